@@ -27,6 +27,7 @@ import_mantid_cext('._api', 'mantid.api', globals())
 from mantid.api import _workspaceops
 
 _workspaceops.attach_binary_operators_to_workspace()
+_workspaceops.attach_binary_operators_to_expression()
 _workspaceops.attach_unary_operators_to_workspace()
 _workspaceops.attach_tableworkspaceiterator()
 ###############################################################################
@@ -42,4 +43,5 @@ from mantid.api import _adsimports
 # Make aliases accessible in this namespace
 ###############################################################################
 from mantid.api._aliases import *
+from mantid.api._workspaceops import DeferredExpression, deferred_operations, set_deferred_operations
 
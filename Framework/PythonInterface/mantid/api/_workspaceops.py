@@ -14,11 +14,15 @@ from __future__ import (absolute_import, division,
                         print_function)
 
 import inspect as _inspect
+import numbers
 import sys
+import threading
+from contextlib import contextmanager
 
 from six import Iterator, get_function_code, iteritems
 
-from mantid.api import AnalysisDataServiceImpl, ITableWorkspace, Workspace, WorkspaceGroup, performBinaryOp
+from mantid.api import (AlgorithmManager, AnalysisDataServiceImpl, IEventWorkspace, ITableWorkspace,
+                        MatrixWorkspace, Workspace, WorkspaceGroup, performBinaryOp)
 from mantid.kernel.funcinspect import customise_func, lhs_info
 
 
@@ -88,6 +92,10 @@ def _do_binary_operation(op, self, rhs, lhs_vars, inplace, reverse):
 
     """
     global _workspace_op_tmps
+    if _deferred_state.enabled and not inplace and _can_defer(op, self, rhs):
+        return _do_deferred_operation(op, self, rhs, lhs_vars, reverse)
+    if isinstance(rhs, DeferredExpression):
+        rhs = rhs.materialize()
     #
     if lhs_vars[0] > 0:
         # Assume the first and clear the temporaries as this
@@ -107,11 +115,7 @@ def _do_binary_operation(op, self, rhs, lhs_vars, inplace, reverse):
 
     # Do we need to clean up
     if clear_tmps:
-        ads = AnalysisDataServiceImpl.Instance()
-        for name in _workspace_op_tmps:
-            if name in ads and output_name != name:
-                del ads[name]
-        _workspace_op_tmps = []
+        _clear_tmps(output_name)
     else:
         if type(resultws) == WorkspaceGroup:
             # Ensure the members are removed aswell
@@ -124,6 +128,424 @@ def _do_binary_operation(op, self, rhs, lhs_vars, inplace, reverse):
     return resultws  # For self-assignment this will be set to the same workspace
 
 
+def _clear_tmps(output_name):
+    """
+        Remove the temporary workspaces created by previous operations from the ADS
+
+        :param output_name: The name of the final output, which is kept
+    """
+    global _workspace_op_tmps
+    ads = AnalysisDataServiceImpl.Instance()
+    for name in _workspace_op_tmps:
+        if name in ads and output_name != name:
+            del ads[name]
+    _workspace_op_tmps = []
+
+
+def _next_tmp_name():
+    """
+        Reserve a name for a temporary workspace created by an operation
+    """
+    output_name = _workspace_op_prefix + str(len(_workspace_op_tmps))
+    _workspace_op_tmps.append(output_name)
+    return output_name
+
+
+# ------------------------------------------------------------------------------
+# Deferred Binary Ops
+# ------------------------------------------------------------------------------
+# Operations that can be recorded & fused into a single pass
+_fusable_ops = ("Plus", "Minus", "Multiply", "Divide")
+
+
+class _DeferredState(threading.local):
+    # If True the binary operators of this thread record an expression tree rather than running algorithms
+    enabled = False
+
+
+_deferred_state = _DeferredState()
+
+
+def set_deferred_operations(enabled):
+    """
+        Switch the deferred evaluation of the workspace arithmetic operators on or off
+        for the calling thread. When on, +-*/ on MatrixWorkspaces record an expression
+        that is only evaluated, in a single pass over the data, when the result is
+        assigned to a variable. The intermediate results of a compound expression are
+        then never stored in the ADS.
+
+        :param enabled: True to defer the evaluation of the operators
+    """
+    _deferred_state.enabled = bool(enabled)
+
+
+@contextmanager
+def deferred_operations():
+    """
+        Context manager that defers the evaluation of the workspace arithmetic
+        operators of the calling thread within its block, e.g.
+
+            with deferred_operations():
+                result = (a - b) * c / d
+    """
+    previous = _deferred_state.enabled
+    set_deferred_operations(True)
+    try:
+        yield
+    finally:
+        set_deferred_operations(previous)
+
+
+class DeferredExpression(object):
+    """
+        A node of the expression tree recorded by the arithmetic operators
+        while deferred operations are enabled. Using the node in place of
+        a workspace, e.g. accessing a workspace method, evaluates it.
+    """
+
+    def __init__(self, op, lhs, rhs):
+        """
+            :param op: The name of the algorithm that the node represents
+            :param lhs: The left operand. A workspace, DeferredExpression or number
+            :param rhs: The right operand. A workspace, DeferredExpression or number
+        """
+        self.op = op
+        self.lhs = lhs
+        self.rhs = rhs
+        self.workspace = None
+
+    def materialize(self, output_name=None):
+        """
+            Evaluate the expression, if it has not been already, and return the workspace
+
+            :param output_name: The name of the output in the ADS. If not given a temporary
+                                name is used and the output is removed on the next assignment
+        """
+        if self.workspace is None or output_name is not None:
+            if output_name is None:
+                output_name = _next_tmp_name()
+            self.workspace = _evaluate_expression(self, output_name)
+        return self.workspace
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+
+def attach_binary_operators_to_expression():
+    """
+        Attaches the fusable binary operators to the DeferredExpression class
+    """
+
+    def add_operator_func(attr, algorithm, reverse):
+        def op_wrapper(self, other):
+            result_info = lhs_info()
+            if not _is_deferrable_operand(other):
+                return _do_binary_operation(algorithm, self.materialize(), other, result_info, False, reverse)
+            return _do_deferred_operation(algorithm, self, other, result_info, reverse)
+
+        op_wrapper.__name__ = attr
+        setattr(DeferredExpression, attr, op_wrapper)
+
+    operations = {
+        "Plus": ["__add__", "__radd__"],
+        "Minus": ["__sub__", "__rsub__"],
+        "Multiply": ["__mul__", "__rmul__"],
+        "Divide": ["__truediv__", "__rtruediv__"]
+    }
+    if sys.version_info[0] < 3:
+        operations["Divide"].extend(["__div__", "__rdiv__"])
+    for alg, attributes in iteritems(operations):
+        for attr in attributes:
+            add_operator_func(attr, alg, attr.startswith('__r'))
+
+
+def _is_deferrable_operand(value):
+    if isinstance(value, (DeferredExpression, numbers.Real)):
+        return True
+    return isinstance(value, MatrixWorkspace) and not isinstance(value, IEventWorkspace)
+
+
+def _can_defer(op, lhs, rhs):
+    return op in _fusable_ops and _is_deferrable_operand(lhs) and _is_deferrable_operand(rhs)
+
+
+def _do_deferred_operation(op, self, rhs, lhs_vars, reverse):
+    """
+        Record the operation in an expression tree and only evaluate the
+        tree if the result is being assigned
+
+        :param op: A string containing the Mantid algorithm name
+        :param self: The object that was the self argument when object.__op__(other) was called
+        :param rhs: The object that was the other argument when object.__op__(other) was called
+        :param lhs_vars: A tuple containing details of the lhs of the assignment, i.e a = b + c, lhs_vars = (1, 'a')
+        :param reverse: True if the reverse operator was called, i.e. 3 + a calls __radd__
+    """
+    if reverse:
+        expression = DeferredExpression(op, rhs, self)
+    else:
+        expression = DeferredExpression(op, self, rhs)
+    if lhs_vars[0] == 0:
+        return expression
+    output_name = lhs_vars[1][0]
+    resultws = expression.materialize(output_name)
+    _clear_tmps(output_name)
+    return resultws
+
+
+def _operand(value):
+    """
+        Return an evaluated expression as its workspace, otherwise the value itself
+    """
+    if isinstance(value, DeferredExpression) and value.workspace is not None:
+        return value.workspace
+    return value
+
+
+def _evaluate_expression(expression, output_name):
+    """
+        Evaluate the tree in a single fused pass if possible, otherwise
+        fall back to running an algorithm per operation
+
+        :param expression: The DeferredExpression at the root of the tree
+        :param output_name: The name of the output workspace
+    """
+    leaves = []
+    num_ops = _collect_leaves(expression, leaves)
+    if num_ops > 1 and _is_fusable(expression, leaves):
+        try:
+            return _evaluate_fused(expression, leaves, output_name)
+        except _NotFusableError:
+            pass
+    lhs, rhs = _operand(expression.lhs), _operand(expression.rhs)
+    if isinstance(lhs, DeferredExpression):
+        lhs = lhs.materialize()
+    if isinstance(rhs, DeferredExpression):
+        rhs = rhs.materialize()
+    if isinstance(lhs, Workspace):
+        return performBinaryOp(lhs, rhs, expression.op, output_name, False, False)
+    else:
+        return performBinaryOp(rhs, lhs, expression.op, output_name, False, True)
+
+
+def _collect_leaves(expression, leaves):
+    """
+        Append the unique workspaces of the tree to leaves
+
+        :returns: The number of operations in the tree
+    """
+    num_ops = 1
+    for value in (_operand(expression.lhs), _operand(expression.rhs)):
+        if isinstance(value, DeferredExpression):
+            num_ops += _collect_leaves(value, leaves)
+        elif isinstance(value, Workspace) and not any(value is leaf for leaf in leaves):
+            leaves.append(value)
+    return num_ops
+
+
+def _is_single_value(workspace):
+    return workspace.id() == "WorkspaceSingleValue"
+
+
+def _divides_by_workspace(expression):
+    value = _operand(expression.rhs)
+    if expression.op == "Divide" and not isinstance(value, numbers.Real):
+        return True
+    return any(_divides_by_workspace(node) for node in (_operand(expression.lhs), value)
+               if isinstance(node, DeferredExpression))
+
+
+def _contains_workspace(value):
+    value = _operand(value)
+    if isinstance(value, DeferredExpression):
+        return _contains_workspace(value.lhs) or _contains_workspace(value.rhs)
+    return isinstance(value, Workspace)
+
+
+def _merges_runs(expression):
+    """
+        Plus merges the logs and adds the proton charges of the runs of two workspaces,
+        which the fused evaluation does not reproduce
+    """
+    if expression.op == "Plus" and _contains_workspace(expression.lhs) and _contains_workspace(expression.rhs):
+        return True
+    return any(_merges_runs(node) for node in (_operand(expression.lhs), _operand(expression.rhs))
+               if isinstance(node, DeferredExpression))
+
+
+def _is_fusable(expression, leaves):
+    """
+        Check that the fused evaluation reproduces the algorithms: all spectra
+        workspaces must share the same common binning, Y unit and be counts,
+        and no runs may need merging
+    """
+    import numpy as np
+    if _merges_runs(expression):
+        return False
+    spectra = [ws for ws in leaves if not _is_single_value(ws)]
+    if len(spectra) == 0 or any(ws.id() != "Workspace2D" for ws in spectra):
+        return False
+    template = spectra[0]
+    if not template.isCommonBins():
+        return False
+    x = template.readX(0)
+    for ws in spectra:
+        if ws.getNumberHistograms() != template.getNumberHistograms() or ws.blocksize() != template.blocksize() \
+                or ws.isDistribution() or ws.YUnit() != template.YUnit() or not ws.isCommonBins() \
+                or not np.array_equal(ws.readX(0), x):
+            return False
+    # Divide changes the Y unit of the output
+    return template.YUnit() == "" or not _divides_by_workspace(expression)
+
+
+class _NotFusableError(Exception):
+    pass
+
+
+# The number of values of each operand that are evaluated at once by the fused evaluation
+_FUSED_BLOCK_VALUES = 65536
+
+
+def _masked_spectra(workspace):
+    """
+        Return a boolean array that is True for the spectra with masked detectors
+    """
+    import numpy as np
+    info = workspace.spectrumInfo()
+    nhist = workspace.getNumberHistograms()
+    return np.fromiter((info.hasDetectors(i) and info.isMasked(i) for i in range(nhist)), dtype=bool, count=nhist)
+
+
+def _evaluate_fused(expression, leaves, output_name):
+    """
+        Evaluate the whole tree in one pass over the Y & E arrays of the
+        operands, a block of spectra at a time. The output is a copy of the
+        first spectra workspace, whose run the algorithms would also keep,
+        with the Y & E values replaced in place.
+    """
+    import numpy as np
+    spectra = [ws for ws in leaves if not _is_single_value(ws)]
+    single_values = dict((id(ws), (ws.readY(0)[0], ws.readE(0)[0])) for ws in leaves if _is_single_value(ws))
+    template = spectra[0]
+    nhist = template.getNumberHistograms()
+    for ws in spectra:
+        if ws is not template and any(ws.hasMaskedBins(i) for i in range(nhist)):
+            # masked bins are copied to the output by the algorithms
+            raise _NotFusableError()
+
+    masked = np.zeros(nhist, dtype=bool)
+    for ws in spectra:
+        masked |= _masked_spectra(ws)
+
+    clone = AlgorithmManager.createUnmanaged("CloneWorkspace")
+    clone.initialize()
+    clone.setChild(True)
+    clone.setProperty("InputWorkspace", template)
+    clone.setPropertyValue("OutputWorkspace", "__unused_for_child")
+    clone.execute()
+    output = clone.getProperty("OutputWorkspace").value
+    output_info = output.spectrumInfo()
+
+    # The scratch buffers for the leaves and the nodes are allocated once and reused for each block
+    nbins = template.blocksize()
+    block_size = max(1, min(nhist, _FUSED_BLOCK_VALUES // max(nbins, 1)))
+    buffers = {}
+    for ws in spectra:
+        buffers[id(ws)] = (np.empty((block_size, nbins)), np.empty((block_size, nbins)))
+    _allocate_node_buffers(expression, buffers, (block_size, nbins))
+    scratch = np.empty((block_size, nbins))
+
+    for start in range(0, nhist, block_size):
+        stop = min(start + block_size, nhist)
+        count = stop - start
+        values = dict(single_values)
+        for ws in spectra:
+            y, e = buffers[id(ws)]
+            for row, i in enumerate(range(start, stop)):
+                y[row] = ws.readY(i)
+                e[row] = ws.readE(i)
+            values[id(ws)] = (y[:count], e[:count])
+        y, e = _evaluate_block(expression, values, buffers, scratch[:count])
+        for row, i in enumerate(range(start, stop)):
+            if masked[i]:
+                output.dataY(i)[:] = 0.0
+                output.dataE(i)[:] = 0.0
+                output_info.setMasked(i, True)
+            else:
+                output.dataY(i)[:] = y[row]
+                output.dataE(i)[:] = e[row]
+
+    ads = AnalysisDataServiceImpl.Instance()
+    ads.addOrReplace(output_name, output)
+    return ads[output_name]
+
+
+def _allocate_node_buffers(value, buffers, shape):
+    """
+        Allocate the (Y, E) buffers of each node of the tree
+    """
+    import numpy as np
+    value = _operand(value)
+    if isinstance(value, DeferredExpression):
+        buffers[id(value)] = (np.empty(shape), np.empty(shape))
+        _allocate_node_buffers(value.lhs, buffers, shape)
+        _allocate_node_buffers(value.rhs, buffers, shape)
+
+
+def _evaluate_block(value, values, buffers, scratch):
+    """
+        Evaluate a node for a block of spectra, propagating the errors as the
+        Plus, Minus, Multiply & Divide algorithms do for uncorrelated values
+
+        :param value: A DeferredExpression, workspace or number
+        :param values: A dictionary of workspace id to the (Y, E) arrays of the workspace for the block
+        :param buffers: A dictionary of node id to the (Y, E) buffers that receive the values of the node
+        :param scratch: A buffer for intermediate values, with the shape of the block
+        :returns: A tuple of (Y, E)
+    """
+    import numpy as np
+    value = _operand(value)
+    if isinstance(value, Workspace):
+        return values[id(value)]
+    if not isinstance(value, DeferredExpression):
+        return float(value), 0.0
+    lhs_y, lhs_e = _evaluate_block(value.lhs, values, buffers, scratch)
+    rhs_y, rhs_e = _evaluate_block(value.rhs, values, buffers, scratch)
+    count = scratch.shape[0]
+    y, e = (buffer[:count] for buffer in buffers[id(value)])
+    op = value.op
+    if op == "Plus" or op == "Minus":
+        if op == "Plus":
+            np.add(lhs_y, rhs_y, out=y)
+        else:
+            np.subtract(lhs_y, rhs_y, out=y)
+        np.multiply(lhs_e, lhs_e, out=e)
+        np.multiply(rhs_e, rhs_e, out=scratch)
+        e += scratch
+    elif op == "Multiply":
+        np.multiply(lhs_y, rhs_y, out=y)
+        np.multiply(lhs_e, rhs_y, out=e)
+        e *= e
+        np.multiply(rhs_e, lhs_y, out=scratch)
+        scratch *= scratch
+        e += scratch
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(lhs_y, rhs_y, out=y)
+            np.multiply(lhs_y, rhs_e, out=scratch)
+            scratch /= rhs_y
+            scratch *= scratch
+            np.multiply(lhs_e, lhs_e, out=e)
+            e += scratch
+            np.sqrt(e, out=e)
+            e /= rhs_y
+            np.abs(e, out=e)
+        return y, e
+    np.sqrt(e, out=e)
+    return y, e
+
+
 # ------------------------------------------------------------------------------
 # Unary Ops
 # ------------------------------------------------------------------------------
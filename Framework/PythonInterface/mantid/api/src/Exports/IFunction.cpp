@@ -5,8 +5,13 @@
 //     & Institut Laue - Langevin
 // SPDX - License - Identifier: GPL - 3.0 +
 #include "MantidAPI/CompositeFunction.h"
+#include "MantidAPI/FunctionDomain1D.h"
+#include "MantidAPI/FunctionValues.h"
+#include "MantidAPI/Jacobian.h"
 #include "MantidKernel/WarningSuppressions.h"
 #include "MantidPythonInterface/api/FitFunctions/IFunctionAdapter.h"
+#include "MantidPythonInterface/core/NDArray.h"
+#include "MantidPythonInterface/core/ReleaseGlobalInterpreterLock.h"
 #include "MantidPythonInterface/kernel/GetPointer.h"
 #include "MantidPythonInterface/kernel/Registry/TypeRegistry.h"
 #include "MantidPythonInterface/kernel/Registry/TypedPropertyValueHandler.h"
@@ -16,9 +21,20 @@
 #include <boost/python/overloads.hpp>
 #include <boost/python/register_ptr_to_python.hpp>
 
+#include <algorithm>
+
+#define PY_ARRAY_UNIQUE_SYMBOL API_ARRAY_API
+#define NO_IMPORT_ARRAY
+#include <numpy/arrayobject.h>
+
+using Mantid::API::FunctionDomain1DView;
+using Mantid::API::FunctionValues;
 using Mantid::API::IFunction;
 using Mantid::API::IFunction_sptr;
+using Mantid::API::Jacobian;
 using Mantid::PythonInterface::IFunctionAdapter;
+using Mantid::PythonInterface::NDArray;
+using Mantid::PythonInterface::ReleaseGlobalInterpreterLock;
 using namespace Mantid::PythonInterface::Registry;
 using namespace boost::python;
 
@@ -53,6 +69,120 @@ double getError(IFunction &self, std::string const &name) {
   return self.getError(self.parameterIndex(name));
 }
 
+/**
+ * A Jacobian which stores the derivatives in a row-major (number of x values) x
+ * (number of parameters) array, such as the data of a numpy array.
+ */
+class ArrayJacobian : public Jacobian {
+public:
+  ArrayJacobian(double *data, size_t nData, size_t nParams)
+      : m_data(data), m_nData(nData), m_nParams(nParams) {}
+  void set(size_t iY, size_t iP, double value) override {
+    m_data[iY * m_nParams + iP] = value;
+  }
+  double get(size_t iY, size_t iP) override {
+    return m_data[iY * m_nParams + iP];
+  }
+  void zero() override { std::fill(m_data, m_data + m_nData * m_nParams, 0.0); }
+
+private:
+  double *m_data;
+  size_t m_nData;
+  size_t m_nParams;
+};
+
+/**
+ * Returns the x values as a C-contiguous float64 numpy array. The array is not
+ * copied if it already is one.
+ */
+PyArrayObject *xValuesArray(const NDArray &xvals) {
+  auto array = reinterpret_cast<PyArrayObject *>(PyArray_FROMANY(
+      xvals.ptr(), NPY_DOUBLE, 0, 0, NPY_ARRAY_IN_ARRAY));
+  if (!array)
+    throw_error_already_set();
+  return array;
+}
+
+/**
+ * Calculates the values of the function for the x values in a numpy array, as
+ * EvaluateFunction does, without creating a workspace. The x values are read
+ * in place when they are a contiguous float64 array.
+ * @param self :: The function
+ * @param xvals :: A numpy array of x values of any shape
+ * @return A numpy array of the same shape with the values of the function
+ */
+PyObject *evaluate1D(IFunction &self, const NDArray &xvals) {
+  PyArrayObject *x = xValuesArray(xvals);
+  const auto nData = static_cast<size_t>(PyArray_SIZE(x));
+  PyObject *y = PyArray_SimpleNew(PyArray_NDIM(x), PyArray_DIMS(x), NPY_DOUBLE);
+  if (!y) {
+    Py_DECREF(x);
+    throw_error_already_set();
+  }
+  try {
+    // Setting up changes the function, so it is done while holding the GIL
+    self.setUpForFit();
+    self.applyTies();
+    ReleaseGlobalInterpreterLock releaseGIL;
+    FunctionDomain1DView domain(
+        static_cast<const double *>(PyArray_DATA(x)), nData);
+    FunctionValues values(domain);
+    self.function(domain, values);
+    if (nData > 0) {
+      const double *calculated = values.getPointerToCalculated(0);
+      std::copy(calculated, calculated + nData,
+                static_cast<double *>(
+                    PyArray_DATA(reinterpret_cast<PyArrayObject *>(y))));
+    }
+  } catch (...) {
+    Py_DECREF(x);
+    Py_DECREF(y);
+    throw;
+  }
+  Py_DECREF(x);
+  return y;
+}
+
+/**
+ * Calculates the derivatives of the function with respect to its parameters
+ * for the x values in a numpy array. The derivatives are written straight into
+ * the returned array.
+ * @param self :: The function
+ * @param xvals :: A numpy array of x values of any shape
+ * @return A numpy array of shape (number of x values, number of parameters)
+ */
+PyObject *jacobian1D(IFunction &self, const NDArray &xvals) {
+  PyArrayObject *x = xValuesArray(xvals);
+  const auto nData = static_cast<size_t>(PyArray_SIZE(x));
+  const auto nParams = self.nParams();
+  Py_intptr_t dims[2] = {static_cast<Py_intptr_t>(nData),
+                         static_cast<Py_intptr_t>(nParams)};
+  PyObject *jacobian = PyArray_ZEROS(2, dims, NPY_DOUBLE, 0);
+  if (!jacobian) {
+    Py_DECREF(x);
+    throw_error_already_set();
+  }
+  try {
+    // Setting up changes the function, so it is done while holding the GIL
+    self.setUpForFit();
+    self.applyTies();
+    ReleaseGlobalInterpreterLock releaseGIL;
+    FunctionDomain1DView domain(
+        static_cast<const double *>(PyArray_DATA(x)), nData);
+    ArrayJacobian out(static_cast<double *>(PyArray_DATA(
+                          reinterpret_cast<PyArrayObject *>(jacobian))),
+                      nData, nParams);
+    if (nData > 0)
+      self.functionDeriv(domain, out);
+  } catch (...) {
+    Py_DECREF(x);
+    Py_DECREF(jacobian);
+    throw;
+  }
+  Py_DECREF(x);
+  return jacobian;
+}
+
 // -- Set property overloads --
 // setProperty(index,value,explicit)
 using setParameterType1 = void (IFunction::*)(size_t, const double &, bool);
@@ -275,6 +405,18 @@ void export_IFunction() {
       .def("getError", &getError, (arg("self"), arg("name")),
            "Return fitting error of the named parameter")
 
+      .def("evaluate1D", &evaluate1D, (arg("self"), arg("xvals")),
+           "Calculate the values of the function for a numpy array of x "
+           "values and return them in an array of the same shape. The "
+           "function is evaluated without holding the GIL so the same "
+           "function must not be evaluated from several threads at once")
+      .def("jacobian1D", &jacobian1D, (arg("self"), arg("xvals")),
+           "Calculate the derivatives of the function with respect to its "
+           "parameters for a numpy array of x values and return them in an "
+           "array of shape (number of x values, number of parameters). The "
+           "derivatives are calculated without holding the GIL so the same "
+           "function must not be used from several threads at once")
+
       //-- Python special methods --
       .def("__repr__", &IFunction::asString, arg("self"),
            "Return a string representation of the function");
@@ -5,15 +5,43 @@
 //     & Institut Laue - Langevin
 // SPDX - License - Identifier: GPL - 3.0 +
 #include "MantidAPI/Jacobian.h"
+#include "MantidPythonInterface/core/NDArray.h"
 #include "MantidPythonInterface/kernel/GetPointer.h"
 #include <boost/python/class.hpp>
 #include <boost/python/register_ptr_to_python.hpp>
 
+#define PY_ARRAY_UNIQUE_SYMBOL API_ARRAY_API
+#define NO_IMPORT_ARRAY
+#include <numpy/arrayobject.h>
+
 using Mantid::API::Jacobian;
+using Mantid::PythonInterface::NDArray;
 using namespace boost::python;
 
 GET_POINTER_SPECIALIZATION(Jacobian)
 
+namespace {
+/**
+ * Set a column of the Jacobian matrix from a numpy array, one element for
+ * each data point
+ * @param self :: The Jacobian
+ * @param iP :: The index of the parameter
+ * @param values :: A 1D array with the derivatives for each data point
+ */
+void setColumn(Jacobian &self, size_t iP, const NDArray &values) {
+  auto array = reinterpret_cast<PyArrayObject *>(
+      PyArray_FROMANY(values.ptr(), NPY_DOUBLE, 1, 1, NPY_ARRAY_IN_ARRAY));
+  if (!array)
+    throw_error_already_set();
+  const auto *data = static_cast<const double *>(PyArray_DATA(array));
+  const auto nData = static_cast<size_t>(PyArray_SIZE(array));
+  for (size_t iY = 0; iY < nData; ++iY) {
+    self.set(iY, iP, data[iY]);
+  }
+  Py_DECREF(array);
+}
+} // namespace
+
 void export_Jacobian() {
   register_ptr_to_python<Jacobian *>();
 
@@ -23,6 +51,10 @@ void export_Jacobian() {
            "Set an element of the Jacobian matrix where iy=index of data "
            "point, ip=index of parameter.")
 
+      .def("setColumn", &setColumn, (arg("self"), arg("ip"), arg("values")),
+           "Set the elements of the Jacobian matrix for parameter ip from an "
+           "array with a value for each data point.")
+
       .def("get", &Jacobian::get, (arg("self"), arg("iy"), arg("ip")),
            "Return the given element of the Jacobian matrix where iy=index of "
            "data point, ip=index of parameter.");
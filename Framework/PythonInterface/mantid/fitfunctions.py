@@ -159,33 +159,54 @@ class FunctionWrapper(object):
             # If the input is a workspace, simply return the output workspace.
             return self._execute_algorithm('EvaluateFunction', Function=self.fun, InputWorkspace=x)
 
-        list_input =  isinstance(x, list)
+        list_input = isinstance(x, list)
         numpy_input = isinstance(x, np.ndarray)
-        if numpy_input:
-            # If the input is a numpy array reshape into 1D array, saving
-            # original shape to reshape output back to it.
-            x_list = x.reshape(-1, order='C')
-            x_shape = x.shape
-        elif list_input:
-            # If the input isn't a list, wrap it in one so we can iterate easily
-            x_list = x
-        else:
-            x_list = [x]
 
         for i in range(len(params)):
             self.fun.setParameter(i, params[i])
-        y = x_list[:]
-        ws = self._execute_algorithm('CreateWorkspace', DataX=x_list, DataY=y)
+        try:
+            # Evaluate the function directly on the array of x values
+            output_array = self.fun.evaluate1D(np.asarray(x, dtype=np.float64))
+        except (RuntimeError, ValueError):
+            # Some functions need a workspace to be evaluated on.
+            output_array = self._evaluate_on_workspace(x)
+            if numpy_input:
+                output_array = output_array.reshape(x.shape, order='C')
+        if numpy_input or list_input:
+            return output_array
+        else:
+            return output_array.reshape(-1)[0]
+
+    def _evaluate_on_workspace(self, x):
+        """
+        Evaluate the function with the EvaluateFunction algorithm on a workspace
+        holding the x values.
+
+        :param x: x value or list or array of x values
+        :return: 1D numpy array of the function values
+        """
+        import numpy as np
+
+        x_list = np.asarray(x, dtype=np.float64).reshape(-1, order='C')
+        ws = self._execute_algorithm('CreateWorkspace', DataX=x_list, DataY=x_list)
         out = self._execute_algorithm('EvaluateFunction', Function=self.fun, InputWorkspace=ws)
         # Create a copy of the calculated spectrum
-        output_array = np.array(out.readY(1))
-        if numpy_input:
-            return output_array.reshape(x_shape, order='C')
+        return np.array(out.readY(1))
 
-        if list_input:
-            return output_array
-        else:
-            return output_array[0]
+    def jacobian(self, x, *params):
+        """
+        Calculate the derivatives of the function with respect
+        to its parameters.
+
+        :param x:      x value or list of x values
+        :param params: list of parameter values
+        :return: numpy array of shape (number of x values, number of parameters)
+        """
+        import numpy as np
+
+        for i in range(len(params)):
+            self.fun.setParameter(i, params[i])
+        return self.fun.jacobian1D(np.asarray(x, dtype=np.float64).reshape(-1, order='C'))
 
     def plot(self, **kwargs):
         """
@@ -53,4 +53,17 @@ def is_64bit():
         return _sys.maxsize > 2**32
     else:
         bits = _platform.architecture()[0]
-        return bits == '64bit'
\ No newline at end of file
+        return bits == '64bit'
+
+def max_threads():
+    """
+        Returns the number of threads that work split across threads may use, as given by
+        MultiThreaded.MaxCores, or the number of CPUs if that is 0 or not set
+    """
+    from multiprocessing import cpu_count
+    from mantid.kernel import config
+    try:
+        threads = int(config['MultiThreaded.MaxCores'])
+    except (KeyError, ValueError):
+        threads = 0
+    return threads if threads > 0 else max(cpu_count(), 1)
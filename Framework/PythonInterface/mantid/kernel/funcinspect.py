@@ -18,6 +18,8 @@ import opcode
 import inspect
 import sys
 import dis
+import threading
+from collections import OrderedDict
 from six import PY3
 
 
@@ -245,6 +247,43 @@ def process_frame(frame):
 
 #-------------------------------------------------------------------------------
 
+# The result of process_frame depends only on the code object and the
+# instruction being executed so it is cached against those to avoid
+# decompiling the caller on every call. The cache is bounded and evicts
+# the least recently used entries.
+_lhs_cache_max_size = 512
+_lhs_cache = OrderedDict()
+_lhs_cache_lock = threading.Lock()
+
+
+def _cached_process_frame(frame):
+    """Returns process_frame(frame), reusing the result of a previous call
+    made from the same instruction of the same code object
+    """
+    if _lhs_cache_max_size <= 0:
+        return process_frame(frame)
+    key = (frame.f_code, frame.f_lasti)
+    with _lhs_cache_lock:
+        ret_vals = _lhs_cache.pop(key, None)
+        if ret_vals is not None:
+            # re-insert to mark as most recently used
+            _lhs_cache[key] = ret_vals
+            return ret_vals
+    ret_vals = process_frame(frame)
+    with _lhs_cache_lock:
+        _lhs_cache[key] = ret_vals
+        while len(_lhs_cache) > _lhs_cache_max_size:
+            _lhs_cache.popitem(last=False)
+    return ret_vals
+
+
+def clear_lhs_cache():
+    """Remove all entries from the cache used by lhs_info"""
+    with _lhs_cache_lock:
+        _lhs_cache.clear()
+
+#-------------------------------------------------------------------------------
+
 def lhs_info(output_type='both', frame=None):
     """Returns the number of arguments on the left of assignment along
     with the names of the variables.
@@ -285,7 +324,7 @@ def lhs_info(output_type='both', frame=None):
     # Process the frame noting the advice here:
     # http://docs.python.org/library/inspect.html#the-interpreter-stack
     try:
-        ret_vals = process_frame(frame)
+        ret_vals = _cached_process_frame(frame)
     finally:
         del frame
 
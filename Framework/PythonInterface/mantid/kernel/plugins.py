@@ -13,8 +13,11 @@ algorithms, fit functions etc.
 from __future__ import (absolute_import, division,
                         print_function)
 
+import json as _json
 import os as _os
+import re as _re
 import sys as _sys
+import threading as _threading
 from traceback import format_exc
 try:
     from importlib.machinery import SourceFileLoader
@@ -38,6 +41,9 @@ from . import logger, Logger, config
 
 # String that separates paths (should be in the ConfigService)
 PATH_SEPARATOR=";"
+# Matches a module-level, unconditional registration of a named algorithm class
+_SUBSCRIBE_RE = _re.compile(r"^AlgorithmFactory\.subscribe\(\s*([A-Za-z_][A-Za-z0-9_]*)\s*\)\s*(#.*)?$",
+                            _re.MULTILINE)
 
 class PluginLoader(object):
 
@@ -99,13 +105,18 @@ def check_for_plugins(top_dir):
     return False
 
 
-def find_plugins(top_dir):
+def find_plugins(top_dir, index=None):
     """
        Searches recursively from the given directory to find the list of plugins that should be loaded
        @param top_dir :: A string containing a path to a directory. Throws ValueError if it is not valid
+       @param index :: An optional PluginIndex. If given the directory listings and the algorithm
+                       check are taken from it and only files that have changed are read
     """
     if not _os.path.isdir(top_dir):
         raise ValueError("Cannot search given path for plugins, path is not a directory: '%s' " % str(top_dir))
+    if index is not None:
+        return index.find_plugins(top_dir)
+
     all_plugins = []
     algs = []
     for root, dirs, files in _os.walk(top_dir):
@@ -260,3 +271,342 @@ def contains_algorithm(filename):
         alg_found = False
 
     return alg_found
+
+#======================================================================================================================
+# Persistent plugin index
+#======================================================================================================================
+
+class PluginIndex(object):
+    """
+        A persistent record of the plugin directories & files. For each plugin file
+        it stores the modification time & size along with the names of the algorithms
+        that it subscribes so that unchanged files never have to be read again.
+        Directory listings are also stored against the directory modification time to
+        avoid walking unchanged trees. Once a plugin has been imported the metadata the
+        AlgorithmFactory requires from each of its algorithms is recorded so that,
+        on subsequent runs, the import can be deferred until an algorithm is first created.
+    """
+    # Increment if the layout of the stored entries changes
+    FORMAT_VERSION = 2
+
+    def __init__(self, filename):
+        """
+            @param filename :: The file used to persist the index
+        """
+        self._filename = filename
+        self._dirs = {}
+        self._files = {}
+        self._modified = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._filename, 'r') as index_file:
+                contents = _json.load(index_file)
+        except (IOError, OSError, ValueError):
+            return
+        if not isinstance(contents, dict) or contents.get('version') != self.FORMAT_VERSION:
+            return
+        self._dirs = contents.get('directories', {})
+        self._files = contents.get('files', {})
+
+    def save(self):
+        """
+            Write the index to disk if it has changed. A failure to write is not fatal
+            as the index is rebuilt from the plugin files.
+        """
+        if not self._modified:
+            return
+        tmp_filename = "{0}.{1}.tmp".format(self._filename, _os.getpid())
+        try:
+            directory = _os.path.dirname(self._filename)
+            if not _os.path.isdir(directory):
+                _os.makedirs(directory)
+            with open(tmp_filename, 'w') as index_file:
+                _json.dump({'version': self.FORMAT_VERSION, 'directories': self._dirs,
+                            'files': self._files}, index_file)
+            getattr(_os, 'replace', _os.rename)(tmp_filename, self._filename)
+            self._modified = False
+        except (IOError, OSError) as exc:
+            logger.debug("Unable to write plugin index '{0}': {1}".format(self._filename, str(exc)))
+
+    def find_plugins(self, top_dir):
+        """
+            Equivalent of find_plugins() that only reads directories and files
+            that have changed since they were last indexed.
+            @param top_dir :: A path to a directory
+            @returns A 2-tuple of (all plugin files, files subscribing an algorithm)
+        """
+        all_plugins = []
+        algs = []
+        for directory, listing in self._walk(top_dir):
+            for name in listing['files']:
+                filename = _os.path.join(directory, name)
+                entry = self.entry(filename)
+                if entry is None:
+                    continue
+                all_plugins.append(filename)
+                if entry['subscribes']:
+                    algs.append(filename)
+        return all_plugins, algs
+
+    def subdirectories(self, top_dir):
+        """
+            Equivalent of walking top_dir with os.walk and collecting the
+            directory names, using the stored listings where possible
+            @param top_dir :: A path to a directory
+            @returns A list of all directories below top_dir
+        """
+        return [directory for directory, _ in self._walk(top_dir) if directory != top_dir]
+
+    def entry(self, filename):
+        """
+            Return the index entry for a plugin file, rescanning the file if its
+            modification time or size has changed.
+            @param filename :: The full path to a plugin file
+            @returns A dictionary describing the plugin or None if the file cannot be accessed
+        """
+        try:
+            stat = _os.stat(filename)
+        except OSError:
+            return None
+        entry = self._files.get(filename)
+        if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+            entry = _scan_plugin(filename)
+            entry['mtime'] = stat.st_mtime
+            entry['size'] = stat.st_size
+            self._files[filename] = entry
+            self._modified = True
+        return entry
+
+    def algorithm_sources(self, filenames):
+        """
+            Map the names of the algorithms subscribed by the given plugin files to the
+            file and its modification time. Names subscribed by several files are left out.
+            @param filenames :: A list of plugin filenames
+            @returns A dictionary of algorithm name to a string identifying the plugin file
+        """
+        sources = {}
+        duplicates = set()
+        for filename in filenames:
+            entry = self.entry(filename)
+            if entry is None or not entry['subscribes']:
+                continue
+            source = "{0}@{1}".format(filename, entry['mtime'])
+            names = [metadata['name'] for metadata in entry['metadata'].values()] or entry['algorithms']
+            for name in names:
+                if name in sources:
+                    duplicates.add(name)
+                sources[name] = source
+        for name in duplicates:
+            del sources[name]
+        return sources
+
+    def record_module(self, filename, module):
+        """
+            Record the factory metadata for the algorithms that a freshly imported
+            plugin module subscribed so that its import can be deferred next time.
+            @param filename :: The full path to the plugin file
+            @param module :: The module object created by importing the file
+        """
+        entry = self._files.get(filename)
+        if entry is None or not entry['deferrable'] or entry['metadata']:
+            return
+        try:
+            metadata = dict((name, _algorithm_metadata(getattr(module, name)))
+                            for name in entry['algorithms'])
+        except Exception as exc:
+            logger.debug("Plugin '{0}' cannot be loaded on demand: {1}".format(filename, str(exc)))
+            entry['deferrable'] = False
+        else:
+            entry['metadata'] = metadata
+        self._modified = True
+
+    def _walk(self, top_dir):
+        """
+            Generate (directory, listing) pairs for top_dir and all directories below it,
+            reusing the stored listing of any directory whose modification time has not changed
+        """
+        pending = [top_dir]
+        while pending:
+            directory = pending.pop()
+            try:
+                mtime = _os.stat(directory).st_mtime
+            except OSError:
+                continue
+            listing = self._dirs.get(directory)
+            if listing is None or listing['mtime'] != mtime:
+                try:
+                    names = sorted(_os.listdir(directory))
+                except OSError:
+                    continue
+                files, subdirs = [], []
+                for name in names:
+                    path = _os.path.join(directory, name)
+                    # os.walk does not follow links to directories
+                    if _os.path.isdir(path):
+                        if not _os.path.islink(path):
+                            subdirs.append(name)
+                    elif name.endswith(PluginLoader.extension):
+                        files.append(name)
+                listing = {'mtime': mtime, 'files': files, 'dirs': subdirs}
+                self._dirs[directory] = listing
+                self._modified = True
+            yield directory, listing
+            pending.extend(_os.path.join(directory, name) for name in reversed(listing['dirs']))
+
+#======================================================================================================================
+
+def _scan_plugin(filename):
+    """
+        Read a plugin file once and describe what it registers
+        @param filename :: The full path to a plugin file
+        @returns A dictionary for the PluginIndex
+    """
+    entry = {'subscribes': False, 'algorithms': [], 'deferrable': False, 'metadata': {}}
+    try:
+        from io import open as _open
+        with _open(filename, 'r', encoding='UTF-8') as plugin_file:
+            source = plugin_file.read()
+    except Exception as exc:
+        logger.warning("Error checking plugin content in '{0}'\n{1}".format(filename, str(exc)))
+        return entry
+    if 'AlgorithmFactory.subscribe' not in source:
+        return entry
+    names = [match.group(1) for match in _SUBSCRIBE_RE.finditer(source)]
+    entry['subscribes'] = True
+    entry['algorithms'] = names
+    # Only files whose sole side effect is to subscribe named algorithms can have their
+    # import deferred. isRunning overrides are looked up when the C++ object is constructed
+    # so cannot be swapped in later.
+    entry['deferrable'] = (len(names) > 0 and source.count('AlgorithmFactory.subscribe') == len(names)
+                           and 'FunctionFactory' not in source and 'def isRunning' not in source)
+    return entry
+
+
+def _algorithm_metadata(cls):
+    """
+        Capture what the factory asks of an algorithm on subscription
+        @param cls :: A class type derived from one of the exported algorithm types
+        @returns A dictionary of the metadata
+    """
+    from mantid import api
+    base = None
+    for klass in cls.__mro__[1:]:
+        if klass.__module__.startswith('mantid.api') and getattr(api, klass.__name__, None) is klass:
+            base = klass.__name__
+            break
+    if base is None:
+        raise ValueError("'{0}' does not derive from an exported algorithm type".format(cls.__name__))
+    instance = cls()
+    return {'base': base, 'name': instance.name(), 'version': instance.version(), 'category': instance.category(),
+            'summary': instance.summary(), 'seeAlso': list(instance.seeAlso()),
+            'helpURL': instance.helpURL()}
+
+#======================================================================================================================
+
+# Plugin files whose import has been deferred mapped to their module once loaded
+_deferred_modules = {}
+_deferred_lock = _threading.RLock()
+
+
+def load_with_index(paths, index, defer=False):
+    """
+        Load the given plugin files, keeping the index up to date. If defer is True then
+        files whose algorithms are fully described by the index are not imported. Instead
+        a lightweight proxy is subscribed for each algorithm that imports the real module
+        when the algorithm is first initialized.
+
+        @param paths :: A list of plugin filenames
+        @param index :: A PluginIndex
+        @param defer :: If True defer the import of plugins where possible
+        @return A list of the modules that were imported
+    """
+    loaded = []
+    for filename in paths:
+        entry = index.entry(filename)
+        if defer and entry is not None and entry['deferrable'] and entry['metadata']:
+            try:
+                _subscribe_deferred(filename, entry['metadata'])
+                continue
+            except Exception:
+                logger.warning("Failed to defer plugin %s, importing it now.\nError: %s" % (filename, format_exc()))
+        modules = load_from_file(filename)
+        loaded += modules
+        if len(modules) > 0:
+            index.record_module(filename, modules[0])
+
+    return loaded
+
+
+def _load_deferred(filename):
+    """
+        Import a plugin whose load was deferred. Importing the module subscribes the
+        real algorithms, replacing the proxies in the factory.
+        @param filename :: The full path to the plugin file
+        @returns The module object
+    """
+    with _deferred_lock:
+        module = _deferred_modules.get(filename)
+        if module is None:
+            name = _os.path.splitext(_os.path.basename(filename))[0]
+            existing = _sys.modules.get(name)
+            if existing is not None and \
+                    _os.path.splitext(getattr(existing, '__file__', ''))[0] == _os.path.splitext(filename)[0]:
+                module = existing
+            else:
+                name, module = load_plugin(filename)
+            _deferred_modules[filename] = module
+    return module
+
+
+def _subscribe_deferred(filename, metadata):
+    """
+        Subscribe a proxy for each algorithm described by metadata
+        @param filename :: The plugin file that defines the algorithms
+        @param metadata :: A dictionary of algorithm class name to the values recorded by _algorithm_metadata
+    """
+    from mantid.api import AlgorithmFactory
+    for name, values in metadata.items():
+        AlgorithmFactory.subscribe(_create_proxy_type(filename, name, values))
+
+
+def _create_proxy_type(filename, name, values):
+    """
+        Create a stand-in algorithm type with the class name of the real algorithm, which
+        is subscribed under the name the real algorithm returns from name(). On PyInit
+        the plugin is imported and the instance becomes an instance of the real type.
+        @param filename :: The plugin file that defines the algorithm
+        @param name :: The name of the algorithm class
+        @param values :: The metadata recorded for the algorithm
+    """
+    from mantid import api
+
+    def become_real(self):
+        module = _load_deferred(filename)
+        try:
+            self.__class__ = getattr(module, name)
+        except (AttributeError, TypeError) as exc:
+            raise RuntimeError("Unable to load algorithm '{0}' from '{1}': {2}".format(name, filename, str(exc)))
+
+    def PyInit(self):
+        become_real(self)
+        self.PyInit()
+
+    def PyExec(self):
+        become_real(self)
+        self.PyExec()
+
+    attrs = {
+        '__module__': __name__,
+        'name': lambda self: str(values['name']),
+        'version': lambda self: values['version'],
+        'category': lambda self: str(values['category']),
+        'summary': lambda self: str(values['summary']),
+        'seeAlso': lambda self: [str(alg) for alg in values['seeAlso']],
+        'helpURL': lambda self: str(values['helpURL']),
+        'PyInit': PyInit,
+        'PyExec': PyExec
+    }
+    return type(str(name), (getattr(api, values['base']),), attrs)
+
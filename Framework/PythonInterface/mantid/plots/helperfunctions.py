@@ -18,7 +18,6 @@ import mantid.kernel
 from mantid.api import MultipleExperimentInfos
 from mantid.dataobjects import EventWorkspace, MDHistoWorkspace, Workspace2D
 from mantid.plots.utility import MantidAxType
-from scipy.interpolate import interp1d
 
 # Helper functions for data extraction from a Mantid workspace and plot functionality
 # These functions are common between plotfunctions.py and plotfunctions3D.py
@@ -303,13 +302,17 @@ def get_bins(workspace, wkspIndex, withDy=False):
 
     """
     num_hist = workspace.getNumberHistograms()
-    x = range(0, num_hist)
-    y = []
-    dy = [] if withDy else None
-    for i in x:
-        y.append(workspace.readY(i)[wkspIndex])
+    x = numpy.arange(num_hist)
+    dy = None
+    if _has_common_blocksize(workspace):
+        # one bulk copy of the data is much cheaper than a call per spectrum
+        y = workspace.extractY()[:, wkspIndex]
+        if withDy:
+            dy = workspace.extractE()[:, wkspIndex]
+    else:
+        y = numpy.fromiter((workspace.readY(i)[wkspIndex] for i in x), dtype=numpy.float64, count=num_hist)
         if withDy:
-            dy.append(workspace.readE(i)[wkspIndex])
+            dy = numpy.fromiter((workspace.readE(i)[wkspIndex] for i in x), dtype=numpy.float64, count=num_hist)
 
     dx = None
     return x, y, dy, dx
@@ -353,13 +356,13 @@ def boundaries_from_points(input_array):
     :param input_array: a :class:`numpy.ndarray` of bin centers
     """
     assert isinstance(input_array, numpy.ndarray), 'Not a numpy array'
-    if len(input_array) == 0:
+    if input_array.shape[-1] == 0:
         raise ValueError('could not extend array with no elements')
-    if len(input_array) == 1:
-        return numpy.array([input_array[0] - 0.5, input_array[0] + 0.5])
-    return numpy.concatenate(([(3 * input_array[0] - input_array[1]) * 0.5],
-                              (input_array[1:] + input_array[:-1]) * 0.5,
-                              [(3 * input_array[-1] - input_array[-2]) * 0.5]))
+    if input_array.shape[-1] == 1:
+        return numpy.concatenate((input_array - 0.5, input_array + 0.5), axis=-1)
+    return numpy.concatenate(((3 * input_array[..., :1] - input_array[..., 1:2]) * 0.5,
+                              (input_array[..., 1:] + input_array[..., :-1]) * 0.5,
+                              (3 * input_array[..., -1:] - input_array[..., -2:-1]) * 0.5), axis=-1)
 
 
 def common_x(arr):
@@ -369,33 +372,97 @@ def common_x(arr):
     return numpy.all(arr == arr[0, :], axis=(1, 0))
 
 
-def get_matrix_2d_ragged(workspace, distribution, histogram2D=False, transpose=False):
-    num_hist = workspace.getNumberHistograms()
-    delta = numpy.finfo(numpy.float64).max
-    min_value = numpy.finfo(numpy.float64).max
-    max_value = numpy.finfo(numpy.float64).min
-    for i in range(num_hist):
-        xtmp = workspace.readX(i)
+def _has_common_blocksize(workspace):
+    """
+    Helper function to check if all spectra in a matrix workspace have the same length,
+    in which case the data can be copied out in bulk with extractX/extractY
+    """
+    try:
+        workspace.blocksize()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _extract_points(workspace, distribution):
+    """
+    Extract the bin centers and intensities of every spectrum in one go,
+    applying the same normalisation as :func:`get_spectrum`.
+
+    Returns the concatenated x and y of all spectra as flat arrays,
+    and an array with the number of points in each spectrum
+    """
+    divide = (workspace.isHistogramData() and (not distribution) and
+              (mantid.kernel.config['graph1d.autodistribution'] == 'On'))
+    if _has_common_blocksize(workspace):
+        x = workspace.extractX()
+        y = workspace.extractY()
         if workspace.isHistogramData():
-            #input x is edges
-            xtmp = mantid.plots.helperfunctions.points_from_boundaries(xtmp)
-        else:
-            #input x is centers
-            pass
-        min_value = min(min_value, xtmp.min())
-        max_value = max(max_value, xtmp.max())
-        diff = xtmp[1:] - xtmp[:-1]
-        delta = min(delta, diff.min())
+            if divide:
+                y = y / (x[:, 1:] - x[:, :-1])
+            x = .5 * (x[:, :-1] + x[:, 1:])
+        counts = numpy.full(x.shape[0], x.shape[1], dtype=numpy.int64)
+        return x.ravel(), y.ravel(), counts
+    xs, ys = [], []
+    for i in range(workspace.getNumberHistograms()):
+        x = workspace.readX(i)
+        y = workspace.readY(i)
+        if workspace.isHistogramData():
+            if divide:
+                y = y / (x[1:] - x[:-1])
+            x = points_from_boundaries(x)
+        xs.append(x)
+        ys.append(y)
+    counts = numpy.array([len(x) for x in xs], dtype=numpy.int64)
+    return numpy.concatenate(xs), numpy.concatenate(ys), counts
+
+
+def _nearest_regrid(grid, x, y, counts):
+    """
+    Resample many spectra onto a common grid, taking the value of the nearest point
+    in each spectrum. This is equivalent to a nearest-neighbour interpolation of every
+    spectrum, with NaN outside its range, but is done for all rows at once.
+
+    :param grid: sorted 1d array of the points to sample at
+    :param x: concatenated, row-wise sorted, x values of all spectra
+    :param y: concatenated y values of all spectra
+    :param counts: number of points in each spectrum
+
+    Returns a 2d array of shape (len(counts), len(grid))
+    """
+    num_hist = len(counts)
+    num_grid = len(grid)
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    rows = numpy.repeat(numpy.arange(num_hist), counts)
+    # the switch-over points between neighbours in the same spectrum
+    same_row = rows[1:] == rows[:-1]
+    midpoints = (.5 * (x[1:] + x[:-1]))[same_row]
+    midpoint_rows = rows[1:][same_row]
+    # for each grid point count the midpoints below it in each spectrum. This is the
+    # index of the nearest point and is found by a histogram of where every midpoint
+    # lands on the grid, accumulated along the rows.
+    positions = numpy.searchsorted(grid, midpoints, side='right')
+    hist = numpy.bincount(midpoint_rows * (num_grid + 1) + positions, minlength=num_hist * (num_grid + 1))
+    nearest = numpy.cumsum(hist.reshape(num_hist, num_grid + 1), axis=1)[:, :num_grid]
+    z = y[starts[:, numpy.newaxis] + nearest].astype(numpy.float64)
+    lower = x[starts][:, numpy.newaxis]
+    upper = x[starts + counts - 1][:, numpy.newaxis]
+    z[(grid < lower) | (grid > upper)] = numpy.nan
+    return z
+
+
+def get_matrix_2d_ragged(workspace, distribution, histogram2D=False, transpose=False):
+    x_points, y_points, counts = _extract_points(workspace, distribution)
+    rows = numpy.repeat(numpy.arange(len(counts)), counts)
+    min_value = x_points.min()
+    max_value = x_points.max()
+    delta = (x_points[1:] - x_points[:-1])[rows[1:] == rows[:-1]].min()
     num_edges = int(numpy.ceil((max_value - min_value)/delta)) + 1
     x_centers = numpy.linspace(min_value, max_value, num=num_edges)
-    y = mantid.plots.helperfunctions.boundaries_from_points(workspace.getAxis(1).extractValues())
-    z = numpy.empty([num_hist, num_edges], dtype=numpy.float64)
-    for i in range(num_hist):
-        centers, ztmp, _, _ = mantid.plots.helperfunctions.get_spectrum(workspace, i, distribution=distribution, withDy=False, withDx=False)
-        f = interp1d(centers, ztmp, kind='nearest', bounds_error=False, fill_value=numpy.nan)
-        z[i] = f(x_centers)
+    y = boundaries_from_points(workspace.getAxis(1).extractValues())
+    z = _nearest_regrid(x_centers, x_points, y_points, counts)
     if histogram2D:
-        x = mantid.plots.helperfunctions.boundaries_from_points(x_centers)
+        x = boundaries_from_points(x_centers)
     else:
         x = x_centers
     if transpose:
@@ -471,13 +538,22 @@ def get_uneven_data(workspace, distribution):
     for a spectra. Each element in the y list is a 2 element array with the extents
     of a particular spectra. The z list contains arrays of intensities at bin centers
     '''
-    z = []
-    x = []
-    y = []
     nhist = workspace.getNumberHistograms()
     yvals = workspace.getAxis(1).extractValues()
     if len(yvals) == nhist:
         yvals = boundaries_from_points(yvals)
+    y = [yvals[index:index + 2] for index in range(nhist)]
+    if _has_common_blocksize(workspace):
+        xvals = workspace.extractX()
+        zvals = workspace.extractY()
+        if workspace.isHistogramData():
+            if not distribution:
+                zvals = zvals / (xvals[:, 1:] - xvals[:, 0:-1])
+        else:
+            xvals = boundaries_from_points(xvals)
+        return list(xvals), y, list(numpy.ma.masked_invalid(zvals))
+    z = []
+    x = []
     for index in range(nhist):
         xvals = workspace.readX(index)
         zvals = workspace.readY(index)
@@ -489,7 +565,6 @@ def get_uneven_data(workspace, distribution):
         zvals = numpy.ma.masked_invalid(zvals)
         z.append(zvals)
         x.append(xvals)
-        y.append([yvals[index], yvals[index + 1]])
     return x, y, z
 
 
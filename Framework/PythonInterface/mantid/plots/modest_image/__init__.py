@@ -1 +1,3 @@
 from .modest_image import ModestImage, imshow
+from .modest_line import ModestLine, minmax_decimate
+from .modest_mesh import ModestMesh, block_extremes
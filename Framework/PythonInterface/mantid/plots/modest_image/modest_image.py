@@ -15,6 +15,8 @@ from matplotlib.transforms import IdentityTransform, Affine2D
 
 import numpy as np
 
+from .modest_mesh import block_extremes
+
 IDENTITY_TRANSFORM = IdentityTransform()
 
 
@@ -35,10 +37,15 @@ class ModestImage(mi.AxesImage):
     does not currently support setting the 'extent' property. There
     may also be weird coordinate warping operations for images that
     I'm not aware of. Don't expect those to work either.
+
+    By default the array is resampled by taking every n-th pixel. Pass
+    reduce_extremes=True to merge blocks of pixels with
+    :func:`block_extremes` instead, so that isolated peaks and dips stay visible.
     """
 
     def __init__(self, *args, **kwargs):
         self._full_res = None
+        self._reduce_extremes = kwargs.pop('reduce_extremes', False)
         self._full_extent = kwargs.get('extent', None)
         super(ModestImage, self).__init__(*args, **kwargs)
         self.invalidate_cache()
@@ -140,7 +147,10 @@ class ModestImage(mi.AxesImage):
 
         # Slice the array using the slices determined previously to optimally
         # match the display
-        self._A = self._full_res[y0:y1:sy, x0:x1:sx]
+        if self._reduce_extremes and self._full_res.ndim == 2 and (sx > 1 or sy > 1):
+            self._A = block_extremes(self._full_res[y0:y1, x0:x1], sy, sx)
+        else:
+            self._A = self._full_res[y0:y1:sy, x0:x1:sx]
         self._A = cbook.safe_masked_invalid(self._A)
 
         # We now determine the extent of the subset of the image, by determining
@@ -206,7 +216,7 @@ def main():
 def imshow(axes, X, cmap=None, norm=None, aspect=None,
            interpolation=None, alpha=None, vmin=None, vmax=None,
            origin=None, extent=None, shape=None, filternorm=1,
-           filterrad=4.0, imlim=None, resample=None, url=None, **kwargs):
+           filterrad=4.0, imlim=None, resample=None, url=None, reduce_extremes=False, **kwargs):
     """Similar to matplotlib's imshow command, but produces a ModestImage
 
     Unlike matplotlib version, must explicitly specify axes
@@ -220,7 +230,8 @@ def imshow(axes, X, cmap=None, norm=None, aspect=None,
     axes.set_aspect(aspect)
     im = ModestImage(axes, cmap=cmap, norm=norm, interpolation=interpolation,
                      origin=origin, extent=extent, filternorm=filternorm,
-                     filterrad=filterrad, resample=resample, **kwargs)
+                     filterrad=filterrad, resample=resample,
+                     reduce_extremes=reduce_extremes, **kwargs)
 
     im.set_data(X)
     im.set_alpha(alpha)
@@ -0,0 +1,146 @@
+"""
+A line counterpart of ModestImage. Before drawing, ModestLine reduces the
+data to the visible x range at the resolution of the screen, keeping the
+extremes in every pixel column so that peaks are not lost.
+"""
+from __future__ import print_function, division
+
+from matplotlib.lines import Line2D
+
+import numpy as np
+
+# Number of points kept in each pixel column: first, minimum, maximum and last
+POINTS_PER_PIXEL = 4
+
+
+def minmax_decimate(x, y, xmin, xmax, num_pixels, transform=None):
+    """Reduce a line to at most POINTS_PER_PIXEL points per pixel column.
+
+    The first, smallest, largest and last values in each column are kept
+    so the drawn line looks identical to the full resolution one. Points
+    outside [xmin, xmax] are dropped, apart from one on either side so the
+    line still runs to the edges of the view.
+
+    :param x: a 1d array of x values sorted in ascending order
+    :param y: a 1d array of y values, NaNs are ignored
+    :param xmin: the lower limit of the view
+    :param xmax: the upper limit of the view
+    :param num_pixels: the width of the view in display pixels
+    :param transform: optional callable mapping x to a space where the
+        pixels are evenly spaced, e.g. the transform of a log axis
+
+    :rtype: tuple of the decimated x and y arrays
+    """
+    start = max(np.searchsorted(x, xmin, side='left') - 1, 0)
+    stop = min(np.searchsorted(x, xmax, side='right') + 1, len(x))
+    x, y = x[start:stop], y[start:stop]
+    num_pixels = max(int(num_pixels), 1)
+    if len(x) <= POINTS_PER_PIXEL * num_pixels:
+        return x, y
+
+    if transform is None:
+        scaled, lo, hi = x, xmin, xmax
+    else:
+        scaled = transform(x)
+        lo, hi = transform(np.array([xmin, xmax]))
+    if not hi > lo:
+        return x, y
+    columns = np.floor((scaled - lo) * (num_pixels / (hi - lo)))
+    # points that can not be placed, e.g. x <= 0 on a log axis, share a column
+    columns = np.clip(np.nan_to_num(columns), -1, num_pixels).astype(np.int64)
+
+    starts = np.flatnonzero(np.concatenate(([True], columns[1:] != columns[:-1])))
+    lasts = np.concatenate((starts[1:], [len(x)])) - 1
+    ymin = np.fmin.reduceat(y, starts)
+    ymax = np.fmax.reduceat(y, starts)
+    xmid = .5 * (x[starts] + x[lasts])
+    xout = np.column_stack((x[starts], xmid, xmid, x[lasts])).ravel()
+    yout = np.column_stack((y[starts], ymin, ymax, y[lasts])).ravel()
+    return xout, yout
+
+
+class ModestLine(Line2D):
+
+    """
+    Computationally modest line class.
+
+    ModestLine is an extension of the Matplotlib Line2D class for lines
+    with many more points than there are pixels on the screen. Before
+    drawing, the data is decimated to the visible x range and the
+    resolution of the axes with :func:`minmax_decimate`. The full
+    resolution data is kept, so get_data and set_data, and hence
+    autoscaling, behave exactly as for a Line2D.
+
+    Only lines without markers whose x data is numeric and sorted are
+    decimated, any other line is drawn in full.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._full_x = None
+        self._full_y = None
+        self._decimatable = None
+        super(ModestLine, self).__init__(*args, **kwargs)
+
+    def set_xdata(self, x):
+        self._full_x = x
+        self._decimatable = None
+        super(ModestLine, self).set_xdata(x)
+
+    def set_ydata(self, y):
+        self._full_y = y
+        super(ModestLine, self).set_ydata(y)
+
+    def _set_drawn_data(self, x, y):
+        # set_data would call the overridden setters and replace the full resolution data
+        super(ModestLine, self).set_xdata(x)
+        super(ModestLine, self).set_ydata(y)
+
+    def _can_decimate(self):
+        if self._decimatable is None:
+            x = np.asarray(self._full_x)
+            self._decimatable = bool(x.ndim == 1 and x.dtype.kind in 'fiu' and
+                                     len(x) > 1 and np.all(x[1:] >= x[:-1]))
+        return (self._decimatable and self.axes is not None and
+                self.get_marker() in (None, 'None', 'none', '', ' '))
+
+    def _decimated_data(self):
+        x = np.asarray(self._full_x, dtype=np.float64)
+        y = np.ma.filled(np.ma.asarray(self._full_y, dtype=np.float64), np.nan)
+        xmin, xmax = sorted(self.axes.get_xlim())
+        scale = self.axes.xaxis.get_transform()
+        return minmax_decimate(x, y, xmin, xmax, self.axes.bbox.width, transform=scale.transform)
+
+    def draw(self, renderer, *args, **kwargs):
+        if not self._can_decimate():
+            return super(ModestLine, self).draw(renderer, *args, **kwargs)
+        x, y = self._decimated_data()
+        if len(x) == len(self._full_x):
+            return super(ModestLine, self).draw(renderer, *args, **kwargs)
+        # Swap the full resolution data out only for the duration of the draw. The line
+        # is not reported as changed, as that would make the figure draw itself again.
+        stale_callback, self.stale_callback = self.stale_callback, None
+        try:
+            self._set_drawn_data(x, y)
+            super(ModestLine, self).draw(renderer, *args, **kwargs)
+        finally:
+            self._set_drawn_data(self._full_x, self._full_y)
+            self.stale = False
+            self.stale_callback = stale_callback
+
+
+def plot(axes, *args, **kwargs):
+    """Similar to matplotlib's plot command, but produces ModestLines
+
+    Unlike matplotlib version, must explicitly specify axes
+    """
+    lines = axes.plot(*args, **kwargs)
+    modest_lines = []
+    for line in lines:
+        modest = ModestLine(line.get_xdata(orig=True), line.get_ydata(orig=True))
+        modest.update_from(line)
+        modest.set_label(line.get_label())
+        modest.set_zorder(line.get_zorder())
+        line.remove()
+        axes.add_line(modest)
+        modest_lines.append(modest)
+    return modest_lines
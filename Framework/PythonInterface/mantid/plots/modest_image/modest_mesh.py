@@ -0,0 +1,177 @@
+"""
+A mesh counterpart of ModestImage. Before drawing, ModestMesh reduces a
+rectilinear mesh to the visible cells at the resolution of the screen,
+keeping the value furthest from the mean of every block of cells it merges.
+"""
+from __future__ import print_function, division
+
+import matplotlib
+from matplotlib.collections import QuadMesh
+
+import numpy as np
+
+# Before matplotlib 3.5 a QuadMesh is created from the number of columns and rows as well as the vertices
+_QUADMESH_TAKES_SHAPE = tuple(int(v) for v in matplotlib.__version__.split('.')[:2]) < (3, 5)
+
+
+def block_extremes(data, sy, sx):
+    """Reduce a 2d array by merging blocks of sy rows and sx columns.
+
+    Each block is replaced by whichever of its minimum or maximum lies
+    furthest from the mean of the block, so a single pixel peak or dip
+    survives the reduction whatever the sign of the surrounding data.
+    NaNs are ignored unless a block contains nothing else.
+
+    :param data: a 2d array, masked values are treated as NaN
+    :param sy: the number of rows in each block
+    :param sx: the number of columns in each block
+
+    :rtype: a masked 2d array of shape (ceil(rows/sy), ceil(columns/sx))
+    """
+    data = np.ma.filled(np.ma.asarray(data, dtype=np.float64), np.nan)
+    rows = np.arange(0, data.shape[0], sy)
+    columns = np.arange(0, data.shape[1], sx)
+
+    def reduce_blocks(ufunc, values):
+        return ufunc.reduceat(ufunc.reduceat(values, rows, axis=0), columns, axis=1)
+
+    lo = reduce_blocks(np.fmin, data)
+    hi = reduce_blocks(np.fmax, data)
+    finite = np.isfinite(data)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = reduce_blocks(np.add, np.where(finite, data, 0.)) / reduce_blocks(np.add, finite.astype(np.float64))
+        use_lo = (mean - lo) > (hi - mean)
+    return np.ma.masked_invalid(np.where(use_lo, lo, hi))
+
+
+def is_rectilinear(coordinates):
+    """Check if the (rows + 1, columns + 1, 2) vertices of a mesh form
+    a grid with a single, ascending, set of x and y edges"""
+    x, y = coordinates[..., 0], coordinates[..., 1]
+    return (np.all(x == x[0, :]) and np.all(y == y[:, :1]) and
+            np.all(np.diff(x[0, :]) > 0) and np.all(np.diff(y[:, 0]) > 0))
+
+
+def _quad_mesh_args(xedges, yedges):
+    """Return the positional arguments of the QuadMesh constructor for a
+    rectilinear mesh with the given cell edges"""
+    coordinates = np.stack(np.meshgrid(xedges, yedges), axis=-1)
+    if _QUADMESH_TAKES_SHAPE:
+        return len(xedges) - 1, len(yedges) - 1, coordinates
+    return coordinates,
+
+
+class ModestMesh(QuadMesh):
+
+    """
+    Computationally modest mesh class.
+
+    ModestMesh is an extension of the Matplotlib QuadMesh class for
+    rectilinear meshes with many more cells than there are pixels on the
+    screen. Before drawing, the mesh is cut down to the visible cells and
+    blocks of cells smaller than a pixel are merged with
+    :func:`block_extremes`, and a QuadMesh of the reduced cells is drawn
+    in its place. The ModestMesh itself is left at full resolution, so
+    get_array, set_array and the data limits behave exactly as for a
+    QuadMesh.
+    """
+
+    def __init__(self, xedges, yedges, antialiased=True, **kwargs):
+        self._xedges = np.asarray(xedges, dtype=np.float64)
+        self._yedges = np.asarray(yedges, dtype=np.float64)
+        self._cell_antialiased = antialiased
+        self._cache_key = None
+        self._cache = None
+        super(ModestMesh, self).__init__(*_quad_mesh_args(self._xedges, self._yedges),
+                                         antialiased=antialiased, shading='flat', **kwargs)
+
+    def _visible_range(self, edges, limits, num_pixels):
+        lo, hi = sorted(limits)
+        num_cells = len(edges) - 1
+        start = int(np.clip(np.searchsorted(edges, lo, side='right') - 1, 0, num_cells - 1))
+        stop = int(np.clip(np.searchsorted(edges, hi, side='left'), start + 1, num_cells))
+        step = int(max(1, np.ceil((stop - start) / max(num_pixels, 1))))
+        return start, stop, step
+
+    def _scale_to_res(self):
+        """
+        Return the cell edges and array of the mesh matched to the eventual
+        rendering, or None if the full mesh should be drawn.
+        """
+        xedges, yedges = self._xedges, self._yedges
+        x0, x1, sx = self._visible_range(xedges, self.axes.get_xlim(), self.axes.bbox.width)
+        y0, y1, sy = self._visible_range(yedges, self.axes.get_ylim(), self.axes.bbox.height)
+        if (x0, x1, y0, y1) == (0, len(xedges) - 1, 0, len(yedges) - 1) and sx == sy == 1:
+            return None
+
+        # Check whether we've already calculated what we need
+        full = self.get_array()
+        key = (id(full), x0, x1, sx, y0, y1, sy)
+        if self._cache_key == key:
+            return self._cache
+
+        array = block_extremes(np.ma.asarray(full).reshape(len(yedges) - 1, len(xedges) - 1)[y0:y1, x0:x1], sy, sx)
+        xsub = xedges[np.append(np.arange(x0, x1, sx), x1)]
+        ysub = yedges[np.append(np.arange(y0, y1, sy), y1)]
+        if np.ndim(full) == 1:
+            array = array.ravel()
+        self._cache_key = key
+        self._cache = (xsub, ysub, array)
+        return self._cache
+
+    def _reduced_mesh(self, xedges, yedges, array):
+        """Return a QuadMesh of the reduced cells, styled like this mesh"""
+        mesh = QuadMesh(*_quad_mesh_args(xedges, yedges), antialiased=self._cell_antialiased, shading='flat')
+        mesh.set_array(array)
+        mesh.set_cmap(self.get_cmap())
+        mesh.set_norm(self.norm)
+        mesh.set_alpha(self.get_alpha())
+        mesh.set_linewidth(self.get_linewidth())
+        # edges coloured like the faces are returned as one color per cell
+        edgecolor = self.get_edgecolor()
+        mesh.set_edgecolor(edgecolor if len(edgecolor) <= 1 else 'face')
+        mesh.set_transform(self.get_transform())
+        mesh.set_clip_on(self.get_clip_on())
+        mesh.set_clip_box(self.get_clip_box())
+        mesh.set_clip_path(self.get_clip_path())
+        mesh.set_rasterized(self.get_rasterized())
+        return mesh
+
+    def draw(self, renderer, *args, **kwargs):
+        if self.axes is None or self.get_array() is None or not self.get_visible():
+            return super(ModestMesh, self).draw(renderer, *args, **kwargs)
+        scaled = self._scale_to_res()
+        if scaled is None:
+            return super(ModestMesh, self).draw(renderer, *args, **kwargs)
+        # A new mesh is drawn every time, so its colors always follow the array, colormap and norm
+        self._reduced_mesh(*scaled).draw(renderer, *args, **kwargs)
+        self.stale = False
+
+
+def pcolormesh(axes, X, Y, C, *args, **kwargs):
+    """Similar to matplotlib's pcolormesh command, but produces a ModestMesh
+    when X and Y are the edges of a rectilinear mesh. Other meshes are
+    returned as a QuadMesh.
+
+    Unlike matplotlib version, must explicitly specify axes
+    """
+    mesh = axes.pcolormesh(X, Y, C, *args, **kwargs)
+    X, Y = np.asarray(X), np.asarray(Y)
+    if X.ndim == 1 and Y.ndim == 1:
+        X, Y = np.meshgrid(X, Y)
+    rows, columns = np.shape(C)[:2]
+    if (kwargs.get('shading') not in (None, 'flat', 'auto') or np.ndim(C) != 2 or
+            X.shape != (rows + 1, columns + 1) or Y.shape != X.shape):
+        return mesh
+    coordinates = np.stack((X, Y), axis=-1)
+    if not is_rectilinear(coordinates):
+        return mesh
+    modest = ModestMesh(coordinates[0, :, 0], coordinates[:, 0, 1], antialiased=kwargs.get('antialiased', False))
+    modest.update_from(mesh)
+    modest.set_array(mesh.get_array())
+    modest.set_cmap(mesh.get_cmap())
+    modest.set_norm(mesh.norm)
+    modest.set_zorder(mesh.get_zorder())
+    mesh.remove()
+    axes.add_collection(modest, autolim=False)
+    return modest
@@ -33,6 +33,11 @@ import mantid.plots.modest_image
 # Used for initializing searches of max, min values
 _LARGEST, _SMALLEST = float(sys.maxsize), -sys.maxsize
 
+# Lines with more points, or meshes with more cells, than these are drawn
+# at screen resolution using the modest_image artists
+_LOD_MIN_POINTS = 10000
+_LOD_MIN_CELLS = 250000
+
 # ================================================
 # Private 2D Helper functions
 # ================================================
@@ -165,6 +170,8 @@ def plot(axes, workspace, *args, **kwargs):
     dimension
     """
     x, y, args, kwargs = _plot_impl(axes, workspace, args, kwargs)
+    if len(x) > _LOD_MIN_POINTS:
+        return mantid.plots.modest_image.modest_line.plot(axes, x, y, *args, **kwargs)
     return axes.plot(x, y, *args, **kwargs)
 
 
@@ -510,6 +517,8 @@ def pcolormesh(axes, workspace, *args, **kwargs):
         else:
             (x, y, z) = get_matrix_2d_data(workspace, distribution, histogram2D=True, transpose=transpose)
         _setLabels2D(axes, workspace, transpose=transpose)
+    if z.size > _LOD_MIN_CELLS:
+        return mantid.plots.modest_image.modest_mesh.pcolormesh(axes, x, y, z, *args, **kwargs)
     return axes.pcolormesh(x, y, z, *args, **kwargs)
 
 
@@ -558,6 +567,7 @@ def imshow(axes, workspace, *args, **kwargs):
             kwargs['extent'] = [x[0, 0], x[0, -1], y[0, 0], y[-1, 0]]
         else:
             kwargs['extent'] = [x[0], x[-1], y[0], y[-1]]
+    kwargs.setdefault('reduce_extremes', True)
     return mantid.plots.modest_image.imshow(axes, z, *args, **kwargs)
 
 
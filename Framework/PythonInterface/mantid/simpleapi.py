@@ -28,6 +28,7 @@ Importing this module starts the FrameworkManager instance.
 """
 from __future__ import (absolute_import, division, print_function)
 
+import json
 import os
 import sys
 # stdlib imports
@@ -62,6 +63,21 @@ __LOGGING_KEYWORD__ = "EnableLogging"
 __STORE_KEYWORD__ = "StoreInADS"
 # This is the default value for __STORE_KEYWORD__
 __STORE_ADS_DEFAULT__ = True
+# ConfigService key switching on the on-disk cache of algorithm signatures
+__LAZY_CONFIG_KEY__ = "simpleapi.lazy"
+# Name of the signature cache file within the user cache directory
+__SIGNATURE_CACHE_FILE__ = "simpleapi_signatures.json"
+# ConfigService key switching on the deferred import of Python plugins
+__LAZY_PLUGINS_CONFIG_KEY__ = "python.plugins.lazy"
+# Name of the plugin index file within the user cache directory
+__PLUGIN_INDEX_FILE__ = "python_plugin_index.json"
+
+# Everything required from an initialized algorithm to build its simpleapi functions
+_AlgorithmSpec = namedtuple('_AlgorithmSpec', ['name', 'version', 'signature', 'docstring', 'aliases',
+                                               'method_name', 'method_on', 'method_input_property',
+                                               'ordered_properties'])
+# Algorithm name mapped to the spec of the function that has been created for it
+_translated_specs = {}
 
 
 def specialization_exists(name):
@@ -122,6 +138,135 @@ def _create_generic_signature(algm_object):
     return "\b%s" % arg_str, "\b\bVersion=%d" % algm_object.version()
 
 
+def _algorithm_spec(algm_object):
+    """
+    Extract everything required to build the simpleapi functions of an algorithm
+    so that the algorithm object itself is no longer needed.
+    :param algm_object: An initialized algorithm instance or an existing _AlgorithmSpec
+    :return: An _AlgorithmSpec
+    """
+    if isinstance(algm_object, _AlgorithmSpec):
+        return algm_object
+    method_name = algm_object.workspaceMethodName()
+    if len(method_name) > 0:
+        method_on = list(algm_object.workspaceMethodOn())
+        method_input_property = algm_object.workspaceMethodInputProperty()
+    else:
+        method_on, method_input_property = [], ""
+    return _AlgorithmSpec(name=algm_object.name(), version=algm_object.version(),
+                          signature=_create_generic_signature(algm_object),
+                          docstring=algm_object.docString(),
+                          aliases=algm_object.alias().strip().split(),
+                          method_name=method_name, method_on=method_on,
+                          method_input_property=method_input_property,
+                          ordered_properties=list(algm_object.orderedProperties()))
+
+
+class _SignatureCache(object):
+    """
+    On-disk store of the _AlgorithmSpec for each algorithm so that importing
+    this module does not have to create and initialize every registered algorithm.
+    Entries are keyed by algorithm name and version and the whole store is discarded
+    if it was written by a different library build. The entries of Python algorithms
+    are also keyed by the path and modification time of the plugin file defining them.
+    """
+
+    def __init__(self, filename, build):
+        """
+        :param filename: The full path to the cache file
+        :param build: A string identifying the library build
+        """
+        self._filename = filename
+        self._build = build
+        self._entries = {}
+        self._modified = False
+        self._load()
+
+    @staticmethod
+    def _key(name, version, source):
+        key = "{0}-v{1}".format(name, version)
+        if source is not None:
+            key += "@{0}".format(source)
+        return key
+
+    def _load(self):
+        try:
+            with open(self._filename, 'r') as cache_file:
+                contents = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return
+        if not isinstance(contents, dict) or contents.get('build') != self._build:
+            return
+        self._entries = contents.get('algorithms', {})
+
+    def get(self, name, version, source=None):
+        """
+        :param source: For a Python algorithm, a string identifying the plugin file and its modification time
+        :return: The _AlgorithmSpec for the given algorithm or None if it is not cached
+        """
+        entry = self._entries.get(self._key(name, version, source))
+        if entry is None:
+            return None
+        try:
+            spec = _AlgorithmSpec(**entry)
+        except TypeError:
+            # written by an older layout of the spec
+            return None
+        return spec._replace(name=str(spec.name), signature=tuple(spec.signature),
+                             aliases=[str(alias) for alias in spec.aliases],
+                             method_name=str(spec.method_name))
+
+    def put(self, spec, source=None):
+        self._entries[self._key(spec.name, spec.version, source)] = dict(spec._asdict())
+        self._modified = True
+
+    def save(self):
+        """
+        Write the cache back to disk if it has changed. Failures are not fatal, the
+        signatures are simply regenerated on the next import.
+        """
+        if not self._modified:
+            return
+        tmp_filename = "{0}.{1}.tmp".format(self._filename, os.getpid())
+        try:
+            directory = os.path.dirname(self._filename)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(tmp_filename, 'w') as cache_file:
+                json.dump({'build': self._build, 'algorithms': self._entries}, cache_file)
+            # write-then-rename so that concurrent imports never see a partial file
+            getattr(os, 'replace', os.rename)(tmp_filename, self._filename)
+            self._modified = False
+        except (IOError, OSError) as exc:
+            logger.debug("Unable to write simpleapi signature cache '{0}': {1}".format(self._filename, str(exc)))
+
+
+def _config_flag(key):
+    """
+    :return: True if the given ConfigService key is switched on
+    """
+    return _kernel.config[key].strip().lower() in ('1', 'true', 'on')
+
+
+def _cache_file(filename):
+    """
+    :return: The full path to the named file in the user cache directory
+    """
+    return os.path.join(_kernel.config.getUserPropertiesDir(), "cache", filename)
+
+
+def _signature_cache():
+    """
+    :return: The _SignatureCache to use when building the algorithm functions or
+             None if lazy initialization has not been enabled in the ConfigService
+    """
+    if not _config_flag(__LAZY_CONFIG_KEY__):
+        return None
+    filename = _cache_file(__SIGNATURE_CACHE_FILE__)
+    build = "{0} {1}".format(_kernel.version_str(), _kernel.revision_full())
+    return _SignatureCache(filename, build)
+
+
 def Load(*args, **kwargs):
     """
     Load is a more flexible algorithm than other Mantid algorithms.
@@ -1041,6 +1186,9 @@ def set_properties(alg_object, *args, **kwargs):
     def do_set_property(name, new_value):
         if new_value is None:
             return
+        if isinstance(new_value, _api.DeferredExpression):
+            # a deferred workspace arithmetic result must exist before it can be used
+            new_value = new_value.materialize()
         if isinstance(new_value, _kernel.DataItem) and new_value.name():
             alg_object.setPropertyValue(key, new_value.name())
         else:
@@ -1076,8 +1224,9 @@ def _create_algorithm_function(name, version, algm_object):
         The help that will be displayed is that of the most recent version.
         :param name: name of the algorithm
         :param version: The version of the algorithm
-        :param algm_object: the created algorithm object.
+        :param algm_object: the created algorithm object or an _AlgorithmSpec describing it.
     """
+    spec = _algorithm_spec(algm_object)
 
     def algorithm_wrapper(*args, **kwargs):
         """
@@ -1138,12 +1287,10 @@ def _create_algorithm_function(name, version, algm_object):
 
     # enddef
     # Insert definition in to global dict
-    algm_wrapper = _customise_func(algorithm_wrapper, name,
-                                   _create_generic_signature(algm_object),
-                                   algm_object.docString())
+    algm_wrapper = _customise_func(algorithm_wrapper, name, spec.signature, spec.docstring)
     globals()[name] = algm_wrapper
-    # Register aliases - split on whitespace
-    for alias in algm_object.alias().strip().split():
+    # Register aliases
+    for alias in spec.aliases:
         globals()[alias] = algm_wrapper
     # endfor
     return algm_wrapper
@@ -1285,8 +1432,9 @@ def _create_algorithm_dialog(algorithm, version, _algm_object):
         Create a function that will set up and execute an algorithm dialog.
         The help that will be displayed is that of the most recent version.
         :param algorithm: name of the algorithm
-        :param _algm_object: the created algorithm object.
+        :param _algm_object: the created algorithm object or an _AlgorithmSpec describing it.
     """
+    spec = _algorithm_spec(_algm_object)
 
     def algorithm_wrapper(*args, **kwargs):
         _version = version
@@ -1304,7 +1452,7 @@ def _create_algorithm_dialog(algorithm, version, _algm_object):
 
     # enddef
     arg_list = []
-    for p in _algm_object.orderedProperties():
+    for p in spec.ordered_properties:
         arg_list.append("%s=None" % p)
     arg_str = ','.join(arg_list)
     signature = ("\b%s" % arg_str, "\b\bMessage=\"\", Enable=\"\", Disable=\"\", Version=%d" % version)
@@ -1313,7 +1461,7 @@ def _create_algorithm_dialog(algorithm, version, _algm_object):
 
     globals()["{}Dialog".format(algorithm)] = algm_wrapper
     # Register aliases
-    for alias in _algm_object.alias().strip().split():  # split on whitespace
+    for alias in spec.aliases:
         globals()["{}Dialog".format(alias)] = algm_wrapper
 
 
@@ -1374,10 +1522,16 @@ def _mockup(plugins):
         create_fake_function(name)
 
 
-def _translate():
+def _translate(plugin_sources=None):
     """
         Loop through the algorithms and register a function call
-        for each of them
+        for each of them. Algorithms whose function already exists at the
+        same version are not recreated. If lazy initialization is enabled
+        the signatures are taken from the on-disk cache and algorithms are
+        only created & initialized for those missing from it.
+        :param plugin_sources: If given, new algorithms are Python algorithms and this maps their
+                               names to their plugin file and its modification time. Algorithms
+                               missing from it are not cached as their definition could change.
         :returns: a list of the name of new function calls
     """
     from mantid.api import AlgorithmFactory, AlgorithmManager
@@ -1386,22 +1540,39 @@ def _translate():
     # Method names mapped to their algorithm names. Used to detect multiple copies of same method name
     # on different algorithms, which is an error
     new_methods = {}
+    signature_cache = _signature_cache()
 
     algs = AlgorithmFactory.getRegisteredAlgorithms(True)
     algorithm_mgr = AlgorithmManager
     for name, versions in iteritems(algs):
         if specialization_exists(name):
             continue
-        try:
-            # Create the algorithm object
-            algm_object = algorithm_mgr.createUnmanaged(name, max(versions))
-            algm_object.initialize()
-        except Exception as exc:
-            logger.warning("Error initializing {0} on registration: '{1}'".format(name, str(exc)))
+        version = max(versions)
+        spec = _translated_specs.get(name)
+        if spec is not None and spec.version == version:
+            # already translated by a previous call
+            if len(spec.method_name) > 0:
+                new_methods[spec.method_name] = spec.name
+            new_func_attrs.append(name)
             continue
 
-        algorithm_wrapper = _create_algorithm_function(name, max(versions), algm_object)
-        method_name = algm_object.workspaceMethodName()
+        source = plugin_sources.get(name) if plugin_sources is not None else None
+        use_cache = signature_cache is not None and (plugin_sources is None or source is not None)
+        spec = signature_cache.get(name, version, source) if use_cache else None
+        if spec is None:
+            try:
+                # Create the algorithm object
+                algm_object = algorithm_mgr.createUnmanaged(name, version)
+                algm_object.initialize()
+                spec = _algorithm_spec(algm_object)
+            except Exception as exc:
+                logger.warning("Error initializing {0} on registration: '{1}'".format(name, str(exc)))
+                continue
+            if use_cache:
+                signature_cache.put(spec, source)
+
+        algorithm_wrapper = _create_algorithm_function(name, version, spec)
+        method_name = spec.method_name
         if len(method_name) > 0:
             if method_name in new_methods:
                 other_alg = new_methods[method_name]
@@ -1409,13 +1580,17 @@ def _translate():
                                    "it has already been attached to point to the '%s' algorithm.\n"
                                    "Does one inherit from the other? "
                                    "Please check and update one of the algorithms accordingly."
-                                   % (method_name, algm_object.name(), other_alg))
-            _attach_algorithm_func_as_method(method_name, algorithm_wrapper, algm_object)
-            new_methods[method_name] = algm_object.name()
+                                   % (method_name, spec.name, other_alg))
+            _attach_algorithm_func_as_method(method_name, algorithm_wrapper, spec)
+            new_methods[method_name] = spec.name
         new_func_attrs.append(name)
 
         # Dialog variant
-        _create_algorithm_dialog(name, max(versions), algm_object)
+        _create_algorithm_dialog(name, version, spec)
+        _translated_specs[name] = spec
+
+    if signature_cache is not None:
+        signature_cache.save()
 
     return new_func_attrs
 
@@ -1429,20 +1604,22 @@ def _attach_algorithm_func_as_method(method_name, algorithm_wrapper, algm_object
         :param method_name: The name of the new method on the type
         :param algorithm_wrapper: Function object whose signature should be f(*args,**kwargs) and when
                                  called will run the selected algorithm
-        :param algm_object: An algorithm object that defines the extra properties of the new method
+        :param algm_object: An algorithm object, or an _AlgorithmSpec, that defines the extra properties
+                            of the new method
     """
-    input_prop = algm_object.workspaceMethodInputProperty()
+    spec = _algorithm_spec(algm_object)
+    input_prop = spec.method_input_property
     if input_prop == "":
         raise RuntimeError("simpleapi: '%s' has requested to be attached as a workspace method but "
                            "Algorithm::workspaceMethodInputProperty() has returned an empty string."
                            "This method is required to map the calling object to the correct property."
-                           % algm_object.name())
-    if input_prop not in algm_object:
+                           % spec.name)
+    if input_prop not in spec.ordered_properties:
         raise RuntimeError("simpleapi: '%s' has requested to be attached as a workspace method but "
                            "Algorithm::workspaceMethodInputProperty() has returned a property name that "
-                           "does not exist on the algorithm." % algm_object.name())
+                           "does not exist on the algorithm." % spec.name)
     _api._workspaceops.attach_func_as_method(method_name, algorithm_wrapper, input_prop,
-                                             algm_object.workspaceMethodOn())
+                                             spec.method_on)
 
 
 # Initialization:
@@ -1477,14 +1654,19 @@ try:
     _user_key = 'user.%s' % _plugins_key
     plugin_dirs = _plugin_helper.get_plugin_paths_as_set(_plugins_key)
     plugin_dirs.update(_plugin_helper.get_plugin_paths_as_set(_user_key))
-    _update_sys_paths(plugin_dirs, recursive=True)
+    # The index records the directory listings and plugin contents so that
+    # unchanged trees do not have to be walked and read on every import
+    _plugin_index = _plugin_helper.PluginIndex(_cache_file(__PLUGIN_INDEX_FILE__))
+    for directory in plugin_dirs:
+        _update_sys_paths([directory])
+        _update_sys_paths(_plugin_index.subdirectories(directory))
 
     # Load
     plugin_files = []
     alg_files = []
     for directory in plugin_dirs:
         try:
-            all_plugins, algs = _plugin_helper.find_plugins(directory)
+            all_plugins, algs = _plugin_helper.find_plugins(directory, _plugin_index)
             plugin_files.extend(all_plugins)
             alg_files.extend(algs)
         except ValueError as exc:
@@ -1493,10 +1675,19 @@ try:
 
     # Mock out the expected functions
     _mockup(alg_files)
-    # Load the plugins.
-    _plugin_modules = _plugin_helper.load(plugin_files)
+    # Load the plugins. Plugins already described by the index can have their
+    # import deferred until their algorithm is first initialized. Without the
+    # signature cache _translate initializes every algorithm, which would import
+    # the deferred plugins straight away
+    _defer_plugins = _config_flag(__LAZY_PLUGINS_CONFIG_KEY__)
+    if _defer_plugins and not _config_flag(__LAZY_CONFIG_KEY__):
+        logger.notice("{0} = 1 has no effect unless {1} = 1 as well. Python plugins are imported "
+                      "now.".format(__LAZY_PLUGINS_CONFIG_KEY__, __LAZY_CONFIG_KEY__))
+        _defer_plugins = False
+    _plugin_modules = _plugin_helper.load_with_index(plugin_files, _plugin_index, defer=_defer_plugins)
+    _plugin_index.save()
     # Create the final proper algorithm definitions for the plugins
-    _plugin_attrs = _translate()
+    _plugin_attrs = _translate(_plugin_index.algorithm_sources(plugin_files))
     # Finally, overwrite the mocked function definitions in the loaded modules with the real ones
     _plugin_helper.sync_attrs(globals(), _plugin_attrs, _plugin_modules)
 
@@ -6,13 +6,6 @@
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
 
-try:
-    import pathos.multiprocessing as mp
-
-    PATHOS_FOUND = True
-except ImportError:
-    PATHOS_FOUND = False
-
 import numpy as np
 import six
 import os
@@ -673,10 +666,9 @@ class Abins(PythonAlgorithm):
         Checks number of threads
         :param message_end: closing part of the error message.
         """
-        if PATHOS_FOUND:
-            threads = AbinsModules.AbinsParameters.threads
-            if not (isinstance(threads, six.integer_types) and 1 <= threads <= mp.cpu_count()):
-                raise RuntimeError("Invalid number of threads for parallelisation over atoms" + message_end)
+        threads = AbinsModules.AbinsParameters.threads
+        if not (isinstance(threads, six.integer_types) and threads >= 1):
+            raise RuntimeError("Invalid number of threads for parallelisation over atoms" + message_end)
 
     def _validate_ab_initio_file_extension(self, filename_full_path=None, expected_file_extension=None):
         """
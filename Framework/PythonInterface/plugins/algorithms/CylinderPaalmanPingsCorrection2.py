@@ -13,6 +13,7 @@ from mantid.simpleapi import *
 from mantid.api import (PythonAlgorithm, AlgorithmFactory, PropertyMode, MatrixWorkspaceProperty,
                         WorkspaceGroupProperty, InstrumentValidator, Progress)
 from mantid.kernel import (StringListValidator, IntBoundedValidator, FloatBoundedValidator, Direction, logger)
+import paalmanpings
 
 
 def set_material_density(set_material_alg, density_type, density, number_density_unit):
@@ -57,6 +58,7 @@ class CylinderPaalmanPingsCorrection(PythonAlgorithm):
     _sig_a = None
     _density = None
     _radii = None
+    _regions = None
     _interpolate = False
 
 #------------------------------------------------------------------------------
@@ -243,20 +245,18 @@ class CylinderPaalmanPingsCorrection(PythonAlgorithm):
         self._get_angles()
         self._transmission()
 
-        dataA1 = []
-        dataA2 = []
-        dataA3 = []
-        dataA4 = []
-
-        data_prog = Progress(self, start=0.1, end=0.85, nreports=len(self._angles))
-        for angle in self._angles:
-            (A1, A2, A3, A4) = self._cyl_abs(angle)
-            logger.information('Angle : %f * successful' % angle)
-            data_prog.report('Appending data for angle %f' % angle)
-            dataA1 = np.append(dataA1, A1)
-            dataA2 = np.append(dataA2, A2)
-            dataA3 = np.append(dataA3, A3)
-            dataA4 = np.append(dataA4, A4)
+        data_prog = Progress(self, start=0.1, end=0.85, nreports=1)
+        self._regions = self._integration_regions()
+        n_points = max(len(omega) for _, _, _, _, omega in self._regions)
+        # exp() is evaluated for each wavelength and integration point of up to two paths
+        angle_memory = 8 * len(self._waves) * n_points * 6
+        (A1, A2, A3, A4) = paalmanpings.evaluate_angles(self._cyl_abs, self._angles, angle_memory,
+                                                        progress=data_prog)
+        logger.information('Angles : %i * successful' % len(self._angles))
+        dataA1 = A1.ravel()
+        dataA2 = A2.ravel()
+        dataA3 = A3.ravel()
+        dataA4 = A4.ravel()
 
         dataX = self._waves * len(self._angles)
 
@@ -591,194 +591,176 @@ class CylinderPaalmanPingsCorrection(PythonAlgorithm):
 
 #------------------------------------------------------------------------------
 
-    def _cyl_abs(self, angle):
+    def _integration_regions(self):
+        """
+        Finds the integration points in each annulus. They do not depend on the angle or the wavelength.
+        @return list of (n_scat, n_abs, r, r_step, omega) for the annuli in the order of _acyl, for each annulus
+                for a positive and a negative beam offset
+        """
+        A = self._beam[1]
+        nan = self._number_can
+        regions = []
+        if nan < 2:
+            annuli = [(0, 0, self._ms)]
+        else:
+            annuli = []
+            for i in range(0, nan):
+#
+#  No. STEPS ARE CHOSEN SO THAT STEP WIDTH IS THE SAME FOR ALL ANNULI
+#
+                ms = int(self._ms*(self._radii[i+1] - self._radii[i])/(self._radii[1] - self._radii[0]))
+                annuli.append((i, 0 if i < nan - 1 else 1, max(ms, 1)))
+        for n_scat, n_abs, ms in annuli:
+            for a in (A, -A):
+                r, r_step, omega = self._integration_points(a, self._radii[n_scat], self._radii[n_scat+1], ms)
+                regions.append((n_scat, n_abs, r, r_step, omega))
+        return regions
+
+#------------------------------------------------------------------------------
+
+    def _integration_points(self, a, r1, r2, ms):
+        omega_add = 0.
+        if a < 0.:
+            omega_add = math.pi
+        r_step = (r2 - r1)/ms
+        r_add = -0.5*r_step + r1
+        # Only the sums over the outermost ring of the annulus contribute to the corrections, as the sums are
+        # reset for every ring
+        r = ms*r_step + r_add
+        number_omega = int(math.pi*r/r_step)
+        omega_ster = math.pi/number_omega
+        omega_deg = -0.5*omega_ster + omega_add
+        omega = []
+        I = 1
+        for _ in range(1, number_omega +1):
+            angle = I*omega_ster + omega_deg
+            if abs(r*math.sin(angle)) <= a:
+                omega.append(angle)
+                I += 1
+            else:
+                I = number_omega -I +2
+        return r, r_step, np.array(omega)
+
+#------------------------------------------------------------------------------
+
+    def _cyl_abs(self, angles):
         #  Parameters :
-        #  self._step_size - step size
-        #  self._beam - beam parameters
+        #  self._regions - integration points in each annulus
         #  nan - number of annuli
         #  radii - list of radii (for each annulus)
         #  density - list of densities (for each annulus)
         #  sigs - list of scattering cross-sections (for each annulus)
         #  siga - list of absorption cross-sections (for each annulus)
-        #  angle - list of angles
+        #  angles - array of angles
         #  wavelas - elastic wavelength
         #  waves - list of wavelengths
         #  Output parameters :  A1 - Ass ; A2 - Assc ; A3 - Acsc ; A4 - Acc
+        #  each of shape angles x wavelengths
 
-        amu_scat = np.zeros(self._number_can)
         amu_scat = self._density*self._sig_s
-        sig_abs = np.zeros(self._number_can)
         sig_abs = self._density*self._sig_a
-        amu_tot_i = np.zeros(self._number_can)
-        amu_tot_s = np.zeros(self._number_can)
-
-        theta = angle*math.pi/180.
-        A1 = []
-        A2 = []
-        A3 = []
-        A4 = []
-        #loop over wavelengths
-        for wave in self._waves:
-            #loop over annuli
-            if self._emode == 'Elastic':
-                amu_tot_i = amu_scat + sig_abs*self._elastic/1.7979
-                amu_tot_s = amu_scat + sig_abs*self._elastic/1.7979
-            elif self._emode == 'Direct':
-                amu_tot_i = amu_scat + sig_abs*self._fixed/1.7979
-                amu_tot_s = amu_scat + sig_abs*wave/1.7979
-            elif self._emode == 'Indirect':
-                amu_tot_i = amu_scat + sig_abs*wave/1.7979
-                amu_tot_s = amu_scat + sig_abs*self._fixed/1.7979
-            elif self._emode == 'Efixed':
-                amu_tot_i = amu_scat + sig_abs*self._fixed/1.7979
-                amu_tot_s = amu_scat + sig_abs*self._fixed/1.7979
-            (Ass, Assc, Acsc, Acc) = self._acyl(theta, amu_scat, amu_tot_i, amu_tot_s)
-            A1.append(Ass)
-            A2.append(Assc)
-            A3.append(Acsc)
-            A4.append(Acc)
-        return A1, A2, A3, A4
+        # Shape: wavelengths x annuli
+        waves = np.array(self._waves)[:, np.newaxis]
+        amu_tot_i = np.zeros((len(self._waves), self._number_can))
+        amu_tot_s = np.zeros((len(self._waves), self._number_can))
+
+        theta = np.asarray(angles)*math.pi/180.
+        if self._emode == 'Elastic':
+            amu_tot_i = amu_tot_i + amu_scat + sig_abs*self._elastic/1.7979
+            amu_tot_s = amu_tot_s + amu_scat + sig_abs*self._elastic/1.7979
+        elif self._emode == 'Direct':
+            amu_tot_i = amu_tot_i + amu_scat + sig_abs*self._fixed/1.7979
+            amu_tot_s = amu_scat + sig_abs*waves/1.7979
+        elif self._emode == 'Indirect':
+            amu_tot_i = amu_scat + sig_abs*waves/1.7979
+            amu_tot_s = amu_tot_s + amu_scat + sig_abs*self._fixed/1.7979
+        elif self._emode == 'Efixed':
+            amu_tot_i = amu_tot_i + amu_scat + sig_abs*self._fixed/1.7979
+            amu_tot_s = amu_tot_s + amu_scat + sig_abs*self._fixed/1.7979
+        return self._acyl(theta, amu_scat, amu_tot_i, amu_tot_s)
 
 #------------------------------------------------------------------------------
 
     def _acyl(self, theta, amu_scat, amu_tot_i, amu_tot_s):
-        A = self._beam[1]
+        shape = (len(theta), amu_tot_i.shape[0])
         Area_s = 0.0
-        Ass = 0.0
-        Acc = 0.0
-        Acsc = 0.0
-        Assc = 0.0
-        nan = self._number_can
-        if self._number_can < 2:
-#
-#  No. STEPS ARE CHOSEN SO THAT STEP WIDTH IS THE SAME FOR ALL ANNULI
-#
-            AAAA, BBBA, Area_A = self._sum_rom(0, 0, A, self._radii[0], self._radii[1], self._ms,
-                                               theta, amu_scat, amu_tot_i, amu_tot_s)
-            AAAB, BBBB, Area_B = self._sum_rom(0, 0, -A, self._radii[0], self._radii[1], self._ms,
-                                               theta, amu_scat, amu_tot_i, amu_tot_s)
-            Area_s += Area_A + Area_B
-            Ass += AAAA + AAAB
-            Ass /= Area_s
+        Ass = np.zeros(shape)
+        Acc = np.zeros(shape)
+        Acsc = np.zeros(shape)
+        Assc = np.zeros(shape)
+        Area_C = 0.0
+        AAA_C = np.zeros(shape)
+        BBB_C = np.zeros(shape)
+        for region in self._regions:
+            AAA, BBB, Area = self._sum_rom(region, theta, amu_scat, amu_tot_i, amu_tot_s)
+            if region[1] == 0:
+                Area_s += Area
+                Ass += AAA
+                Assc += BBB
+            else:
+                Area_C += Area
+                AAA_C += AAA
+                BBB_C += BBB
+        Ass /= Area_s
+        if self._number_can > 1:
+            Assc /= Area_s
+            Acsc = AAA_C/Area_C
+            Acc = BBB_C/Area_C
         else:
-            for i in range(0, self._number_can -1):
-                radius_1 = self._radii[i]
-                radius_2 = self._radii[i+1]
-#
-#  No. STEPS ARE CHOSEN SO THAT STEP WIDTH IS THE SAME FOR ALL ANNULI
-#
-                ms = int(self._ms*(radius_2 - radius_1)/(self._radii[1] - self._radii[0]))
-                if ms < 1:
-                    ms = 1
-                AAAA, BBBA, Area_A = self._sum_rom(i, 0, A, radius_1, radius_2,
-                                                   ms, theta, amu_scat, amu_tot_i, amu_tot_s)
-                AAAB, BBBB, Area_B = self._sum_rom(i, 0, -A, radius_1, radius_2,
-                                                   ms, theta, amu_scat, amu_tot_i, amu_tot_s)
-                Area_s += Area_A + Area_B
-                Ass += AAAA + AAAB
-                Assc += BBBA + BBBB
-            Ass = Ass/Area_s
-            Assc = Assc/Area_s
-            radius_1 = self._radii[nan -1]
-            radius_2 = self._radii[nan]
-            ms = int(self._ms*(radius_2 - radius_1)/(self._radii[1] - self._radii[0]))
-            if ms < 1:
-                ms = 1
-            AAAA, BBBA, Area_A = self._sum_rom(nan-1, 1, A, radius_1, radius_2,
-                                               ms, theta, amu_scat, amu_tot_i, amu_tot_s)
-            AAAB, BBBB, Area_B = self._sum_rom(nan-1, 1, -A, radius_1, radius_2,
-                                               ms, theta, amu_scat, amu_tot_i, amu_tot_s)
-            Area_C = Area_A + Area_B
-            Acsc = (AAAA + AAAB)/Area_C
-            Acc = (BBBA + BBBB)/Area_C
+            # There is no container, so only Ass is calculated
+            Assc = np.zeros(shape)
         return Ass, Assc, Acsc, Acc
 
 #------------------------------------------------------------------------------
 
-    def _sum_rom(self, n_scat, n_abs, a, r1, r2, ms, theta, amu_scat, amu_tot_i, amu_tot_s):
+    def _sum_rom(self, region, theta, amu_scat, amu_tot_i, amu_tot_s):
         #n_scat is region for scattering
         #n_abs is region for absorption
+        n_scat, n_abs, r, r_step, omega = region
         nan = self._number_can
-        omega_add = 0.
-        if a < 0.:
-            omega_add = math.pi
-        AAA = 0.
-        BBB = 0.
-        Area = 0.
         theta_deg = math.pi - theta
-        num = ms
-        r_step = (r2 - r1)/ms
-        r_add = -0.5*r_step + r1
-
-# start loop over M
-        for M in range(1, num+1):
-            r = M*r_step + r_add
-            number_omega = int(math.pi*r/r_step)
-            omega_ster = math.pi/number_omega
-            omega_deg = -0.5*omega_ster + omega_add
-            Area_y = r*r_step*omega_ster*amu_scat[n_scat]
-            sum_1 = 0.
-            sum_2 = 0.
-            I = 1
-            Area_sum = 0.
-            for _ in range(1, number_omega +1):
-                omega = I*omega_ster + omega_deg
-                distance = r*math.sin(omega)
-
-                skip = True
-                if abs(distance) <= a:
+        omega_ster = math.pi/int(math.pi*r/r_step)
+        Area_y = r*r_step*omega_ster*amu_scat[n_scat]
 #
-# CALCULATE DISTANCE INCIDENT NEUTRON PASSES THROUGH EACH ANNULUS
-                    LIS = []
-                    for j in range(0, nan):
-                        LIST = self._distance(r, self._radii[j], omega)
-                        LISN = self._distance(r, self._radii[j+1], omega)
-                        LIS.append(LISN - LIST)
+# CALCULATE DISTANCE INCIDENT NEUTRON PASSES THROUGH EACH ANNULUS, shape: points
+        LIS = [self._distance(r, self._radii[j+1], omega) - self._distance(r, self._radii[j], omega)
+               for j in range(0, nan)]
 #
-# CALCULATE DISTANCE SCATTERED NEUTRON PASSES THROUGH EACH ANNULUS
-                    O = omega + theta_deg
-                    LSS = []
-                    for j in range(0, nan):
-                        LSST = self._distance(r, self._radii[j], O)
-                        LSSN = self._distance(r, self._radii[j+1], O)
-                        LSS.append(LSSN - LSST)
+# CALCULATE DISTANCE SCATTERED NEUTRON PASSES THROUGH EACH ANNULUS, shape: angles x points
+        O = omega[np.newaxis, :] + theta_deg[:, np.newaxis]
+        LSS = [self._distance(r, self._radii[j+1], O) - self._distance(r, self._radii[j], O)
+               for j in range(0, nan)]
 #
-# CALCULATE ABSORPTION FOR PATH THROUGH ALL ANNULI,AND THROUGH INNER ANNULI
-                    path = np.zeros(3)
+# CALCULATE ABSORPTION FOR PATH THROUGH ALL ANNULI,AND THROUGH INNER ANNULI, shape: angles x wavelengths x points
 #	split into input (I) and scattered (S) paths
-                    path[0] += amu_tot_i[0]*LIS[0] + amu_tot_s[0]*LSS[0]
-                    if nan == 2:
-                        path[2] += amu_tot_i[1]*LIS[1] + amu_tot_s[1]*LSS[1]
-                        path[1] = path[0] + path[2]
-                    sum_1 += math.exp(-path[n_abs])
-                    sum_2 += math.exp(-path[n_abs +1])
-                    Area_sum += 1.0
-                    skip = False
-
-                if skip:
-                    I = number_omega -I +2
-                else:
-                    I += 1
-        AAA += sum_1*Area_y
-        BBB += sum_2*Area_y
-        Area += Area_sum*Area_y
+        path = [np.zeros((len(theta), amu_tot_i.shape[0], len(omega)))] * 3
+        path[0] = self._path(amu_tot_i[:, 0], LIS[0], amu_tot_s[:, 0], LSS[0])
+        if nan == 2:
+            path[2] = self._path(amu_tot_i[:, 1], LIS[1], amu_tot_s[:, 1], LSS[1])
+            path[1] = path[0] + path[2]
+        AAA = np.sum(np.exp(-path[n_abs]), axis=2)*Area_y
+        BBB = np.sum(np.exp(-path[n_abs +1]), axis=2)*Area_y
+        Area = len(omega)*Area_y
         return AAA, BBB, Area
 
+#------------------------------------------------------------------------------
+
+    def _path(self, amu_tot_i, LIS, amu_tot_s, LSS):
+        return (amu_tot_i[np.newaxis, :, np.newaxis]*LIS[np.newaxis, np.newaxis, :] +
+                amu_tot_s[np.newaxis, :, np.newaxis]*LSS[:, np.newaxis, :])
+
 #------------------------------------------------------------------------------
 
     def _distance(self, r1, radius, omega):
         r = r1
-        distance = 0.
-        b = r*math.sin(omega)
-        if abs(b) < radius:
-            t = r*math.cos(omega)
-            c = radius*radius -b*b
-            d = math.sqrt(c)
-            if r <= radius:
-                distance = t + d
-            else:
-                distance = d*(1.0 + math.copysign(1.0, t))
-        return distance
+        b = r*np.sin(omega)
+        t = r*np.cos(omega)
+        d = np.sqrt(np.maximum(radius*radius -b*b, 0.))
+        if r <= radius:
+            distance = t + d
+        else:
+            distance = d*(1.0 + np.copysign(1.0, t))
+        return np.where(np.abs(b) < radius, distance, 0.)
 
 #------------------------------------------------------------------------------
 
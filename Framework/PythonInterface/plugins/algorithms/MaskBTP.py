@@ -9,9 +9,21 @@ from __future__ import (absolute_import, division, print_function)
 import mantid.simpleapi
 import mantid.api
 import mantid.kernel
+import hashlib
 import numpy
+import os
+import tempfile
 from collections import defaultdict
 
+# Values in the detector index for banks which are not in the instrument, for pixels which could not be found
+# and for banks which have not been looked up yet
+MISSING_BANK = -1
+MISSING_PIXEL = -2
+UNINDEXED_BANK = -3
+
+# Detector indices by instrument fingerprint, shared by all instances of the algorithm
+_detector_indices = {}
+
 
 class MaskBTP(mantid.api.PythonAlgorithm):
     """ Class to generate grouping file
@@ -106,25 +118,25 @@ class MaskBTP(mantid.api.PythonAlgorithm):
         else:
             pixels=self._parseBTPlist(pixelString)
 
-        detlist=[]
-        for b in banks:
-            ep=self._getEightPackHandle(b)
-            if ep is not None:
-                for t in tubes:
-                    if (t<tubemin[self.instname]) or (t>tubemax[self.instname]):
-                        raise ValueError("Out of range index for tube number")
-                    else:
-                        for p in pixels:
-                            if (p<pixmin[self.instname]) or (p>pixmax[self.instname]):
-                                raise ValueError("Out of range index for pixel number")
-                            else:
-                                try:
-                                    pid=ep[int(t-tubemin[self.instname])][int(p-pixmin[self.instname])].getID()
-                                except:
-                                    raise RuntimeError("Problem finding pixel in bank="+str(b)+
-                                                       ", tube="+str(t-tubemin[self.instname])+", pixel="+str(p-pixmin[self.instname]))
-                                detlist.append(pid)
-        detlist = numpy.array(detlist)
+        banks=numpy.array(banks,dtype=int).ravel()
+        tubes=numpy.array(tubes,dtype=int).ravel()
+        pixels=numpy.array(pixels,dtype=int).ravel()
+        self._checkBankNumbers(banks)
+        index=self._getDetectorIndex(ws,banks,tubemin[self.instname],tubemax[self.instname],
+                                     pixmin[self.instname],pixmax[self.instname])
+        banks=banks[index[banks-self.bankmin[self.instname],0,0]!=MISSING_BANK]
+        if banks.size>0:
+            if numpy.any((tubes<tubemin[self.instname])|(tubes>tubemax[self.instname])):
+                raise ValueError("Out of range index for tube number")
+            if numpy.any((pixels<pixmin[self.instname])|(pixels>pixmax[self.instname])):
+                raise ValueError("Out of range index for pixel number")
+        # Single selection of the detector IDs, in the order bank, tube, pixel
+        selected=index[numpy.ix_(banks-self.bankmin[self.instname],tubes-tubemin[self.instname],pixels-pixmin[self.instname])]
+        if numpy.any(selected==MISSING_PIXEL):
+            b,t,p=numpy.argwhere(selected==MISSING_PIXEL)[0]
+            raise RuntimeError("Problem finding pixel in bank="+str(banks[b])+
+                               ", tube="+str(tubes[t]-tubemin[self.instname])+", pixel="+str(pixels[p]-pixmin[self.instname]))
+        detlist=selected.ravel().astype(int)
         if detlist.size > 0:
             mantid.simpleapi.MaskDetectors(Workspace=ws,DetectorList=detlist, EnableLogging=False)
         else:
@@ -132,6 +144,86 @@ class MaskBTP(mantid.api.PythonAlgorithm):
         self.setProperty("Workspace",ws.name())
         self.setProperty("MaskedDetectors", detlist)
 
+    def _checkBankNumbers(self,banks):
+        """
+        Helper function to check that the bank numbers are within the range of the instrument
+        """
+        outside=banks[(banks<self.bankmin[self.instname])|(banks>self.bankmax[self.instname])]
+        if outside.size>0:
+            raise ValueError("Out of range index for "+str(self.instname)+" instrument bank numbers: %s" % (outside[0],))
+
+    def _getDetectorIndex(self,ws,banks,tubemin,tubemax,pixmin,pixmax):
+        """
+        Helper function to return the array of detector IDs by bank, tube and pixel of the instrument.
+        The detector IDs of a bank are looked up the first time the bank is requested. The array is kept
+        per instrument definition and saved next to the instrument definition file or, if that directory
+        is read only, in the temporary directory.
+        """
+        fingerprint=hashlib.sha1()
+        fingerprint.update(str(self.instname).encode('utf-8'))
+        fingerprint.update(str(self.instrument.getValidFromDate()).encode('utf-8'))
+        fingerprint.update(numpy.ascontiguousarray(ws.detectorInfo().detectorIDs(),dtype=numpy.int32).tobytes())
+        digest=fingerprint.hexdigest()
+        index=_detector_indices.get(digest)
+        if index is not None and numpy.all(index[banks-self.bankmin[self.instname],0,0]!=UNINDEXED_BANK):
+            return index
+
+        cache_name="MaskBTP_"+self.instname+"_"+digest[:16]+".npy"
+        cache_files=[os.path.join(tempfile.gettempdir(),cache_name)]
+        try:
+            idf_directory=os.path.dirname(mantid.api.ExperimentInfo.getInstrumentFilename(self.instname))
+            if idf_directory:
+                cache_files.insert(0,os.path.join(idf_directory,cache_name))
+        except RuntimeError:
+            pass
+        for cache_file in cache_files:
+            if index is None and os.path.isfile(cache_file):
+                try:
+                    index=numpy.load(cache_file)
+                    break
+                except (IOError,OSError,ValueError):
+                    self.log().warning("Could not read the detector index "+cache_file)
+        if index is None:
+            nbanks=self.bankmax[self.instname]-self.bankmin[self.instname]+1
+            index=numpy.full((nbanks,tubemax-tubemin+1,pixmax-pixmin+1),UNINDEXED_BANK,dtype=numpy.int32)
+        unindexed=[b for b in numpy.unique(banks) if index[b-self.bankmin[self.instname],0,0]==UNINDEXED_BANK]
+        if unindexed:
+            for b in unindexed:
+                index[b-self.bankmin[self.instname]]=self._buildBankIndex(b,tubemax-tubemin+1,pixmax-pixmin+1)
+            for cache_file in cache_files:
+                if not os.access(os.path.dirname(cache_file),os.W_OK):
+                    continue
+                # Write to a temporary file first, so that other processes never see a partial index
+                temp_file=cache_file+"."+str(os.getpid())+".tmp"
+                try:
+                    with open(temp_file,'wb') as handle:
+                        numpy.save(handle,index)
+                    os.rename(temp_file,cache_file)
+                    break
+                except (IOError,OSError):
+                    self.log().information("Could not write the detector index "+cache_file)
+                    if os.path.isfile(temp_file):
+                        os.remove(temp_file)
+        _detector_indices[digest]=index
+        return index
+
+    def _buildBankIndex(self,banknum,ntubes,npixels):
+        """
+        Helper function to walk the instrument tree of a bank and collect its detector IDs by tube and pixel
+        """
+        ep=self._getEightPackHandle(banknum)
+        if ep is None:
+            return MISSING_BANK
+        bank_index=numpy.full((ntubes,npixels),MISSING_PIXEL,dtype=numpy.int32)
+        for t in range(ntubes):
+            for p in range(npixels):
+                try:
+                    bank_index[t,p]=ep[t][p].getID()
+                except RuntimeError:
+                    # the tube or pixel is not in the bank
+                    pass
+        return bank_index
+
     def _parseBTPlist(self,value):
         """
         Helper function to transform a string into a list of integers
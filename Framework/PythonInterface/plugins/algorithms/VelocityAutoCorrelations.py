@@ -10,10 +10,10 @@ from mantid.simpleapi import *
 from mantid.kernel import *
 from mantid.api import *
 
-from scipy.io import netcdf
 import numpy as np
-import re
 import time
+import mdcorrelations
+import mdtrajectory
 
 
 class VelocityAutoCorrelations(PythonAlgorithm):
@@ -38,50 +38,16 @@ class VelocityAutoCorrelations(PythonAlgorithm):
         # Get file path
         file_name=self.getPropertyValue("InputFile")
 
-        # Load trajectory file
-        trajectory=netcdf.netcdf_file(file_name,mode="r")
-
         logger.information("Loading particle id's and coordinate array...")
         start_time=time.time()
 
-        # netcdf object containing the particle id numbers
-        description=(trajectory.variables["description"])[:]
-        # Convert description object to string via for loop. The original object has strange formatting
-        particleID = ''
-        for i in description:
-            particleID += i.decode('UTF-8')
-
-        # Extract particle id's from string using regular expressions
-        p_atoms=re.findall(r"A\('[a-z]+\d+',\d+", particleID)
-
-        # Many-to-one structures. Identify the set of atomic species present (list structure 'elements') in the
-        # simulation and repackage particles into a dictionary 'particles_to_species' with structure id number -> species
-        atoms_to_species={}
-        species_to_atoms={}
-        elements=[]
-
-        # Populate the particles_to_species dictionary and the elements list
-        for j in p_atoms:
-            key=re.findall(r"',\d+",j)[0]
-            key=int(re.findall(r"\d+",key)[0])
-            element=re.findall(r"[a-z]+",j)[0]
-            if element not in elements:
-                elements.append(str(element))
-            atoms_to_species[key]=str(element)
-
-        # Initialise lists in the species_to_particles dictionary
-        for j in elements:
-            species_to_atoms[j]=[]
-
-        # Populate the species_to_particles dictionary
-        for j in p_atoms:
-            key=re.findall(r"',\d+",j)[0]
-            key=int(re.findall(r"\d+",key)[0])
-            element=re.findall(r"[a-z]+",j)[0]
-            species_to_atoms[element].append(key)
-
-        # Coordinate array. Shape: timesteps x (# of particles) x (# of spatial dimensions)
-        configuration=trajectory.variables["configuration"]
+        # Load trajectory file. The coordinates are read in blocks of timesteps when they are needed
+        trajectory=mdtrajectory.Trajectory(file_name)
+
+        # Many-to-one structures. The set of atomic species present (list structure 'elements') in the simulation
+        # and a dictionary 'atoms_to_species' with structure id number -> species
+        elements=trajectory.elements
+        atoms_to_species=trajectory.atoms_to_species
 
         # Extract useful simulation parameters
         # Number of species present in the simulation
@@ -89,75 +55,34 @@ class VelocityAutoCorrelations(PythonAlgorithm):
         # Number of particles present in the simulation
         n_particles=len(atoms_to_species)
         # Number of timesteps in the simulation
-        n_timesteps=int(configuration.shape[0])
-        # Number of spatial dimensions
-        n_dimensions=int(configuration.shape[2])
-
-        logger.information(str(time.time()-start_time) + " s")
-
-        logger.information("Transforming coordinates...")
-        start_time=time.time()
-
-        # Box size for each timestep. Shape: timesteps x (3 consecutive 3-vectors)
-        box_size=trajectory.variables["box_size"]
-
-        # Reshape the paralellepipeds into 3x3 tensors for coordinate transformations.
-        # Shape: timesteps x 3 vectors x (# of spatial dimensions)
-        box_size_tensors=np.array([box_size[j].reshape((3,3)) for j in range(n_timesteps)])
-
-        # Copy the configuration object into a numpy array
-        configuration_copy=np.array([configuration[i] for i in range(n_timesteps)])
-
-        # Swap the time and particle axes
-        configuration_copy=np.swapaxes(configuration_copy,0,1)#/1.12484770
-
-        # Get scaled coordinates (assumes orthogonal simulation box)
-        scaled_coords=np.zeros(np.shape(configuration_copy))
-        for i in range(n_particles):
-            for j in range(n_timesteps):
-                for k in range(n_dimensions):
-                    scaled_coords[i,j,k]=configuration_copy[i,j,k]/box_size_tensors[j,k,k]
-
-        # # Transform particle trajectories (configuration array) to Cartesian coordinates at each time step
+        n_timesteps=trajectory.n_timesteps
 
         logger.information(str(time.time()-start_time) + " s")
 
         logger.information("Calculating velocities...")
         start_time=time.time()
 
-        # Initialise velocity arrray. Note that the first dimension is 2 elements shorter than the coordinate array.
-        # Use finite difference methods to evaluate the time-derivative to 1st order
-        # Shape: (# of particles) x (timesteps-2) x (# of spatial dimensions)
-        velocities=np.zeros((n_particles,n_timesteps-1,n_dimensions))
-
-        for i in range(n_particles):
-            for j in range(n_timesteps-2):
-                # Unwrapping coordinates
-                v_temp1=scaled_coords[i,j+1]-scaled_coords[i,j]-np.round(scaled_coords[i,j+1]-scaled_coords[i,j])
-                v_temp2=scaled_coords[i,j+2]-scaled_coords[i,j+1]-np.round(scaled_coords[i,j+2]-scaled_coords[i,j+1])
-                velocities[i,j]=(v_temp1+v_temp2)/(2.0)
-
-        # Transform velocities (configuration array) back to Cartesian coordinates at each time step
-        velocities=np.array([[np.dot(box_size_tensors[j+1],np.transpose(velocities[i,j]))
-                              for j in range(n_timesteps-1)] for i in range(n_particles)])
+        # Unwrap the coordinates and use finite difference methods to evaluate the time-derivative to 1st order.
+        # Shape: (# of particles) x (timesteps-1) x (# of spatial dimensions)
+        velocities=mdcorrelations.calculate_velocities(trajectory)
+        trajectory.close()
         logger.information(str(time.time()-start_time) + " s")
 
         logger.information("Calculating velocity auto-correlations (resource intensive calculation)...")
         start_time=time.time()
 
-        correlation_length=n_timesteps-1
-        correlations=np.zeros((n_species,n_species,correlation_length))
+        # Index of the species of each particle in the 'elements' list
+        particle_species=np.array([elements.index(atoms_to_species[i]) for i in range(n_particles)])
+
+        correlations=np.zeros((n_species,n_species,n_timesteps-1))
         # Array for counting particle pairings
         correlation_count=np.zeros((n_species,n_species))
 
-        # Compute cross-correlations for each pair of particles in each spatial coordinate
-        for i in range(n_particles):
-            # Retrieve particle indices from the 'particles' dictionary and determine the relevant position in the 'correlations' matrices
-            k=elements.index(atoms_to_species[i])
-            # Check for the order of elements (ensures upper triangular matrix form & consistent order of operations)
-            correlation_temp=self.auto_correlation(velocities[i])
-            correlations[k,k]+=correlation_temp
-            correlation_count[k,k]+=1
+        # Sum the auto-correlations of the particles of each species
+        auto_correlations=mdcorrelations.auto_correlations(velocities,particle_species,n_species)
+        for k in range(n_species):
+            correlations[k,k]=auto_correlations[k]
+            correlation_count[k,k]=np.count_nonzero(particle_species==k)
 
         logger.information(str(time.time()-start_time) + " s")
 
@@ -298,20 +223,6 @@ class VelocityAutoCorrelations(PythonAlgorithm):
         # Set output workspace to output_ws
         self.setProperty('OutputWorkspace',output_ws)
 
-    def auto_correlation(self,u):
-        # Returns auto-correlation of a 3-vectors
-        n=np.shape(u)[0]
-        norm=np.arange(np.ceil(n/2.0),n+1)
-        norm=np.append(norm,(np.arange(n/2+1,n)[::-1]))
-        # Correlation in x
-        C=np.divide(np.correlate(u[:,0],u[:,0],"same"),norm)
-        # Correlation in y
-        C+=np.divide(np.correlate(u[:,1],u[:,1],"same"),norm)
-        # Correlation in z
-        C+=np.divide(np.correlate(u[:,2],u[:,2],"same"),norm)
-
-        return C
-
     def fold_correlation(self,w):
         # Folds an array with symmetrical values into half by averaging values around the centre
         right_half=w[len(w)//2:]
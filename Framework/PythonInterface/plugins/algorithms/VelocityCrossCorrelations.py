@@ -10,10 +10,10 @@ from mantid.simpleapi import *
 from mantid.kernel import *
 from mantid.api import *
 
-from scipy.io import netcdf
 import numpy as np
-import re
 import time
+import mdcorrelations
+import mdtrajectory
 
 
 class VelocityCrossCorrelations(PythonAlgorithm):
@@ -41,50 +41,16 @@ class VelocityCrossCorrelations(PythonAlgorithm):
         # Get file path
         file_name=self.getPropertyValue("InputFile")
 
-        # Load trajectory file
-        trajectory=netcdf.netcdf_file(file_name,mode="r")
-
         logger.information("Loading particle id's and coordinate array...")
         start_time=time.time()
 
-        # netcdf object containing the particle id numbers
-        description=(trajectory.variables["description"])[:]
-        # Convert description object to string via for loop. The original object has strange formatting
-        particleID = ''
-        for i in description:
-            particleID += i.decode('UTF-8')
-        # Extract particle id's from string using regular expressions
-        p_atoms=re.findall(r"A\('[a-z]+\d+',\d+", particleID)
-
-        # Many-to-one structures. Identify the set of atomic species present (list structure 'elements')
-        # in the simulation and repackage particles into a dictionary
-        # 'particles_to_species' with structure id number -> species
-        atoms_to_species={}
-        species_to_atoms={}
-        elements=[]
-
-        # Populate the particles_to_species dictionary and the elements list
-        for j in p_atoms:
-            key=re.findall(r"',\d+",j)[0]
-            key=int(re.findall(r"\d+",key)[0])
-            element=re.findall(r"[a-z]+",j)[0]
-            if element not in elements:
-                elements.append(str(element))
-            atoms_to_species[key]=str(element)
-
-        # Initialise lists in the species_to_particles dictionary
-        for j in elements:
-            species_to_atoms[j]=[]
-
-        # Populate the species_to_particles dictionary
-        for j in p_atoms:
-            key=re.findall(r"',\d+",j)[0]
-            key=int(re.findall(r"\d+",key)[0])
-            element=re.findall(r"[a-z]+",j)[0]
-            species_to_atoms[element].append(key)
-
-        # Coordinate array. Shape: timesteps x (# of particles) x (# of spatial dimensions)
-        configuration=trajectory.variables["configuration"]
+        # Load trajectory file. The coordinates are read in blocks of timesteps when they are needed
+        trajectory=mdtrajectory.Trajectory(file_name)
+
+        # Many-to-one structures. The set of atomic species present (list structure 'elements') in the simulation
+        # and a dictionary 'atoms_to_species' with structure id number -> species
+        elements=trajectory.elements
+        atoms_to_species=trajectory.atoms_to_species
 
         # Extract useful simulation parameters
         # Number of species present in the simulation
@@ -92,79 +58,35 @@ class VelocityCrossCorrelations(PythonAlgorithm):
         # Number of particles present in the simulation
         n_particles=len(atoms_to_species)
         # Number of timesteps in the simulation
-        n_timesteps=int(configuration.shape[0])
-        # Number of spatial dimensions
-        n_dimensions=int(configuration.shape[2])
+        n_timesteps=trajectory.n_timesteps
 
         logger.information(str(time.time()-start_time) + " s")
 
-        logger.information("Transforming coordinates...")
+        logger.information("Calculating velocities...")
         start_time=time.time()
 
-        # Box size for each timestep. Shape: timesteps x (3 consecutive 3-vectors)
-        box_size=trajectory.variables["box_size"]
-
-        # Reshape the paralellepipeds into 3x3 tensors for coordinate transformations.
-        # Shape: timesteps x 3 vectors x (# of spatial dimensions)
-        box_size_tensors=np.array([box_size[j].reshape((3,3)) for j in range(n_timesteps)])
-
-        # Copy the configuration object into a numpy array
-        configuration_copy=np.array([configuration[i] for i in range(n_timesteps)])
-
-        # Swap the time and particle axes
-        configuration_copy=np.swapaxes(configuration_copy,0,1)#/1.12484770
-
-        # Get scaled coordinates (assumes orthogonal simulation box)
-        scaled_coords=np.zeros(np.shape(configuration_copy))
-        for i in range(n_particles):
-            for j in range(n_timesteps):
-                for k in range(n_dimensions):
-                    scaled_coords[i,j,k]=configuration_copy[i,j,k]/box_size_tensors[j,k,k]
-
-        # # Transform particle trajectories (configuration array) to Cartesian coordinates at each time step
-
+        # Unwrap the coordinates and use finite difference methods to evaluate the time-derivative to 1st order.
+        # Shape: (# of particles) x (timesteps-1) x (# of spatial dimensions)
+        velocities=mdcorrelations.calculate_velocities(trajectory)
+        trajectory.close()
         logger.information(str(time.time()-start_time) + " s")
 
-        logger.information("Calculating velocities...")
+        logger.information("Calculating velocity cross-correlations (resource intensive calculation)...")
         start_time=time.time()
 
-        # Initialise velocity arrray. Note that the first dimension is 2 elements shorter than the coordinate array.
-        # Use finite difference methods to evaluate the time-derivative to 1st order
-        # Shape: (# of particles) x (timesteps-2) x (# of spatial dimensions)
+        # Index of the species of each particle in the 'elements' list
+        particle_species=np.array([elements.index(atoms_to_species[i]) for i in range(n_particles)])
 
-        velocities=np.zeros((n_particles,n_timesteps-1,n_dimensions))
-        v1=scaled_coords[:,1:-1,:]-scaled_coords[:,:-2,:]-np.round(scaled_coords[:,1:-1,:]-scaled_coords[:,:-2,:])
-        v2=scaled_coords[:,2:,:]-scaled_coords[:,1:-1,:]-np.round(scaled_coords[:,2:,:]-scaled_coords[:,1:-1,:])
-        velocities[:,:-1,:]=(v1+v2)/2.
-
-        # Transform velocities (configuration array) back to Cartesian coordinates at each time step
-        velocities=np.array([[np.dot(box_size_tensors[j+1],np.transpose(velocities[i,j]))
-                              for j in range(n_timesteps-1)] for i in range(n_particles)])
-        logger.information(str(time.time()-start_time) + " s")
+        # Sum the cross-correlations of each pair of particles in upper triangular matrix form
+        correlations=mdcorrelations.cross_correlations(velocities,particle_species,n_species)
 
-        logger.information("Calculating velocity cross-correlations (resource intensive calculation)...")
-        start_time=time.time()
-        correlation_length=n_timesteps-1
-        correlations=np.zeros((n_species,n_species,correlation_length))
         # Array for counting particle pairings
         correlation_count=np.zeros((n_species,n_species))
-
-        # Compute cross-correlations for each pair of particles in each spatial coordinate
-        for i in range(n_particles):
-            for j in range(i+1,n_particles):
-                # Retrieve particle indices from the 'particles' dictionary and
-                # determine the relevant position in the 'correlations' matrices
-                k=elements.index(atoms_to_species[i])
-                l=elements.index(atoms_to_species[j])
-                # Check for the order of elements (ensures upper triangular matrix form & consistent order of operations)
-                if k<=l:
-                    correlation_temp=self.cross_correlation(velocities[i],velocities[j])
-                    correlations[k,l]+=correlation_temp
-                    correlation_count[k,l]+=1
-                else:
-                    correlation_temp=self.cross_correlation(velocities[j],velocities[i])
-                    correlations[l,k]+=correlation_temp
-                    correlation_count[l,k]+=1
+        species_count=np.bincount(particle_species,minlength=n_species)
+        for k in range(n_species):
+            correlation_count[k,k]=species_count[k]*(species_count[k]-1)/2
+            for l in range(k+1,n_species):
+                correlation_count[k,l]=species_count[k]*species_count[l]
 
         logger.information(str(time.time()-start_time) + " s")
 
@@ -308,20 +230,6 @@ class VelocityCrossCorrelations(PythonAlgorithm):
         # Set output workspace to output_ws
         self.setProperty('OutputWorkspace',output_ws)
 
-    def cross_correlation(self,u,v):
-        # Returns cross-correlation of two 3-vectors
-        n=np.shape(v)[0]
-        norm=np.arange(np.ceil(n/2.0),n+1)
-        norm=np.append(norm,(np.arange(n/2+1,n)[::-1]))
-        # Correlation in x
-        C=np.divide(np.correlate(u[:,0],v[:,0],"same"),norm)
-        # Correlation in y
-        C+=np.divide(np.correlate(u[:,1],v[:,1],"same"),norm)
-        # Correlation in z
-        C+=np.divide(np.correlate(u[:,2],v[:,2],"same"),norm)
-
-        return C
-
     def fold_correlation(self,w):
         # Folds an array with symmetrical values into half by averaging values around the centre
         right_half=w[int(len(w)/2):]
@@ -16,6 +16,7 @@ from mantid.simpleapi import *
 from mantid.api import (PythonAlgorithm, AlgorithmFactory, PropertyMode, MatrixWorkspaceProperty,
                         WorkspaceGroupProperty, InstrumentValidator, Progress)
 from mantid.kernel import (StringListValidator, IntBoundedValidator, FloatBoundedValidator, Direction, logger)
+import paalmanpings
 
 
 def set_material_density(set_material_alg, density_type, density, number_density_unit):
@@ -243,15 +244,9 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
                                                    self._can_density,
                                                    self._can_number_density_unit)
 
-        # Holders for the corrected data
-        data_ass = []
-        data_assc = []
-        data_acsc = []
-        data_acc = []
-
         self._get_angles()
         num_angles = len(self._angles)
-        workflow_prog = Progress(self, start=0.2, end=0.8, nreports=num_angles * 2)
+        workflow_prog = Progress(self, start=0.2, end=0.8, nreports=1)
 
         # Check sample input
         sam_material = mtd[self._sample_ws_name].sample().getMaterial()
@@ -281,17 +276,15 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
                     "A can workspace was given but the can back thickness was not given. Continuing but no absorption for can back"
                     " will be computed.")
 
-        for angle_idx in range(num_angles):
-            workflow_prog.report('Running flat correction for angle %s' % angle_idx)
-            angle = self._angles[angle_idx]
-            (ass, assc, acsc, acc) = self._flat_abs(angle)
-
-            logger.information('Angle %d: %f successful' % (angle_idx + 1, self._angles[angle_idx]))
-            workflow_prog.report('Appending data for angle %s' % angle_idx)
-            data_ass = np.append(data_ass, ass)
-            data_assc = np.append(data_assc, assc)
-            data_acsc = np.append(data_acsc, acsc)
-            data_acc = np.append(data_acc, acc)
+        # The intermediate arrays of _flat_abs for each wavelength
+        angle_memory = 8 * len(self._wavelengths) * 30
+        (ass, assc, acsc, acc) = paalmanpings.evaluate_angles(self._flat_abs, self._angles, angle_memory,
+                                                              progress=workflow_prog)
+        logger.information('Flat correction for %d angles successful' % num_angles)
+        data_ass = ass.ravel()
+        data_assc = assc.ravel()
+        data_acsc = acsc.ravel()
+        data_acc = acc.ravel()
 
         log_prog = Progress(self, start=0.8, end=1.0, nreports=8)
 
@@ -557,7 +550,7 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
 
     # ------------------------------------------------------------------------------
 
-    def _flat_abs(self, angle):
+    def _flat_abs(self, angles):
         """
         FlatAbs - calculate flat plate absorption factors
 
@@ -570,7 +563,8 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
             Open-Source Implementation libabsco, and Why it Should be Used with Caution',
             http://apps.jcns.fz-juelich.de/doku/sc/_media/abs00.pdf
 
-        @return: A tuple containing the attenuations;
+        @param angles Array of scattering angles in degrees
+        @return: A tuple containing the attenuations, each an array of shape angles x wavelengths;
             1) scattering and absorption in sample,
             2) scattering in sample and absorption in sample and container
             3) scattering in container and absorption in sample and container,
@@ -581,25 +575,19 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
         # self._sample_angle = 0 means that the sample is perpendicular
         # to the incident beam
         alpha = (90.0 + self._sample_angle) * self.PICONV
-        theta = angle * self.PICONV
+        # Angles are along the first axis and wavelengths along the second one
+        theta = np.asarray(angles)[:, np.newaxis] * self.PICONV
         salpha = np.sin(alpha)
-        if theta > (alpha + np.pi):
-            stha = np.sin(abs(theta-alpha-np.pi))
-        else:
-            stha = np.sin(abs(theta-alpha))
+        stha = np.where(theta > (alpha + np.pi), np.sin(abs(theta-alpha-np.pi)), np.sin(abs(theta-alpha)))
+        transmission = (theta < alpha) | (theta > (alpha + np.pi))
 
         nlam = len(self._wavelengths)
 
-        ass = np.ones(nlam)
-        assc = np.ones(nlam)
-        acsc = np.ones(nlam)
-        acc = np.ones(nlam)
-
-        # Scattering in direction of slab --> calculation is not reliable
-        # Default to 1 for everything
-        # Tolerance is 0.001 rad ~ 0.06 deg
-        if abs(theta-alpha) < 0.001:
-            return ass, assc, acsc, acc
+        ones = np.ones((len(theta), nlam))
+        ass = ones
+        assc = ones
+        acsc = ones
+        acc = ones
 
         sample = mtd[self._sample_ws_name].sample()
         sam_material = sample.getMaterial()
@@ -607,22 +595,26 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
         # List of wavelengths
         waveslengths = np.array(self._wavelengths)
 
-        sst = np.vectorize(self._self_shielding_transmission)
-        ssr = np.vectorize(self._self_shielding_reflection)
+        # Scattering in direction of slab gives infinite path lengths
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ki_s, kf_s = 0, 0
+            if self._has_sample_in:
+                ki_s, kf_s, ass = self._sample_cross_section_calc(sam_material, waveslengths, salpha, stha, transmission)
 
-        ki_s, kf_s = 0, 0
-        if self._has_sample_in:
-            ki_s, kf_s, ass = self._sample_cross_section_calc(sam_material, waveslengths, theta, alpha, stha, salpha, sst, ssr)
+            # Container --> Acc, Assc, Acsc
+            if self._use_can:
+                ass, assc, acsc, acc = self._can_cross_section_calc(waveslengths, salpha, stha, transmission, ki_s, kf_s, ass,
+                                                                    acc)
 
-        # Container --> Acc, Assc, Acsc
-        if self._use_can:
-            ass, assc, acsc, acc = self._can_cross_section_calc(waveslengths, theta, alpha, stha, salpha, ki_s, kf_s, ass, acc, sst, ssr)
-
-        return ass, assc, acsc, acc
+        # Scattering in direction of slab --> calculation is not reliable
+        # Default to 1 for everything
+        # Tolerance is 0.001 rad ~ 0.06 deg
+        slab = abs(theta-alpha) < 0.001
+        return tuple(np.where(slab, ones, attenuation * ones) for attenuation in (ass, assc, acsc, acc))
 
     # ------------------------------------------------------------------------------
 
-    def _sample_cross_section_calc(self, sam_material, waves, theta, alpha, stha, salpha, sst, ssr):
+    def _sample_cross_section_calc(self, sam_material, waves, salpha, stha, transmission):
         # Sample cross section (value for each of the wavelengths and for E = Efixed)
         sample_x_section = (sam_material.totalScatterXSection() +
                             sam_material.absorbXSection() * waves / self.TABULATED_WAVELENGTH) * self._sample_density
@@ -641,18 +633,14 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
             ki_s, kf_s = self._calc_ki_kf(waves, self._sample_thickness, salpha, stha,
                                           sample_x_section, sample_x_section_efixed)
 
-        if theta < alpha or theta > (alpha + np.pi):
-            # transmission case
-            ass = sst(ki_s, kf_s)
-        else:
-            # reflection case
-            ass = ssr(ki_s, kf_s)
+        # transmission or reflection case
+        ass = np.where(transmission, self._self_shielding_transmission(ki_s, kf_s), self._self_shielding_reflection(ki_s, kf_s))
 
         return ki_s, kf_s, ass
 
     # ------------------------------------------------------------------------------
 
-    def _can_cross_section_calc(self, wavelengths, theta, alpha, stha, salpha, ki_s, kf_s, ass, acc, sst, ssr):
+    def _can_cross_section_calc(self, wavelengths, salpha, stha, transmission, ki_s, kf_s, ass, acc):
         can_sample = mtd[self._can_ws_name].sample()
         can_material = can_sample.getMaterial()
 
@@ -672,35 +660,34 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
         if self._has_can_front_in:
             # Front container --> Acc1
             ki_c1, kf_c1, acc1 = self._can_thickness_calc(can_x_section, can_x_section_efixed, self._can_front_thickness, wavelengths,
-                                                          theta, alpha, stha, salpha, ssr, sst)
+                                                          salpha, stha, transmission)
         if self._has_can_back_in:
             # Back container --> Acc2
             ki_c2, kf_c2, acc2 = self._can_thickness_calc(can_x_section, can_x_section_efixed, self._can_back_thickness, wavelengths,
-                                                          theta, alpha, stha, salpha, ssr, sst)
+                                                          salpha, stha, transmission)
 
         # Attenuation due to passage by other layers (sample or container)
-        if theta < alpha or theta > (alpha + np.pi):  # transmission case
-            assc, acsc, acc = self._container_transmission_calc(acc, acc1, acc2, ki_s, kf_s, ki_c1, kf_c2, ass)
-        else:  # reflection case
-            assc, acsc, acc = self._container_reflection_calc(acc, acc1, acc2, ki_s, kf_s, ki_c1, kf_c1, ass)
+        # transmission case
+        assc_t, acsc_t, acc_t = self._container_transmission_calc(acc, acc1, acc2, ki_s, kf_s, ki_c1, kf_c2, ass)
+        # reflection case
+        assc_r, acsc_r, acc_r = self._container_reflection_calc(acc, acc1, acc2, ki_s, kf_s, ki_c1, kf_c1, ass)
+        assc = np.where(transmission, assc_t, assc_r)
+        acsc = np.where(transmission, acsc_t, acsc_r)
+        acc = np.where(transmission, acc_t, acc_r)
 
         return ass, assc, acsc, acc
 
     # ------------------------------------------------------------------------------
 
-    def _can_thickness_calc(self, can_x_section, can_x_section_efixed, can_thickness, wavelengths, theta, alpha, stha, salpha, ssr, sst):
+    def _can_thickness_calc(self, can_x_section, can_x_section_efixed, can_thickness, wavelengths, salpha, stha, transmission):
         if self._emode == 'Efixed':
             ki = can_x_section_efixed * can_thickness / salpha
             kf = can_x_section_efixed * can_thickness / stha
         else:
             ki, kf = self._calc_ki_kf(wavelengths, can_thickness, salpha, stha, can_x_section, can_x_section_efixed)
 
-        if theta < alpha or theta > (alpha + np.pi):
-            # transmission case
-            acc = sst(ki, kf)
-        else:
-            # reflection case
-            acc = ssr(ki, kf)
+        # transmission or reflection case
+        acc = np.where(transmission, self._self_shielding_transmission(ki, kf), self._self_shielding_reflection(ki, kf))
 
         return ki, kf, acc
 
@@ -778,10 +765,9 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
     # ------------------------------------------------------------------------------
 
     def _self_shielding_transmission(self, ki, kf):
-        if abs(ki-kf) < 1.0e-3:
-            return np.exp(-ki) * ( 1.0 - 0.5*(kf-ki) + (kf-ki)**2/12.0 )
-        else:
-            return (np.exp(-kf)-np.exp(-ki)) / (ki-kf)
+        return np.where(abs(ki-kf) < 1.0e-3,
+                        np.exp(-ki) * ( 1.0 - 0.5*(kf-ki) + (kf-ki)**2/12.0 ),
+                        (np.exp(-kf)-np.exp(-ki)) / (ki-kf))
 
     # ------------------------------------------------------------------------------
 
@@ -802,8 +788,8 @@ class FlatPlatePaalmanPingsCorrection(PythonAlgorithm):
         elif self._emode == 'Indirect':
             ki = np.copy(x_section)
             kf *= x_section_efixed
-        ki *= (thickness / sinangle1)
-        kf *= (thickness / sinangle2)
+        ki = ki * (thickness / sinangle1)
+        kf = kf * (thickness / sinangle2)
         return ki, kf
 
     # ------------------------------------------------------------------------------
@@ -0,0 +1,141 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+import tempfile
+import numpy as np
+from scipy.fftpack import next_fast_len
+
+'''
+This file contains the velocity and correlation calculations shared by VelocityAutoCorrelations and
+VelocityCrossCorrelations.
+
+The coordinates are read from an mdtrajectory.Trajectory in blocks of frames and the velocities of all particles in a
+block are calculated at once.
+The velocities are stored particle by particle, in memory or in a temporary file if they are large, so that the
+correlations can be calculated with FFTs for blocks of particles. The correlations of all particles of a species
+are summed in Fourier space, hence only one inverse transform is needed per species or pair of species.
+'''
+
+# Approximate amount of memory used for one block of particles
+BLOCK_MEMORY = 1 << 27
+
+# Velocities larger than this are stored in a temporary file rather than in memory
+MAX_VELOCITIES_IN_MEMORY = 1 << 30
+
+
+def calculate_velocities(trajectory):
+    '''
+    Calculates the Cartesian velocities of all particles by central differences of the unwrapped scaled coordinates.
+
+    The scaled coordinates assume an orthogonal simulation box. As in the original nMoldyn based implementation, the
+    velocity array is one element shorter than the trajectory and its last element is zero.
+    :param trajectory: an mdtrajectory.Trajectory
+    :return: velocity array, shape: (# of particles) x (timesteps - 1) x (# of spatial dimensions)
+    '''
+    n_timesteps, n_dimensions = trajectory.n_timesteps, trajectory.n_dimensions
+    shape = (trajectory.n_particles, max(n_timesteps - 1, 0), n_dimensions)
+    if shape[0] * shape[1] * n_dimensions * 8 > MAX_VELOCITIES_IN_MEMORY:
+        # The temporary file is removed once the memory map is released
+        velocities = np.memmap(tempfile.TemporaryFile(), dtype=np.float64, mode='w+', shape=shape)
+    else:
+        velocities = np.zeros(shape)
+
+    box_tensors = trajectory.get_box_tensors()
+    # The velocity at step j needs the coordinates at steps j, j+1 and j+2
+    for start, stop, frames in trajectory.frame_blocks(overlap=2, block_memory=BLOCK_MEMORY // 4):
+        boxes = box_tensors[start:stop + 2]
+        scaled_coords = frames / np.diagonal(boxes, axis1=1, axis2=2)[:, np.newaxis, :]
+        # Unwrapping coordinates
+        steps = np.diff(scaled_coords, axis=0)
+        steps -= np.round(steps)
+        block_velocities = (steps[:-1] + steps[1:]) / 2.0
+        # Transform velocities back to Cartesian coordinates at each time step
+        velocities[:, start:stop, :] = np.einsum('tij,tpj->pti', boxes[1:-1], block_velocities)
+    return velocities
+
+
+def _particle_blocks(velocities, fft_length):
+    n_particles, n_steps, n_dimensions = velocities.shape
+    particle_memory = 8 * n_dimensions * (n_steps + 6 * (fft_length // 2 + 1))
+    particles_per_block = max(1, BLOCK_MEMORY // particle_memory)
+    for start in range(0, n_particles, particles_per_block):
+        stop = min(start + particles_per_block, n_particles)
+        yield start, stop, np.fft.rfft(np.asarray(velocities[start:stop]), n=fft_length, axis=1)
+
+
+def _same_correlation(spectrum, n_steps, fft_length):
+    # Returns the correlation at the same lags as np.correlate(u, v, "same"), i.e. -n/2 ... n-1-n/2
+    correlation = np.fft.irfft(spectrum, n=fft_length)
+    return np.concatenate((correlation[fft_length - n_steps // 2:], correlation[:n_steps - n_steps // 2]))
+
+
+def correlation_norm(n_steps):
+    '''
+    Returns the normalisation applied to the correlations, i.e. the number of overlapping steps at each lag.
+    '''
+    norm = np.arange(np.ceil(n_steps / 2.0), n_steps + 1)
+    return np.append(norm, (np.arange(n_steps / 2 + 1, n_steps)[::-1]))
+
+
+def auto_correlations(velocities, species, n_species, norm=None):
+    '''
+    Sums the normalised velocity auto-correlations of the particles of each species.
+    :param velocities: velocity array as returned by calculate_velocities, or any other time-dependent vectors
+    :param species: index of the species of each particle
+    :param n_species: number of species
+    :param norm: normalisation of the correlations, by default correlation_norm
+    :return: array of shape (# of species) x (# of steps)
+    '''
+    n_steps = velocities.shape[1]
+    fft_length = next_fast_len(max(2 * n_steps - 1, 1))
+    spectra = np.zeros((n_species, fft_length // 2 + 1))
+    for start, stop, block in _particle_blocks(velocities, fft_length):
+        power = np.sum(block.real ** 2 + block.imag ** 2, axis=2)
+        for k in range(n_species):
+            spectra[k] += np.sum(power[species[start:stop] == k], axis=0)
+    if norm is None:
+        norm = correlation_norm(n_steps)
+    return np.array([_same_correlation(spectrum, n_steps, fft_length) / norm for spectrum in spectra])
+
+
+def cross_correlations(velocities, species, n_species):
+    '''
+    Sums the normalised velocity cross-correlations of every pair of different particles.
+
+    For two different species k < l, the correlations of all particles of species k with all particles of species l
+    are summed. For particles of the same species, the correlation of each particle with every particle of a higher
+    index is summed. As the correlation is linear in both arguments, the sums are correlations of summed velocities.
+    :param velocities: velocity array as returned by calculate_velocities
+    :param species: index of the species of each particle
+    :param n_species: number of species
+    :return: array of shape (# of species) x (# of species) x (# of steps), of which the upper triangle is filled
+    '''
+    n_particles, n_steps, n_dimensions = velocities.shape
+    fft_length = next_fast_len(max(2 * n_steps - 1, 1))
+    n_frequencies = fft_length // 2 + 1
+    # Sums of the spectra of the particles of each species seen so far
+    species_sums = np.zeros((n_species, n_frequencies, n_dimensions), dtype=np.complex128)
+    same_species = np.zeros((n_species, n_frequencies), dtype=np.complex128)
+    for start, stop, block in _particle_blocks(velocities, fft_length):
+        block_species = species[start:stop]
+        for k in range(n_species):
+            species_block = block[block_species == k]
+            if len(species_block) == 0:
+                continue
+            # Sums of the spectra of the particles of species k with a lower index than each particle in the block
+            lower_sums = species_sums[k] + np.cumsum(species_block, axis=0) - species_block
+            same_species[k] += np.sum(lower_sums * np.conj(species_block), axis=(0, 2))
+            species_sums[k] += np.sum(species_block, axis=0)
+
+    norm = correlation_norm(n_steps)
+    correlations = np.zeros((n_species, n_species, n_steps))
+    for k in range(n_species):
+        correlations[k, k] = _same_correlation(same_species[k], n_steps, fft_length) / norm
+        for l in range(k + 1, n_species):
+            spectrum = np.sum(species_sums[k] * np.conj(species_sums[l]), axis=1)
+            correlations[k, l] = _same_correlation(spectrum, n_steps, fft_length) / norm
+    return correlations
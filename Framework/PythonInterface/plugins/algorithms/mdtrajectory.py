@@ -0,0 +1,162 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+import re
+import h5py
+import numpy as np
+from scipy.io import netcdf
+from scipy.sparse import csr_matrix
+
+'''
+This file contains the access to MMTK trajectories shared by the algorithms working on nMoldyn trajectory files,
+such as VelocityAutoCorrelations and AngularAutoCorrelationsSingleAxis.
+
+The coordinates are never loaded as a whole. netCDF 3 files are memory-mapped and netCDF 4 (HDF5) files are read
+through h5py, and the algorithms request the coordinates in blocks of frames, so trajectories larger than the memory
+can be processed in a single pass.
+'''
+
+# Approximate amount of memory used for one block of frames
+BLOCK_MEMORY = 1 << 27
+
+
+class Trajectory(object):
+    '''
+    An MMTK trajectory: the particles and molecules in the simulation, the box size at each timestep and read
+    access to the coordinates.
+    '''
+    def __init__(self, file_name):
+        if h5py.is_hdf5(file_name):
+            self._file = h5py.File(file_name, 'r')
+            variables = self._file
+        else:
+            self._file = netcdf.netcdf_file(file_name, mode='r', mmap=True)
+            variables = self._file.variables
+
+        # Coordinate array. Shape: timesteps x (# of particles) x (# of spatial dimensions)
+        self._configuration = variables["configuration"]
+        # Box size for each timestep. Shape: timesteps x (3 consecutive 3-vectors)
+        self._box_size = variables["box_size"]
+
+        self.n_timesteps = int(self._configuration.shape[0])
+        self.n_particles = int(self._configuration.shape[1])
+        self.n_dimensions = int(self._configuration.shape[2])
+
+        # Convert description object to string via for loop. The original object has strange formatting
+        self.description = ''.join(character.decode('UTF-8') for character in variables["description"][:])
+        self._parse_description()
+
+    def _parse_description(self):
+        # Extract particle id's from string using regular expressions
+        particles = [_parse_particle(atom) for atom in re.findall(r"A\('[a-z]+\d+',\d+", self.description)]
+
+        # Many-to-one structures. Identify the set of atomic species present (list structure 'elements') in the
+        # simulation and repackage particles into dictionaries with structures id number -> species and
+        # species -> list of id numbers
+        self.elements = []
+        self.atoms_to_species = {}
+        self.species_to_atoms = {}
+        for key, element in particles:
+            if element not in self.elements:
+                self.elements.append(element)
+                self.species_to_atoms[element] = []
+            self.atoms_to_species[key] = element
+            self.species_to_atoms[element].append(key)
+
+        # Many-to-one structures. Assign atom indices to molecule indices, the first item of the split description
+        # contains the initialisation of the variable 'description'
+        molecules = self.description.split("AC")[1:]
+        self.molecules_to_atoms = [[_parse_particle(atom)[0] for atom in re.findall(r"A\('[a-z]+\d+',\d+", molecule)]
+                                   for molecule in molecules]
+        self.atoms_to_molecules = {}
+        for molecule, atoms in enumerate(self.molecules_to_atoms):
+            for atom in atoms:
+                self.atoms_to_molecules[atom] = molecule
+
+    def get_box_tensors(self):
+        '''
+        Reshapes the paralellepipeds into 3x3 tensors for coordinate transformations.
+        :return: array of shape timesteps x (3-vectors) x (# of spatial dimensions)
+        '''
+        box_size = np.array(self._box_size[:], dtype=np.float64)
+        return box_size.reshape((box_size.shape[0], 3, 3))
+
+    def frame_blocks(self, overlap=0, block_memory=None):
+        '''
+        Yields the coordinates in blocks of consecutive timesteps.
+
+        Blocks start at every timestep up to the last but overlap timesteps. Each block contains overlap more
+        timesteps than it starts, for calculations which need the following timesteps.
+        :param overlap: number of additional timesteps in each block
+        :param block_memory: approximate memory for a block in bytes, by default BLOCK_MEMORY
+        :return: tuples of the first and one past the last timestep starting in the block and the coordinates of
+                 the timesteps from the first to one past the last plus overlap, as an array of shape
+                 timesteps x (# of particles) x (# of spatial dimensions)
+        '''
+        frame_memory = 8 * self.n_particles * self.n_dimensions
+        frames_per_block = max(1, (block_memory or BLOCK_MEMORY) // frame_memory)
+        n_starts = self.n_timesteps - overlap
+        for start in range(0, max(n_starts, 0), frames_per_block):
+            stop = min(start + frames_per_block, n_starts)
+            yield start, stop, np.array(self._configuration[start:stop + overlap], dtype=np.float64)
+
+    def close(self):
+        # Memory-mapped netCDF files can only be closed once no variable refers to them anymore
+        self._configuration = None
+        self._box_size = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def molecule_average(molecules_to_atoms, atoms_to_species, species, n_particles):
+    '''
+    Creates the operator averaging the positions of the atoms of a species in each molecule.
+    :param molecules_to_atoms: list of the atom ids of each molecule
+    :param atoms_to_species: dictionary with structure id number -> species
+    :param species: the species to average
+    :param n_particles: number of particles in the simulation
+    :return: a function which takes positions of shape timesteps x (# of particles) x (# of spatial dimensions) and
+             returns the average positions, shape: (# of molecules) x timesteps x (# of spatial dimensions)
+    '''
+    rows, columns = [], []
+    for molecule, atoms in enumerate(molecules_to_atoms):
+        for atom in atoms:
+            if atoms_to_species[atom] == species:
+                rows.append(molecule)
+                columns.append(atom)
+    n_molecules = len(molecules_to_atoms)
+    sums = csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(n_molecules, n_particles))
+    counts = np.bincount(rows, minlength=n_molecules).astype(np.float64)
+
+    def average(positions):
+        n_timesteps, _, n_dimensions = positions.shape
+        particle_major = np.swapaxes(positions, 0, 1).reshape((n_particles, n_timesteps * n_dimensions))
+        return sums.dot(particle_major).reshape((n_molecules, n_timesteps, n_dimensions)) / counts[:, None, None]
+
+    return average
+
+
+def minimum_image(vectors, box_lengths):
+    '''
+    Wraps vectors into the simulation box, assuming an orthorhombic simulation cell.
+    :param vectors: vectors, shape: (...) x timesteps x (# of spatial dimensions)
+    :param box_lengths: box dimensions at each timestep, shape: timesteps x (# of spatial dimensions)
+    :return: the shortest periodic images of the vectors
+    '''
+    scaled = vectors / box_lengths
+    return (scaled - np.round(scaled)) * box_lengths
+
+
+def _parse_particle(atom):
+    key = int(re.findall(r"\d+", re.findall(r"',\d+", atom)[0])[0])
+    element = str(re.findall(r"[a-z]+", atom)[0])
+    return key, element
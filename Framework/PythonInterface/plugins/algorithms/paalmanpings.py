@@ -0,0 +1,65 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+from multiprocessing.pool import ThreadPool
+from mantid.kernel.environment import max_threads
+import numpy as np
+
+'''
+This file contains the evaluation of absorption corrections for many detector angles, shared by
+CylinderPaalmanPingsCorrection and FlatPlatePaalmanPingsCorrection.
+
+The corrections are calculated by a function of an array of angles which returns arrays of
+shape angles x wavelengths. Each distinct angle is evaluated once, and the angles are split into
+blocks which are evaluated on a pool of threads. The calculations are NumPy array operations,
+which release the GIL, so the blocks are evaluated in parallel without copying the inputs to other
+processes.
+'''
+
+# Approximate amount of memory used for the intermediate arrays of one block of angles
+BLOCK_MEMORY = 1 << 26
+
+
+def evaluate_angles(function, angles, angle_memory, workers=None, progress=None):
+    '''
+    Evaluates the corrections for every angle.
+    :param function: callable taking an array of distinct angles and returning a tuple of arrays of shape
+                     angles x wavelengths
+    :param angles: the angle of each spectrum
+    :param angle_memory: approximate memory used by function for each angle in bytes
+    :param workers: number of threads to use, by default max_threads()
+    :param progress: optional Progress, reported once for each block of angles
+    :return: a list of arrays of shape (# of spectra) x wavelengths, one for each output of function
+    '''
+    unique_angles, spectrum_angles = np.unique(np.asarray(angles, dtype=np.float64), return_inverse=True)
+    workers = workers or max_threads()
+    # Use blocks which fit in BLOCK_MEMORY, with at least one block per thread
+    block_size = min(max(1, BLOCK_MEMORY // max(angle_memory, 1)),
+                     max(1, -(-len(unique_angles) // workers)))
+    blocks = [unique_angles[start:start + block_size] for start in range(0, len(unique_angles), block_size)]
+    if progress is not None:
+        progress.setNumSteps(len(blocks))
+
+    pool = None
+    if workers > 1 and len(blocks) > 1:
+        pool = ThreadPool(min(workers, len(blocks)))
+        results = pool.imap(function, blocks)
+    else:
+        results = (function(block) for block in blocks)
+    try:
+        block_results = []
+        for result in results:
+            block_results.append(result)
+            if progress is not None:
+                progress.report('Calculated corrections for {0} of {1} distinct angles'
+                                .format(min(len(block_results) * block_size, len(unique_angles)), len(unique_angles)))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return [np.concatenate(outputs)[spectrum_angles] for outputs in zip(*block_results)]
@@ -57,10 +57,21 @@ class PrimStretchedExpFT(IFunction1D):
         :param optparms: alternate list of function parameters
         :return: P(bin_boundaries[i+1])- P(bin_boundaries[i]), the difference of the primitive
         """
-        rf = 16
-        parms, de, energies, fourier = function1Dcommon(self, xvals, rf=rf, **optparms)
+        parms, de, energies, fourier = function1Dcommon(self, xvals, **optparms)
         if parms is None:
             return fourier # return zeros if parameters not valid
+        return self.valuesFromTransform(xvals, parms, de, energies, fourier)
+
+    def valuesFromTransform(self, xvals, parms, de, energies, fourier):
+        """Integrate the Fourier transform within the energy bins of the domain
+        :param xvals: list of values where to evaluate the function
+        :param parms: dictionary of function parameters
+        :param de: energy width of the Fourier transform
+        :param energies: energies of the Fourier transform
+        :param fourier: values of the Fourier transform
+        :return: P(bin_boundaries[i+1])- P(bin_boundaries[i]), the difference of the primitive
+        """
+        rf = 16
         denergies = (energies[-1] - energies[0]) / (len(energies)-1)
         # Find bin boundaries
         boundaries = (xvals[1:]+xvals[:-1])/2  # internal bin boundaries
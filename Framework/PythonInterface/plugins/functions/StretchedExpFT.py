@@ -52,6 +52,17 @@ class StretchedExpFT(IFunction1D):
         parms, de, energies, fourier = function1Dcommon(self, xvals, **optparms)
         if parms is None:
             return fourier  #return zeros if parameters not valid
+        return self.valuesFromTransform(xvals, parms, de, energies, fourier)
+
+    def valuesFromTransform(self, xvals, parms, de, energies, fourier):
+        """Interpolate the Fourier transform at the energies of the domain
+        :param xvals: list of values where to evaluate the function
+        :param parms: dictionary of function parameters
+        :param de: energy width of the Fourier transform
+        :param energies: energies of the Fourier transform
+        :param fourier: values of the Fourier transform
+        :return: function values
+        """
         transform = parms['Height'] * np.interp(xvals-parms['Centre'], energies, fourier)
         return transform
 
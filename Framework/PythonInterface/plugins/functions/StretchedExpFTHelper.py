@@ -14,12 +14,19 @@ This module provides functionality common to classes StretchedExpFT and PrimStre
 """
 
 from __future__ import (absolute_import, division, print_function)
+from collections import OrderedDict
 import copy
 from scipy.fftpack import fft, fftfreq
 from scipy.special import gamma
 from scipy import constants
 import numpy as np
 
+planck_constant = constants.Planck / constants.e * 1E15  # meV*psec
+
+# Number of time and energy grids kept in memory
+CACHE_SIZE = 8
+_grid_cache = OrderedDict()
+
 
 def fillJacobian(function, xvals, jacobian, partials):
     """Fill the jacobian object with the dictionary of partial derivatives
@@ -31,15 +38,12 @@ def fillJacobian(function, xvals, jacobian, partials):
     """
     # Return zero derivatives if empty object
     if not partials:
+        zeros = np.zeros(len(xvals))
         for ip in range(len(function._parmList)):
-            for ix in range(len(xvals)):
-                jacobian.set(ix, ip, 0.0)
+            jacobian.setColumn(ip, zeros)
     else:
-        for ip in range(len(function._parmList)):
-            name = function._parmList[ip]
-            pd = partials[name]
-            for ix in range(len(xvals)):
-                jacobian.set(ix, ip, pd[ix])
+        for ip, name in enumerate(function._parmList):
+            jacobian.setColumn(ip, partials[name])
 
 
 def functionDeriv1D(function, xvals, jacobian):
@@ -54,21 +58,27 @@ def functionDeriv1D(function, xvals, jacobian):
     if not p:
         function.fillJacobian(xvals, jacobian, {})
         return
-    f0 = function.function1D(xvals)
     # Add these quantities to original parameter values
     dp = {'Tau': 1.0,  # change by 1ps
           'Beta': 0.01,
           'Centre': 0.0001  # change by 0.1 micro-eV
           }
-    for name in dp.keys():
+    # Only Tau and Beta change the Fourier transform, so the transforms of
+    # the original and of these two shifted parameters are calculated at once
+    de, energies, abs_times = energy_grid(xvals)
+    fourier, fourier_tau, fourier_beta = fourier_transforms(abs_times,
+                                                            [p['Tau'], p['Tau'] + dp['Tau'], p['Tau']],
+                                                            [p['Beta'], p['Beta'], p['Beta'] + dp['Beta']])
+    f0 = function.valuesFromTransform(xvals, p, de, energies, fourier)
+    for name, transform in (('Tau', fourier_tau), ('Beta', fourier_beta), ('Centre', fourier)):
         pp = copy.copy(p)
         pp[name] += dp[name]
-        partials[name] = (function.function1D(xvals, **pp) - f0) / dp[name]
+        partials[name] = (function.valuesFromTransform(xvals, pp, de, energies, transform) - f0) / dp[name]
     # Analytical derivative for Height parameter. Note we don't use
     # f0/p['Height'] in case p['Height'] was set to zero by the user
     pp = copy.copy(p)
     pp['Height'] = 1.0
-    partials['Height'] = function.function1D(xvals, **pp)
+    partials['Height'] = function.valuesFromTransform(xvals, pp, de, energies, fourier)
     function.fillJacobian(xvals, jacobian, partials)
 
 
@@ -117,6 +127,62 @@ def surrogate(method):
     return surrogates[method.__name__]
 
 
+def energy_grid(xvals, refine_factor=16):
+    """Sampled times and energies of the Fourier transform, kept for the
+    most recently used domains
+    :param xvals: energy domain
+    :param refine_factor: divide the natural energy width by this value
+    :return: energy width, energies, and absolute values of the sampled times
+    """
+    ne = len(xvals)
+    erange = 2 * np.max(np.abs(xvals))
+    key = (ne, float(xvals[0]), float(xvals[-1]), float(erange), refine_factor)
+    grid = _grid_cache.pop(key, None)
+    if grid is None:
+        # energy spacing. Assumed xvals is a single-segment grid
+        # of increasing energy values
+        de = (xvals[-1] - xvals[0]) / (refine_factor * (ne - 1))
+        dt = 0.5 * planck_constant / erange  # spacing in time
+        tmax = planck_constant / de  # maximum reciprocal time
+        # round to an upper power of two
+        nt = 2 ** (1 + int(np.log(tmax / dt) / np.log(2)))
+        abs_times = np.abs(dt * np.arange(-nt, nt))
+        # Find energy values corresponding to the fourier values
+        energies = planck_constant * fftfreq(2 * nt, d=dt)  # standard ordering
+        energies = np.concatenate([energies[nt:], energies[:nt]])  # increasing ordering
+        # the grids are shared by all the calls with the same domain
+        energies.flags.writeable = False
+        abs_times.flags.writeable = False
+        grid = (de, energies, abs_times)
+        if len(_grid_cache) >= CACHE_SIZE:
+            _grid_cache.popitem(last=False)
+    _grid_cache[key] = grid
+    return grid
+
+
+def fourier_transforms(abs_times, taus, betas):
+    """Fourier transforms of the symmetrized stretched exponential for
+    several pairs of Tau and Beta values, calculated in a single FFT
+    :param abs_times: absolute values of the sampled times
+    :param taus: relaxation times
+    :param betas: stretching exponents
+    :return: array with the transform for each pair in increasing energy ordering
+    """
+    taus = np.asarray(taus, dtype=float)[:, np.newaxis]
+    betas = np.asarray(betas, dtype=float)[:, np.newaxis]
+    nt = len(abs_times) // 2
+    decay = np.exp(-(abs_times / taus) ** betas)
+    # The Fourier transform introduces an extra factor exp(i*pi*E/de),
+    # which amounts to alternating sign every time E increases by de,
+    # the energy bin width. Thus, we take the absolute value
+    fourier = np.abs(fft(decay).real)  # notice the reverse of decay array
+    fourier /= fourier[:, :1]  # set maximum to unity
+    # Normalize the integral in energies to unity
+    fourier *= 2 * taus * gamma(1. / betas) / (betas * planck_constant)
+    # symmetrize to negative energies
+    return np.concatenate([fourier[:, nt:], fourier[:, :nt]], axis=1)  # increasing ordering
+
+
 def function1Dcommon(function, xvals, refine_factor=16, **optparms):
     """Fourier transform of the symmetrized stretched exponential
     :param function: instance of StretchedExpFT or PrimStretchedExpFT
@@ -125,7 +191,6 @@ def function1Dcommon(function, xvals, refine_factor=16, **optparms):
     :param optparms: optional parameters used when evaluating the numerical derivative
     :return: parameters, energy width, energies, and function values
     """
-    planck_constant = constants.Planck / constants.e * 1E15  # meV*psec
     p = function.validateParams()
     if p is None:
         # return zeros if parameters not valid
@@ -135,27 +200,6 @@ def function1Dcommon(function, xvals, refine_factor=16, **optparms):
         for name in optparms.keys():
             p[name] = optparms[name]
 
-    ne = len(xvals)
-    # energy spacing. Assumed xvals is a single-segment grid
-    # of increasing energy values
-    de = (xvals[-1] - xvals[0]) / (refine_factor * (ne - 1))
-    erange = 2 * max(abs(xvals))
-    dt = 0.5 * planck_constant / erange  # spacing in time
-    tmax = planck_constant / de  # maximum reciprocal time
-    # round to an upper power of two
-    nt = 2 ** (1 + int(np.log(tmax / dt) / np.log(2)))
-    sampled_times = dt * np.arange(-nt, nt)
-    decay = np.exp(-(np.abs(sampled_times) / p['Tau']) ** p['Beta'])
-    # The Fourier transform introduces an extra factor exp(i*pi*E/de),
-    # which amounts to alternating sign every time E increases by de,
-    # the energy bin width. Thus, we take the absolute value
-    fourier = np.abs(fft(decay).real)  # notice the reverse of decay array
-    fourier /= fourier[0]  # set maximum to unity
-    # Normalize the integral in energies to unity
-    fourier *= 2*p['Tau']*gamma(1./p['Beta']) / (p['Beta']*planck_constant)
-    # symmetrize to negative energies
-    fourier = np.concatenate([fourier[nt:], fourier[:nt]])  # increasing ordering
-    # Find energy values corresponding to the fourier values
-    energies = planck_constant * fftfreq(2 * nt, d=dt)  # standard ordering
-    energies = np.concatenate([energies[nt:], energies[:nt]])  # increasing ordering
+    de, energies, abs_times = energy_grid(xvals, refine_factor)
+    fourier = fourier_transforms(abs_times, [p['Tau']], [p['Beta']])[0]
     return p, de, energies, fourier
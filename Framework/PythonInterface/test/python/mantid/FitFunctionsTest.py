@@ -667,6 +667,31 @@ class FitFunctionsTest(unittest.TestCase):
         self.assertAlmostEqual(result[1], 1.0)
         self.assertAlmostEqual(result[2], 3.0)
 
+    def test_evaluation_matches_evaluate_function(self):
+        x = np.linspace(5.0, 15.0, 51)
+        f = Gaussian(Height=7.5, Sigma=1.2, PeakCentre=10) + LinearBackground(A0=1.0, A1=0.5)
+        ws = CreateWorkspace(DataX=x, DataY=x, StoreInADS=False)
+        expected = EvaluateFunction(f, ws, StoreInADS=False).readY(1)
+        np.testing.assert_allclose(f(x), expected)
+        np.testing.assert_allclose(f.fun.evaluate1D(x), expected)
+
+    def test_evaluation_of_non_contiguous_array(self):
+        x = np.arange(12.0).reshape(3, 4)[:, ::2]
+        p = Polynomial(n=2, A0=1, A1=1, A2=1)
+        result = p(x)
+        self.assertEqual(result.shape, (3, 2))
+        np.testing.assert_allclose(result, 1.0 + x + x**2)
+
+    def test_jacobian(self):
+        x = np.array([0.0, 1.0, 3.0])
+        lb = LinearBackground()
+        jacobian = lb.jacobian(x, 2.0, 3.0)
+        self.assertEqual(jacobian.shape, (3, 2))
+        np.testing.assert_allclose(jacobian[:, 0], [1.0, 1.0, 1.0])
+        np.testing.assert_allclose(jacobian[:, 1], x)
+        self.assertAlmostEqual(lb.A0, 2.0)
+        self.assertAlmostEqual(lb.A1, 3.0)
+
     def test_attributes_passed_to_composite_functions(self):
         cf = Gaussian() + LinearBackground()
         self.assertEqual(cf.getAttributeValue('NumDeriv'), False)
@@ -6,6 +6,7 @@
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
 
+import os
 import unittest
 from mantid.api import (AlgorithmFactory, AlgorithmProxy, IAlgorithm, IEventWorkspace, ITableWorkspace,
                         PythonAlgorithm, MatrixWorkspace, mtd)
@@ -475,5 +476,60 @@ class SimpleAPITest(unittest.TestCase):
         mtd.remove('ws')
         self.assertTrue(ws)
 
+    def test_signature_cache_round_trips_algorithm_spec(self):
+        import shutil
+        import tempfile
+        from mantid.api import AlgorithmManager
+        cache_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(cache_dir, "cache", "signatures.json")
+            alg = AlgorithmManager.createUnmanaged("Rebin", 1)
+            alg.initialize()
+            spec = simpleapi._algorithm_spec(alg)
+            cache = simpleapi._SignatureCache(filename, "build1")
+            self.assertTrue(cache.get("Rebin", 1) is None)
+            cache.put(spec)
+            cache.save()
+            self.assertTrue(os.path.exists(filename))
+
+            reloaded = simpleapi._SignatureCache(filename, "build1").get("Rebin", 1)
+            self.assertEqual(spec, reloaded)
+            self.assertEqual("rebin", reloaded.method_name)
+            self.assertTrue(simpleapi._SignatureCache(filename, "build1").get("Rebin", 2) is None)
+            # a different build discards the cache
+            self.assertTrue(simpleapi._SignatureCache(filename, "build2").get("Rebin", 1) is None)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_signature_cache_keys_python_algorithms_by_plugin_file(self):
+        import shutil
+        import tempfile
+        from mantid.api import AlgorithmManager
+        cache_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(cache_dir, "cache", "signatures.json")
+            alg = AlgorithmManager.createUnmanaged("Rebin", 1)
+            alg.initialize()
+            spec = simpleapi._algorithm_spec(alg)
+            cache = simpleapi._SignatureCache(filename, "build1")
+            cache.put(spec, "/plugins/Rebin.py@1.0")
+
+            self.assertEqual(spec, cache.get("Rebin", 1, "/plugins/Rebin.py@1.0"))
+            # the plugin file has been modified or moved
+            self.assertTrue(cache.get("Rebin", 1, "/plugins/Rebin.py@2.0") is None)
+            self.assertTrue(cache.get("Rebin", 1) is None)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_algorithm_function_can_be_created_from_spec(self):
+        from mantid.api import AlgorithmManager
+        alg = AlgorithmManager.createUnmanaged("CreateSampleWorkspace", 1)
+        alg.initialize()
+        spec = simpleapi._algorithm_spec(alg)
+        func = simpleapi._create_algorithm_function("CreateSampleWorkspace", 1, spec)
+        self.assertEqual(simpleapi.CreateSampleWorkspace.__doc__, func.__doc__)
+        ws = func(StoreInADS=False)
+        self.assertTrue(ws)
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,8 +6,10 @@
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
 
-from mantid.api import mtd
+from mantid.api import DeferredExpression, deferred_operations, mtd
 from mantid.simpleapi import CreateSampleWorkspace
+import numpy as np
+import threading
 import unittest
 
 
@@ -40,5 +42,53 @@ class WorkspaceBinaryOpsTest(unittest.TestCase):
         ws_ads += 1
         self.assertTrue(mtd.doesExist('ws_ads'))
 
+    def test_deferred_operations_match_algorithm_results(self):
+        a = CreateSampleWorkspace(Random=True)
+        b = CreateSampleWorkspace(Random=True)
+        c = CreateSampleWorkspace(Random=True)
+        expected = (a - b) * c / 2.0
+        with deferred_operations():
+            fused = (a - b) * c / 2.0
+        self.assertTrue(mtd.doesExist('fused'))
+        self.assertFalse(any(name.startswith('__python_op_tmp') for name in mtd.getObjectNames()))
+        np.testing.assert_allclose(expected.extractY(), fused.extractY())
+        np.testing.assert_allclose(expected.extractE(), fused.extractE())
+
+    def test_deferred_operations_record_expression_until_assigned(self):
+        a = CreateSampleWorkspace()
+        b = CreateSampleWorkspace()
+        with deferred_operations():
+            self.assertTrue(isinstance(a + b, DeferredExpression))
+            # using it as a workspace evaluates it
+            self.assertEqual(a.getNumberHistograms(), (a + b).getNumberHistograms())
+            total = a + b
+        self.assertFalse(isinstance(total, DeferredExpression))
+        self.assertTrue(mtd.doesExist('total'))
+
+    def test_deferred_plus_merges_runs_as_the_algorithm_does(self):
+        a = CreateSampleWorkspace()
+        b = CreateSampleWorkspace()
+        a.mutableRun().addProperty('gd_prtn_chrg', 1.5, True)
+        b.mutableRun().addProperty('gd_prtn_chrg', 2.0, True)
+        expected = (a + b) * 2.0
+        with deferred_operations():
+            deferred = (a + b) * 2.0
+        self.assertAlmostEqual(expected.run().getProtonCharge(), deferred.run().getProtonCharge())
+        np.testing.assert_allclose(expected.extractY(), deferred.extractY())
+
+    def test_deferred_operations_only_apply_to_the_calling_thread(self):
+        a = CreateSampleWorkspace()
+        results = []
+
+        def add_in_thread():
+            results.append(isinstance(a + a, DeferredExpression))
+
+        with deferred_operations():
+            thread = threading.Thread(target=add_in_thread)
+            thread.start()
+            thread.join()
+            self.assertTrue(isinstance(a + a, DeferredExpression))
+        self.assertEqual([False], results)
+
 if __name__ == '__main__':
     unittest.main()
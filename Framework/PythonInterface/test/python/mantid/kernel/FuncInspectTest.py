@@ -0,0 +1,73 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+
+import unittest
+
+from mantid.kernel import funcinspect
+from mantid.py3compat import mock
+
+
+def _lhs_of_caller():
+    return funcinspect.lhs_info()
+
+
+class FuncInspectTest(unittest.TestCase):
+
+    def setUp(self):
+        funcinspect.clear_lhs_cache()
+        self._max_size = funcinspect._lhs_cache_max_size
+
+    def tearDown(self):
+        funcinspect._lhs_cache_max_size = self._max_size
+        funcinspect.clear_lhs_cache()
+
+    def test_lhs_info_returns_assigned_names(self):
+        result = _lhs_of_caller()
+        self.assertEqual((1, ('result',)), result)
+        self.assertEqual(0, _lhs_of_caller()[0])
+
+    def test_repeated_calls_from_same_instruction_use_cache(self):
+        results = []
+        for _ in range(3):
+            value = _lhs_of_caller()
+            results.append(value)
+        self.assertEqual(1, len(funcinspect._lhs_cache))
+        self.assertEqual([(1, ('value',))] * 3, results)
+
+    def test_different_call_sites_are_cached_separately(self):
+        first = _lhs_of_caller()
+        second = _lhs_of_caller()
+        self.assertEqual((1, ('first',)), first)
+        self.assertEqual((1, ('second',)), second)
+        self.assertEqual(2, len(funcinspect._lhs_cache))
+
+    def test_cache_is_bounded(self):
+        funcinspect._lhs_cache_max_size = 1
+        first = _lhs_of_caller()  # noqa: F841
+        second = _lhs_of_caller()  # noqa: F841
+        self.assertEqual(1, len(funcinspect._lhs_cache))
+
+    def test_cache_hits_do_not_process_the_frame_again(self):
+        with mock.patch.object(funcinspect, 'process_frame', wraps=funcinspect.process_frame) as process_frame:
+            for _ in range(3):
+                value = _lhs_of_caller()  # noqa: F841
+            self.assertEqual(1, process_frame.call_count)
+            funcinspect._lhs_cache_max_size = 0
+            for _ in range(3):
+                value = _lhs_of_caller()  # noqa: F841
+            self.assertEqual(4, process_frame.call_count)
+
+    def test_cache_can_be_disabled(self):
+        funcinspect._lhs_cache_max_size = 0
+        result = _lhs_of_caller()
+        self.assertEqual((1, ('result',)), result)
+        self.assertEqual(0, len(funcinspect._lhs_cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
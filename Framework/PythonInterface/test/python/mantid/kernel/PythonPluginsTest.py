@@ -28,6 +28,23 @@ class TestPyAlg(PythonAlgorithm):
 AlgorithmFactory.subscribe(TestPyAlg)
 """
 
+__RENAMEDALG__ = \
+"""from mantid.api import PythonAlgorithm, AlgorithmFactory
+
+class RenamedPyAlgClass(PythonAlgorithm):
+
+    def name(self):
+        return 'RenamedPyAlg'
+
+    def PyInit(self):
+        pass
+
+    def PyExec(self):
+        pass
+
+AlgorithmFactory.subscribe(RenamedPyAlgClass)
+"""
+
 class PythonPluginsTest(unittest.TestCase):
 
     def setUp(self):
@@ -66,6 +83,73 @@ class PythonPluginsTest(unittest.TestCase):
         except RuntimeError as exc:
             self.fail("Failed to create plugin algorithm from the manager: '%s' " %s)
 
+    def test_plugin_index_records_subscribed_algorithms(self):
+        index = plugins.PluginIndex(os.path.join(self._testdir, 'index.json'))
+        all_plugins, algs = plugins.find_plugins(self._testdir, index)
+        filename = os.path.join(self._testdir, 'TestPyAlg.py')
+        self.assertEqual([filename], all_plugins)
+        self.assertEqual([filename], algs)
+        entry = index.entry(filename)
+        self.assertEqual(['TestPyAlg'], entry['algorithms'])
+        self.assertTrue(entry['deferrable'])
+
+        index.save()
+        reloaded = plugins.PluginIndex(os.path.join(self._testdir, 'index.json'))
+        self.assertEqual(entry, reloaded.entry(filename))
+
+    def test_plugin_index_rescans_changed_file(self):
+        index = plugins.PluginIndex(os.path.join(self._testdir, 'index.json'))
+        filename = os.path.join(self._testdir, 'TestPyAlg.py')
+        self.assertEqual(['TestPyAlg'], index.entry(filename)['algorithms'])
+        with open(filename, 'w') as plugin:
+            plugin.write("# no longer an algorithm\n")
+        entry = index.entry(filename)
+        self.assertFalse(entry['subscribes'])
+        self.assertEqual([], entry['algorithms'])
+
+    def test_plugin_index_maps_algorithms_to_file_and_modification_time(self):
+        index = plugins.PluginIndex(os.path.join(self._testdir, 'index.json'))
+        filename = os.path.join(self._testdir, 'TestPyAlg.py')
+        source = index.algorithm_sources([filename])['TestPyAlg']
+        self.assertTrue(source.startswith(filename))
+
+        os.utime(filename, (0, 0))
+        self.assertNotEqual(source, index.algorithm_sources([filename])['TestPyAlg'])
+        self.assertEqual({}, index.algorithm_sources([]))
+
+    def test_deferred_plugin_is_imported_when_algorithm_is_initialized(self):
+        index = plugins.PluginIndex(os.path.join(self._testdir, 'index.json'))
+        filename = os.path.join(self._testdir, 'TestPyAlg.py')
+        # first load records the metadata required to defer it
+        plugins.load_with_index([filename], index)
+        self.assertTrue(index.entry(filename)['metadata'])
+        del sys.modules['TestPyAlg']
+
+        loaded = plugins.load_with_index([filename], index, defer=True)
+        self.assertEqual([], loaded)
+        self.assertFalse('TestPyAlg' in sys.modules)
+        test_alg = AlgorithmManager.createUnmanaged('TestPyAlg')
+        self.assertEqual(1, test_alg.version())
+        test_alg.initialize()
+        self.assertTrue('TestPyAlg' in sys.modules)
+        self.assertEqual('TestPyAlg', test_alg.name())
+
+    def test_deferred_plugin_is_subscribed_under_the_algorithm_name(self):
+        index = plugins.PluginIndex(os.path.join(self._testdir, 'index.json'))
+        filename = os.path.join(self._testdir, 'RenamedPyAlg.py')
+        with open(filename, 'w') as plugin:
+            plugin.write(__RENAMEDALG__)
+        plugins.load_with_index([filename], index)
+        self.assertEqual('RenamedPyAlg', index.entry(filename)['metadata']['RenamedPyAlgClass']['name'])
+        del sys.modules['RenamedPyAlg']
+
+        plugins.load_with_index([filename], index, defer=True)
+        self.assertFalse('RenamedPyAlg' in sys.modules)
+        test_alg = AlgorithmManager.createUnmanaged('RenamedPyAlg')
+        test_alg.initialize()
+        self.assertEqual('RenamedPyAlg', test_alg.name())
+        self.assertFalse('RenamedPyAlgClass' in AlgorithmFactory.getRegisteredAlgorithms(True))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -364,6 +364,8 @@ class HelperFunctionsTest(unittest.TestCase):
         x, y, z = funcs.get_matrix_2d_ragged(self.ws2d_point_rag, True, histogram2D=False)
         np.testing.assert_allclose(x, np.array([1., 2., 3., 4., 5., 6., 7., 8.]))
         np.testing.assert_allclose(y, np.array([0.5, 1.5, 2.5]))
+        np.testing.assert_allclose(z, np.array([[2, 2, 2, 2, np.nan, np.nan, np.nan, np.nan],
+                                                [np.nan, 2, 2, 2, 2, 2, 2, 2]]))
         # contour from ragged histo data
         x, y, z = funcs.get_matrix_2d_ragged(self.ws2d_histo_rag, True, histogram2D=False)
         np.testing.assert_allclose(x, np.array([1.5, 2.4375, 3.375, 4.3125, 5.25, 6.1875, 7.125, 8.0625, 9.]))
@@ -638,6 +640,12 @@ class HelperFunctionsTest(unittest.TestCase):
         self.assertTrue(np.array_equal([2.0, 5.0, 8.0, 11.0], y))
         self.assertTrue(np.array_equal([2.0, 5.0, 8.0, 11.0], dy))
 
+    def test_get_bins_ragged(self):
+        x, y, dy, dx = funcs.get_bins(self.ws2d_point_uneven, 2, withDy=True)
+        np.testing.assert_allclose([0, 1], x)
+        np.testing.assert_allclose([3, 3], y)
+        np.testing.assert_allclose([0, 0], dy)
+
     @add_md_workspace_with_data(dimensions=3)
     def test_get_md_data2d_bin_bounds_raises_AssertionException_too_many_dims(self, mdws):
         self.assertRaises(AssertionError, funcs.get_md_data2d_bin_bounds, mdws, False)
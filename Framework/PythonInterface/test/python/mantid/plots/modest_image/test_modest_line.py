@@ -0,0 +1,63 @@
+from __future__ import print_function, division
+
+import unittest
+import numpy as np
+import matplotlib
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+
+from mantid.plots.modest_image import ModestLine, minmax_decimate
+from mantid.plots.modest_image.modest_line import plot
+
+
+class ModestLineTest(unittest.TestCase):
+
+    def tearDown(self):
+        plt.close('all')
+
+    def test_minmax_decimate_keeps_extremes(self):
+        x = np.linspace(0, 100, 100001)
+        y = np.sin(x)
+        y[12345] = 50.
+        y[54321] = -50.
+        xd, yd = minmax_decimate(x, y, 0, 100, 200)
+        self.assertTrue(len(xd) <= 4 * 200 + 8)
+        self.assertEqual(50., yd.max())
+        self.assertEqual(-50., yd.min())
+        self.assertTrue(np.all(np.diff(xd) >= 0))
+
+    def test_minmax_decimate_keeps_only_the_visible_range(self):
+        x = np.arange(100000, dtype=np.float64)
+        xd, yd = minmax_decimate(x, x, 1000, 2000, 100)
+        self.assertEqual(999, xd[0])
+        self.assertEqual(2001, xd[-1])
+
+    def test_minmax_decimate_does_nothing_for_few_points(self):
+        x = np.arange(10, dtype=np.float64)
+        xd, yd = minmax_decimate(x, x, 0, 9, 100)
+        np.testing.assert_array_equal(x, xd)
+
+    def test_plot_creates_modest_lines_with_same_style(self):
+        fig, ax = plt.subplots()
+        x = np.arange(100000, dtype=np.float64)
+        lines = plot(ax, x, np.sin(x), 'r--', label='sin')
+        self.assertEqual(1, len(lines))
+        line = lines[0]
+        self.assertTrue(isinstance(line, ModestLine))
+        self.assertEqual([line], list(ax.lines))
+        self.assertEqual('r', line.get_color())
+        self.assertEqual('--', line.get_linestyle())
+        self.assertEqual('sin', line.get_label())
+
+    def test_full_resolution_data_is_kept_after_drawing(self):
+        fig, ax = plt.subplots()
+        x = np.arange(100000, dtype=np.float64)
+        line = plot(ax, x, np.sin(x))[0]
+        ax.set_xlim(10, 1000)
+        fig.canvas.draw()
+        self.assertEqual(len(x), len(line.get_xdata()))
+        self.assertEqual(len(x), len(line.get_path().vertices))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+from __future__ import print_function, division
+
+import unittest
+import numpy as np
+import matplotlib
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+from matplotlib.collections import QuadMesh
+
+from mantid.py3compat import mock
+from mantid.plots.modest_image import ModestMesh, block_extremes
+from mantid.plots.modest_image.modest_mesh import pcolormesh
+
+
+class ModestMeshTest(unittest.TestCase):
+
+    def tearDown(self):
+        plt.close('all')
+
+    def test_block_extremes_keeps_peaks_and_dips(self):
+        data = np.zeros((6, 9))
+        data[1, 1] = 5.
+        data[4, 7] = -5.
+        data[0, 8] = np.nan
+        reduced = block_extremes(data, 3, 3)
+        self.assertEqual((2, 3), reduced.shape)
+        np.testing.assert_array_equal([[5, 0, 0], [0, 0, -5]], reduced)
+
+    def test_block_extremes_keeps_dips_in_positive_data(self):
+        data = np.full((6, 6), 10.)
+        data[1, 1] = 50.
+        data[4, 4] = 2.
+        reduced = block_extremes(data, 3, 3)
+        np.testing.assert_array_equal([[50, 10], [10, 2]], reduced)
+
+    def test_pcolormesh_creates_modest_mesh_for_rectilinear_grid(self):
+        fig, ax = plt.subplots()
+        x, y = np.arange(2001), np.arange(501)
+        mesh = pcolormesh(ax, x, y, np.random.rand(500, 2000))
+        self.assertTrue(isinstance(mesh, ModestMesh))
+        self.assertEqual([mesh], list(ax.collections))
+        fig.canvas.draw()
+        self.assertEqual(500 * 2000, mesh.get_array().size)
+
+    def test_reduced_mesh_follows_the_visible_cells_after_zoom(self):
+        fig, ax = plt.subplots()
+        x, y = np.arange(2001), np.arange(501)
+        mesh = pcolormesh(ax, x, y, np.random.rand(500, 2000))
+        drawn = []
+
+        def record_mesh(artist, renderer, *args, **kwargs):
+            drawn.append(artist)
+
+        with mock.patch.object(QuadMesh, 'draw', autospec=True, side_effect=record_mesh):
+            fig.canvas.draw()
+            ax.set_xlim(100, 400)
+            mesh.set_clim(0.2, 0.8)
+            fig.canvas.draw()
+        self.assertEqual(2, len(drawn))
+        self.assertFalse(any(artist is mesh for artist in drawn))
+        self.assertNotEqual(drawn[0].get_array().shape, drawn[1].get_array().shape)
+        for artist in drawn:
+            self.assertTrue(artist.norm is mesh.norm)
+            self.assertEqual(mesh.get_cmap(), artist.get_cmap())
+        self.assertEqual((0.2, 0.8), drawn[1].get_clim())
+        self.assertEqual(500 * 2000, mesh.get_array().size)
+
+    def test_pcolormesh_keeps_quadmesh_for_distorted_grid(self):
+        fig, ax = plt.subplots()
+        x, y = np.meshgrid(np.arange(11), np.arange(6))
+        mesh = pcolormesh(ax, x + 0.1 * y, y, np.random.rand(5, 10))
+        self.assertFalse(isinstance(mesh, ModestMesh))
+
+
+if __name__ == '__main__':
+    unittest.main()
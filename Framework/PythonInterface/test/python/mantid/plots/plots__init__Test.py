@@ -13,6 +13,7 @@ from matplotlib.container import ErrorbarContainer
 import numpy as np
 import unittest
 
+from mantid.plots.modest_image import ModestLine, ModestMesh
 from mantid.plots.plotfunctions import get_colorplot_extents
 from mantid.api import WorkspaceFactory
 from mantid.simpleapi import (AnalysisDataService, CreateWorkspace,
@@ -108,6 +109,29 @@ class Plots__init__Test(unittest.TestCase):
         # try deleting
         self.ax.remove_workspace_artists(plot_data)
 
+    def test_replace_workspace_data_plot_with_many_points(self):
+        npoints = 50000
+        plot_data = CreateWorkspace(DataX=np.arange(npoints), DataY=np.ones(npoints), NSpec=1)
+        line = self.ax.plot(plot_data, specNum=1, color='r')[0]
+        self.assertTrue(isinstance(line, ModestLine))
+        self.fig.canvas.draw()
+        self.assertEqual(npoints, len(line.get_xdata()))
+        plot_data = CreateWorkspace(DataX=np.arange(npoints) + 10, DataY=np.ones(npoints), NSpec=1)
+        self.ax.replace_workspace_artists(plot_data)
+        self.assertAlmostEqual(10, line.get_xdata()[0])
+        self.assertEquals('r', line.get_color())
+        self.ax.remove_workspace_artists(plot_data)
+
+    def test_pcolormesh_with_many_cells_draws_modest_mesh(self):
+        nspec, nbins = 300, 1000
+        mesh_data = CreateWorkspace(DataX=np.tile(np.arange(nbins + 1), nspec),
+                                    DataY=np.ones(nspec * nbins), NSpec=nspec)
+        mesh = self.ax.pcolormesh(mesh_data)
+        self.assertTrue(isinstance(mesh, ModestMesh))
+        self.fig.canvas.draw()
+        self.assertEqual(nspec * nbins, mesh.get_array().size)
+        self.ax.remove_workspace_artists(mesh_data)
+
     def test_replace_workspace_data_errorbar(self):
         eb_data = CreateWorkspace(DataX=[10, 20, 30, 10, 20, 30, 10, 20, 30],
                                   DataY=[3, 4, 5, 3, 4, 5],
@@ -10,12 +10,6 @@ from mantid.simpleapi import Abins, DeleteWorkspace, mtd
 
 from AbinsModules import AbinsParameters, AbinsTestHelpers
 
-try:
-    from pathos.multiprocessing import ProcessingPool
-    PATHOS_FOUND = True
-except ImportError:
-    PATHOS_FOUND = False
-
 
 class AbinsAdvancedParametersTest(unittest.TestCase):
 
@@ -259,10 +253,9 @@ class AbinsAdvancedParametersTest(unittest.TestCase):
                           OutputWorkspace=self._wrk_name)
 
     def test_wrong_threads(self):
-        if PATHOS_FOUND:
-            AbinsParameters.threads = -1
-            self.assertRaises(RuntimeError, Abins, VibrationalOrPhononFile=self._Si2 + ".phonon",
-                              OutputWorkspace=self._wrk_name)
+        AbinsParameters.threads = -1
+        self.assertRaises(RuntimeError, Abins, VibrationalOrPhononFile=self._Si2 + ".phonon",
+                          OutputWorkspace=self._wrk_name)
 
     def test_good_case(self):
 
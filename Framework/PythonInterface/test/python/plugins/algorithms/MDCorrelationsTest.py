@@ -0,0 +1,74 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+import mantid  # noqa
+import mdcorrelations
+
+
+class FakeTrajectory(object):
+    def __init__(self, configuration, box_size):
+        self._configuration = np.asarray(configuration, dtype=np.float64)
+        self._box_size = np.asarray(box_size, dtype=np.float64)
+        self.n_timesteps, self.n_particles, self.n_dimensions = self._configuration.shape
+
+    def get_box_tensors(self):
+        return self._box_size.reshape((self.n_timesteps, 3, 3))
+
+    def frame_blocks(self, overlap=0, block_memory=None):
+        # One timestep per block
+        for start in range(self.n_timesteps - overlap):
+            yield start, start + 1, self._configuration[start:start + 1 + overlap]
+
+
+class MDCorrelationsTest(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(10)
+        self.n_steps = 9
+        self.velocities = np.random.rand(5, self.n_steps, 3) - 0.5
+        self.species = np.array([0, 1, 0, 1, 0])
+        self.norm = mdcorrelations.correlation_norm(self.n_steps)
+
+    def _correlate(self, u, v):
+        return sum(np.correlate(u[:, i], v[:, i], "same") / self.norm for i in range(3))
+
+    def test_velocities_are_unwrapped(self):
+        box = np.tile(np.diag([2., 2., 2.]).ravel(), (4, 1))
+        configuration = np.array([[[1.9, 1., 1.]], [[0.1, 1., 1.]], [[0.3, 1., 1.]], [[0.5, 1., 1.]]])
+
+        velocities = mdcorrelations.calculate_velocities(FakeTrajectory(configuration, box))
+
+        npt.assert_allclose(velocities[0, :, 0], [0.2, 0.2, 0.])
+        npt.assert_allclose(velocities[0, :, 1:], 0., atol=1e-15)
+
+    def test_auto_correlations_match_direct_correlation(self):
+        expected = np.zeros((2, self.n_steps))
+        for velocity, species in zip(self.velocities, self.species):
+            expected[species] += self._correlate(velocity, velocity)
+
+        npt.assert_allclose(mdcorrelations.auto_correlations(self.velocities, self.species, 2), expected)
+
+    def test_cross_correlations_match_direct_correlation(self):
+        expected = np.zeros((2, 2, self.n_steps))
+        for i in range(len(self.velocities)):
+            for j in range(i + 1, len(self.velocities)):
+                k, l = self.species[i], self.species[j]
+                if k <= l:
+                    expected[k, l] += self._correlate(self.velocities[i], self.velocities[j])
+                else:
+                    expected[l, k] += self._correlate(self.velocities[j], self.velocities[i])
+
+        npt.assert_allclose(mdcorrelations.cross_correlations(self.velocities, self.species, 2), expected, atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import numpy.testing as npt
+from scipy.io import netcdf
+
+import mantid  # noqa
+import mdtrajectory
+
+
+class MDTrajectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._file_name = os.path.join(self._directory, "trajectory.nc")
+        description = "S('water',[AC('m0',[A('o1',0),A('h1',1),A('h2',2)]),AC('m1',[A('o1',3),A('h1',4),A('h2',5)])])"
+        self._configuration = np.random.rand(5, 6, 3)
+
+        trajectory = netcdf.netcdf_file(self._file_name, mode="w")
+        trajectory.createDimension("description_length", len(description))
+        trajectory.createDimension("step", 5)
+        trajectory.createDimension("atom_number", 6)
+        trajectory.createDimension("xyz", 3)
+        trajectory.createDimension("box_size_length", 9)
+        trajectory.createVariable("description", "c", ("description_length",))[:] = np.array(list(description), "S1")
+        trajectory.createVariable("configuration", "d", ("step", "atom_number", "xyz"))[:] = self._configuration
+        trajectory.createVariable("box_size", "d", ("step", "box_size_length"))[:] = np.tile(np.eye(3).ravel(), (5, 1))
+        trajectory.close()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_particles_and_molecules_are_read_from_the_description(self):
+        with mdtrajectory.Trajectory(self._file_name) as trajectory:
+            self.assertEqual(["o", "h"], trajectory.elements)
+            self.assertEqual({0: "o", 1: "h", 2: "h", 3: "o", 4: "h", 5: "h"}, trajectory.atoms_to_species)
+            self.assertEqual([[0, 1, 2], [3, 4, 5]], trajectory.molecules_to_atoms)
+            self.assertEqual((5, 6, 3), (trajectory.n_timesteps, trajectory.n_particles, trajectory.n_dimensions))
+            npt.assert_equal(np.eye(3), trajectory.get_box_tensors()[4])
+
+    def test_frame_blocks_overlap(self):
+        with mdtrajectory.Trajectory(self._file_name) as trajectory:
+            blocks = list(trajectory.frame_blocks(overlap=2, block_memory=2 * 6 * 3 * 8))
+
+        self.assertEqual([(0, 2), (2, 3)], [(start, stop) for start, stop, _ in blocks])
+        npt.assert_equal(self._configuration[0:4], blocks[0][2])
+        npt.assert_equal(self._configuration[2:5], blocks[1][2])
+
+    def test_molecule_average(self):
+        average = mdtrajectory.molecule_average([[0, 1, 2], [3, 4, 5]], {0: "o", 1: "h", 2: "h", 3: "o", 4: "h", 5: "h"},
+                                                "h", 6)
+
+        npt.assert_allclose(average(self._configuration)[1], self._configuration[:, 4:6, :].mean(axis=1))
+
+    def test_minimum_image(self):
+        vectors = np.array([[[0.9, -0.6, 0.2]]])
+        npt.assert_allclose([[[-0.1, 0.4, 0.2]]], mdtrajectory.minimum_image(vectors, np.ones((1, 3))))
+
+
+if __name__ == "__main__":
+    unittest.main()
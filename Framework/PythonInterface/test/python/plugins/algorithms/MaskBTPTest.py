@@ -75,6 +75,19 @@ class MaskBTPTest(unittest.TestCase):
         self.assertTrue(detInfo.isMasked(4403)) #bank5, tube 3 (detID 4400)
         DeleteWorkspace(w)
 
+    def testDetectorIndexMatchesInstrumentTree(self):
+        m=MaskBTP(Instrument='CNCS', Bank="3", Tube="2", Pixel="1-3")
+        ep=mtd['CNCSMaskBTP'].getInstrument().getComponentByName("bank3")[0]
+        self.assertTrue(array_equal(m,[ep[1][p].getID() for p in range(3)]))
+        # A second call reuses the stored index
+        m=MaskBTP(Workspace='CNCSMaskBTP', Bank="3", Tube="2", Pixel="1-3")
+        self.assertTrue(array_equal(m,[ep[1][p].getID() for p in range(3)]))
+        # Banks which were not requested before are added to the index
+        ep=mtd['CNCSMaskBTP'].getInstrument().getComponentByName("bank7")[0]
+        m=MaskBTP(Workspace='CNCSMaskBTP', Bank="7", Tube="5", Pixel="4-6")
+        self.assertTrue(array_equal(m,[ep[4][p].getID() for p in range(3,6)]))
+        DeleteWorkspace('CNCSMaskBTP')
+
     def testSEQMaskBTP(self):
         MaskBTP(Instrument='SEQUOIA', Bank="23")
         MaskBTP(Instrument='SEQUOIA', Bank="24")
@@ -0,0 +1,53 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+import mantid  # noqa
+import paalmanpings
+
+
+class PaalmanPingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.waves = np.array([1., 2., 3.])
+        self.evaluated = []
+
+    def _corrections(self, angles):
+        self.evaluated.extend(angles)
+        return np.outer(angles, self.waves), np.outer(angles, -self.waves)
+
+    def test_corrections_are_in_spectrum_order(self):
+        angles = [30., 10., 20., 40., 50.]
+
+        first, second = paalmanpings.evaluate_angles(self._corrections, angles, 8, workers=2)
+
+        npt.assert_equal(first, np.outer(angles, self.waves))
+        npt.assert_equal(second, np.outer(angles, -self.waves))
+
+    def test_identical_angles_are_evaluated_once(self):
+        angles = [20., 10., 20., 10., 20.]
+
+        first, = paalmanpings.evaluate_angles(lambda block: self._corrections(block)[:1], angles, 8, workers=1)
+
+        self.assertEqual(sorted(self.evaluated), [10., 20.])
+        npt.assert_equal(first, np.outer(angles, self.waves))
+
+    def test_small_blocks_are_used_for_large_angle_memory(self):
+        angles = np.linspace(5., 100., 7)
+
+        first, _ = paalmanpings.evaluate_angles(self._corrections, angles, paalmanpings.BLOCK_MEMORY, workers=3)
+
+        npt.assert_equal(first, np.outer(angles, self.waves))
+        self.assertEqual(len(self.evaluated), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,13 +7,17 @@
 from __future__ import (absolute_import, division, print_function)
 import unittest
 
-from StretchedExpFTTestHelper import isregistered, do_fit
+from StretchedExpFTTestHelper import isregistered, do_fit, check_jacobian
 
 class PrimStretchedExpFTTest(unittest.TestCase):
 
     def testRegistered(self):
         self.assertTrue(*isregistered('PrimStretchedExpFT'))
 
+    def testJacobian(self):
+        """Test the derivatives agree with finite differences of the function"""
+        self.assertTrue(*check_jacobian('PrimStretchedExpFT'))
+
     def testGaussian(self):
         """ Test PrimStretchedExpFT against the binned-integrated of
          the Fourier transform of a gaussian
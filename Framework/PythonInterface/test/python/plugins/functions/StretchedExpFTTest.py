@@ -7,13 +7,17 @@
 from __future__ import (absolute_import, division, print_function)
 import unittest
 
-from StretchedExpFTTestHelper import isregistered, do_fit
+from StretchedExpFTTestHelper import isregistered, do_fit, check_jacobian
 
 class StretchedExpFTTest(unittest.TestCase):
 
     def testRegistered(self):
         self.assertTrue(*isregistered('StretchedExpFT'))
 
+    def testJacobian(self):
+        """Test the derivatives agree with finite differences of the function"""
+        self.assertTrue(*check_jacobian('StretchedExpFT'))
+
     def testGaussian(self):
         """ Test the Fourier transform of a gaussian is a Gaussian"""
         # Target parameters
@@ -81,6 +81,34 @@ def isregistered(function):
     return status, msg
 
 
+def check_jacobian(function):
+    """
+    Compare the derivatives of the function with finite differences of its values
+    :param function: name of the function
+    :return: success or failure of the comparison
+    """
+    f = FunctionFactory.createFunction(function)
+    p = {'Height': 2.0, 'Tau': 50.0, 'Beta': 0.7, 'Centre': 0.001}
+    dp = {'Tau': 1.0, 'Beta': 0.01, 'Centre': 0.0001}  # steps of the numerical derivatives
+    for name in p:
+        f.setParameter(name, p[name])
+    energies = np.arange(-0.1, 0.5, 0.0004)
+    jacobian = f.jacobian1D(energies)
+    f0 = f.evaluate1D(energies)
+    msg = ""
+    for ip in range(f.nParams()):
+        name = f.parameterName(ip)
+        if name == 'Height':
+            expected = f0 / p['Height']
+        else:
+            f.setParameter(name, p[name] + dp[name])
+            expected = (f.evaluate1D(energies) - f0) / dp[name]
+            f.setParameter(name, p[name])
+        if not np.allclose(jacobian[:, ip], expected, rtol=1e-6, atol=1e-9 * np.max(np.abs(expected))):
+            msg += " derivative with respect to {} differs".format(name)
+    return msg == "", msg
+
+
 def do_fit(tg, fString, shape):
     """
     Given a target shape and initial fit function guess, carry out the fit
@@ -0,0 +1,50 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+#pylint: disable=no-init,attribute-defined-outside-init,too-few-public-methods
+from __future__ import (absolute_import, division, print_function)
+
+import time
+
+import numpy as np
+import systemtesting
+from mantid.simpleapi import CreateWorkspace, EvaluateFunction, Gaussian, LinearBackground, Lorentzian
+
+
+class FunctionWrapperEvaluationTest(systemtesting.MantidSystemTest):
+    '''Compares the number of evaluations per second of fit functions called directly
+    on numpy arrays with evaluating them on a workspace with EvaluateFunction.
+    The rates depend on the machine, so they are reported but not checked.'''
+
+    DURATION = 2.0
+
+    def _evaluations_per_second(self, evaluate):
+        count = 0
+        time_start = time.time()
+        while time.time() - time_start < self.DURATION:
+            evaluate()
+            count += 1
+        return count / (time.time() - time_start)
+
+    def _compare(self, label, function, x):
+        ws = CreateWorkspace(DataX=x, DataY=x, StoreInADS=False)
+        expected = EvaluateFunction(function, ws, StoreInADS=False).readY(1)
+        self.assertTrue(np.allclose(function(x), expected), '{}: values differ from EvaluateFunction'.format(label))
+
+        direct = self._evaluations_per_second(lambda: function(x))
+        workspace = self._evaluations_per_second(
+            lambda: EvaluateFunction(function, CreateWorkspace(DataX=x, DataY=x, StoreInADS=False), StoreInADS=False))
+        print('{} ({} points): {:.0f} evaluations/s directly, {:.0f} evaluations/s with EvaluateFunction, '
+              'speed up {:.1f}'.format(label, len(x), direct, workspace, direct / workspace))
+        self.reportResult('{}_{}_speed_up'.format(label, len(x)), direct / workspace)
+
+    def runTest(self):
+        x = np.linspace(-10.0, 10.0, 1000)
+        self._compare('Gaussian', Gaussian(Height=10.0, PeakCentre=1.0, Sigma=2.0), x)
+        composite = (Gaussian(Height=10.0, PeakCentre=1.0, Sigma=2.0) + Lorentzian(Amplitude=5.0, PeakCentre=-2.0, FWHM=1.0)
+                     + LinearBackground(A0=1.0, A1=0.1))
+        self._compare('Composite', composite, x)
+        self._compare('Gaussian', Gaussian(Height=10.0, PeakCentre=1.0, Sigma=2.0), np.linspace(-10.0, 10.0, 100000))
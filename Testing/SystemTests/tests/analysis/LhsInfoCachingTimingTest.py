@@ -0,0 +1,56 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+#pylint: disable=no-init,attribute-defined-outside-init,too-few-public-methods
+from __future__ import (absolute_import, division, print_function)
+
+import time
+
+import systemtesting
+from mantid.kernel import funcinspect
+from mantid.simpleapi import CreateSingleValuedWorkspace
+
+
+def _assign_result():
+    a, b = funcinspect.lhs_info()
+    return a, b
+
+
+class LhsInfoCachingTimingTest(systemtesting.MantidSystemTest):
+    '''Compares the number of lhs_info calls per second with and without the
+    cache of the analysed caller code, and the same for a simpleapi call,
+    which uses lhs_info to name its output. The rates depend on the machine,
+    so they are reported but not checked.'''
+
+    DURATION = 2.0
+
+    def _calls_per_second(self, call):
+        count = 0
+        time_start = time.time()
+        while time.time() - time_start < self.DURATION:
+            call()
+            count += 1
+        return count / (time.time() - time_start)
+
+    def _compare(self, label, call):
+        cache_size = funcinspect._lhs_cache_max_size
+        try:
+            funcinspect._lhs_cache_max_size = 0
+            without_cache = self._calls_per_second(call)
+        finally:
+            funcinspect._lhs_cache_max_size = cache_size
+        with_cache = self._calls_per_second(call)
+        print('{}: {:.0f} calls/s without the cache, {:.0f} calls/s with the cache, '
+              'speed up {:.1f}'.format(label, without_cache, with_cache, with_cache / without_cache))
+        self.reportResult('{}_lhs_info_cache_speed_up'.format(label), with_cache / without_cache)
+
+    def runTest(self):
+        self._compare('lhs_info', _assign_result)
+
+        def _create_workspace():
+            ws = CreateSingleValuedWorkspace(DataValue=1.0, StoreInADS=False)
+            return ws
+        self._compare('simpleapi', _create_workspace)
@@ -0,0 +1,52 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+#pylint: disable=invalid-name
+from __future__ import (absolute_import, division, print_function)
+
+import time
+
+import systemtesting
+from mantid.api import FileFinder
+from sans.command_interface.ISISCommandInterface import (SANS2D, MaskFile, SetEventSlices, UseCompatibilityMode,
+                                                         AssignSample, AssignCan, TransmissionSample, TransmissionCan,
+                                                         WavRangeReduction)
+from sans.state.state_base import set_state_caching
+
+MASKFILE = FileFinder.getFullPath('MaskSANS2DReductionGUI.txt')
+
+
+class SANS2DSlicedReductionStateCachingTimingTest(systemtesting.MantidSystemTest):
+    '''Times a sliced reduction with and without the caching of serialized and deserialized states.
+    The times depend on the machine, so they are reported but not checked.'''
+
+    def _reduce(self):
+        UseCompatibilityMode()
+        SANS2D()
+        MaskFile(MASKFILE)
+        AssignSample('22048')
+        AssignCan('22023')
+        TransmissionSample('22041', '22024')
+        TransmissionCan('22024', '22024')
+        SetEventSlices("0.0-450, 5-10, 10-15, 15-20, 20-25, 25-30")
+        time_start = time.time()
+        WavRangeReduction()
+        return time.time() - time_start
+
+    def runTest(self):
+        # The first reduction loads the data, which is reused by the timed reductions
+        self._reduce()
+        try:
+            set_state_caching(False)
+            without_caching = self._reduce()
+        finally:
+            set_state_caching(True)
+        with_caching = self._reduce()
+        print('Sliced reduction: {:.2f}s without state caching, {:.2f}s with state caching, '
+              'speed up {:.2f}'.format(without_caching, with_caching, without_caching / with_caching))
+        self.reportResult('sliced_reduction_without_state_caching', without_caching)
+        self.reportResult('sliced_reduction_with_state_caching', with_caching)
+        self.reportResult('sliced_reduction_state_caching_speed_up', without_caching / with_caching)
@@ -61,5 +61,5 @@ s_absolute_threshold = 10e-8
 optimal_size = 5000000  # this is used to create optimal size of chunk energies for which S is calculated
 # Actual chunk of energies < optimal_size
 
-threads = 3  # number of threads used in parallel calculations
+threads = 3  # number of worker processes used in parallel calculations
 # Abins internal parameters end ###########################
@@ -7,12 +7,7 @@
 from __future__ import (absolute_import, division, print_function)
 import numpy as np
 import AbinsModules
-try:
-    # noinspection PyUnresolvedReferences
-    from pathos.multiprocessing import ProcessPool
-    PATHOS_FOUND = True
-except ImportError:
-    PATHOS_FOUND = False
+from AbinsModules.SharedMemoryPool import SharedMemoryPool
 
 
 # noinspection PyMethodMayBeStatic
@@ -49,10 +44,9 @@ class CalculatePowder(object):
         b_tensors = {}
         a_tensors = {}
 
-        if PATHOS_FOUND:
-            threads = AbinsModules.AbinsParameters.threads
-            p_local = ProcessPool(nodes=threads)
-            tensors = p_local.map(self._calculate_powder_k, k_indices)
+        threads = AbinsModules.AbinsParameters.threads
+        if threads > 1 and len(k_indices) > 1 and SharedMemoryPool.is_available():
+            tensors = self._calculate_powder_in_pool(k_indices=k_indices, threads=threads)
         else:
             tensors = [self._calculate_powder_k(k=k) for k in k_indices]
 
@@ -65,6 +59,35 @@ class CalculatePowder(object):
 
         return powder
 
+    def _calculate_powder_in_pool(self, k_indices=None, threads=None):
+        """
+        Calculates powder data for all k-points with a pool of worker processes, which write the tensors to shared
+        memory.
+        :param k_indices: k indices
+        :param threads: number of worker processes
+        :returns: list with a_tensors and b_tensors for each k-point
+        """
+        num_freq = [self._frequencies[k].size for k in k_indices]
+        float_type = AbinsModules.AbinsConstants.FLOAT_TYPE
+        arrays = {"a_tensors": ((len(k_indices), self._num_atoms, 3, 3), float_type),
+                  "b_tensors": ((len(k_indices), self._num_atoms, max(num_freq), 3, 3), float_type)}
+        with SharedMemoryPool(processes=min(threads, len(k_indices)), task=self._calculate_powder_k_shared,
+                              arrays=arrays) as pool:
+            pool.map(list(enumerate(k_indices)))
+            return [(np.copy(pool.arrays["a_tensors"][indx]), np.copy(pool.arrays["b_tensors"][indx, :, :size]))
+                    for indx, size in enumerate(num_freq)]
+
+    def _calculate_powder_k_shared(self, arrays=None, item=None):
+        """
+        Calculates powder data for one k-point in a worker process and writes it to shared memory.
+        :param arrays: dictionary with the shared arrays
+        :param item: position of the k-point in the shared arrays and k index
+        """
+        indx, k = item
+        a_tensors, b_tensors = self._calculate_powder_k(k=k)
+        arrays["a_tensors"][indx] = a_tensors
+        arrays["b_tensors"][indx, :, :b_tensors.shape[1]] = b_tensors
+
     def _calculate_powder_k(self, k=None):
         """
         :param k: k index
@@ -7,18 +7,14 @@
 from __future__ import (absolute_import, division, print_function)
 import AbinsModules
 import gc
-try:
-    # noinspection PyUnresolvedReferences
-    from pathos.multiprocessing import ProcessingPool
-    PATHOS_FOUND = True
-except ImportError:
-    PATHOS_FOUND = False
 import numpy as np
+from AbinsModules.SharedMemoryPool import SharedMemoryPool
 
 
 # Helper class for handling stability issues with S threshold for one atom and one quantum event.
 class StabilityError(Exception):
     def __init__(self, value=None):
+        super(StabilityError, self).__init__(value)
         self._value = value
 
     def __str__(self):
@@ -28,6 +24,7 @@ class StabilityError(Exception):
 # Helper class for handling stability issues with S threshold for all atoms and all quantum events.
 class StabilityErrorAllAtoms(Exception):
     def __init__(self, value=None):
+        super(StabilityErrorAllAtoms, self).__init__(value)
         self._value = value
 
     def __str__(self):
@@ -125,6 +122,7 @@ class SPowderSemiEmpiricalCalculator(object):
         self._b_traces = None
         self._atoms_data = None
         self._fundamentals_freq = None
+        self._pool = None
 
     def _calculate_s(self):
 
@@ -226,7 +224,7 @@ class SPowderSemiEmpiricalCalculator(object):
         intend = AbinsModules.AbinsConstants.S_THRESHOLD_CHANGE_INDENTATION
         if atom is None:
 
-            self._s_current_threshold = self._s_threshold_ref * 2**self._total_s_correction_num_attempt
+            self._s_current_threshold[:] = self._s_threshold_ref * 2**self._total_s_correction_num_attempt
             self._report_progress(
                 intend + "Threshold for S has been changed to {} for all atoms."
                 .format(self._s_current_threshold[0]) + " S for all atoms will be calculated from scratch.")
@@ -250,7 +248,7 @@ class SPowderSemiEmpiricalCalculator(object):
         """
         Reset threshold for S to the initial value.
         """
-        self._s_current_threshold = np.copy(self._s_threshold_ref)
+        self._s_current_threshold[:] = self._s_threshold_ref
         self._total_s_correction_num_attempt = 0
 
     def _calculate_s_powder_over_k(self):
@@ -258,12 +256,15 @@ class SPowderSemiEmpiricalCalculator(object):
         Helper function. It calculates S for all q points  and all atoms.
         :returns: dictionary with S
         """
-        data = self._calculate_s_powder_over_atoms(q_indx=self._q2_indices[0])
-
-        # iterate over remaining q-points
-        for q in self._q2_indices[1:]:
-            local_data = self._calculate_s_powder_over_atoms(q_indx=q)
-            self._sum_s(current_val=data, addition=local_data)
+        try:
+            data = self._calculate_s_powder_over_atoms(q_indx=self._q2_indices[0])
+
+            # iterate over remaining q-points
+            for q in self._q2_indices[1:]:
+                local_data = self._calculate_s_powder_over_atoms(q_indx=q)
+                self._sum_s(current_val=data, addition=local_data)
+        finally:
+            self._close_pool()
         return data
 
     def _sum_s(self, current_val=None, addition=None):
@@ -324,9 +325,8 @@ class SPowderSemiEmpiricalCalculator(object):
         atoms = range(self._num_atoms)
         self._prepare_data(k_point=q_indx)
 
-        if PATHOS_FOUND:
-            p_local = ProcessingPool(nodes=AbinsModules.AbinsParameters.threads)
-            result = p_local.map(self._calculate_s_powder_one_atom, atoms)
+        if self._use_pool():
+            result = self._calculate_s_powder_over_atoms_in_pool()
         else:
             result = [self._calculate_s_powder_one_atom(atom=atom) for atom in atoms]
 
@@ -335,6 +335,92 @@ class SPowderSemiEmpiricalCalculator(object):
             self._report_progress(msg="S for atom %s" % atom + " has been calculated.")
         return atoms_items
 
+    def _use_pool(self):
+        """
+        :returns: True if S for atoms should be calculated by a pool of worker processes
+        """
+        return (AbinsModules.AbinsParameters.threads > 1 and self._num_atoms > 1 and
+                SharedMemoryPool.is_available())
+
+    def _calculate_s_powder_over_atoms_in_pool(self):
+        """
+        Calculates S for all atoms with a pool of worker processes. The tensors, fundamentals, thresholds and S are
+        exchanged with the workers through shared memory, and the pool is reused for all k-points.
+        :returns: list with S for each atom
+        """
+        if self._pool is not None and self._pool.arrays["b_tensors"].shape != self._b_tensors.shape:
+            self._close_pool()
+        if self._pool is None:
+            self._start_pool()
+        arrays = self._pool.arrays
+
+        # share data for the current k-point
+        arrays["a_tensors"][...] = self._a_tensors
+        arrays["b_tensors"][...] = self._b_tensors
+        arrays["fundamentals_freq"][:self._fundamentals_freq.size] = self._fundamentals_freq
+        arrays["k_point"][...] = (self._fundamentals_freq.size, self._weight)
+
+        # Atoms with the largest mean square displacements give the largest number of transitions above the
+        # threshold, so they are handed out first to balance the work between the workers
+        atoms = np.argsort(-self._a_traces, kind="mergesort").tolist()
+        self._pool.map(atoms)
+
+        orders = range(AbinsModules.AbinsConstants.FUNDAMENTALS,
+                       self._quantum_order_num + AbinsModules.AbinsConstants.S_LAST_INDEX)
+        return [dict(("order_%s" % order, np.copy(arrays["s"][atom, indx])) for indx, order in enumerate(orders))
+                for atom in range(self._num_atoms)]
+
+    def _start_pool(self):
+        """
+        Starts the pool of worker processes. Thresholds of the calculator are moved to shared memory so that they are
+        seen by the workers and by this process.
+        """
+        num_orders = self._quantum_order_num + AbinsModules.AbinsConstants.S_LAST_INDEX - \
+            AbinsModules.AbinsConstants.FUNDAMENTALS
+        float_type = AbinsModules.AbinsConstants.FLOAT_TYPE
+        self._pool = SharedMemoryPool(
+            processes=AbinsModules.AbinsParameters.threads,
+            task=self._calculate_s_powder_one_atom_shared,
+            arrays={"a_tensors": (self._a_tensors.shape, self._a_tensors.dtype),
+                    "b_tensors": (self._b_tensors.shape, self._b_tensors.dtype),
+                    "fundamentals_freq": (self._b_tensors.shape[1], float_type),
+                    "k_point": (2, float_type),
+                    "s_current_threshold": (self._num_atoms, float_type),
+                    "max_s_previous_order": (self._num_atoms, float_type),
+                    "s": ((self._num_atoms, num_orders, self._freq_size), float_type)})
+        arrays = self._pool.arrays
+        arrays["s_current_threshold"][...] = self._s_current_threshold
+        arrays["max_s_previous_order"][...] = self._max_s_previous_order
+        self._s_current_threshold = arrays["s_current_threshold"]
+        self._max_s_previous_order = arrays["max_s_previous_order"]
+
+    def _close_pool(self):
+        if self._pool is not None:
+            self._s_current_threshold = np.copy(self._s_current_threshold)
+            self._max_s_previous_order = np.copy(self._max_s_previous_order)
+            self._pool.close()
+            self._pool = None
+
+    def _calculate_s_powder_one_atom_shared(self, arrays=None, atom=None):
+        """
+        Calculates S for one atom in a worker process, taking the input from and writing S to shared memory.
+        :param arrays: dictionary with the shared arrays
+        :param atom: number of atom
+        """
+        num_fundamentals, self._weight = arrays["k_point"]
+        self._a_tensors = arrays["a_tensors"]
+        self._b_tensors = arrays["b_tensors"]
+        self._a_traces = np.trace(a=self._a_tensors, axis1=1, axis2=2)
+        self._b_traces = np.trace(a=self._b_tensors, axis1=2, axis2=3)
+        self._fundamentals_freq = arrays["fundamentals_freq"][:int(num_fundamentals)]
+        self._s_current_threshold = arrays["s_current_threshold"]
+        self._max_s_previous_order = arrays["max_s_previous_order"]
+
+        s = self._calculate_s_powder_one_atom(atom=atom)
+        for indx, order in enumerate(range(AbinsModules.AbinsConstants.FUNDAMENTALS,
+                                           self._quantum_order_num + AbinsModules.AbinsConstants.S_LAST_INDEX)):
+            arrays["s"][atom, indx] = s["order_%s" % order]
+
     def _prepare_data(self, k_point=None):
         """
         Sets all necessary fields for 1D calculations. Sorts atom indices to improve parallelism.
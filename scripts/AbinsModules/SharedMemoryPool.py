@@ -0,0 +1,112 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+import sys
+import numpy as np
+
+# State of a worker process, set once when the worker starts
+_worker = {}
+
+
+def _get_fork_context():
+    """
+    Forking a process which runs Qt, as Mantid Workbench does, is only safe on Linux. On other platforms, e.g. macOS,
+    the child processes can crash or hang, so the callers fall back to calculating in the current process.
+
+    :returns: a multiprocessing context which starts workers with fork, or None if forking is not supported
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    if hasattr(multiprocessing, "get_context"):
+        try:
+            return multiprocessing.get_context("fork")
+        except ValueError:
+            return None
+    return multiprocessing
+
+
+def _init_worker(task, buffers):
+    _worker["task"] = task
+    _worker["arrays"] = dict((name, _as_array(*buffer)) for name, buffer in buffers.items())
+
+
+def _run_task(item):
+    return _worker["task"](_worker["arrays"], item)
+
+
+def _as_array(raw, dtype, shape):
+    return np.frombuffer(raw, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+class SharedMemoryPool(object):
+    """
+    Pool of worker processes which share numpy arrays with the parent process.
+
+    The arrays live in shared memory, so the parent can write the input of each round of tasks into them and the
+    workers can write their results straight into an output array. Only the task items and the return values of the
+    tasks are pickled. Workers are started with fork, hence the task does not need to be picklable and any object the
+    task refers to is inherited by the workers.
+
+    The task is called as task(arrays, item), where arrays is a dictionary with numpy views of the shared arrays.
+    """
+    def __init__(self, processes=None, task=None, arrays=None):
+        """
+        :param processes: number of worker processes, at most one per core is started
+        :param task: function called by the workers for each item
+        :param arrays: dictionary with the names of the shared arrays and tuples with their shape and dtype
+        """
+        context = _get_fork_context()
+        if context is None:
+            raise RuntimeError("Starting processes with fork is not supported on this platform.")
+
+        buffers = {}
+        self.arrays = {}
+        for name, (shape, dtype) in arrays.items():
+            dtype = np.dtype(dtype)
+            shape = tuple(int(dim) for dim in np.atleast_1d(shape))
+            raw = RawArray(ctypes.c_char, max(1, int(np.prod(shape)) * dtype.itemsize))
+            buffers[name] = (raw, dtype, shape)
+            self.arrays[name] = _as_array(raw, dtype, shape)
+
+        processes = min(processes or multiprocessing.cpu_count(), multiprocessing.cpu_count())
+        self._pool = context.Pool(processes=processes, initializer=_init_worker, initargs=(task, buffers))
+
+    @staticmethod
+    def is_available():
+        """
+        :returns: True if worker processes can be started with fork on this platform, which is only the case on Linux
+        """
+        return _get_fork_context() is not None
+
+    def map(self, items):
+        """
+        Runs the task for all items. Items are handed out one at a time, so items expected to take longest should
+        come first.
+        :param items: task items
+        :returns: list with the results for each item, in the order of items
+        """
+        return self._pool.map(_run_task, items, chunksize=1)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
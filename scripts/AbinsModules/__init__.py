@@ -33,6 +33,7 @@ from .LoadGAUSSIAN import LoadGAUSSIAN
 from .GeneralAbInitioParser import GeneralAbInitioParser
 
 # Calculating modules
+from .SharedMemoryPool import SharedMemoryPool
 from .CalculatePowder import CalculatePowder
 from .CalculateSingleCrystal import CalculateSingleCrystal
 from .CalculateDWSingleCrystal import CalculateDWSingleCrystal
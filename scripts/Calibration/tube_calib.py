@@ -11,6 +11,9 @@ The main function is :func:`getCalibration` which is at the end of this file.
 It populates an empty Calibration Table Workspace with the new positions of the pixel detectors after calibration.
 This Calibration Table Workspace can be used later to move the pixel detectors to the calibrated positions.
 
+The tubes are calibrated independently of each other on a pool of threads. The fits for a tube run as child
+algorithms on workspaces which are not stored in the ADS, and the algorithms release the GIL while they execute.
+
 Users should not need to directly call any other function other than :func:`getCalibration` from this file.
 
 """
@@ -19,8 +22,11 @@ Users should not need to directly call any other function other than :func:`getC
 from __future__ import absolute_import, division, print_function
 
 import numpy
+from multiprocessing.pool import ThreadPool
 from mantid.simpleapi import *
+from mantid.api import AlgorithmManager
 from mantid.kernel import *
+from mantid.kernel.environment import max_threads
 from tube_spec import TubeSpec
 from ideal_tube import IdealTube
 import re
@@ -82,6 +88,38 @@ def get_ypos(work_handle, pixel_float):
     return center_y
 
 
+def _create_workspace(x, y):
+    """Create a workspace that doesn't appear in the ADS"""
+    alg = AlgorithmManager.createUnmanaged('CreateWorkspace')
+    alg.initialize()
+    alg.setChild(True)
+    alg.setProperty('DataX', x)
+    alg.setProperty('DataY', y)
+    alg.setProperty('OutputWorkspace', 'dummy')
+    alg.execute()
+    return alg.getProperty('OutputWorkspace').value
+
+
+def _fit(ws, function, start, end, workspace_index=0):
+    """
+       Fit a function to a spectrum of a workspace without storing any workspace in the ADS
+
+       Return Value: The table of fitted parameters and the workspace with the data, the fit and the difference
+    """
+    alg = AlgorithmManager.createUnmanaged('Fit')
+    alg.initialize()
+    alg.setChild(True)
+    alg.setProperty('Function', function)
+    alg.setProperty('InputWorkspace', ws)
+    alg.setProperty('WorkspaceIndex', workspace_index)
+    alg.setProperty('StartX', float(start))
+    alg.setProperty('EndX', float(end))
+    alg.setProperty('CreateOutput', True)
+    alg.setProperty('Output', 'fit')
+    alg.execute()
+    return alg.getProperty('OutputParameters').value, alg.getProperty('OutputWorkspace').value
+
+
 def fit_gaussian_params(height, centre, sigma):  # Compose string argument for fit
     return "name=Gaussian, Height={0}, PeakCentre={1}, Sigma={2}".format(height, centre, sigma)
 
@@ -95,8 +133,8 @@ def fit_end_erfc_params(B, C):  # Compose string argument for fit
 #
 
 
-def fit_edges(fit_par, index, ws, output_ws):
-    # find the edge position
+def fit_edges(fit_par, index, ws):
+    # find the edge position. Returns the fitted centre and the fit workspace
     centre = fit_par.getPeaks()[index]
     outer_edge, inner_edge, end_grad = fit_par.getEdgeParameters()
     margin = fit_par.getMargin()
@@ -115,13 +153,12 @@ def fit_edges(fit_par, index, ws, output_ws):
         start = max(centre - inner_edge, 0)
         end = min(centre + outer_edge, right_limit)
         edgeMode = 1
-    Fit(InputWorkspace=ws, Function=fit_end_erfc_params(centre, end_grad * edgeMode), StartX=str(start), EndX=str(end),
-        Output=output_ws)
-    return 1  # peakIndex (center) -> parameter B of EndERFC
+    parameters, fit_ws = _fit(ws, fit_end_erfc_params(centre, end_grad * edgeMode), start, end)
+    return parameters.row(1)['Value'], fit_ws  # peakIndex (center) -> parameter B of EndERFC
 
 
-def fit_gaussian(fit_par, index, ws, output_ws):
-    # find the peak position
+def fit_gaussian(fit_par, index, ws):
+    # find the peak position. Returns the fitted centre and the fit workspace
     centre = fit_par.getPeaks()[index]
     margin = fit_par.getMargin()
 
@@ -161,8 +198,7 @@ def fit_gaussian(fit_par, index, ws, output_ws):
         fit_msg = 'name=LinearBackground,A0=%f;name=Gaussian,Height=%f,PeakCentre=%f,Sigma=%f' % (
                   background, height, centre, width)
 
-        Fit(InputWorkspace=ws, Function=fit_msg,
-            StartX=str(start), EndX=str(end), Output=output_ws)
+        parameters, fit_ws = _fit(ws, fit_msg, start, end)
 
         peak_index = 3
 
@@ -176,15 +212,13 @@ def fit_gaussian(fit_par, index, ws, output_ws):
         # fit the input data as a linear background + gaussian fit
         # it was seen that the best result for static general fitParamters,
         # is to divide the values in two fitting steps
-        Fit(InputWorkspace=ws, Function='name=LinearBackground,A0=%f' % background,
-            StartX=str(start), EndX=str(end), Output='Z1')
-        Fit(InputWorkspace='Z1_Workspace',
-            Function='name=Gaussian,Height=%f,PeakCentre=%f,Sigma=%f' % (height, centre, width),
-            WorkspaceIndex=2, StartX=str(start), EndX=str(end), Output=output_ws)
-        CloneWorkspace(output_ws + '_Workspace', OutputWorkspace='gauss_' + str(index))
+        _, background_ws = _fit(ws, 'name=LinearBackground,A0=%f' % background, start, end)
+        parameters, fit_ws = _fit(background_ws,
+                                  'name=Gaussian,Height=%f,PeakCentre=%f,Sigma=%f' % (height, centre, width),
+                                  start, end, workspace_index=2)
         peak_index = 1
 
-    return peak_index
+    return parameters.row(peak_index)['Value'], fit_ws
 
 
 def getPoints(integrated_ws, func_forms, fit_params, which_tube, show_plot=False):
@@ -213,7 +247,25 @@ def getPoints(integrated_ws, func_forms, fit_params, which_tube, show_plot=False
     if len(counts_y) == 0:
         return
     get_points_ws = CreateWorkspace(range(len(counts_y)), counts_y, OutputWorkspace='TubePlot')
-    calib_points_ws = 'CalibPoint'
+    results, fitted_x, fitted_y = _find_points(get_points_ws, func_forms, fit_params, keep_fitted=show_plot)
+
+    if show_plot:
+        CreateWorkspace(OutputWorkspace='FittedData', DataX=fitted_x, DataY=fitted_y)
+    return results
+
+
+def _find_points(tube_ws, func_forms, fit_params, keep_fitted=False):
+    """
+    Fit the slits or edges of one tube, as :func:`getPoints` but without storing any workspace in the ADS
+
+    :param tube_ws: Workspace with the integrated counts of the tube against the pixel index
+    :param func_forms: array of function form 1=slit/bar, 2=edge
+    :param fit_params: a TubeCalibFitParams object contain the fit parameters
+    :param keep_fitted: return the x and y values of the fitted functions, for plotting
+
+    :rtype: the slit/edge positions and the x and y values of the fitted functions, which are None
+        unless keep_fitted is True
+    """
     results = []
     fitt_y_values = []
     fitt_x_values = []
@@ -222,23 +274,17 @@ def getPoints(integrated_ws, func_forms, fit_params, which_tube, show_plot=False
     for i in range(len(func_forms)):
         if func_forms[i] == 2:
             # find the edge position
-            peak_index = fit_edges(fit_params, i, get_points_ws, calib_points_ws)
+            peak_centre, fit_ws = fit_edges(fit_params, i, tube_ws)
         else:
-            peak_index = fit_gaussian(fit_params, i, get_points_ws, calib_points_ws)
-
-        peak_centre = mtd[calib_points_ws + '_Parameters'].row(peak_index).items()[1][1]
+            peak_centre, fit_ws = fit_gaussian(fit_params, i, tube_ws)
         results.append(peak_centre)
+        if keep_fitted:
+            fitt_y_values.append(copy.copy(fit_ws.dataY(1)))
+            fitt_x_values.append(copy.copy(fit_ws.dataX(1)))
 
-        if show_plot:
-            ws = mtd[calib_points_ws + '_Workspace']
-            fitt_y_values.append(copy.copy(ws.dataY(1)))
-            fitt_x_values.append(copy.copy(ws.dataX(1)))
-
-    if show_plot:
-        CreateWorkspace(OutputWorkspace='FittedData',
-                        DataX=numpy.hstack(fitt_x_values),
-                        DataY=numpy.hstack(fitt_y_values))
-    return results
+    if not keep_fitted:
+        return results, None, None
+    return results, numpy.hstack(fitt_x_values), numpy.hstack(fitt_y_values)
 
 
 def get_ideal_tube_from_n_slits(integrated_workspace, slits):
@@ -292,7 +338,16 @@ def correct_tube(AP, BP, CP, nDets):
     return x_bin_new
 
 
-def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test_mode=False, polin_fit=2):
+def _report(message, messages=None):
+    """Print the message or, if a list of messages is given, add the message to it"""
+    if messages is None:
+        print(message)
+    else:
+        messages.append(message)
+
+
+def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test_mode=False, polin_fit=2,
+                               messages=None):
     """
        Corrects position errors in a tube given an array of points and their ideal positions.
 
@@ -302,6 +357,7 @@ def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test
        :param test_mode: If true, detectors at the position of a slit will be moved out of the way
                          to show the reckoned slit positions when the instrument is displayed.
        :param polin_fit: Order of the polynomial to fit for the ideal positions
+       :param messages: Optional list to collect the diagnostic messages in instead of printing them
 
        Return Value: Array of corrected Xs  (in same units as ideal tube points)
 
@@ -310,8 +366,8 @@ def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test
 
     # Check the arguments
     if len(tube_points) != len(ideal_tube_points):
-        print("Number of points in tube {0} must equal number of points in ideal tube {1}".
-              format(len(tube_points), len(ideal_tube_points)))
+        _report("Number of points in tube {0} must equal number of points in ideal tube {1}".
+                format(len(tube_points), len(ideal_tube_points)), messages)
         return x_result
 
     # Filter out rogue slit points
@@ -327,25 +383,22 @@ def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test
 
     # State number of rogue slit points, if any
     if len(tube_points) != len(used_tube_points):
-        print("Only {0} out of {1} slit points used. Missed {2}".format(len(used_tube_points), len(tube_points),
-                                                                        missed_tube_points))
+        _report("Only {0} out of {1} slit points used. Missed {2}".format(len(used_tube_points), len(tube_points),
+                                                                          missed_tube_points), messages)
 
     # Check number of usable points
     if len(used_tube_points) < 3:
-        print("Too few usable points in tube {0}".format(len(used_tube_points)))
+        _report("Too few usable points in tube {0}".format(len(used_tube_points)), messages)
         return []
 
     # Fit quadratic to ideal tube points
-    CreateWorkspace(dataX=used_tube_points, dataY=used_ideal_tube_points, OutputWorkspace="PolyFittingWorkspace")
+    poly_fitting_ws = _create_workspace(used_tube_points, used_ideal_tube_points)
     try:
-        Fit(InputWorkspace="PolyFittingWorkspace", Function='name=Polynomial,n=%d' % polin_fit, StartX=str(0.0),
-            EndX=str(n_detectors), Output="QF")
+        param_q_f, _ = _fit(poly_fitting_ws, 'name=Polynomial,n=%d' % polin_fit, 0.0, n_detectors)
     except:
-        print("Fit failed")
+        _report("Fit failed", messages)
         return []
 
-    param_q_f = mtd['QF_Parameters']
-
     # get the coefficients, get the Value from every row, and exclude the last one because it is the error
     # rowErr is the last one, it could be used to check accuracy of fit
     c = [r['Value'] for r in param_q_f][:-1]
@@ -356,7 +409,7 @@ def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test
     # In test mode, shove the pixels that are closest to the reckoned peaks
     # to the position of the first detector so that the resulting gaps can be seen.
     if test_mode:
-        print("TestMode code")
+        _report("TestMode code", messages)
         for i in range(len(used_tube_points)):
             x_result[int(used_tube_points[i])] = x_result[0]
 
@@ -364,7 +417,7 @@ def correct_tube_to_ideal_tube(tube_points, ideal_tube_points, n_detectors, test
 
 
 def getCalibratedPixelPositions(ws, tube_positions, ideal_tube_positions, which_tube, peak_test_mode=False,
-                                polin_fit=2):
+                                polin_fit=2, messages=None):
     """
        Get the calibrated detector positions for one tube
        The tube is specified by a list of workspace indices of its spectra
@@ -376,6 +429,7 @@ def getCalibratedPixelPositions(ws, tube_positions, ideal_tube_positions, which_
        :param which_tube:  a list of workspace indices for the tube
        :param peak_test_mode: true if shoving detectors that are reckoned to be at peak away (for test purposes)
        :param polin_fit: Order of the polynomial to fit for the ideal positions
+       :param messages: Optional list to collect the diagnostic messages in instead of printing them
 
        Return  Array of pixel detector IDs and array of their calibrated positions
     """
@@ -389,9 +443,10 @@ def getCalibratedPixelPositions(ws, tube_positions, ideal_tube_positions, which_
         return det_IDs, det_positions
 
     # Correct positions of detectors in tube by quadratic fit
-    pixels = correct_tube_to_ideal_tube(tube_positions, ideal_tube_positions, n_dets, test_mode=peak_test_mode, polin_fit=polin_fit)
+    pixels = correct_tube_to_ideal_tube(tube_positions, ideal_tube_positions, n_dets, test_mode=peak_test_mode,
+                                        polin_fit=polin_fit, messages=messages)
     if len(pixels) != n_dets:
-        print("Tube correction failed.")
+        _report("Tube correction failed.", messages)
         return det_IDs, det_positions
     base_instrument = ws.getInstrument().getBaseInstrument()
     # Get tube unit vector
@@ -403,7 +458,7 @@ def getCalibratedPixelPositions(ws, tube_positions, ideal_tube_positions, which_
     # identical to norm of vector: |dNpos - d0pos|
     tubeLength = det0.getDistance(detN)
     if tubeLength <= 0.0:
-        print("Zero length tube cannot be calibrated, calibration failed.")
+        _report("Zero length tube cannot be calibrated, calibration failed.", messages)
         return det_IDs, det_positions
     # unfortunately, the operation '/' is not defined in V3D object, so
     # I have to use the multiplication.
@@ -492,6 +547,8 @@ def getCalibration(ws, tubeSet, calibTable, fitPar, iTube, peaksTable,
 
 
     This is the main method called from :func:`~tube.calibrate` to perform the calibration.
+    Up to MultiThreaded.MaxCores tubes are calibrated at the same time, and the results are added to the tables
+    in the order of range_list.
     """
     n_tubes = tubeSet.getNumTubes()
     print("Number of tubes =", n_tubes)
@@ -501,13 +558,14 @@ def getCalibration(ws, tubeSet, calibTable, fitPar, iTube, peaksTable,
 
     all_skipped = set()
 
+    # Select the tubes to calibrate
+    tubes = []
     for i in range_list:
 
         # Deal with (i+1)st tube specified
         wht, skipped = tubeSet.getTube(i)
         all_skipped.update(skipped)
 
-        print("Calibrating tube", i + 1, "of", n_tubes, tubeSet.getTubeName(i))
         if len(wht) < 1:
             print("Unable to get any workspace indices (spectra) for this tube. Tube", tubeSet.getTubeName(i),
                   "not calibrated.")
@@ -519,6 +577,17 @@ def getCalibration(ws, tubeSet, calibTable, fitPar, iTube, peaksTable,
             # skip this tube
             continue
 
+        tubes.append((i, wht))
+
+    func_forms = iTube.getFunctionalForms()
+    ideal_tube = iTube.getArray()
+
+    def calibrate_tube(tube):
+        i, wht = tube
+        counts_y = None
+        # the messages are printed with the tube they belong to once its results are collected
+        messages = []
+
         ##############################
         # Define Peak Position session
         ##############################
@@ -526,44 +595,57 @@ def getCalibration(ws, tubeSet, calibTable, fitPar, iTube, peaksTable,
         # if this tube is to be override, get the peaks positions for this tube.
         if i in overridePeaks:
             actual_tube = overridePeaks[i]
+            fitted_x, fitted_y = None, None
         else:
             # find the peaks positions
-            plot_this_tube = i in plotTube
-            actual_tube = getPoints(ws, iTube.getFunctionalForms(), fitPar, wht, show_plot=plot_this_tube)
-            if plot_this_tube:
-                RenameWorkspace('FittedData', OutputWorkspace='FittedTube%d' % (i))
-                RenameWorkspace('TubePlot', OutputWorkspace='TubePlot%d' % (i))
-
-        # Set the peak positions at the peakTable
-        peaksTable.addRow([tubeSet.getTubeName(i)] + list(actual_tube))
+            counts_y = numpy.array([ws.dataY(j)[0] for j in wht])
+            tube_ws = _create_workspace(numpy.arange(len(counts_y)), counts_y)
+            actual_tube, fitted_x, fitted_y = _find_points(tube_ws, func_forms, fitPar, keep_fitted=i in plotTube)
 
         ##########################################
         # Define the correct position of detectors
         ##########################################
 
-        det_id_list, det_position_list = getCalibratedPixelPositions(ws, actual_tube, iTube.getArray(), wht,
-                                                                     peaksTestMode, polinFit)
-        # save the detector positions to calibTable
-        if len(det_id_list) == len(wht):  # We have corrected positions
-            for j in range(len(wht)):
-                next_row = {'Detector ID': det_id_list[j], 'Detector Position': det_position_list[j]}
-                calibTable.addRow(next_row)
+        det_id_list, det_position_list = getCalibratedPixelPositions(ws, actual_tube, ideal_tube, wht,
+                                                                     peaksTestMode, polinFit, messages)
+        return actual_tube, det_id_list, det_position_list, counts_y, fitted_x, fitted_y, messages
+
+    # Calibrate the tubes concurrently and collect the results in order
+    workers = max_threads()
+    pool = None
+    if workers > 1 and len(tubes) > 1:
+        pool = ThreadPool(min(workers, len(tubes)))
+        results = pool.imap(calibrate_tube, tubes)
+    else:
+        results = (calibrate_tube(tube) for tube in tubes)
+    try:
+        for (i, wht), result in zip(tubes, results):
+            actual_tube, det_id_list, det_position_list, counts_y, fitted_x, fitted_y, messages = result
+            print("Calibrated tube", i + 1, "of", n_tubes, tubeSet.getTubeName(i))
+            for message in messages:
+                print(message)
+
+            if i in plotTube and counts_y is not None:
+                CreateWorkspace(OutputWorkspace='FittedTube%d' % (i), DataX=fitted_x, DataY=fitted_y)
+                CreateWorkspace(OutputWorkspace='TubePlot%d' % (i), DataX=numpy.arange(len(counts_y)), DataY=counts_y)
+
+            # Set the peak positions at the peakTable
+            peaksTable.addRow([tubeSet.getTubeName(i)] + list(actual_tube))
+
+            # save the detector positions to calibTable
+            if len(det_id_list) == len(wht):  # We have corrected positions
+                for j in range(len(wht)):
+                    next_row = {'Detector ID': det_id_list[j], 'Detector Position': det_position_list[j]}
+                    calibTable.addRow(next_row)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
 
     if len(all_skipped) > 0:
         print("%i histogram(s) were excluded from the calibration since they did not have an assigned detector." % len(
             all_skipped))
 
-    # Delete temporary workspaces used in the calibration
-    for ws_name in ('TubePlot', 'CalibPoint_NormalisedCovarianceMatrix',
-                    'CalibPoint_NormalisedCovarianceMatrix', 'CalibPoint_NormalisedCovarianceMatrix',
-                    'CalibPoint_Parameters', 'CalibPoint_Workspace', 'PolyFittingWorkspace',
-                    'QF_NormalisedCovarianceMatrix', 'QF_Parameters', 'QF_Workspace',
-                    'Z1_Workspace', 'Z1_Parameters', 'Z1_NormalisedCovarianceMatrix'):
-        try:
-            DeleteWorkspace(ws_name)
-        except:
-            pass
-
 
 def getCalibrationFromPeakFile(ws, calibTable, iTube, PeakFile):
     """
@@ -605,15 +687,6 @@ def getCalibrationFromPeakFile(ws, calibTable, iTube, PeakFile):
                 next_row = {'Detector ID': det_id_list[j], 'Detector Position': det_pos_list[j]}
                 calibTable.addRow(next_row)
 
-    if n_tubes == 0:
-        return
-
-    # Delete temporary workspaces for getting new detector positions
-    DeleteWorkspace('PolyFittingWorkspace')
-    DeleteWorkspace('QF_NormalisedCovarianceMatrix')
-    DeleteWorkspace('QF_Parameters')
-    DeleteWorkspace('QF_Workspace')
-
 
 ## implement this function
 def constructIdealTubeFromRealTube(ws, tube, fitPar, funcForm):
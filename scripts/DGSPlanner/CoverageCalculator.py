@@ -0,0 +1,280 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+# pylint: disable=invalid-name,too-many-arguments,too-many-locals
+"""
+Reciprocal space coverage of a direct geometry spectrometer for a grid of goniometer settings.
+
+This is the calculation of the CalculateCoverageDGS algorithm, done for all goniometer settings at once
+from the rotation matrices, without a workspace for each setting. Every unmasked detector sees a straight
+line in (Q1, Q2, Q3) as the final momentum goes from kf(DeltaE min) to kf(DeltaE max). As in the algorithm,
+the lines are clipped to the largest ranges of Q1, Q2 and Q3 and split at the lower edges of the bins of all
+four dimensions. A bin of the first two dimensions is covered if the middle of a piece of a line falls into
+it and inside the limits of the other two dimensions.
+"""
+from __future__ import (absolute_import, division, print_function)
+from collections import OrderedDict
+import numpy
+
+# 8 pi^2 m_n meV 1e-20 / h^2 with the values of Mantid's PhysicalConstants: E[meV] = k[1/Angstrom]^2 / ENERGY_TO_K
+ENERGY_TO_K = 8.0 * numpy.pi ** 2 * 1.674927211e-27 * 1.602176487e-22 * 1e-20 / 6.62606896e-34 ** 2
+
+DIMENSIONS = ['Q1', 'Q2', 'Q3', 'DeltaE']
+
+# Approximate amount of memory used for the lines of one block of goniometer settings
+BLOCK_MEMORY = 1 << 27
+
+# Number of coverage results to keep
+CACHE_SIZE = 16
+
+_cache = OrderedDict()
+
+
+def detector_angles(workspace):
+    """
+    Returns the polar and azimuthal angles of the unmasked detectors of a workspace, excluding monitors
+    """
+    detector_info = workspace.detectorInfo()
+    positions = numpy.array([detector_info.position(i) for i in range(detector_info.size())
+                             if not (detector_info.isMasked(i) or detector_info.isMonitor(i))]).reshape(-1, 3)
+    two_theta = numpy.arccos(positions[:, 2] / numpy.linalg.norm(positions, axis=1))
+    phi = numpy.arctan2(positions[:, 1], positions[:, 0])
+    return two_theta, phi
+
+
+def goniometer_matrices(axis_values, directions, senses):
+    """
+    Returns the rotation matrices of the goniometer settings, as SetGoniometer would create them
+    @param axis_values: list of arrays of angles in degrees for each axis. The settings are all the
+                        combinations, with the last axis changing fastest
+    @param directions: the direction of each axis, as strings 'x,y,z'
+    @param senses: the sense of each axis, 1 for counterclockwise, -1 for clockwise
+    @return array of shape settings x 3 x 3
+    """
+    matrices = numpy.eye(3)[numpy.newaxis]
+    for values, direction, sense in zip(axis_values, directions, senses):
+        axis = numpy.array([float(x) for x in direction.split(',')])
+        axis /= numpy.linalg.norm(axis)
+        angles = numpy.radians(numpy.asarray(values, dtype=numpy.float64) * sense)
+        # Rodrigues' rotation formula
+        cross = numpy.array([[0., -axis[2], axis[1]], [axis[2], 0., -axis[0]], [-axis[1], axis[0], 0.]])
+        rotations = (numpy.eye(3) + numpy.sin(angles)[:, numpy.newaxis, numpy.newaxis] * cross
+                     + (1. - numpy.cos(angles))[:, numpy.newaxis, numpy.newaxis] * cross.dot(cross))
+        matrices = numpy.einsum('aij,bjk->abik', matrices, rotations).reshape(-1, 3, 3)
+    return matrices
+
+
+class CoverageGrid(object):
+    """
+    The bins of the coverage, as CalculateCoverageDGS defines them. Only the first two dimensions are binned.
+    """
+    def __init__(self, two_theta_max, ub, basis, ei, dim_index, dim_min, dim_max, dim_step):
+        """
+        @param two_theta_max: largest scattering angle of the detectors in radians
+        @param ub: the UB matrix
+        @param basis: the Q1, Q2 and Q3 projection directions, as lists of 3 numbers
+        @param ei: incident energy in meV
+        @param dim_index: index in DIMENSIONS of each of the four dimensions
+        @param dim_min: minimum of each dimension, None for the largest range
+        @param dim_max: maximum of each dimension, None for the largest range
+        @param dim_step: step of the first two dimensions, None to integrate
+        """
+        self.ei = ei
+        self.dim_index = list(dim_index)
+        if sorted(self.dim_index) != [0, 1, 2, 3]:
+            raise ValueError("Please make sure each dimension is selected only once.")
+        ranges = [(dim_min[i], dim_max[i], dim_step[i] if i < 2 else None) for i in range(4)]
+        ranges = [ranges[self.dim_index.index(d)] for d in range(4)]
+
+        de_min, de_max, de_step = ranges[3]
+        de_min = -ei if de_min is None else de_min
+        de_max = ei if de_max is None else de_max
+        de_bins, de_max = self._bins(de_min, de_max, de_step)
+        self.ki = numpy.sqrt(ENERGY_TO_K * ei)
+        self.kf_min = numpy.sqrt(ENERGY_TO_K * (ei - de_min)) if ei > de_min else 0.
+        self.kf_max = numpy.sqrt(ENERGY_TO_K * (ei - de_max)) if ei > de_max else 0.
+        q_max = max(numpy.sqrt(self.ki ** 2 + kf ** 2 - 2. * self.ki * kf * numpy.cos(two_theta_max))
+                    for kf in (self.kf_min, self.kf_max))
+
+        # Transforms Q in the lab frame, without goniometer rotation, to (Q1, Q2, Q3)
+        rubw = numpy.dot(numpy.asarray(ub, dtype=numpy.float64), numpy.array(basis, dtype=numpy.float64).T) * 2. * numpy.pi
+        self.rubw_inverse = numpy.linalg.inv(rubw)
+        # The real space lattice parameters of rubw give the largest ranges of Q1, Q2 and Q3
+        lattice = numpy.sqrt(numpy.diag(numpy.linalg.inv(numpy.dot(rubw.T, rubw))))
+        self.q_limits = numpy.array([-q_max * lattice, q_max * lattice]).T
+
+        self.minimum, self.maximum, self.bins = [], [], []
+        for d in range(3):
+            q_min, q_max_d, q_step = ranges[d]
+            q_min = self.q_limits[d, 0] if q_min is None else q_min
+            q_max_d = self.q_limits[d, 1] if q_max_d is None else q_max_d
+            if q_min >= q_max_d:
+                raise ValueError("{0}max has to be greater than {0}min".format(DIMENSIONS[d]))
+            bins, q_max_d = self._bins(q_min, q_max_d, q_step)
+            self.minimum.append(q_min)
+            self.maximum.append(q_max_d)
+            self.bins.append(bins)
+        self.minimum.append(de_min)
+        self.maximum.append(de_max)
+        self.bins.append(de_bins)
+        # In the order of the dimensions of the coverage
+        self.minimum = [self.minimum[d] for d in self.dim_index]
+        self.maximum = [self.maximum[d] for d in self.dim_index]
+        self.bins = [self.bins[d] for d in self.dim_index]
+        # The workspace of CalculateCoverageDGS keeps the limits and bin widths in single precision
+        self.origin = [numpy.float32(minimum) for minimum in self.minimum]
+        self.width = [(numpy.float32(maximum) - origin) / numpy.float32(bins)
+                      for maximum, origin, bins in zip(self.maximum, self.origin, self.bins)]
+
+    @staticmethod
+    def _bins(minimum, maximum, step):
+        if step is None:
+            return 1, maximum
+        bins = int((maximum - minimum) / step)
+        if step * bins + minimum < maximum:
+            bins += 1
+            maximum = step * bins + minimum
+        return bins, maximum
+
+    def edges(self, position):
+        """
+        Returns the lower edges of the bins of the dimension at a position
+        """
+        return numpy.arange(self.bins[position], dtype=numpy.float32) * self.width[position] + self.origin[position]
+
+    def bin_indices(self, coordinates, position):
+        """
+        Returns the bins of single precision coordinates of the dimension at a position, -1 outside the limits
+        """
+        x = coordinates - self.origin[position]
+        box_length = (self.width[position] + self.origin[position]) - self.origin[position]
+        indices = (x / box_length).astype(numpy.int64)
+        return numpy.where((x < 0) | (indices >= self.bins[position]), -1, indices)
+
+    def coordinates(self, q_in, q_out, kf, dimension):
+        """
+        Returns a coordinate along the lines q_in - q_out * kf
+        @param dimension: index in DIMENSIONS
+        """
+        if dimension == 3:
+            return self.ei - kf ** 2 / ENERGY_TO_K
+        return q_in[..., dimension] - q_out[..., dimension] * kf
+
+    def crossing(self, q_in, q_out, value, dimension):
+        """
+        Returns the final momentum where the lines q_in - q_out * kf cross a value of a dimension
+        """
+        if dimension == 3:
+            return numpy.sqrt(ENERGY_TO_K * (self.ei - value))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return (q_in[..., dimension] - value) / q_out[..., dimension]
+
+
+def calculate_coverage(two_theta, phi, goniometers, ub, basis, ei, dim_index, dim_min, dim_max, dim_step,
+                       convention='Inelastic', block_memory=None):
+    """
+    Calculates the coverage of the goniometer settings in blocks.
+    See CoverageGrid for the description of the dimension parameters.
+    @param two_theta: polar angles of the detectors in radians
+    @param phi: azimuthal angles of the detectors in radians
+    @param goniometers: the rotation matrices of the goniometer settings, shape: settings x 3 x 3
+    @param convention: the Q.convention, 'Inelastic' or 'Crystallography'
+    @param block_memory: approximate memory for a block of settings in bytes, by default BLOCK_MEMORY
+    @return a generator yielding the grid, the number of settings calculated so far and an array with the
+            shape of the bins of the first two dimensions, with the index of the last of these settings
+            covering each bin or -1
+    """
+    two_theta = numpy.asarray(two_theta, dtype=numpy.float64)
+    phi = numpy.asarray(phi, dtype=numpy.float64)
+    goniometers = numpy.asarray(goniometers, dtype=numpy.float64).reshape(-1, 3, 3)
+    grid = CoverageGrid(numpy.max(two_theta), ub, basis, ei, dim_index, dim_min, dim_max, dim_step)
+    last = numpy.full(grid.bins[:2], -1, dtype=numpy.int64)
+
+    directions = numpy.array([numpy.sin(two_theta) * numpy.cos(phi), numpy.sin(two_theta) * numpy.sin(phi),
+                              numpy.cos(two_theta)]).T
+    sign = -1. if convention == 'Crystallography' else 1.
+    # Q = q_in - q_out * kf for each setting and detector
+    rotations = sign * numpy.einsum('ij,skj->sik', grid.rubw_inverse, goniometers)
+    settings_per_block = max(1, (block_memory or BLOCK_MEMORY) // (1024 * max(len(two_theta), 1)))
+
+    for start in range(0, len(goniometers), settings_per_block):
+        stop = min(start + settings_per_block, len(goniometers))
+        q_out = numpy.einsum('sij,nj->sni', rotations[start:stop], directions).reshape(-1, 3)
+        q_in = numpy.repeat(rotations[start:stop, :, 2] * grid.ki, len(two_theta), axis=0)
+        setting = numpy.repeat(numpy.arange(start, stop), len(two_theta))
+
+        # Clip the lines to the largest ranges of Q1, Q2 and Q3
+        kf_low = numpy.full(len(q_out), min(grid.kf_min, grid.kf_max))
+        kf_high = numpy.full(len(q_out), max(grid.kf_min, grid.kf_max))
+        for d in range(3):
+            lower, upper = grid.q_limits[d]
+            kf_lower, kf_upper = grid.crossing(q_in, q_out, lower, d), grid.crossing(q_in, q_out, upper, d)
+            parallel = numpy.abs(q_out[:, d]) < 1e-10
+            inside = (q_in[:, d] >= lower) & (q_in[:, d] <= upper)
+            kf_low = numpy.where(parallel, numpy.where(inside, kf_low, numpy.inf),
+                                 numpy.maximum(kf_low, numpy.minimum(kf_lower, kf_upper)))
+            kf_high = numpy.where(parallel, kf_high, numpy.minimum(kf_high, numpy.maximum(kf_lower, kf_upper)))
+        kept = kf_high - kf_low >= 1e-10
+        q_in, q_out, setting = q_in[kept], q_out[kept], setting[kept]
+        kf_low, kf_high = kf_low[kept], kf_high[kept]
+
+        # Split the lines where they cross the lower bin edges of all the dimensions
+        lines = [numpy.arange(len(setting))] * 2
+        kfs = [kf_low, kf_high]
+        for position, d in enumerate(grid.dim_index):
+            edges = grid.edges(position).astype(numpy.float64)
+            width = edges[1] - edges[0] if len(edges) > 1 else 1.
+            ends = (grid.coordinates(q_in, q_out, kf_low, d), grid.coordinates(q_in, q_out, kf_high, d))
+            first = numpy.maximum(numpy.floor((numpy.minimum(*ends) - edges[0]) / width) + 1, 0)
+            last_edge = numpy.minimum(numpy.ceil((numpy.maximum(*ends) - edges[0]) / width) - 1, len(edges) - 1)
+            counts = numpy.maximum(last_edge - first + 1, 0).astype(numpy.int64)
+            crossed = numpy.repeat(numpy.arange(len(setting)), counts)
+            offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+            kf_crossed = grid.crossing(q_in[crossed], q_out[crossed],
+                                       edges[(numpy.repeat(first, counts) + offsets).astype(numpy.int64)], d)
+            strictly_inside = (kf_crossed > kf_low[crossed]) & (kf_crossed < kf_high[crossed])
+            lines.append(crossed[strictly_inside])
+            kfs.append(kf_crossed[strictly_inside])
+        lines = numpy.concatenate(lines)
+        kfs = numpy.concatenate(kfs)
+        order = numpy.lexsort((kfs, lines))
+        lines, kfs = lines[order], kfs[order]
+
+        # Mark the bins of the middle of each piece of the lines, if it is inside the limits of all dimensions
+        pieces = (lines[1:] == lines[:-1]) & (kfs[1:] - kfs[:-1] >= 1e-10)
+        piece_lines = lines[:-1][pieces]
+        middle = 0.5 * (kfs[:-1][pieces] + kfs[1:][pieces])
+        indices = []
+        for position, d in enumerate(grid.dim_index):
+            # The algorithm converts the single precision final momentum to energy transfer
+            kf = middle.astype(numpy.float32).astype(numpy.float64) if d == 3 else middle
+            coordinates = grid.coordinates(q_in[piece_lines], q_out[piece_lines], kf, d)
+            indices.append(grid.bin_indices(coordinates.astype(numpy.float32), position))
+        inside = numpy.all(numpy.array(indices) >= 0, axis=0)
+        piece_lines = piece_lines[inside]
+        indices = [index[inside] for index in indices[:2]]
+        # Later settings overwrite earlier ones
+        numpy.maximum.at(last, (indices[0], indices[1]), setting[piece_lines])
+        yield grid, stop, last
+
+
+def cached_coverage(key, *args, **kwargs):
+    """
+    As calculate_coverage, but the result is kept for the key and a cached result is returned in one block.
+    The key must identify all the arguments, for example the instrument, Ei, UB and goniometer axis grid.
+    """
+    if key in _cache:
+        result = _cache.pop(key)
+        _cache[key] = result
+        yield result
+        return
+    result = None
+    for result in calculate_coverage(*args, **kwargs):
+        yield result
+    if result is not None:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
@@ -10,6 +10,7 @@ from . import InstrumentSetupWidget
 from . import ClassicUBInputWidget
 from . import MatrixUBInputWidget
 from . import DimensionSelectorWidget
+from . import CoverageCalculator
 from qtpy import QtCore, QtWidgets
 import sys
 import mantid
@@ -23,6 +24,10 @@ from mpl_toolkits.axisartist import Subplot
 import numpy
 import copy
 import os
+import time
+
+# Minimum time in seconds between redraws of the plot while the coverage is calculated
+REDRAW_INTERVAL = 0.5
 
 
 def float2Input(x):
@@ -49,9 +54,8 @@ class DGSPlannerGUI(QtWidgets.QWidget):
         else:
             self.ol = mantid.geometry.OrientedLattice()
         self.masterDict = dict()  # holds info about instrument and ranges
-        self.updatedInstrument = False
-        self.updatedOL = False
-        self.wg = None  # workspace group
+        self.detectorAngles = None  # polar and azimuthal angles of the unmasked detectors
+        self.instrumentKey = None  # instrument, S2 and masks of detectorAngles
         self.instrumentWidget = InstrumentSetupWidget.InstrumentSetupWidget(self)
         self.setLayout(QtWidgets.QHBoxLayout())
         controlLayout = QtWidgets.QVBoxLayout()
@@ -124,9 +128,6 @@ class DGSPlannerGUI(QtWidgets.QWidget):
         version = ".".join(mantid.__version__.split(".")[:2])
         self.qt_url = 'qthelp://org.sphinx.mantidproject.' + version + '/doc/interfaces/DGS Planner.html'
         self.external_url = 'http://docs.mantidproject.org/nightly/interfaces/DGS Planner.html'
-        # control for cancel button
-        self.iterations = 0
-        self.progress_canceled = False
 
         # register startup
         mantid.UsageService.registerFeatureUsage("Interface", "DGSPlanner", False)
@@ -134,13 +135,10 @@ class DGSPlannerGUI(QtWidgets.QWidget):
     @QtCore.Slot(mantid.geometry.OrientedLattice)
     def updateUB(self, ol):
         self.ol = ol
-        self.updatedOL = True
         self.trajfig.clear()
 
     @QtCore.Slot(dict)
     def updateParams(self, d):
-        if self.sender() is self.instrumentWidget:
-            self.updatedInstrument = True
         if 'dimBasis' in d and 'dimBasis' in self.masterDict and d['dimBasis'] != self.masterDict['dimBasis']:
             self.needToClear = True
         if 'dimIndex' in d and 'dimIndex' in self.masterDict and d['dimIndex'] != self.masterDict['dimIndex']:
@@ -159,174 +157,105 @@ class DGSPlannerGUI(QtWidgets.QWidget):
         self.assistant_process.waitForFinished()
         event.accept()
 
-    def _create_goniometer_workspaces(self, gonioAxis0values, gonioAxis1values, gonioAxis2values, progressDialog):
-        groupingStrings = []
-        i = 0
-        for g0 in gonioAxis0values:
-            for g1 in gonioAxis1values:
-                for g2 in gonioAxis2values:
-                    name = "__temp_instrument" + str(i)
-                    i += 1
-                    progressDialog.setValue(i)
-                    progressDialog.setLabelText("Creating workspace %d of %d..." % (i, self.iterations))
-                    QtWidgets.qApp.processEvents()
-                    if progressDialog.wasCanceled():
-                        self.progress_canceled = True
-                        progressDialog.close()
-                        return None
-
-                    groupingStrings.append(name)
-                    mantid.simpleapi.CloneWorkspace("__temp_instrument", OutputWorkspace=name)
-                    mantid.simpleapi.SetGoniometer(Workspace=name,
-                                                   Axis0=str(g0) + "," + self.masterDict['gonioDirs'][0] +
-                                                   "," + str(self.masterDict['gonioSenses'][0]),
-                                                   Axis1=str(g1) + "," + self.masterDict['gonioDirs'][1] +
-                                                   "," + str(self.masterDict['gonioSenses'][1]),
-                                                   Axis2=str(g2) + "," + self.masterDict['gonioDirs'][2] +
-                                                   "," + str(self.masterDict['gonioSenses'][2]))
-        return groupingStrings
-
-    # pylint: disable=too-many-locals
-    def updateFigure(self):
-        # pylint: disable=too-many-branches
-        if self.updatedInstrument or self.progress_canceled:
-            self.progress_canceled = False
-            # get goniometer settings first
-            gonioAxis0values = numpy.arange(self.masterDict['gonioMinvals'][0],
-                                            self.masterDict['gonioMaxvals'][0] + 0.1 * self.masterDict['gonioSteps'][0],
-                                            self.masterDict['gonioSteps'][0])
-            gonioAxis1values = numpy.arange(self.masterDict['gonioMinvals'][1],
-                                            self.masterDict['gonioMaxvals'][1] + 0.1 * self.masterDict['gonioSteps'][1],
-                                            self.masterDict['gonioSteps'][1])
-            gonioAxis2values = numpy.arange(self.masterDict['gonioMinvals'][2],
-                                            self.masterDict['gonioMaxvals'][2] + 0.1 * self.masterDict['gonioSteps'][2],
-                                            self.masterDict['gonioSteps'][2])
-            self.iterations = len(gonioAxis0values) * len(gonioAxis1values) * len(gonioAxis2values)
-            if self.iterations > 10:
-                reply = QtWidgets.QMessageBox.warning(self, 'Goniometer',
-                                                      "More than 10 goniometer settings. This might be long.\n"
-                                                      "Are you sure you want to proceed?",
-                                                      QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
-                                                      QtWidgets.QMessageBox.No)
+    def _load_detector_angles(self):
+        """
+        Loads the instrument, applies the masks and returns the angles of the unmasked detectors,
+        or None if canceled
+        """
+        mantid.simpleapi.LoadEmptyInstrument(
+            mantid.api.ExperimentInfo.getInstrumentFilename(self.masterDict['instrument']),
+            OutputWorkspace="__temp_instrument")
+        if self.masterDict['instrument'] == 'HYSPEC':
+            mantid.simpleapi.AddSampleLog(Workspace="__temp_instrument", LogName='msd', LogText='1798.5',
+                                          LogType='Number Series')
+            mantid.simpleapi.AddSampleLog(Workspace="__temp_instrument", LogName='s2',
+                                          LogText=str(self.masterDict['S2']), LogType='Number Series')
+            mantid.simpleapi.LoadInstrument(Workspace="__temp_instrument", RewriteSpectraMap=True,
+                                            InstrumentName="HYSPEC")
+        elif self.masterDict['instrument'] == 'EXED':
+            mantid.simpleapi.RotateInstrumentComponent(Workspace="__temp_instrument",
+                                                       ComponentName='Tank',
+                                                       Y=1,
+                                                       Angle=str(self.masterDict['S2']),
+                                                       RelativeRotation=False)
+        # masking
+        if 'maskFilename' in self.masterDict and len(self.masterDict['maskFilename'].strip()) > 0:
+            try:
+                __maskWS = mantid.simpleapi.Load(self.masterDict['maskFilename'])
+                mantid.simpleapi.MaskDetectors(Workspace="__temp_instrument", MaskedWorkspace=__maskWS)
+            except (ValueError, RuntimeError) as e:
+                reply = QtWidgets.QMessageBox.critical(self, 'Error',
+                                                       "The following error has occurred in loading the mask:\n" +
+                                                       str(e) + "\nDo you want to continue without mask?",
+                                                       QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+                                                       QtWidgets.QMessageBox.No)
                 if reply == QtWidgets.QMessageBox.No:
-                    return
-
-            if self.wg is not None:
-                mantid.simpleapi.DeleteWorkspace(self.wg)
-
-            mantid.simpleapi.LoadEmptyInstrument(
-                mantid.api.ExperimentInfo.getInstrumentFilename(self.masterDict['instrument']),
-                OutputWorkspace="__temp_instrument")
-            if self.masterDict['instrument'] == 'HYSPEC':
-                mantid.simpleapi.AddSampleLog(Workspace="__temp_instrument", LogName='msd', LogText='1798.5',
-                                              LogType='Number Series')
-                mantid.simpleapi.AddSampleLog(Workspace="__temp_instrument", LogName='s2',
-                                              LogText=str(self.masterDict['S2']), LogType='Number Series')
-                mantid.simpleapi.LoadInstrument(Workspace="__temp_instrument", RewriteSpectraMap=True,
-                                                InstrumentName="HYSPEC")
-            elif self.masterDict['instrument'] == 'EXED':
-                mantid.simpleapi.RotateInstrumentComponent(Workspace="__temp_instrument",
-                                                           ComponentName='Tank',
-                                                           Y=1,
-                                                           Angle=str(self.masterDict['S2']),
-                                                           RelativeRotation=False)
-            # masking
-            if 'maskFilename' in self.masterDict and len(self.masterDict['maskFilename'].strip()) > 0:
-                try:
-                    __maskWS = mantid.simpleapi.Load(self.masterDict['maskFilename'])
-                    mantid.simpleapi.MaskDetectors(Workspace="__temp_instrument", MaskedWorkspace=__maskWS)
-                except (ValueError, RuntimeError) as e:
-                    reply = QtWidgets.QMessageBox.critical(self, 'Error',
-                                                           "The following error has occurred in loading the mask:\n" +
-                                                           str(e) + "\nDo you want to continue without mask?",
-                                                           QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
-                                                           QtWidgets.QMessageBox.No)
-                    if reply == QtWidgets.QMessageBox.No:
-                        return
-            if self.masterDict['makeFast']:
-                sp = list(range(mantid.mtd["__temp_instrument"].getNumberHistograms()))
-                tomask = sp[1::4] + sp[2::4] + sp[3::4]
-                mantid.simpleapi.MaskDetectors("__temp_instrument", SpectraList=tomask)
-
-            progressDialog = QtWidgets.QProgressDialog(self)
-            progressDialog.setMinimumDuration(0)
-            progressDialog.setCancelButtonText("&Cancel")
-            progressDialog.setRange(0, self.iterations)
-            progressDialog.setWindowTitle("DGSPlanner progress")
-
-            groupingStrings = self._create_goniometer_workspaces(gonioAxis0values, gonioAxis1values, gonioAxis2values,
-                                                                 progressDialog)
-            if groupingStrings is None:
-                return
-
-            progressDialog.close()
-            mantid.simpleapi.DeleteWorkspace("__temp_instrument")
-            self.wg = mantid.simpleapi.GroupWorkspaces(groupingStrings, OutputWorkspace="__temp_instrument")
-            self.updatedInstrument = False
-        # set the UB
-        if self.updatedOL or not self.wg[0].sample().hasOrientedLattice():
-            mantid.simpleapi.SetUB(self.wg, UB=self.ol.getUB())
-            self.updatedOL = False
-        # calculate coverage
-        dimensions = ['Q1', 'Q2', 'Q3', 'DeltaE']
-        progressDialog = QtWidgets.QProgressDialog(self)
-        progressDialog.setMinimumDuration(0)
-        progressDialog.setCancelButtonText("&Cancel")
-        progressDialog.setRange(0, self.iterations)
-        progressDialog.setWindowTitle("DGSPlanner progress")
-        for i in range(self.iterations):
-            progressDialog.setValue(i)
-            progressDialog.setLabelText("Calculating orientation %d of %d..." % (i, self.iterations))
-            QtWidgets.qApp.processEvents()
-            if progressDialog.wasCanceled():
-                self.progress_canceled = True
-                progressDialog.close()
-                return
-
-            __mdws = mantid.simpleapi.CalculateCoverageDGS(self.wg[i],
-                                                           Q1Basis=self.masterDict['dimBasis'][0],
-                                                           Q2Basis=self.masterDict['dimBasis'][1],
-                                                           Q3Basis=self.masterDict['dimBasis'][2],
-                                                           IncidentEnergy=self.masterDict['Ei'],
-                                                           Dimension1=dimensions[self.masterDict['dimIndex'][0]],
-                                                           Dimension1Min=float2Input(self.masterDict['dimMin'][0]),
-                                                           Dimension1Max=float2Input(self.masterDict['dimMax'][0]),
-                                                           Dimension1Step=float2Input(self.masterDict['dimStep'][0]),
-                                                           Dimension2=dimensions[self.masterDict['dimIndex'][1]],
-                                                           Dimension2Min=float2Input(self.masterDict['dimMin'][1]),
-                                                           Dimension2Max=float2Input(self.masterDict['dimMax'][1]),
-                                                           Dimension2Step=float2Input(self.masterDict['dimStep'][1]),
-                                                           Dimension3=dimensions[self.masterDict['dimIndex'][2]],
-                                                           Dimension3Min=float2Input(self.masterDict['dimMin'][2]),
-                                                           Dimension3Max=float2Input(self.masterDict['dimMax'][2]),
-                                                           Dimension4=dimensions[self.masterDict['dimIndex'][3]],
-                                                           Dimension4Min=float2Input(self.masterDict['dimMin'][3]),
-                                                           Dimension4Max=float2Input(self.masterDict['dimMax'][3]))
-
-            if i == 0:
-                intensity = __mdws.getSignalArray()[:, :, 0, 0] * 1.  # to make it writeable
-            else:
-                if self.colorButton.isChecked():
-                    tempintensity = __mdws.getSignalArray()[:, :, 0, 0]
-                    intensity[numpy.where(tempintensity > 0)] = i + 1.
-                else:
-                    tempintensity = __mdws.getSignalArray()[:, :, 0, 0]
-                    intensity[numpy.where(tempintensity > 0)] = 1.
-        progressDialog.close()
-        x = numpy.linspace(__mdws.getDimension(0).getMinimum(), __mdws.getDimension(0).getMaximum(), intensity.shape[0])
-        y = numpy.linspace(__mdws.getDimension(1).getMinimum(), __mdws.getDimension(1).getMaximum(), intensity.shape[1])
+                    mantid.simpleapi.DeleteWorkspace("__temp_instrument")
+                    return None
+        if self.masterDict['makeFast']:
+            sp = list(range(mantid.mtd["__temp_instrument"].getNumberHistograms()))
+            tomask = sp[1::4] + sp[2::4] + sp[3::4]
+            mantid.simpleapi.MaskDetectors("__temp_instrument", SpectraList=tomask)
+        angles = CoverageCalculator.detector_angles(mantid.mtd["__temp_instrument"])
+        mantid.simpleapi.DeleteWorkspace("__temp_instrument")
+        return angles
+
+    def _plot_coverage(self, grid, last):
+        """
+        Plots the coverage, colored by the last goniometer setting covering each bin if color by angle is checked
+        """
+        if self.colorButton.isChecked():
+            intensity = last + 1.
+        else:
+            intensity = (last >= 0) * 1.
+        x = numpy.linspace(grid.minimum[0], grid.maximum[0], intensity.shape[0])
+        y = numpy.linspace(grid.minimum[1], grid.maximum[1], intensity.shape[1])
         Y, X = numpy.meshgrid(y, x)
         xx, yy = self.tr(X, Y)
         Z = numpy.ma.masked_array(intensity, intensity == 0)
         Z = Z[:-1, :-1]
+        return self.trajfig.pcolorfast(xx, yy, Z)
+
+    # pylint: disable=too-many-locals
+    def updateFigure(self):
+        maskFilename = self.masterDict.get('maskFilename', '').strip()
+        # a mask file changed on disk under the same name needs the instrument to be loaded again
+        maskPath = mantid.api.FileFinder.getFullPath(maskFilename) if maskFilename else ''
+        maskTime = os.path.getmtime(maskPath) if maskPath and os.path.isfile(maskPath) else None
+        instrumentKey = (self.masterDict['instrument'], self.masterDict['S2'], maskFilename, maskTime,
+                         self.masterDict['makeFast'])
+        if self.detectorAngles is None or instrumentKey != self.instrumentKey:
+            detectorAngles = self._load_detector_angles()
+            if detectorAngles is None:
+                return
+            self.detectorAngles, self.instrumentKey = detectorAngles, instrumentKey
+        # goniometer settings
+        gonioValues = [numpy.arange(self.masterDict['gonioMinvals'][i],
+                                    self.masterDict['gonioMaxvals'][i] + 0.1 * self.masterDict['gonioSteps'][i],
+                                    self.masterDict['gonioSteps'][i]) for i in range(3)]
+        goniometers = CoverageCalculator.goniometer_matrices(gonioValues, self.masterDict['gonioDirs'],
+                                                             self.masterDict['gonioSenses'])
+        UB = self.ol.getUB()
+        basis = [[float(temp) for temp in b.split(',')] for b in self.masterDict['dimBasis']]
+        dimMin = [float2Input(x) for x in self.masterDict['dimMin']]
+        dimMax = [float2Input(x) for x in self.masterDict['dimMax']]
+        dimStep = [float2Input(x) for x in self.masterDict['dimStep']]
+        convention = mantid.kernel.config['Q.convention']
+        # the coverage of the same settings is calculated only once
+        key = (instrumentKey, self.masterDict['Ei'], tuple(numpy.ravel(UB)),
+               tuple(tuple(values) for values in gonioValues), tuple(self.masterDict['gonioDirs']),
+               tuple(self.masterDict['gonioSenses']), tuple(self.masterDict['dimBasis']),
+               tuple(self.masterDict['dimIndex']), tuple(dimMin), tuple(dimMax), tuple(dimStep), convention)
+        coverage = CoverageCalculator.cached_coverage(key, self.detectorAngles[0], self.detectorAngles[1], goniometers,
+                                                      UB, basis, self.masterDict['Ei'], self.masterDict['dimIndex'],
+                                                      dimMin, dimMax, dimStep, convention)
+
         # plotting
         if self.sender() is self.plotButton or self.needToClear:
             self.figure.clear()
             self.trajfig.clear()
             self.figure.add_subplot(self.trajfig)
             self.needToClear = False
-        self.trajfig.pcolorfast(xx, yy, Z)
-
         if self.aspectButton.isChecked():
             self.trajfig.set_aspect(1.)
         else:
@@ -334,8 +263,31 @@ class DGSPlannerGUI(QtWidgets.QWidget):
         self.trajfig.set_xlabel(self.masterDict['dimNames'][0])
         self.trajfig.set_ylabel(self.masterDict['dimNames'][1])
         self.trajfig.grid(True)
-        self.canvas.draw()
-        mantid.simpleapi.DeleteWorkspace(__mdws)
+
+        # calculate coverage, redrawing the plot as the goniometer settings are calculated
+        progressDialog = QtWidgets.QProgressDialog(self)
+        progressDialog.setMinimumDuration(0)
+        progressDialog.setCancelButtonText("&Cancel")
+        progressDialog.setRange(0, len(goniometers))
+        progressDialog.setWindowTitle("DGSPlanner progress")
+        mesh = None
+        drawn = 0.
+        try:
+            for grid, done, last in coverage:
+                progressDialog.setValue(done)
+                progressDialog.setLabelText("Calculated orientation %d of %d..." % (done, len(goniometers)))
+                QtWidgets.qApp.processEvents()
+                canceled = progressDialog.wasCanceled()
+                if canceled or done == len(goniometers) or time.time() - drawn > REDRAW_INTERVAL:
+                    if mesh is not None:
+                        mesh.remove()
+                    mesh = self._plot_coverage(grid, last)
+                    self.canvas.draw()
+                    drawn = time.time()
+                if canceled:
+                    break
+        finally:
+            progressDialog.close()
 
     def save(self):
         fileName = QtWidgets.QFileDialog.getSaveFileName(self, 'Save Plot', self.saveDir, '*.png')
@@ -135,6 +135,7 @@ class ScanPreProcessWindow(QMainWindow):
         print ('[INFO] Closing {0}'.format(self.objectName()))
 
         if self._myMergePeaksThread is not None:
+            self._myMergePeaksThread.stop()
             self._myMergePeaksThread.terminate()
 
     def do_start_pre_process(self):
@@ -180,6 +181,9 @@ class ScanPreProcessWindow(QMainWindow):
         # launch the multiple threading to scans
         self._myMergePeaksThread = multi_threads_helpers.MergePeaksThread(self, exp_number, scan_list,
                                                                           file_list)
+        # scans pre-processed with the same calibration after their data files are written are not merged again
+        record_file_name = fourcircle_utility.pre_processed_record_file(exp_number, output_dir)
+        self._myMergePeaksThread.set_skip_up_to_date(record_file_name)
         self._scansToProcess = set(scan_list)
         self._scanNumbersProcessed = set()
 
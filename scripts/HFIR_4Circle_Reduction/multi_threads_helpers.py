@@ -7,9 +7,13 @@
 #pylint: disable=W0403,R0913,R0902
 from __future__ import (absolute_import, division, print_function)
 import os
+import threading
+from multiprocessing.pool import ThreadPool
 from qtpy.QtCore import Signal as pyqtSignal
 from qtpy.QtCore import QThread   # noqa
+from mantid.kernel.environment import max_threads
 import HFIR_4Circle_Reduction.reduce4circleControl as r4c  # noqa
+from HFIR_4Circle_Reduction import fourcircle_utility  # noqa
 from HFIR_4Circle_Reduction import peak_integration_utility  # noqa
 
 
@@ -396,6 +400,13 @@ class MergePeaksThread(QThread):
         self._checkPreprocessedScans = False
         self._preProcessedDir = None
         self._redoMerge = True
+        self._recordFileName = None
+
+        # number of scans to merge concurrently, flag to stop and slots for the scans fetched ahead
+        self._numWorkers = None
+        self._stopRequested = False
+        self._fetchSlots = None
+        self._fetchStopped = False
 
         # link signals
         self.mergeMsgSignal.connect(self._mainWindow.update_merge_value)
@@ -415,63 +426,184 @@ class MergePeaksThread(QThread):
     def run(self):
         """Execute the thread!
 
-        i.e., merging the scans
+        i.e., merging the scans.  The SPICE and Pt XML files of the scans are fetched in order on one thread,
+        ahead of the merging, while the scans are merged concurrently on a pool of threads.  The files of at
+        most as many scans as there are merging threads are fetched while waiting to be merged
         :return:
         """
-        if self._outputMDFileList is None or len(self._outputMDFileList) == 0:
-            save_file = False
-        else:
-            save_file = True
+        # pre-processed scans that may be skipped
+        record_dict = None
+        if self._recordFileName is not None and os.path.exists(self._recordFileName):
+            record_dict = fourcircle_utility.read_pre_process_record(self._recordFileName)
+
+        num_workers = self._numWorkers or max_threads()
+        self._fetchSlots = threading.Semaphore(2 * num_workers)
+        self._fetchStopped = False
+        fetch_pool = ThreadPool(1)
+        merge_pool = ThreadPool(num_workers)
+        try:
+            merge_results = list()
+            for index, (status, ret_obj) in enumerate(fetch_pool.imap(self._fetch_scan, self._scanNumberList)):
+                if self._stopRequested:
+                    break
+                scan_number = self._scanNumberList[index]
+                if not status:
+                    self._fetchSlots.release()
+                    self.mergeMsgSignal.emit(scan_number, str(ret_obj))
+                    continue
+                pt_number_list, input_files = ret_obj
 
-        for index, scan_number in enumerate(self._scanNumberList):
-            # set up merging parameters
-            pt_number_list = list()
+                # skip the scans which are pre-processed after their inputs are written
+                if record_dict is not None and self._outputMDFileList:
+                    out_file_name = self._outputMDFileList[index]
+                    controller = self._mainWindow.controller
+                    if controller.is_pre_processed_up_to_date(self._expNumber, scan_number, out_file_name,
+                                                              input_files, record_dict):
+                        self._fetchSlots.release()
+                        self.mergeMsgSignal.emit(scan_number, 'Up to date')
+                        self.saveMsgSignal.emit(scan_number, out_file_name)
+                        continue
+
+                merge_results.append(merge_pool.apply_async(self._merge_fetched_scan, (index, pt_number_list)))
+            # END-FOR
 
-            # emit signal for run start (mode 0)
-            # self.peakMergeSignal.emit(scan_number, 'In merging')
-            self.mergeMsgSignal.emit(scan_number, 'Being merged')
+            for merge_result in merge_results:
+                merge_result.get()
+        finally:
+            # let the fetching thread go if it waits for a slot
+            self._fetchStopped = True
+            self._fetchSlots.release()
+            fetch_pool.terminate()
+            merge_pool.close()
+            merge_pool.join()
 
-            # merge if not merged
-            merged_ws_name = None
-            out_file_name = 'No File To Save'
-            try:
-                status, ret_tup = self._mainWindow.controller.merge_pts_in_scan(exp_no=self._expNumber,
-                                                                                scan_no=scan_number,
-                                                                                pt_num_list=pt_number_list,
-                                                                                rewrite=self._redoMerge,
-                                                                                preprocessed_dir=self._preProcessedDir)
-                if status:
-                    merged_ws_name = str(ret_tup[0])
-                    error_message = ''
-                else:
-                    error_message = str(ret_tup)
+        return
 
-                # save
-                if save_file:
-                    out_file_name = self._outputMDFileList[index]
-                    self._mainWindow.controller.save_merged_scan(exp_number=self._expNumber,
-                                                                 scan_number=scan_number,
-                                                                 pt_number_list=pt_number_list,
-                                                                 merged_ws_name=merged_ws_name,
-                                                                 output=out_file_name)
-                # END-IF-ELSE
+    def _fetch_scan(self, scan_number):
+        """
+        download and load the SPICE file and the Pt XML files of a scan
+        :param scan_number:
+        :return: (boolean, object) as (status, (Pt number list, input files) / error message)
+        """
+        # wait until a merging thread is about to be free
+        self._fetchSlots.acquire()
+        if self._stopRequested or self._fetchStopped:
+            # pass the slot on to the next scan, which is stopped too
+            self._fetchSlots.release()
+            return False, 'Stopped'
 
-            except RuntimeError as run_err:
-                # error
-                status = False
-                error_message = 'Failed: {0}'.format(run_err)
+        try:
+            return self._mainWindow.controller.prefetch_scan_files(self._expNumber, scan_number)
+        except RuntimeError as run_err:
+            return False, 'Failed: {0}'.format(run_err)
+
+    def _merge_fetched_scan(self, index, pt_number_list):
+        """
+        merge a scan whose files are fetched and let the files of another scan be fetched
+        :param index: index of the scan in the scans to merge
+        :param pt_number_list:
+        :return:
+        """
+        try:
+            self._merge_scan(index, pt_number_list)
+        finally:
+            self._fetchSlots.release()
+
+        return
+
+    def _merge_scan(self, index, pt_number_list):
+        """
+        merge a scan and save it if the output files are given
+        :param index: index of the scan in the scans to merge
+        :param pt_number_list:
+        :return:
+        """
+        if self._stopRequested:
+            return
+
+        scan_number = self._scanNumberList[index]
+        save_file = self._outputMDFileList is not None and len(self._outputMDFileList) > 0
 
-            # continue to
+        # emit signal for run start (mode 0)
+        self.mergeMsgSignal.emit(scan_number, 'Being merged')
+
+        # merge if not merged
+        merged_ws_name = None
+        out_file_name = 'No File To Save'
+        try:
+            status, ret_tup = self._mainWindow.controller.merge_pts_in_scan(exp_no=self._expNumber,
+                                                                            scan_no=scan_number,
+                                                                            pt_num_list=pt_number_list,
+                                                                            rewrite=self._redoMerge,
+                                                                            preprocessed_dir=self._preProcessedDir)
             if status:
-                # successfully merge peak
-                assert merged_ws_name is not None, 'Impossible situation'
-                self.mergeMsgSignal.emit(scan_number, merged_ws_name)
-                self.saveMsgSignal.emit(scan_number, out_file_name)
+                merged_ws_name = str(ret_tup[0])
+                error_message = ''
             else:
-                # merging error
-                self.mergeMsgSignal.emit(scan_number, error_message)
-                continue
-            # END-IF
+                error_message = str(ret_tup)
+
+            # save
+            if status and save_file:
+                out_file_name = self._outputMDFileList[index]
+                self._mainWindow.controller.save_merged_scan(exp_number=self._expNumber,
+                                                             scan_number=scan_number,
+                                                             pt_number_list=pt_number_list,
+                                                             merged_ws_name=merged_ws_name,
+                                                             output=out_file_name)
+            # END-IF-ELSE
+
+        except RuntimeError as run_err:
+            # error
+            status = False
+            error_message = 'Failed: {0}'.format(run_err)
+
+        # continue to
+        if status:
+            # successfully merge peak
+            assert merged_ws_name is not None, 'Impossible situation'
+            self.mergeMsgSignal.emit(scan_number, merged_ws_name)
+            self.saveMsgSignal.emit(scan_number, out_file_name)
+        else:
+            # merging error
+            self.mergeMsgSignal.emit(scan_number, error_message)
+        # END-IF
+
+        return
+
+    def set_number_of_workers(self, num_workers):
+        """
+        set the number of scans to merge concurrently
+        :param num_workers: None to use MultiThreaded.MaxCores
+        :return:
+        """
+        assert num_workers is None or (isinstance(num_workers, int) and num_workers > 0), \
+            'Number of workers {0} must be None or a positive integer.'.format(num_workers)
+
+        self._numWorkers = num_workers
+
+        return
+
+    def set_skip_up_to_date(self, record_file_name):
+        """
+        skip the scans whose pre-processed MD file is newer than their SPICE and Pt XML files, and whose
+        calibration in the pre-processed scans' record matches the current one
+        :param record_file_name: pre-processed scans' record file. None not to skip any scan
+        :return:
+        """
+        assert record_file_name is None or isinstance(record_file_name, str), \
+            'Record file name {0} must be None or a string but not a {1}.' \
+            ''.format(record_file_name, type(record_file_name))
+
+        self._recordFileName = record_file_name
+
+        return
+
+    def stop(self):
+        """
+        stop fetching and merging the scans which are not started yet
+        :return:
+        """
+        self._stopRequested = True
 
         return
 
@@ -2377,18 +2377,22 @@ class CWSCDReductionControl(object):
 
         return binning_script
 
-    def is_calibration_match(self, exp_number, scan_number):
+    def is_calibration_match(self, exp_number, scan_number, record_dict=None):
         """
         check whether the pre-processed data has a set of matching calibrated parameters comparing to
         the current one
         :param exp_number:
         :param scan_number:
+        :param record_dict: pre-processed scans' record. If None, then the record of the pre-processed directory
         :return:
         """
+        if record_dict is None:
+            record_dict = self._preprocessedInfoDict
+
         # no record is found. it should not happen!
-        if self._preprocessedInfoDict is None:
+        if record_dict is None:
             return False
-        if scan_number not in self._preprocessedInfoDict:
+        if scan_number not in record_dict:
             return False
 
         # check others
@@ -2396,12 +2400,12 @@ class CWSCDReductionControl(object):
 
         # center
         center_x, center_y = self.get_calibrated_det_center(exp_number)
-        if (center_x, center_y) != self._preprocessedInfoDict[scan_number]['Center']:
+        if (center_x, center_y) != record_dict[scan_number]['Center']:
             unmatch_score += 2
 
         # wave length
         wavelength = self.get_calibrated_wave_length(exp_number)
-        record_lambda = self._preprocessedInfoDict[scan_number]['WaveLength']
+        record_lambda = record_dict[scan_number]['WaveLength']
         if type(record_lambda) != type(wavelength):
             unmatch_score += 20
         elif wavelength is not None and abs(wavelength - record_lambda) > 1.E-5:
@@ -2409,7 +2413,7 @@ class CWSCDReductionControl(object):
 
         # detector distance
         det_sample_distance = self.get_calibrated_det_sample_distance(exp_number)
-        record_distance = self._preprocessedInfoDict[scan_number]['DetSampleDistance']
+        record_distance = record_dict[scan_number]['DetSampleDistance']
         if type(det_sample_distance) != type(record_distance):
             unmatch_score += 200
         elif det_sample_distance is not None and abs(det_sample_distance - record_distance) > 1.E-5:
@@ -2426,6 +2430,32 @@ class CWSCDReductionControl(object):
 
         return True
 
+    def is_pre_processed_up_to_date(self, exp_number, scan_number, md_file_name, input_files, record_dict):
+        """
+        check whether a pre-processed MD file of a scan can be used as it is, i.e., it is newer than all the
+        SPICE and Pt. XML files of the scan and it is recorded with the current calibrated parameters
+        :param exp_number:
+        :param scan_number:
+        :param md_file_name: pre-processed MD file
+        :param input_files: SPICE and Pt. XML files of the scan
+        :param record_dict: pre-processed scans' record
+        :return:
+        """
+        if not os.path.exists(md_file_name) or False in [os.path.exists(name) for name in input_files]:
+            return False
+        if record_dict is None or scan_number not in record_dict or record_dict[scan_number]['MD'] != md_file_name:
+            return False
+        if not self.is_calibration_match(exp_number, scan_number, record_dict):
+            return False
+
+        # max() and all() are numpy's in this module
+        md_file_time = os.path.getmtime(md_file_name)
+        for input_file in input_files:
+            if os.path.getmtime(input_file) > md_file_time:
+                return False
+
+        return True
+
     def load_mask_file(self, mask_file_name, mask_tag):
         """
         load an XML mask file to a workspace and parse to ROI that can be mapped pixels in 2D notion
@@ -2553,6 +2583,29 @@ class CWSCDReductionControl(object):
 
         return True, (pt_num_list, pt_list_str)
 
+    def prefetch_scan_files(self, exp_no, scan_no):
+        """
+        Download the SPICE file and Pt. XML files of a scan if they are not on local disk and load the SPICE table,
+        such that the scan can be merged later without waiting for them
+        :param exp_no:
+        :param scan_no:
+        :return: (boolean, object) as (status, (Pt number list, SPICE and Pt. XML files) / error message)
+        """
+        try:
+            status, ret_obj = self._process_pt_list(exp_no, scan_no, list())
+        except IOError as io_err:
+            return False, str(io_err)
+        if not status:
+            return False, ret_obj
+        pt_num_list = ret_obj[0]
+
+        input_files = [os.path.join(self._dataDir, get_spice_file_name(self._instrumentName, exp_no, scan_no))]
+        for pt in pt_num_list:
+            input_files.append(os.path.join(self._dataDir,
+                                            get_det_xml_file_name(self._instrumentName, exp_no, scan_no, pt)))
+
+        return True, (pt_num_list, input_files)
+
     def merge_pts_in_scan(self, exp_no, scan_no, pt_num_list, rewrite, preprocessed_dir):
         """
         Merge Pts in Scan
@@ -2666,10 +2719,10 @@ class CWSCDReductionControl(object):
 
                 self._myMDWsList.append(out_q_name)
             except RuntimeError as e:
-                err_msg += 'Unable to convert scan %d data to Q-sample MDEvents due to %s' % (scan_no, str(e))
+                err_msg = 'Unable to convert scan %d data to Q-sample MDEvents due to %s' % (scan_no, str(e))
                 return False, err_msg
             except ValueError as e:
-                err_msg += 'Unable to convert scan %d data to Q-sample MDEvents due to %s.' % (scan_no, str(e))
+                err_msg = 'Unable to convert scan %d data to Q-sample MDEvents due to %s.' % (scan_no, str(e))
                 return False, err_msg
             # END-TRY
 
@@ -5,6 +5,7 @@
 #     & Institut Laue - Langevin
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
+from multiprocessing.pool import ThreadPool
 import numpy as np
 import re
 import warnings
@@ -17,6 +18,10 @@ FN_PATTERN = re.compile('f(\\d+)\\.(.+)')
 # RegEx pattern matching a composite function parameter name, eg f2.Sigma. Multi-spectrum case.
 FN_MS_PATTERN = re.compile('f(\\d+)\\.f(\\d+)\\.(.+)')
 
+# Number of independent Monte Carlo searches per worker in a parallel estimation. Smaller searches let
+# the estimation stop sooner once a target cost is reached.
+SEARCHES_PER_WORKER = 4
+
 
 def makeWorkspace(xArray, yArray):
     """Create a workspace that doesn't appear in the ADS"""
@@ -31,6 +36,35 @@ def makeWorkspace(xArray, yArray):
     return alg.getProperty('OutputWorkspace').value
 
 
+def _reorder_physical_properties(fun):
+    """
+    Move the 'PhysicalProperties' attribute of a CrystalFieldMultiSpectrum function string to the front.
+    Otherwise it won't set up the other attributes properly.
+    """
+    if 'CrystalFieldMultiSpectrum' in fun:
+        fun = re.sub(r'(name=.*?,)(.*?)(PhysicalProperties=\(.*?\),)', r'\1\3\2', fun)
+    return fun
+
+
+def _rank_parameter_sets(candidates, n_outputs):
+    """
+    Sort parameter sets by their cost and keep the n_outputs best distinct ones. Every Monte Carlo search can
+    return the starting parameters, so the same set can be found by several searches.
+    Args:
+        candidates: A list of (cost, values) tuples.
+        n_outputs: The maximum number of parameter sets to keep.
+    """
+    ranked, seen = [], set()
+    for cost, values in sorted(candidates, key=lambda candidate: candidate[0]):
+        key = tuple(values)
+        if key not in seen:
+            seen.add(key)
+            ranked.append((cost, values))
+            if len(ranked) == n_outputs:
+                break
+    return ranked
+
+
 def islistlike(arg):
     return (not hasattr(arg, "strip")) and (hasattr(arg, "__getitem__") or hasattr(arg, "__iter__")) and hasattr(arg, "__len__")
 
@@ -1239,9 +1273,18 @@ class CrystalFieldFit(object):
             return self._fit_single()
 
     def monte_carlo(self, **kwargs):
+        """
+        Estimate the parameters with EstimateFitParameters.
+        If NWorkers or Chi2Target is given, several independent Monte Carlo searches are run
+        concurrently (see _monte_carlo_parallel).
+        Args:
+            **kwargs: Properties of the algorithm.
+        """
         fix_all_peaks = self.model.FixAllPeaks
         self.model.FixAllPeaks = True
-        if isinstance(self._input_workspace, list):
+        if 'NWorkers' in kwargs or 'Chi2Target' in kwargs:
+            self._monte_carlo_parallel(**kwargs)
+        elif isinstance(self._input_workspace, list):
             self._monte_carlo_multi(**kwargs)
         else:
             self._monte_carlo_single(**kwargs)
@@ -1309,11 +1352,7 @@ class CrystalFieldFit(object):
             **kwargs: Properties of the algorithm.
         """
         from mantid.api import AlgorithmManager
-        fun = self.model.makeSpectrumFunction()
-        if 'CrystalFieldMultiSpectrum' in fun:
-            # Hack to ensure that 'PhysicalProperties' attribute is first
-            # otherwise it won't set up other attributes properly
-            fun = re.sub(r'(name=.*?,)(.*?)(PhysicalProperties=\(.*?\),)',r'\1\3\2', fun)
+        fun = _reorder_physical_properties(self.model.makeSpectrumFunction())
         alg = AlgorithmManager.createUnmanaged('EstimateFitParameters')
         alg.initialize()
         alg.setProperty('Function', fun)
@@ -1348,6 +1387,146 @@ class CrystalFieldFit(object):
         self.model.update(function)
         self._function = function
 
+    def _monte_carlo_parallel(self, NWorkers=None, Chi2Target=None, **kwargs):
+        """
+        Run independent Monte Carlo searches concurrently and rank the parameter sets found by all of them.
+        Each search is an EstimateFitParameters algorithm drawing a share of NSamples with its own seed.
+        The algorithms release the GIL while they execute, so they run in parallel on a pool of threads.
+        Args:
+            NWorkers: Number of searches to run at the same time. Default: MultiThreaded.MaxCores.
+            Chi2Target: If given, no more searches are started once a parameter set with a cost
+                function value at or below it has been found.
+            **kwargs: Properties of the algorithm.
+        """
+        from mantid.api import AnalysisDataService, WorkspaceFactory
+        if kwargs.get('Type', 'Monte Carlo') != 'Monte Carlo':
+            raise ValueError('Only the Monte Carlo estimation can run in parallel.')
+        from mantid.kernel.environment import max_threads
+        workers = int(NWorkers) if NWorkers else max_threads()
+        n_samples = int(kwargs.pop('NSamples', 100))
+        n_outputs = max(int(kwargs.pop('NOutputs', 10)), 1)
+        seed = int(kwargs.pop('Seed', 0))
+        output_workspace = kwargs.pop('OutputWorkspace', '').strip()
+
+        # Split the samples between the searches. EstimateFitParameters always uses the same
+        # random numbers for a seed of 0, so every search gets a distinct non-zero seed.
+        n_searches = max(min(workers * SEARCHES_PER_WORKER, n_samples), 1)
+        searches = [((seed + i) % 2147483646 + 1, len(samples))
+                    for i, samples in enumerate(np.array_split(np.arange(n_samples), n_searches))]
+
+        fun = self._estimation_function()
+
+        def search(args):
+            return self._monte_carlo_search(fun, n_outputs, *args, **kwargs)
+
+        pool = None
+        if workers > 1 and len(searches) > 1:
+            pool = ThreadPool(min(workers, len(searches)))
+            results = pool.imap_unordered(search, searches)
+        else:
+            results = (search(args) for args in searches)
+        names, function, candidates = None, None, []
+        best_cost = None
+        try:
+            for search_function, search_names, search_candidates in results:
+                names = search_names
+                if search_candidates and (best_cost is None or search_candidates[0][0] < best_cost):
+                    best_cost = search_candidates[0][0]
+                    function = search_function
+                candidates += search_candidates
+                if Chi2Target is not None and best_cost is not None and best_cost <= Chi2Target:
+                    break
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        if function is None:
+            raise RuntimeError('None of the Monte Carlo searches found a parameter set. '
+                               'Try increasing NSamples or relaxing the constraints.')
+        # Rank the parameter sets of all searches by the value of the cost function
+        candidates = _rank_parameter_sets(candidates, n_outputs)
+        if output_workspace:
+            table = WorkspaceFactory.createTable()
+            table.addColumn('str', 'Name')
+            for i in range(len(candidates)):
+                table.addColumn('double', str(i + 1))
+            for row, name in enumerate(names):
+                table.addRow([name] + [values[row] for _, values in candidates])
+            AnalysisDataService.addOrReplace(output_workspace, table)
+        # Use the top ranked parameter set, so that the model agrees with the first column of the table
+        for name, value in zip(names, candidates[0][1]):
+            function.setParameter(name, value)
+        self.model.update(function)
+        self._function = function
+
+    def _monte_carlo_search(self, fun, n_outputs, seed, n_samples, **kwargs):
+        """
+        Run one Monte Carlo search and calculate the cost function for the parameter sets it found.
+        Args:
+            fun: The function string to estimate the parameters of.
+            n_outputs: The number of parameter sets to keep.
+            seed: The seed of the random number generator.
+            n_samples: The number of samples to draw.
+            **kwargs: Properties of the algorithm.
+        Returns:
+            The function with the best parameters, the names of the estimated parameters and a list of
+            the parameter sets as (cost, values) tuples, in order of increasing cost.
+        """
+        from mantid.api import AlgorithmManager, FunctionFactory
+        alg = AlgorithmManager.createUnmanaged('EstimateFitParameters')
+        alg.initialize()
+        alg.setChild(True)
+        alg.setProperty('Function', fun)
+        self._set_input_workspaces(alg)
+        for param in kwargs:
+            alg.setProperty(param, kwargs[param])
+        alg.setProperty('NSamples', n_samples)
+        alg.setProperty('NOutputs', n_outputs)
+        alg.setProperty('Seed', seed)
+        alg.setProperty('OutputWorkspace', 'estimated_parameters')
+        alg.execute()
+        function = alg.getProperty('Function').value
+        table = alg.getProperty('OutputWorkspace').value
+        names = table.column(0)
+        best = _reorder_physical_properties(str(function))
+        candidates = []
+        for column in range(1, table.columnCount()):
+            values = table.column(column)
+            candidate = FunctionFactory.createInitialized(best)
+            for name, value in zip(names, values):
+                candidate.setParameter(name, value)
+            cost = AlgorithmManager.createUnmanaged('CalculateCostFunction')
+            cost.initialize()
+            cost.setChild(True)
+            cost.setProperty('Function', _reorder_physical_properties(str(candidate)))
+            self._set_input_workspaces(cost)
+            if 'CostFunction' in kwargs:
+                cost.setProperty('CostFunction', kwargs['CostFunction'])
+            cost.execute()
+            candidates.append((cost.getProperty('Value').value, values))
+        candidates.sort(key=lambda candidate: candidate[0])
+        return function, names, candidates
+
+    def _estimation_function(self):
+        """
+        Make the function string for the estimation of the parameters.
+        """
+        if isinstance(self._input_workspace, list):
+            return self.model.makeMultiSpectrumFunction()
+        return _reorder_physical_properties(self.model.makeSpectrumFunction())
+
+    def _set_input_workspaces(self, alg):
+        """
+        Set the input workspaces of a fitting algorithm. The function must be set first.
+        """
+        if isinstance(self._input_workspace, list):
+            alg.setProperty('InputWorkspace', self._input_workspace[0])
+            for i, workspace in enumerate(self._input_workspace[1:], 1):
+                alg.setProperty('InputWorkspace_%s' % i, workspace)
+        else:
+            alg.setProperty('InputWorkspace', self._input_workspace)
+
     def _fit_single(self):
         """
         Fit when the model has a single spectrum.
@@ -1364,8 +1543,7 @@ class CrystalFieldFit(object):
                     fun = self.model.makeSpectrumFunction()
             else:
                 fun = str(self._function)
-        if 'CrystalFieldMultiSpectrum' in fun:
-            fun = re.sub(r'(name=.*?,)(.*?)(PhysicalProperties=\(.*?\),)',r'\1\3\2', fun)
+        fun = _reorder_physical_properties(fun)
         alg = AlgorithmManager.createUnmanaged('Fit')
         alg.initialize()
         alg.setProperty('Function', fun)
@@ -8,6 +8,7 @@ from __future__ import (absolute_import, division, print_function)
 import numpy as np
 from six import string_types
 from scipy import constants
+import itertools
 import warnings
 
 
@@ -95,6 +96,7 @@ class PointCharge(object):
         self._maxdistance = None # Outer distance of shell within which to compute charges
         self._neighbour = None   # Nth level of nearest neighbour ions within which to compute charges
         self._atoms = None       # A list of all the inequivalent sites by their unique labels and coordinates
+        self._shells = {}        # The ligand shells around the magnetic ion for each (IonLabel, distance / neighbour)
         # Parse args / kwargs
         argname = ['Structure', 'IonLabel', 'Charges', 'Ion', 'MaxDistance', 'Neighbour']
         argdict = {'MaxDistance':5.}
@@ -278,18 +280,23 @@ class PointCharge(object):
         return self._atoms
 
     def _getBlm(self, q, x, y, z, r, PreFact, rn, thetak):
+        """
+        Calculates the crystal field parameters due to each ligand.
+        The charges q, coordinates x, y, z and distances r may be arrays of all the ligands, in which case
+        each element of the returned Blm is an array of the parameters due to each ligand.
+        """
+        q, x, y, z, r = (np.asarray(v, dtype=np.float64) for v in (q, x, y, z, r))
         # Converts from Cartesian to polars: c==cos, s==sin, t==theta, fi==phi
         xy = x*x + y*y
         ct = z/r
         ct2 = ct * ct
         st = np.sqrt(xy)/r
         st2 = st * st
-        if xy==0:
-            sfi = 0
-            cfi = 0
-        else:
-            sfi = y/np.sqrt(xy)
-            cfi = x/np.sqrt(xy)
+        # The azimuthal terms are zero for ligands on the z axis
+        onaxis = (xy == 0)
+        rxy = np.sqrt(np.where(onaxis, 1., xy))
+        sfi = np.where(onaxis, 0., y/rxy)
+        cfi = np.where(onaxis, 0., x/rxy)
 
         Blm = [ [ 0 for _ in range(4*l+5) ] for l in range(3) ]
 
@@ -351,20 +358,13 @@ class PointCharge(object):
         """
         Parses the stored crystal structure and returns a set of ligands
         @param dist - the maximum distance of ligands (if dist > 0) or the nth neighbour shell (if dist < 0)
+        @return an array with a row of [charge, x, y, z] for each ligand, sorted by distance
         """
         # Check that the charges have been defined:
         if self._charges is None:
             raise RuntimeError('No charges have been defined for this model.')
-        # Determine the transformation matrix to convert from fractional to Cartesian coordinates and back.
-        cell = self._cryst.getUnitCell()
-        rtoijk = cell.getBinv()
-        invrtoijk = cell.getB()
-        # Make a list of all atomic positions
-        sg = self._cryst.getSpaceGroup()
-        pos = {}
         charges = self._charges
-        for name, coords in self._atoms.items():
-            pos[name] = [c for c in sg.getEquivalentPositions(coords)]
+        for name in self._atoms.keys():
             if name not in self._charges.keys():
                 import re
                 try:
@@ -373,6 +373,28 @@ class PointCharge(object):
                     warnstr = 'Atom type ''%s'' in structure not in list of charges. Assuming q=0' % (name)
                     warnings.warn(warnstr, RuntimeWarning)
                     charges[name] = 0.
+        names, rvecs = self._getLigandShell(dist)
+        return np.column_stack([[charges[name] for name in names], np.reshape(rvecs, (-1, 3))])
+
+    def _getLigandShell(self, dist):
+        """
+        Returns the names and Cartesian positions (relative to the magnetic ion) of the ions up to the given distance
+        or neighbour shell, sorted by distance. The shells do not depend on the charges, so they are calculated once
+        for each magnetic ion and distance / neighbour.
+        @param dist - the maximum distance of ligands (if dist > 0) or the nth neighbour shell (if dist < 0)
+        """
+        key = (self._ionlabel, dist)
+        if key in self._shells:
+            return self._shells[key]
+        # Determine the transformation matrix to convert from fractional to Cartesian coordinates and back.
+        cell = self._cryst.getUnitCell()
+        rtoijk = cell.getBinv()
+        invrtoijk = cell.getB()
+        # Make a list of all atomic positions
+        sg = self._cryst.getSpaceGroup()
+        pos = {}
+        for name, coords in self._atoms.items():
+            pos[name] = np.array([[c[0], c[1], c[2]] for c in sg.getEquivalentPositions(coords)], dtype=np.float64)
         if self._ionlabel not in pos.keys():
             raise RuntimeError('Magnetic ion ''%s'' not found in structure' % (self._ionlabel))
         # Construct a large enough supercell such that we can be sure to find all neighbours of the magnetic
@@ -381,29 +403,29 @@ class PointCharge(object):
             nn = -dist
             # Estimate number of nearest-neighbours in the cell, and then scale the search distance by the
             # nearest-neighbour separation weighted by the number of neighbours in the cell
-            r0 = np.array(pos[self._ionlabel][0])
+            r0 = pos[self._ionlabel][0]
             dist_in_cell = [np.linalg.norm(np.inner(rtoijk, r0 - r)) for r in [rs for rs in pos.values()]]
             nn_in_cell = len(dist_in_cell)
             dist = float(dist / nn_in_cell) * np.min(dist_in_cell)
         # Supercell size is distance (with 50% fudge factor) times unit cell dimensions in each orthongal direction
         nmax = [int(val) for val in np.ceil(np.abs(dist) * 1.5 * np.sqrt(np.sum(invrtoijk**2, 1)))]
-        for r0 in pos[self._ionlabel]:
-            entries = []
-            for i1 in range(-nmax[0], nmax[0]+1):
-                for i2 in range(-nmax[1], nmax[1]+1):
-                    for i3 in range(-nmax[2], nmax[2]+1):
-                        r1 = r0 + np.array([i1, i2, i3])
-                        for name, rns in pos.items():
-                            for rn in rns:
-                                rvec = np.array(np.matrix(r1 - rn) * rtoijk)[0]
-                                r = np.linalg.norm(rvec)
-                                if (r > 0) and (r < (dist if dist > 0 else r+1)):
-                                    entries.append([r, charges[name], rvec[0], rvec[1], rvec[2]])
+        translations = np.array(list(itertools.product(*[range(-n, n+1) for n in nmax])), dtype=np.float64)
+        # All the ions in the supercell, relative to the last equivalent position of the magnetic ion
+        names = np.array([name for name, rns in pos.items() for _ in rns])
+        sites = np.concatenate(list(pos.values()))
+        r0 = pos[self._ionlabel][-1]
+        rvecs = np.dot((r0 + translations)[:, np.newaxis, :] - sites, rtoijk).reshape((-1, 3))
+        names = np.tile(names, len(translations))
+        r = np.sqrt(np.sum(rvecs**2, axis=1))
+        within = (r > 0) & (r < dist) if dist > 0 else (r > 0)
+        names, rvecs, r = names[within], rvecs[within], r[within]
         if dist < 0:
-            rlist = np.sort(np.unique([ent[0] for ent in entries]))
-            entries = [ent for ent in entries if ent[0] < rlist[nn]]  # Truncates the entries to nnth neighbours
-        idx = np.argsort([ent[0] for ent in entries])
-        return [entries[i][1:] for i in idx]
+            rlist = np.sort(np.unique(r))
+            within = r < rlist[nn]  # Truncates the entries to nnth neighbours
+            names, rvecs, r = names[within], rvecs[within], r[within]
+        idx = np.argsort(r)
+        self._shells[key] = (names[idx], rvecs[idx])
+        return self._shells[key]
 
     def _getIon(self):
         ion = self._ion if self._ion else self._ionlabel
@@ -424,16 +446,13 @@ class PointCharge(object):
                 ['IB44', 'IB43', 'IB42', 'IB41', 'B40', 'B41', 'B42', 'B43', 'B44'],
                 ['IB66', 'IB65', 'IB64', 'IB63', 'IB62', 'IB61', 'B60', 'B61', 'B62', 'B63', 'B64', 'B65', 'B66']]
         Blm = {lm: 0 for sublist in Blms for lm in sublist}
-        for n in range(len(ligands)):
-            q = ligands[n][0]
-            x = ligands[n][1]
-            y = ligands[n][2]
-            z = ligands[n][3]
-            r = np.sqrt(x*x + y*y + z*z)
-            nBlm = self._getBlm(q, x, y, z, r, self.Zlm, self.rns[ion], self.theta[ion])
-            for l in range(3):
-                for m in range(4*(l+1)+1):
-                    Blm[Blms[l][m]] += nBlm[l][m]
+        # Calculates the parameters due to all the ligands at once and sums them
+        q, x, y, z = np.reshape(np.asarray(ligands, dtype=np.float64), (-1, 4)).T
+        r = np.sqrt(x*x + y*y + z*z)
+        nBlm = self._getBlm(q, x, y, z, r, self.Zlm, self.rns[ion], self.theta[ion])
+        for l in range(3):
+            for m in range(4*(l+1)+1):
+                Blm[Blms[l][m]] += np.sum(nBlm[l][m])
         # Removes parameters which are zero
         for lm in [key for key in Blm.keys() if np.abs(Blm[key]) < 1.e-10]:
             del Blm[lm]
@@ -61,7 +61,7 @@ class SettingsDiagnosticTab(QtWidgets.QWidget, Ui_SettingsDiagnosticTab):
         self._settings_diagnostic_listeners = []
 
         # Excluded settings entries
-        self.excluded = ["state_module", "state_name"]
+        self.excluded = ["state_module", "state_name", "state_hash"]
         self.class_type_id = "ClassTypeParameter"
 
         # Q Settings
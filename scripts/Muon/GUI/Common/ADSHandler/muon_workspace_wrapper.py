@@ -87,6 +87,11 @@ class MuonWorkspaceWrapper(object):
         """Is the workspace hidden (i.e. not in the ADS)."""
         return not self._is_in_ads
 
+    @property
+    def exists(self):
+        """Is the workspace still available, either in the class instance or in the ADS."""
+        return self.is_hidden or mtd.doesExist(self._workspace_name)
+
     @property
     def name(self):
         """The current name of the workspace."""
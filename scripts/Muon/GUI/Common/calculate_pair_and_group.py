@@ -4,12 +4,30 @@
 #     NScD Oak Ridge National Laboratory, European Spallation Source
 #     & Institut Laue - Langevin
 # SPDX - License - Identifier: GPL - 3.0 +
+import weakref
+
 import Muon.GUI.Common.utilities.algorithm_utils as algorithm_utils
 
 
 def calculate_group_data(context, group_name, run, rebin):
-    processed_data = _run_pre_processing(context, run, rebin)
+    processed_data = run_pre_processing(context, run, rebin)
+
+    return calculate_group_data_from_processed(context, group_name, run, processed_data)
+
+
+def calculate_pair_data(context, pair_name, run, rebin):
+    processed_data = run_pre_processing(context, run, rebin)
+
+    return calculate_pair_data_from_processed(context, pair_name, run, processed_data)
+
 
+def estimate_group_asymmetry_data(context, group_name, run, rebin):
+    processed_data = run_pre_processing(context, run, rebin)
+
+    return estimate_group_asymmetry_data_from_processed(context, group_name, run, processed_data)
+
+
+def calculate_group_data_from_processed(context, group_name, run, processed_data):
     params = _get_MuonGroupingCounts_parameters(context, group_name, run)
     params["InputWorkspace"] = processed_data
     group_data = algorithm_utils.run_MuonGroupingCounts(params)
@@ -17,9 +35,7 @@ def calculate_group_data(context, group_name, run, rebin):
     return group_data
 
 
-def calculate_pair_data(context, pair_name, run, rebin):
-    processed_data = _run_pre_processing(context, run, rebin)
-
+def calculate_pair_data_from_processed(context, pair_name, run, processed_data):
     params = _get_MuonPairingAsymmetry_parameters(context, pair_name, run)
     params["InputWorkspace"] = processed_data
     pair_data = algorithm_utils.run_MuonPairingAsymmetry(params)
@@ -27,9 +43,7 @@ def calculate_pair_data(context, pair_name, run, rebin):
     return pair_data
 
 
-def estimate_group_asymmetry_data(context, group_name, run, rebin):
-    processed_data = _run_pre_processing(context, run, rebin)
-
+def estimate_group_asymmetry_data_from_processed(context, group_name, run, processed_data):
     params = _get_MuonGroupingAsymmetry_parameters(context, group_name, run)
     params["InputWorkspace"] = processed_data
     group_asymmetry = algorithm_utils.run_MuonGroupingAsymmetry(params)
@@ -37,7 +51,49 @@ def estimate_group_asymmetry_data(context, group_name, run, rebin):
     return group_asymmetry
 
 
-def _run_pre_processing(context, run, rebin):
+def pre_processing_inputs(context, run, rebin):
+    """
+    Everything the pre-processed data of a run depends on: the loaded data followed by the
+    MuonPreProcess parameters (time limits, time offset, rebinning and dead time table).
+
+    The loaded data is referred to weakly, through its MuonLoadData entry, so that the recorded
+    inputs do not keep workspaces alive once MuonLoadData has released them.
+    """
+    entry = context.data_context.get_loaded_entry_for_run(run)
+    params = _get_pre_processing_params(context, run, rebin)
+    if context.gui_context.get('DeadTimeSource') == 'FromFile' and 'DeadTimeTable' in params:
+        # The table comes with the loaded data
+        params['DeadTimeTable'] = 'FromFile'
+    return (weakref.ref(entry) if entry is not None else None), params
+
+
+def group_inputs(context, group_name, run, rebin):
+    """
+    Everything the counts and asymmetry workspaces of a group depend on: the inputs of the
+    pre-processing followed by the MuonGroupingCounts and MuonGroupingAsymmetry parameters.
+    """
+    return pre_processing_inputs(context, run, rebin) + (_get_MuonGroupingCounts_parameters(context, group_name, run),
+                                                         _get_MuonGroupingAsymmetry_parameters(context, group_name, run))
+
+
+def pair_inputs(context, pair_name, run, rebin):
+    """
+    Everything the asymmetry workspace of a pair depends on: the inputs of the pre-processing
+    followed by the MuonPairingAsymmetry parameters.
+    """
+    return pre_processing_inputs(context, run, rebin) + (_get_MuonPairingAsymmetry_parameters(context, pair_name, run),)
+
+
+def same_inputs(inputs, other_inputs):
+    """
+    Compare the inputs of two calculations. The loaded data is compared by the identity of its
+    entry, as that is replaced when a run is loaded again, and the parameters by value.
+    """
+    loaded, other_loaded = [ref() if ref is not None else None for ref in (inputs[0], other_inputs[0])]
+    return loaded is not None and loaded is other_loaded and inputs[1:] == other_inputs[1:]
+
+
+def run_pre_processing(context, run, rebin):
     params = _get_pre_processing_params(context, run, rebin)
     params["InputWorkspace"] = context.data_context.loaded_workspace_as_group(run)
     processed_data = algorithm_utils.run_MuonPreProcess(params)
@@ -9,7 +9,9 @@ from Muon.GUI.Common.ADSHandler.workspace_naming import (get_raw_data_workspace_
                                                          get_raw_data_directory, get_group_data_directory,
                                                          get_pair_data_directory, get_group_asymmetry_name)
 from Muon.GUI.Common.calculate_pair_and_group import calculate_group_data, calculate_pair_data, \
-    estimate_group_asymmetry_data
+    estimate_group_asymmetry_data, calculate_group_data_from_processed, calculate_pair_data_from_processed, \
+    estimate_group_asymmetry_data_from_processed, run_pre_processing, pre_processing_inputs, group_inputs, \
+    pair_inputs, same_inputs
 from Muon.GUI.Common.contexts.muon_data_context import MuonDataContext
 from Muon.GUI.Common.contexts.muon_group_pair_context import MuonGroupPairContext
 from Muon.GUI.Common.contexts.muon_gui_context import MuonGuiContext
@@ -17,6 +19,8 @@ from Muon.GUI.Common.contexts.phase_table_context import PhaseTableContext
 from Muon.GUI.Common.utilities.run_string_utils import run_list_to_string, run_string_to_list
 import Muon.GUI.Common.ADSHandler.workspace_naming as wsName
 from Muon.GUI.Common.contexts.muon_data_context import get_default_grouping
+from mantid.kernel.environment import max_threads
+from multiprocessing.pool import ThreadPool
 
 
 class MuonContext(object):
@@ -27,6 +31,10 @@ class MuonContext(object):
         self._group_pair_context = muon_group_context
         self._phase_context = muon_phase_context
         self.base_directory = base_directory
+        # Inputs of the calculated groups and pairs, and the pre-processed data of each run,
+        # so that only the workspaces whose inputs have changed are calculated again
+        self._calculated_inputs = {}
+        self._pre_processed_data = {}
 
         self.gui_context.update({'DeadTimeSource': 'None', 'LastGoodDataFromFile': True, 'selected_group_pair': ''})
 
@@ -87,24 +95,112 @@ class MuonContext(object):
                     self.group_pair_context[pair_name].show_rebin(run, directory + name)
 
     def calculate_all_pairs(self):
-        for run in self._data_context.current_runs:
-            for pair_name in self._group_pair_context.pair_names:
-                pair_asymmetry_workspace = self.calculate_pair(pair_name, run)
-                self.group_pair_context[pair_name].update_asymmetry_workspace(pair_asymmetry_workspace, run)
-
-                if self._do_rebin():
-                    pair_asymmetry_workspace = self.calculate_pair(pair_name, run, rebin=True)
-                    self.group_pair_context[pair_name].update_asymmetry_workspace(pair_asymmetry_workspace, run, rebin=True)
+        self._calculate_groups_and_pairs([], self._group_pair_context.pair_names)
 
     def calculate_all_groups(self):
+        self._calculate_groups_and_pairs(self._group_pair_context.group_names, [])
+
+    def _calculate_groups_and_pairs(self, group_names, pair_names):
+        """
+        Calculate the workspaces of the groups and pairs for all the current runs, skipping those
+        whose inputs have not changed since they were last calculated. The data of each run is
+        pre-processed once and kept for the next calculations, and the groups and pairs are
+        calculated concurrently.
+        """
+        rebin_options = [False, True] if self._do_rebin() else [False]
+        tasks = []
         for run in self._data_context.current_runs:
-            for group_name in self._group_pair_context.group_names:
-                group_workspace, group_asymmetry = self.calculate_group(group_name, run)
-                self.group_pair_context[group_name].update_workspaces(run, group_workspace, group_asymmetry, rebin=False)
-
-                if self._do_rebin():
-                    group_workspace, group_asymmetry = self.calculate_group(group_name, run, rebin=True)
-                    self.group_pair_context[group_name].update_workspaces(run, group_workspace, group_asymmetry, rebin=True)
+            for rebin in rebin_options:
+                for group_name in group_names:
+                    group = self.group_pair_context[group_name]
+                    inputs = group_inputs(self, group_name, run, rebin)
+                    if not self._is_up_to_date(('group', group_name, str(run), rebin), group, inputs) \
+                            or not group.has_workspaces(run, rebin):
+                        tasks.append(('group', group_name, group, run, rebin, inputs))
+                for pair_name in pair_names:
+                    pair = self.group_pair_context[pair_name]
+                    inputs = pair_inputs(self, pair_name, run, rebin)
+                    if not self._is_up_to_date(('pair', pair_name, str(run), rebin), pair, inputs) \
+                            or not pair.has_asymmetry_workspace(run, rebin):
+                        tasks.append(('pair', pair_name, pair, run, rebin, inputs))
+        if not tasks:
+            self._prune(rebin_options)
+            return
+
+        pool = ThreadPool(min(max_threads(), len(tasks)))
+        try:
+            # Pre-process the data of each run first, as all its groups and pairs depend on it
+            runs_to_process = dict(((str(run), rebin), (run, rebin)) for _, _, _, run, rebin, _ in tasks)
+            processed = dict(zip(runs_to_process.keys(),
+                                 pool.map(lambda run_and_rebin: self._get_pre_processed_data(*run_and_rebin),
+                                          runs_to_process.values())))
+
+            results = pool.map(lambda task: self._calculate_task(task, processed[(str(task[3]), task[4])]), tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        for (kind, name, group_or_pair, run, rebin, inputs), workspaces in zip(tasks, results):
+            if kind == 'group':
+                group_or_pair.update_workspaces(run, workspaces[0], workspaces[1], rebin=rebin)
+            else:
+                group_or_pair.update_asymmetry_workspace(workspaces, run, rebin=rebin)
+            self._calculated_inputs[(kind, name, str(run), rebin)] = (group_or_pair, inputs)
+
+        self._prune(rebin_options)
+
+    def _prune(self, rebin_options):
+        """
+        Only keep the inputs of the current groups and pairs for the current runs and rebin options. The
+        pre-processed data of a run is only kept while some of the groups and pairs which depend on it are not
+        up to date, as it is a full copy of the data of the run.
+        """
+        current_runs = [str(run) for run in self._data_context.current_runs]
+        current_names = {'group': self._group_pair_context.group_names, 'pair': self._group_pair_context.pair_names}
+        for key in list(self._calculated_inputs):
+            if key[2] not in current_runs or key[3] not in rebin_options or key[1] not in current_names[key[0]]:
+                del self._calculated_inputs[key]
+        for key in list(self._pre_processed_data):
+            if key[0] not in current_runs or key[1] not in rebin_options:
+                del self._pre_processed_data[key]
+        for run in self._data_context.current_runs:
+            for rebin in rebin_options:
+                if (str(run), rebin) in self._pre_processed_data and self._dependants_are_up_to_date(run, rebin):
+                    del self._pre_processed_data[(str(run), rebin)]
+
+    def _dependants_are_up_to_date(self, run, rebin):
+        for group_name in self._group_pair_context.group_names:
+            if not self._is_up_to_date(('group', group_name, str(run), rebin), self.group_pair_context[group_name],
+                                       group_inputs(self, group_name, run, rebin)):
+                return False
+        for pair_name in self._group_pair_context.pair_names:
+            if not self._is_up_to_date(('pair', pair_name, str(run), rebin), self.group_pair_context[pair_name],
+                                       pair_inputs(self, pair_name, run, rebin)):
+                return False
+        return True
+
+    def _is_up_to_date(self, key, group_or_pair, inputs):
+        if key not in self._calculated_inputs:
+            return False
+        calculated_for, calculated_inputs = self._calculated_inputs[key]
+        return calculated_for is group_or_pair and same_inputs(inputs, calculated_inputs)
+
+    def _get_pre_processed_data(self, run, rebin):
+        inputs = pre_processing_inputs(self, run, rebin)
+        key = (str(run), rebin)
+        if key in self._pre_processed_data and same_inputs(inputs, self._pre_processed_data[key][0]):
+            return self._pre_processed_data[key][1]
+        processed_data = run_pre_processing(self, run, rebin)
+        self._pre_processed_data[key] = (inputs, processed_data)
+        return processed_data
+
+    def _calculate_task(self, task, processed_data):
+        kind, name, _, run, _, _ = task
+        if kind == 'group':
+            return (calculate_group_data_from_processed(self, name, run, processed_data),
+                    estimate_group_asymmetry_data_from_processed(self, name, run, processed_data))
+        else:
+            return calculate_pair_data_from_processed(self, name, run, processed_data)
 
     def update_current_data(self):
         # Update the current data; resetting the groups and pairs to their default values
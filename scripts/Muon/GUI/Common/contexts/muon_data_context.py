@@ -175,6 +175,10 @@ class MuonDataContext(object):
         else:
             return None
 
+    def get_loaded_entry_for_run(self, run):
+        """The MuonLoadData entry of a run, which stays the same until the run is loaded again"""
+        return self._loaded_data.get_data(run=run, instrument=self.instrument)
+
     def loaded_workspace_as_group(self, run):
         if self.is_multi_period():
             workspace_group = WorkspaceGroup()
@@ -32,7 +32,8 @@ class LoadRunWidgetModel(object):
         failed_files = []
         for filename in self._filenames:
             try:
-                ws, run, filename = load_utils.load_workspace_from_filename(filename)
+                ws, run, filename = self._loaded_data_store.take_loaded_ahead(filename) or \
+                    load_utils.load_workspace_from_filename(filename)
             except Exception as error:
                 failed_files += [(filename, error)]
                 continue
@@ -49,6 +50,13 @@ class LoadRunWidgetModel(object):
     def cancel(self):
         pass
 
+    def load_ahead(self, filenames):
+        self._loaded_data_store.load_ahead(filenames)
+
+    @property
+    def load_ahead_runs(self):
+        return self._loaded_data_store.load_ahead_runs
+
     def clear_loaded_data(self):
         self._loaded_data_store.clear()
 
@@ -150,6 +150,8 @@ class LoadRunWidgetPresenter(object):
 
         file_name = file_utils.file_path_for_instrument_and_run(self.get_current_instrument(), new_run)
         self.load_runs([file_name])
+        self.load_ahead([new_run + step for step in range(1, self._model.load_ahead_runs + 1)
+                         if not self._model.current_run or new_run + step <= self._model.current_run[0]])
 
     def handle_decrement_run(self):
         decremented_run_list = self.get_decremented_run_list()
@@ -160,6 +162,12 @@ class LoadRunWidgetPresenter(object):
 
         file_name = file_utils.file_path_for_instrument_and_run(self.get_current_instrument(), new_run)
         self.load_runs([file_name])
+        self.load_ahead([new_run - step for step in range(1, self._model.load_ahead_runs + 1) if new_run - step > 0])
+
+    def load_ahead(self, runs):
+        """Load the runs the user is likely to step to next in the background"""
+        self._model.load_ahead([file_utils.file_path_for_instrument_and_run(self.get_current_instrument(), run)
+                                for run in runs])
 
     def get_incremented_run_list(self):
         """
@@ -89,6 +89,13 @@ class MuonGroup(object):
             self._counts_workspace.update({str(run): MuonWorkspaceWrapper(counts_workspace)})
             self._asymmetry_estimate.update({str(run): MuonWorkspaceWrapper(asymmetry_workspace)})
 
+    def has_workspaces(self, run, rebin):
+        if rebin:
+            workspaces = (self._counts_workspace_rebin, self._asymmetry_estimate_rebin)
+        else:
+            workspaces = (self._counts_workspace, self._asymmetry_estimate)
+        return all(str(run) in workspace and workspace[str(run)].exists for workspace in workspaces)
+
     def update_counts_workspace(self, counts_workspace, run):
         self._counts_workspace.update({run: MuonWorkspaceWrapper(counts_workspace)})
 
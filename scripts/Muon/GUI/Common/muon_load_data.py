@@ -6,8 +6,96 @@
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
 
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+
+from Muon.GUI.Common.ADSHandler.muon_workspace_wrapper import MuonWorkspaceWrapper
 import Muon.GUI.Common.utilities.load_utils as load_utils
 
+# Parameters with an index, for fast look ups of the entries
+INDEXED_PARAMETERS = ('run', 'filename', 'instrument')
+# Default memory limit of the loaded workspaces, in bytes
+DEFAULT_MEMORY_LIMIT = 4 * 1024 ** 3
+
+
+def _hashable(value):
+    """Hashable equivalent of a parameter value, or None if it cannot be indexed"""
+    if isinstance(value, list):
+        value = tuple(_hashable(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return value
+
+
+def _memory_size(loaded_workspace):
+    """Memory used by the workspaces of a load result which are not in the ADS"""
+    try:
+        wrappers = dict.__getitem__(loaded_workspace, 'OutputWorkspace')
+    except (KeyError, TypeError):
+        return 0
+    if wrappers is None:
+        return 0
+    size = 0
+    for wrapper in wrappers:
+        if isinstance(wrapper, MuonWorkspaceWrapper) and wrapper.is_hidden:
+            size += wrapper.workspace.getMemorySize()
+    return size
+
+
+class _LoadedEntry(dict):
+    """
+    An entry of MuonLoadData. Accessing the workspace of an entry marks it as recently used, and loads
+    the file again if the workspace was evicted to save memory. Entries may be read from several threads.
+    """
+
+    def __init__(self, store, *args, **kwargs):
+        super(_LoadedEntry, self).__init__(*args, **kwargs)
+        self._store = store
+        self.evicted = False
+
+    def __getitem__(self, key):
+        if key == 'workspace':
+            # An evicted load result keeps its other outputs, so the file is only loaded again when its
+            # OutputWorkspace is read
+            reload = not isinstance(super(_LoadedEntry, self).get(key), _LoadedWorkspace)
+            self._store._use(self, reload=reload)
+        return super(_LoadedEntry, self).__getitem__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+class _LoadedWorkspace(dict):
+    """
+    The load result held by an entry of MuonLoadData. Only its OutputWorkspace is released when the entry is
+    evicted, and reading it loads the file again. The other outputs, such as TimeZero, FirstGoodData and
+    DataDeadTimeTable, are small and stay available.
+    """
+
+    def __init__(self, entry, *args, **kwargs):
+        super(_LoadedWorkspace, self).__init__(*args, **kwargs)
+        self._entry = entry
+
+    def __getitem__(self, key):
+        if key == 'OutputWorkspace':
+            self._entry._store._use(self._entry)
+        return super(_LoadedWorkspace, self).__getitem__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        self._entry._store._use(self._entry)
+        return super(_LoadedWorkspace, self).items()
+
+    def values(self):
+        self._entry._store._use(self._entry)
+        return super(_LoadedWorkspace, self).values()
+
 
 class MuonLoadData:
     """
@@ -25,18 +113,40 @@ class MuonLoadData:
     - Clients responsibility to prevent duplicated entries.
     - Clients responsibility to ensure the entries are correct (i.e. no validation is performed).
 
+    The entries are indexed by run, filename and instrument. When the workspaces which are not in the ADS take more
+    than memory_limit bytes, the workspaces of the least recently used entries which were loaded from a file are
+    released, and loaded again from the file when they are next needed. Entries whose workspaces have all been
+    shown in the ADS are never released, as that would not free any memory. Runs can also be loaded in the background
+    with load_ahead, ready for when they are requested.
+
     The instance of this class is intended to be shared between all models in the load widget (the parent, run and file
     widgets).
     """
 
-    def __init__(self):
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, load_ahead_runs=0):
         """
         Hard code any parameters and their default values that are needed to be stored. The name given here
         can then be used as a keyword into any of the methods of the class. Use singular
         nouns.
+
+        :param memory_limit: memory limit of the loaded workspaces in bytes, or 0 for no limit
+        :param load_ahead_runs: number of following runs to load in the background when stepping through runs
         """
         self.params = []
         self.defaults = {"run": 0, "workspace": [], "filename": "", 'instrument': ''}
+        self.memory_limit = memory_limit
+        self.load_ahead_runs = load_ahead_runs
+
+        self._index = dict((name, {}) for name in INDEXED_PARAMETERS)
+        self._recently_used = OrderedDict()
+        # Guards the recently used entries and the reloading of evicted workspaces, which
+        # happen whenever a workspace is read, possibly from a worker thread
+        self._use_lock = threading.RLock()
+        self._load_ahead_pool = None
+        self._loaded_ahead = OrderedDict()
+        # Files which were discarded while waiting to be loaded ahead
+        self._discarded_ahead = set()
+        self._load_ahead_lock = threading.Lock()
 
     def __iter__(self):
         self._n = -1
@@ -66,23 +176,32 @@ class MuonLoadData:
     # Adding/removing data
 
     def add_data(self, **kwargs):
-        new_entry = {}
+        new_entry = _LoadedEntry(self)
         for key, value in self.defaults.items():
             new_entry[key] = kwargs.get(key, self.defaults[key])
-        self.params.append(new_entry)
+        if type(new_entry['workspace']) is dict:
+            dict.__setitem__(new_entry, 'workspace', _LoadedWorkspace(new_entry, dict.get(new_entry, 'workspace')))
+        with self._use_lock:
+            self.params.append(new_entry)
+            for name in INDEXED_PARAMETERS:
+                value = _hashable(new_entry[name])
+                if value is not None:
+                    self._index[name].setdefault(value, []).append(new_entry)
+            self._use(new_entry, loaded=True)
 
     def remove_data(self, **kwargs):
-        indices = [i for i, j in enumerate(self._matches(**kwargs)) if not j]
-        self.params = [self.params[i] for i in indices]
+        removed = self._find(**kwargs)
+        if removed:
+            self._keep([entry for entry in self.params if not any(entry is item for item in removed)])
 
     def clear(self):
-        self.params = []
+        self._keep([])
 
     def remove_nth_last_entry(self, n):
         """Remove the nth last entry given to the instance by add_data, n=1 refers to the most
         recently added."""
         keep_indices = [i for i in range(self.num_items()) if i != self.num_items() - n]
-        self.params = [self.params[i] for i in keep_indices]
+        self._keep([self.params[i] for i in keep_indices])
 
     def remove_current_data(self):
         """Remove the most recently added data item"""
@@ -92,23 +211,45 @@ class MuonLoadData:
         """Remove the data item before the current one"""
         self.remove_nth_last_entry(2)
 
+    def _keep(self, entries):
+        """Keep only the given entries, and rebuild the index"""
+        index = dict((name, {}) for name in INDEXED_PARAMETERS)
+        for entry in entries:
+            for name in INDEXED_PARAMETERS:
+                value = _hashable(dict.get(entry, name))
+                if value is not None:
+                    index[name].setdefault(value, []).append(entry)
+        kept = set(id(entry) for entry in entries)
+        with self._use_lock:
+            self.params = entries
+            self._index = index
+            for key in [key for key in self._recently_used if key not in kept]:
+                del self._recently_used[key]
+
     # Searching
 
-    def _matches(self, **kwargs):
-        matches = []
+    @staticmethod
+    def _entry_matches(entry, kwargs):
+        return all(key in entry and entry.get(key) == value for key, value in kwargs.items())
 
-        for entries in self.params:
-            matching_parameters = [entries.get(key) == kwargs.get(key) for key in entries]
-            if sum(matching_parameters) >= len(kwargs):
-                matches.append(True)
-            else:
-                matches.append(False)
+    def _matches(self, **kwargs):
+        return [self._entry_matches(entry, kwargs) for entry in self.params]
 
-        return matches
+    def _find(self, **kwargs):
+        """The matching entries, in the order they were added, looked up through the index where possible"""
+        candidates = self.params
+        for name in INDEXED_PARAMETERS:
+            if name in kwargs:
+                value = _hashable(kwargs[name])
+                if value is not None:
+                    indexed = self._index[name].get(value, [])
+                    if len(indexed) < len(candidates):
+                        candidates = indexed
+        return [entry for entry in candidates if self._entry_matches(entry, kwargs)]
 
     def contains_n(self, **kwargs):
         """Counts the number of matching entries where at least one of kwargs matches"""
-        return sum(self._matches(**kwargs))
+        return len(self._find(**kwargs))
 
     def contains(self, **kwargs):
         """Does the data contain a match to at least one of the supplied keyword values"""
@@ -119,10 +260,9 @@ class MuonLoadData:
             return False
 
     def get_data(self, **kwargs):
-        if self.contains_n(**kwargs) == 1:
-            indices = [i for i, val in enumerate(self._matches(**kwargs)) if val is True]
-            index = indices[0]
-            return self.params[index]
+        matches = self._find(**kwargs)
+        if len(matches) == 1:
+            return matches[0]
 
     def get_latest_data(self):
         if self.num_items() > 0:
@@ -137,3 +277,121 @@ class MuonLoadData:
             return self.get_data(**kwargs)['workspace']['MainFieldDirection']
         else:
             return None
+
+    # Memory management
+
+    def _use(self, entry, loaded=False, reload=True):
+        """
+        Mark the entry as the most recently used, loading its workspace again if it was evicted and reload is
+        True. Memory is only reclaimed when a workspace has been loaded, as that is the only time the memory in
+        use grows.
+        """
+        with self._use_lock:
+            key = id(entry)
+            self._recently_used.pop(key, None)
+            self._recently_used[key] = entry
+            if entry.evicted and reload:
+                workspace, _, _ = self.take_loaded_ahead(dict.get(entry, 'filename')) or \
+                    load_utils.load_workspace_from_filename(dict.get(entry, 'filename'))
+                loaded_workspace = dict.get(entry, 'workspace')
+                if isinstance(loaded_workspace, _LoadedWorkspace):
+                    # Update the load result in place, as it may be held outside of this entry
+                    dict.update(loaded_workspace, workspace)
+                else:
+                    dict.__setitem__(entry, 'workspace', workspace)
+                entry.evicted = False
+                loaded = True
+            if self.memory_limit and loaded:
+                self._evict(entry)
+
+    def _evict(self, entry_in_use):
+        """
+        Release the workspaces of the least recently used entries until they fit in the memory limit. The sizes
+        are measured now rather than when the entries were added, as their workspaces may since have been put
+        in the ADS, and releasing those would free nothing. The files loaded ahead which have not been taken yet
+        count towards the memory in use as well.
+        """
+        sizes = OrderedDict((key, _memory_size(dict.get(entry, 'workspace')))
+                            for key, entry in self._recently_used.items() if not entry.evicted)
+        used_memory = sum(sizes.values()) + self._loaded_ahead_memory_size()
+        for key, size in sizes.items():
+            if used_memory <= self.memory_limit:
+                break
+            entry = self._recently_used[key]
+            if entry is entry_in_use or size == 0 or not self._can_reload(entry):
+                continue
+            used_memory -= size
+            loaded_workspace = dict.get(entry, 'workspace')
+            if isinstance(loaded_workspace, _LoadedWorkspace):
+                dict.__setitem__(loaded_workspace, 'OutputWorkspace', None)
+            else:
+                dict.__setitem__(entry, 'workspace', None)
+            entry.evicted = True
+
+    @staticmethod
+    def _can_reload(entry):
+        filename = dict.get(entry, 'filename')
+        return bool(filename) and os.path.isfile(filename)
+
+    # Loading ahead
+
+    def load_ahead(self, filenames):
+        """
+        Load the files in the background, so that they are ready when the runs are requested. Only the
+        load_ahead_runs first files are loaded, and the oldest files loaded ahead are discarded so that
+        at most load_ahead_runs + 1 are kept. Files which are discarded before their load has started are not
+        loaded at all.
+        """
+        filenames = filenames[:self.load_ahead_runs]
+        if not filenames:
+            return
+        with self._load_ahead_lock:
+            if self._load_ahead_pool is None:
+                self._load_ahead_pool = ThreadPool(1)
+            for filename in filenames:
+                if filename not in self._loaded_ahead and not self.contains(filename=filename):
+                    self._discarded_ahead.discard(filename)
+                    self._loaded_ahead[filename] = self._load_ahead_pool.apply_async(self._load_ahead_file,
+                                                                                     (filename,))
+            while len(self._loaded_ahead) > self.load_ahead_runs + 1:
+                filename, result = self._loaded_ahead.popitem(last=False)
+                if not result.ready():
+                    self._discarded_ahead.add(filename)
+
+    def _load_ahead_file(self, filename):
+        with self._load_ahead_lock:
+            if filename in self._discarded_ahead:
+                self._discarded_ahead.discard(filename)
+                return None
+        result = load_utils.load_workspace_from_filename(filename)
+        # A thread holding the lock may be waiting for this result, and it reclaims memory itself once it has it
+        if self.memory_limit and self._use_lock.acquire(False):
+            try:
+                self._evict(None)
+            finally:
+                self._use_lock.release()
+        return result
+
+    def _loaded_ahead_memory_size(self):
+        """Memory used by the files which have been loaded ahead but not taken yet"""
+        with self._load_ahead_lock:
+            results = list(self._loaded_ahead.values())
+        size = 0
+        for result in results:
+            if result.ready() and result.successful() and result.get() is not None:
+                size += _memory_size(result.get()[0])
+        return size
+
+    def take_loaded_ahead(self, filename):
+        """
+        The result of load_utils.load_workspace_from_filename for a file loaded ahead, waiting for the load to
+        finish if needed, or None if the file was not loaded ahead or could not be loaded.
+        """
+        with self._load_ahead_lock:
+            result = self._loaded_ahead.pop(filename, None)
+        if result is None:
+            return None
+        try:
+            return result.get()
+        except Exception:
+            return None
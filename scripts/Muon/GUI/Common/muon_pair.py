@@ -87,6 +87,10 @@ class MuonPair(object):
         else:
             self.workspace_rebin.update({str(run): MuonWorkspaceWrapper(asymmetry_workspace)})
 
+    def has_asymmetry_workspace(self, run, rebin=False):
+        workspace = self.workspace_rebin if rebin else self._workspace
+        return str(run) in workspace and workspace[str(run)].exists
+
     def get_asymmetry_workspace_names(self, runs):
         workspace_list = []
 
@@ -60,7 +60,7 @@ class MuonAnalysisGui(QtWidgets.QMainWindow):
             self.warning_popup(error.args[0])
 
         # initialise the data storing classes of the interface
-        self.loaded_data = MuonLoadData()
+        self.loaded_data = MuonLoadData(load_ahead_runs=2)
         self.data_context = MuonDataContext(self.loaded_data)
         self.gui_context = MuonGuiContext()
         self.group_pair_context = MuonGroupPairContext(self.data_context.check_group_contains_valid_detectors)
@@ -288,7 +288,7 @@ def detect_he(wvec, rad, atms, t2rad):
     else:
         reff = (rad*(1.0-t2rad))
         var = 2.0 * (rad*(1.0-t2rad)) * (const*atms)
-        if wvec < (var*1.0e-18):
+        if np.any(np.asarray(wvec) < (var*1.0e-18)):
             raise ValueError('Error with size of wavevector for input pars')
         else:
             alf = var/wvec
@@ -394,39 +394,46 @@ def tube_mts(alf):
               -3.7678839381882767e-10, 1.1723938486696284e-11, 7.0125182882740944e-11, 7.5127332133106960e-12,
               -1.2478237332302910e-11, -3.8880659802842388e-12, 1.7635456983633446e-12, 1.2439449470491581e-12,
               -9.4195068411906391e-14, -3.4105815394092076e-13]
-    if alf < 0:
+    coeffs_f = (c_eff_f, c_del_f, c_xsqr_f, c_vx_f, c_vy_f)
+    coeffs_g = (c_eff_g, c_del_g, c_xsqr_g, c_vx_g, c_vy_g)
+    if np.any(np.asarray(alf) < 0):
         raise ValueError('alf < 0, invalid choice')
-    else:
+    elif not np.shape(alf):
         if alf <= 9.0:
-            eff = (np.pi/4.00) * alf * chbmts(0.00, 10.00, c_eff_f, 25, alf)
-            delta = -0.125 *alf * chbmts(0.00, 10.00, c_del_f, 25, alf)
-            xsqr = 0.25 * chbmts(0.00, 10.00, c_xsqr_f, 25, alf)
-            vx = 0.25 * chbmts(0.00, 10.00, c_vx_f, 25, alf)
-            vy = 0.25 * chbmts(0.00, 10.00, c_vy_f, 25, alf)
+            return _tube_mts_f(alf, coeffs_f)
         elif alf >= 10.00:
-            y = 1.0 - 18.0/alf
-            eff = 1.00 - chbmts(-1.00, 1.00, c_eff_g, 25, y)/alf**2
-            delta = (2.0*chbmts(-1.00, 1.00, c_del_g, 25, y)/alf - 0.25*np.pi) / eff
-            xsqr = ((-np.pi/alf)* chbmts(-1.00, 1.00, c_xsqr_g, 25, y) + 2.0/3.0) / eff
-            vx = g0 + g1*chbmts(-1.00, 1.00, c_vx_g, 25, y)/(alf**2)
-            vy = (-chbmts(-1.00, 1.00, c_vy_g, 25, y)/(alf**2) + 1.0/3.0) / eff
-        else:
-            eff_f = (np.pi/4.00) * alf * chbmts(0.00, 10.00, c_eff_f, 25, alf)
-            del_f = -0.125 * alf * chbmts(0.00, 10.00, c_del_f, 25, alf)
-            xsqr_f = 0.25*chbmts(0.00, 10.00, c_xsqr_f, 25, alf)
-            vx_f = 0.25*chbmts(0.00, 10.00, c_vx_f, 25, alf)
-            vy_f = 0.25*chbmts(0.00, 10.00, c_vy_f, 25, alf)
-            y = 1.0 - 18.0/alf
-            eff_g = 1.00 - chbmts(-1.00, 1.00, c_eff_g, 25, y)/alf**2
-            del_g = (2.0*chbmts(-1.00, 1.00, c_del_g, 25, y)/alf - 0.25*np.pi) / eff_g
-            xsqr_g = ((-np.pi/alf)*chbmts(-1.00, 1.00, c_xsqr_g, 25, y) + 2.0/3.0) / eff_g
-            vx_g = g0 + g1*chbmts(-1.00, 1.00, c_vx_g, 25, y)/(alf**2)
-            vy_g = (-chbmts(-1.00, 1.00, c_vy_g, 25, y)/(alf**2) + 1.0/3.0) / eff_g
-            eff = (10.0-alf)*eff_f + (alf-9.0)*eff_g
-            delta = (10.0-alf)*del_f + (alf-9.0)*del_g
-            xsqr = (10.0-alf)*xsqr_f + (alf-9.0)*xsqr_g
-            vx = (10.0-alf)*vx_f + (alf-9.0)*vx_g
-            vy = (10.0-alf)*vy_f + (alf-9.0)*vy_g
+            return _tube_mts_g(alf, coeffs_g, g0, g1)
+    # For arrays (or 9 < alf < 10) both approximations are evaluated and the results for each alf selected or
+    # combined, which gives the same results as for a single alf
+    alf = np.asarray(alf, dtype=np.float64)
+    with np.errstate(all='ignore'):
+        moments_f = _tube_mts_f(alf, coeffs_f)
+        moments_g = _tube_mts_g(alf, coeffs_g, g0, g1)
+    eff, delta, xsqr, vx, vy = tuple(np.where(alf <= 9.0, f, np.where(alf >= 10.0, g, (10.0-alf)*f + (alf-9.0)*g))[()]
+                                     for f, g in zip(moments_f, moments_g))
+    return eff, delta, xsqr, vx, vy
+
+
+def _tube_mts_f(alf, coeffs):
+    # Chebyshev approximations for 0 =< alf =< 9
+    c_eff_f, c_del_f, c_xsqr_f, c_vx_f, c_vy_f = coeffs
+    eff = (np.pi/4.00) * alf * chbmts(0.00, 10.00, c_eff_f, 25, alf)
+    delta = -0.125 *alf * chbmts(0.00, 10.00, c_del_f, 25, alf)
+    xsqr = 0.25 * chbmts(0.00, 10.00, c_xsqr_f, 25, alf)
+    vx = 0.25 * chbmts(0.00, 10.00, c_vx_f, 25, alf)
+    vy = 0.25 * chbmts(0.00, 10.00, c_vy_f, 25, alf)
+    return eff, delta, xsqr, vx, vy
+
+
+def _tube_mts_g(alf, coeffs, g0, g1):
+    # Chebyshev approximations for 10 =< alf =< (infinity)
+    c_eff_g, c_del_g, c_xsqr_g, c_vx_g, c_vy_g = coeffs
+    y = 1.0 - 18.0/alf
+    eff = 1.00 - chbmts(-1.00, 1.00, c_eff_g, 25, y)/alf**2
+    delta = (2.0*chbmts(-1.00, 1.00, c_del_g, 25, y)/alf - 0.25*np.pi) / eff
+    xsqr = ((-np.pi/alf)* chbmts(-1.00, 1.00, c_xsqr_g, 25, y) + 2.0/3.0) / eff
+    vx = g0 + g1*chbmts(-1.00, 1.00, c_vx_g, 25, y)/(alf**2)
+    vy = (-chbmts(-1.00, 1.00, c_vy_g, 25, y)/(alf**2) + 1.0/3.0) / eff
     return eff, delta, xsqr, vx, vy
 
 
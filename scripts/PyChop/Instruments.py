@@ -11,6 +11,7 @@ and methods which then call either Chop.py or MulpyRep.py to do the resolution c
 
 from __future__ import (absolute_import, division, print_function)
 from six import string_types
+from collections import OrderedDict
 import numpy as np
 import yaml
 import warnings
@@ -26,6 +27,8 @@ SIGMA2FWHMSQ = SIGMA2FWHM ** 2
 E2V = np.sqrt((constants.e / 1000) * 2 / constants.neutron_mass) # v = E2V * sqrt(E)    veloc in m/s, E in meV
 E2L = 1.e23 * constants.h**2 / (2 * constants.m_n * constants.e) # lam = sqrt(E2L / E)  lam in Angst, E in meV
 E2K = constants.e * 2 * constants.m_n / constants.hbar**2 / 1e23 # k = sqrt(E2K * E)    k in 1/Angst, E in meV
+# Number of chopper settings for which the disk chopper opening times and reps are kept
+CACHE_SIZE = 64
 
 
 def wrap_attributes(obj, inval, allowed_var_names):
@@ -120,6 +123,9 @@ class ChopperSystem(object):
         self.overlap_ei_frac = 0.9
         self.n_frame = 1
         self._ei = None
+        # Caches of the chopper opening times and of the reps, for each chopper setting and Ei
+        self._openings_cache = OrderedDict()
+        self._reps_cache = OrderedDict()
         # Parse input values (if any)
         wrap_attributes(self, inval, self.__allowed_var_names)
         self._parse_choppers()
@@ -329,9 +335,12 @@ class ChopperSystem(object):
         if self.isFermi:
             return self._ChopDriver(Ei_in, squared), None
         else:
-            chop_times = self._MulpyRepDriver(Ei_in, calc_res=False)[1]
+            Ei = _check_input(self, Ei_in)
+            # Only the first opening of the first and last choppers is needed, not the reps
+            chop_times = [self._getOpenings(ei) for ei in np.ravel(Ei)]
             # Output of MulpyRep is FWHM in us - want it in seconds for later calculations
-            wd = ((chop_times[1][1] - chop_times[1][0]) / 2. / 1.e6, (chop_times[0][1] - chop_times[0][0]) / 2. / 1.e6)
+            wd = tuple(np.reshape([(ct[idx][0][1] - ct[idx][0][0]) / 2. / 1.e6 for ct in chop_times], np.shape(Ei))[()]
+                       for idx in [-1, 0])
             return (wd[0]**2, wd[1]**2) if squared else wd
 
     def getDistances(self):
@@ -351,7 +360,7 @@ class ChopperSystem(object):
             return self.packages[self.package].getTransmission(Ei, freq) * magic / fudge
         else:
             # For disk choppers, transmission goes quadratic with freq at high resolution, linear at low
-            freqdep = (self.flux_ref_freq / freq)**2 if hires else  (self.flux_ref_freq / freq)
+            freqdep = np.where(hires, (self.flux_ref_freq / freq)**2, (self.flux_ref_freq / freq))[()]
             return (self.slot_width[-1] / self.flux_ref_slot) * freqdep
 
     def setNFrame(self, value):
@@ -359,7 +368,24 @@ class ChopperSystem(object):
         self._instpar[9] = [self.source_rep, value]
 
     def _get_state(self, Ei_in=None):
-        return hash((self.variant, self.package, tuple(self.frequency), tuple(self.phase), Ei_in if Ei_in else self.ei, self.n_frame))
+        return (self.variant, self.package, tuple(self.frequency), tuple(self.phase), Ei_in if Ei_in else self.ei, self.n_frame)
+
+    def _cached(self, cache, Ei, calculate):
+        # Looks up the result of calculate() for the current chopper setting and Ei, keeping the most recently used
+        state = self._get_state(Ei)
+        if state in cache:
+            result = cache.pop(state)
+        else:
+            result = calculate()
+            while len(cache) >= CACHE_SIZE:
+                cache.popitem(last=False)
+        cache[state] = result
+        return result
+
+    def _getOpenings(self, Ei):
+        """Private method to get the opening times of each chopper when focussed on Ei"""
+        return self._cached(self._openings_cache, Ei,
+                            lambda: MulpyRep.calcChopOpenings(Ei, self._long_frequency, self._instpar, self.phase))
 
     def _removeLowIntensityReps(self, Eis, lines, Ei=None):
         # Removes reps with Ei where there are no neutrons
@@ -377,12 +403,13 @@ class ChopperSystem(object):
     def _MulpyRepDriver(self, Ei_in=None, calc_res=True):
         """Private method to calculate resolution for given Ei from chopper opening times"""
         Ei = _check_input(self, Ei_in)
-        if '_saved_state' not in self.__dict__ or (self._saved_state[0] != self._get_state(Ei)):
+
+        def calculate():
             Eis, all_times, chop_times, lastChopDist, lines = MulpyRep.calcChopTimes(Ei, self._long_frequency, self._instpar, self.phase)
             Eis, lines = self._removeLowIntensityReps(Eis, lines, Ei)
-            self._saved_state = [self._get_state(Ei), Eis, chop_times, lastChopDist, lines, all_times]
-        else:
-            Eis, chop_times, lastChopDist, lines, all_times = tuple(self._saved_state[1:])
+            return Eis, chop_times, lastChopDist, lines, all_times
+
+        Eis, chop_times, lastChopDist, lines, all_times = self._cached(self._reps_cache, Ei, calculate)
         if calc_res:
             res_el, percent, chop_width, mod_width = MulpyRep.calcRes(Eis, chop_times, lastChopDist, self.chop_sam,
                                                                       self.sam_det, self.guide_width[-1], self.slot_width[-1])
@@ -560,13 +587,15 @@ class Moderator(object):
     def getWidthSquared(self, Ei):
         """ Returns the squared time gaussian FWHM width due to the sample in s^2 """
         if hasattr(self, 'width_interp'):
-            wavelength = np.sqrt(E2L / (Ei if not hasattr(Ei, '__len__') else Ei[0]))
-            if wavelength >= self.wmn:
+            wavelength = np.sqrt(E2L / np.asarray(Ei, dtype=np.float64))
+            measured = wavelength >= self.wmn
+            if np.any(measured):
                 # Data is obtained from measuring widths of powder Bragg peaks in backscattering
                 # At low wavelengths / high energies, the peaks are too close together to discern
                 # so there is no measurements, but the analytical expressions should still be good.
-                width = self.width_interp(min([wavelength, self.wmx]))**2 / 1e12
-                return (width * SIGMA2FWHMSQ) if self.measured_width['isSigma'] else width
+                width = self.width_interp(np.clip(wavelength, self.wmn, self.wmx))**2 / 1e12
+                width = (width * SIGMA2FWHMSQ) if self.measured_width['isSigma'] else width
+                return width if np.all(measured) else np.where(measured, width, self.getAnalyticWidthsSquared(Ei))
         return self.getAnalyticWidthsSquared(Ei)
 
     def getWidth(self, Ei):
@@ -596,7 +625,7 @@ class Moderator(object):
         """ Interpolates flux from a table of measured flux """
         if not hasattr(self, 'flux_interp'):
             raise AttributeError('This instrument does not have a table of measured flux')
-        wavelength = [min(max(l, self.fmn), self.fmx) for l in np.sqrt(E2L / np.array(Ei if hasattr(Ei, '__len__') else [Ei]))]
+        wavelength = np.clip(np.sqrt(E2L / np.array(Ei if hasattr(Ei, '__len__') else [Ei])), self.fmn, self.fmx)
         return self.flux_interp(wavelength)
 
     @property
@@ -791,6 +820,51 @@ class Instrument(object):
             Etrans = np.linspace(0.05, 0.95, 19, endpoint=True)
         return [self.getResolution(Etrans * ei, ei, frequency) for ei in self.getAllowedEi(Ei)]
 
+    def getResFluxScan(self, Ei, frequency=None, Etrans=0.):
+        """
+        Calculates the resolution and flux for many incident energies and chopper settings at once
+
+        res, flux = getResFluxScan(eis)
+        res, flux = getResFluxScan(eis, [[240, 120], [280, 140]])
+        res, flux = getResFluxScan(eis, [300, 400, 500], etrans)
+
+        Inputs:
+            Ei - list or numpy array of incident energies (meV)
+            frequency - list of chopper frequency settings, each as accepted by setFrequency [default: preset frequency]
+            Etrans - energy transfer or list of energy transfers (meV) [default: 0, elastic]
+
+        Outputs:
+            res - the incoherent (Vanadium) energy FWHM in meV, shape (# of frequencies) x (# of Ei) x (# of Etrans)
+            flux - the monochromatic flux in n/cm^2/s, shape (# of frequencies) x (# of Ei)
+
+        For each setting, the results are the same as those of getResFlux(Etrans, ei, frequency) for each ei.
+        """
+        Ei = np.array(Ei, dtype=np.float64, ndmin=1)
+        Etrans = np.array(Etrans, dtype=np.float64, ndmin=1)
+        frequencies = [self.frequency] if frequency is None else frequency
+        x2 = self.chopper_system.sam_det
+        # Final energies, shape: Ei x Etrans
+        Ef = Ei[:, np.newaxis] - Etrans
+        resolution = np.zeros((len(frequencies), len(Ei), len(Etrans)))
+        flux = np.zeros((len(frequencies), len(Ei)))
+        oldfreq = self.frequency
+        try:
+            for idx, freq in enumerate(frequencies):
+                self.frequency = freq
+                v_van, _, _ = self._getVanVar(Ei, Etrans)
+                resolution[idx] = (2 * E2V * np.sqrt(Ef**3 * v_van)) / x2
+                if self.isFermi:
+                    isHires = False
+                else:
+                    v_el, _, _ = self._getVanVar(Ei, np.array([0.]))
+                    isHires = ((2 * E2V * np.sqrt(Ei**3 * v_el[:, 0])) / x2 / Ei) <= 0.02
+                isHires = np.broadcast_to(isHires, np.shape(Ei))
+                flux[idx] = np.ravel([self.moderator.getFlux(ei) * self.chopper_system.getTransmission(ei, hires=hires)
+                                      for ei, hires in zip(Ei, isHires)])
+        finally:
+            self.frequency = oldfreq
+        return resolution, flux
+
     def getVanVar(self, Ei_in=None, frequency=None, Etrans=0):
         """ Calculates the time squared FWHM in s^2 at the sample (Vanadium widths) for different components """
         Ei, _ = _check_input(self.chopper_system, Ei_in, frequency)
@@ -798,8 +872,26 @@ class Instrument(object):
         if frequency:
             oldfreq = self.frequency
             self.frequency = frequency
-        tsqmod = self.moderator.getWidthSquared(Ei)
-        tsqchp = self.chopper_system.getWidthSquared(Ei)
+        vsqvan, outdic, tsqmodchop = self._getVanVar(Ei, Etrans)
+        if frequency:
+            self.frequency = oldfreq
+        return vsqvan, outdic, np.array(tsqmodchop)
+
+    def _getVanVar(self, Ei, Etrans):
+        """
+        Private method to calculate the Vanadium widths for an Ei, or a 1D array of Ei, and a 1D array of Etrans.
+        The widths for an array of Ei have shape Ei x Etrans.
+        """
+        # The components which only depend on Ei are calculated for each Ei and then broadcast against Etrans
+        column = (lambda x: np.reshape(x, (-1, 1))) if np.shape(Ei) else (lambda x: x)
+        if np.shape(Ei):
+            # The moderator and chopper widths are calculated for each Ei on its own, as for a single Ei
+            tsqmod = np.array([self.moderator.getWidthSquared(ei) for ei in Ei])
+            tsqchp = tuple(None if widths[0] is None else np.array(widths)
+                           for widths in zip(*[self.chopper_system.getWidthSquared(ei) for ei in Ei]))
+        else:
+            tsqmod = self.moderator.getWidthSquared(Ei)
+            tsqchp = self.chopper_system.getWidthSquared(Ei)
         tsqjit = self.tjit**2
         # Gets distances: x0=mod-final chopper, xa=aperture-final, x1=final-sample, x2=sample-det, xm=mod-first chopper
         x0, xa, x1, x2, xm = self.chopper_system.getDistances()
@@ -808,30 +900,32 @@ class Instrument(object):
             frac_dist = 1 - (xm / x0)
             tsmeff = tsqmod * frac_dist**2   # Effective moderator time at first chopper
             x0 -= xm                         # Propagate from first chopper, not from moderator (after rescaling tmod)
-            tsqmod = tsmeff if (tsqchp[1] > tsmeff) else tsqchp[1]
+            tsqmod = np.where(tsqchp[1] > tsmeff, tsmeff, tsqchp[1])[()]
         tsqchp = tsqchp[0]
-        tsqmodchop = np.array([tsqmod, tsqchp, x0])
+        tsqmodchop = (tsqmod, tsqchp, x0)
         # Propagate the time widths to the sample position
         omega = self.frequency[0] * 2 * np.pi
-        vi = E2V * np.sqrt(Ei)
-        vf = E2V * np.sqrt(Ei - Etrans)
+        vi = E2V * np.sqrt(column(Ei))
+        vf = E2V * np.sqrt(column(Ei) - Etrans)
         vratio = (vi / vf)**3
         tanthm = np.tan(self.moderator.theta_m * np.pi / 180.)
-        g1, g2 = tuple(1. - ((omega * tanthm / vi) * np.array([xa + x1, x0 - xa])))
-        f1, f2 = tuple(1. + (x1 / x0) * np.array([g1, g2]))
-        g1, g2, f1, f2 = tuple(np.array([g1, g2, f1, f2]) / (omega * (xa + x1)))
+        g1 = 1. - ((omega * tanthm / vi) * (xa + x1))
+        g2 = 1. - ((omega * tanthm / vi) * (x0 - xa))
+        f1 = 1. + (x1 / x0) * g1
+        f2 = 1. + (x1 / x0) * g2
+        g1, g2, f1, f2 = tuple(val / (omega * (xa + x1)) for val in (g1, g2, f1, f2))
         modfac = (x1 + vratio * x2) / x0
         chpfac = 1. + modfac
         apefac = f1 + ((vratio * x2 / x0) * g1)
-        tsqmod *= modfac**2
-        tsqchp *= chpfac**2
-        tsqjit *= chpfac**2
+        tsqmod = column(tsqmod) * modfac**2
+        tsqchp = column(tsqchp) * chpfac**2
+        tsqjit = tsqjit * chpfac**2
         tsqape = apefac**2 * (self.aperture_width**2 / 12.) * SIGMA2FWHMSQ
         vsqvan = tsqmod + tsqchp + tsqjit + tsqape
         outdic = {'moderator': tsqmod, 'chopper': tsqchp, 'jitter': tsqjit, 'aperture': tsqape}
         if self.has_detector and hasattr(self.detector, 'idet'):
             phi = self.detector.phi_deg * np.pi / 180.
-            tsqdet = (1. / vf)**2 * np.array([self.detector.getWidthSquared(Ei, en) for en in Etrans])
+            tsqdet = (1. / vf)**2 * self.detector.getWidthSquared(column(Ei), Etrans)
             vsqvan += tsqdet
             outdic['detector'] = tsqdet
         else:
@@ -843,8 +937,6 @@ class Instrument(object):
             tsqsam = samfac**2 * self.sample.getWidthSquared()
             vsqvan += tsqsam
             outdic['sample'] = tsqsam
-        if frequency:
-            self.frequency = oldfreq
         return vsqvan, outdic, tsqmodchop
 
     @property
@@ -27,75 +27,76 @@ def findLine(chop_times, chopDist, moderator_limits):
     chop_times: a list of the opening and closing times of the chopper within the time frame
     chopDist: a list of the distance from moderator to chopper in meters
     moderator_limits: the earliest and latest times that neutrons can leave the the moderator in microseconds
+
+    Returns an array of lines with shape (# of lines) x 2 x 2, with the gradient and intercept of the fastest
+    and slowest neutrons for each window of the chopper
     """
-    lines = []
-    for i in range(len(chop_times)):
-        # final chopper openings
-        leftM = (-chopDist) / (moderator_limits[0]-chop_times[i][0])
-        rightM = (-chopDist) / (moderator_limits[1]-chop_times[i][1])
-        leftC = -leftM*moderator_limits[0]
-        rightC = -rightM*moderator_limits[1]
-        if leftM > 0 and rightM > 0:
-            lines.append([[leftM, leftC], [rightM, rightC]])
-    return lines
+    chop_times = np.reshape(np.asarray(chop_times, dtype=np.float64), (-1, 2))
+    # final chopper openings
+    leftM = (-chopDist) / (moderator_limits[0]-chop_times[:, 0])
+    rightM = (-chopDist) / (moderator_limits[1]-chop_times[:, 1])
+    leftC = -leftM*moderator_limits[0]
+    rightC = -rightM*moderator_limits[1]
+    lines = np.stack([np.stack([leftM, leftC], axis=-1), np.stack([rightM, rightC], axis=-1)], axis=1)
+    return lines[(leftM > 0) & (rightM > 0)]
 
 
 def checkPath(chop_times, lines, chopDist, chop5Dist):
     """
-    A recursive function to check for lines which can satisfy a window in the next chopper
+    Checks for lines which can satisfy a window in each of the other choppers, starting from the
+    chopper nearest to the final chopper. All the lines are compared with all the windows of a
+    chopper at once.
+
+    Returns an array of the lines (with shape (# of lines) x 2 x 2) which pass through every chopper,
+    ordered by the line they started from and then by the chopper windows they pass through.
     """
-    if len(chop_times) > 1:
-        # recursive bit
-        lines = checkPath(chop_times[1:], lines, chopDist[1:], chop5Dist)
-    newLines = []
-    for line in lines:
-        # for each line check to see if there is an opening in the right time window
+    lines = np.reshape(np.asarray(lines, dtype=np.float64), (-1, 2, 2))
+    for times, dist in reversed(list(zip(chop_times, chopDist))):
+        times = np.reshape(np.asarray(times, dtype=np.float64), (-1, 2))
+        # for each line check to see if there is an opening in the right time window, shape: lines x 1
         # fast first
-        earlyT = (chopDist[0]-line[0][1]) / line[0][0]
+        earlyT = ((dist-lines[:, 0, 1]) / lines[:, 0, 0])[:, np.newaxis]
         # then slow
-        lateT = (chopDist[0]-line[1][1]) / line[1][0]
-
-        # then compare this time window to when this chopper is open, keep the range if it is possible
-        for i in range(len(chop_times[0])):
-            if (chop_times[0][i][0] < earlyT) and ((chop_times[0][i][1] > lateT)):
-                # the chopper window is larger than the maximum possible spread, change nothing
-                newLines.append(line)
-            elif (chop_times[0][i][0] > earlyT) and ((chop_times[0][i][1] < lateT)):
-                # both are within the window, draw a new box
-                chop5_open = (chop5Dist-line[0][1]) / line[0][0]
-                leftM = (chopDist[0]-chop5Dist) / (chop_times[0][i][0]-chop5_open)
-                leftC = chop5Dist - leftM*chop5_open
-                chop5_close = (chop5Dist-line[1][1]) / line[1][0]
-                rightM = (chopDist[0]-chop5Dist) / (chop_times[0][i][1]-chop5_close)
-                rightC = chop5Dist - rightM*chop5_close
-                newLines.append([[leftM, leftC], [rightM, rightC]])
-            elif ((chop_times[0][i][1] < lateT) and (chop_times[0][i][1] > earlyT)) and (chop_times[0][i][0] < earlyT):
-                # the left most range is fine but the right most is outside the window. Redefine it
-                chop5_close = (chop5Dist-line[1][1]) / line[1][0]
-                rightM = (chopDist[0]-chop5Dist) / (chop_times[0][i][1]-chop5_close)
-                rightC = chop5Dist - rightM*chop5_close
-                newLines.append([line[0], [rightM, rightC]])
-            elif (chop_times[0][i][1] > lateT) and ((chop_times[0][i][0] > earlyT) and (chop_times[0][i][0] < lateT)):
-                # the leftmost range is outside the chopper window
-                chop5_open = (chop5Dist-line[0][1]) / line[0][0]
-                leftM = (chopDist[0]-chop5Dist) / (chop_times[0][i][0]-chop5_open)
-                leftC = chop5Dist - leftM*chop5_open
-                newLines.append([[leftM, leftC], line[1]])
-    return newLines
+        lateT = ((dist-lines[:, 1, 1]) / lines[:, 1, 0])[:, np.newaxis]
+        # then compare this time window to when this chopper is open, shape: lines x windows
+        opens, closes = times[:, 0], times[:, 1]
+        # the chopper window is larger than the maximum possible spread, change nothing
+        keep = (opens < earlyT) & (closes > lateT)
+        # both are within the window, draw a new box
+        inside = (opens > earlyT) & (closes < lateT)
+        # the left most range is fine but the right most is outside the window. Redefine it
+        new_right = ((closes < lateT) & (closes > earlyT)) & (opens < earlyT)
+        # the leftmost range is outside the chopper window
+        new_left = (closes > lateT) & ((opens > earlyT) & (opens < lateT))
+        # The cases are exclusive, so each line and window gives at most one new line
+        chop5_open = ((chop5Dist-lines[:, 0, 1]) / lines[:, 0, 0])[:, np.newaxis]
+        leftM = (dist-chop5Dist) / (opens-chop5_open)
+        leftC = chop5Dist - leftM*chop5_open
+        chop5_close = ((chop5Dist-lines[:, 1, 1]) / lines[:, 1, 0])[:, np.newaxis]
+        rightM = (dist-chop5Dist) / (closes-chop5_close)
+        rightC = chop5Dist - rightM*chop5_close
+        newLines = np.repeat(lines[:, np.newaxis], len(times), axis=1)
+        redraw_left = inside | new_left
+        redraw_right = inside | new_right
+        newLines[redraw_left, 0, 0] = leftM[redraw_left]
+        newLines[redraw_left, 0, 1] = leftC[redraw_left]
+        newLines[redraw_right, 1, 0] = rightM[redraw_right]
+        newLines[redraw_right, 1, 1] = rightC[redraw_right]
+        lines = newLines[keep | inside | new_right | new_left]
+    return lines
 
 
 def calcEnergy(lines, samDist):
     """
     Calculates the energies of neutrons which can pass through choppering openings.
     """
-    Ei = np.zeros(len(lines))
+    lines = np.reshape(np.asarray(lines, dtype=np.float64), (-1, 2, 2))
     massN = 1.674927e-27
-    for i in range(len(lines)):
-        # look at the middle of the time window
-        x0 = -lines[i][0][1] / lines[i][0][0]
-        x1 = ((samDist-lines[i][0][1]) / lines[i][0][0] + (samDist-lines[i][1][1]) / lines[i][1][0]) / 2.
-        v = samDist / (x1 - x0)
-        Ei[i] = (v*1e6)**2 * massN / 2. / 1.60217662e-22
+    # look at the middle of the time window
+    x0 = -lines[:, 0, 1] / lines[:, 0, 0]
+    x1 = ((samDist-lines[:, 0, 1]) / lines[:, 0, 0] + (samDist-lines[:, 1, 1]) / lines[:, 1, 0]) / 2.
+    v = samDist / (x1 - x0)
+    Ei = (v*1e6)**2 * massN / 2. / 1.60217662e-22
     return Ei
 
 
@@ -178,18 +179,12 @@ def calcFlux(Ei, freq1, percent, slot):
     return flux
 
 
-def calcChopTimes(efocus, freq, instrumentpars, chop2Phase=5):
+def calcChopOpenings(efocus, freq, instrumentpars, chop2Phase=5):
     """
-    A method to calculate the various possible incident energies with a given chopper setup on LET.
-    The window of energy transfers plotted is 85% by default.
-    efocus: The incident enrgy that all choppers are focussed on
-    freq1: The frequency of the resolution choppers
-    freqpr: frequency of the pulse removal chopper
-    instrumentpars: a list of instrument parameters [see ISISDisk.py]
-    chop2Phase: the second choppers phase, adjustable to take the guessing out
+    Calculates the opening and closing times of each chopper within the time frame, for choppers focussed
+    on a given incident energy. The arguments are as for calcChopTimes.
 
-    Original Matlab code R. Bewley STFC
-    Rewritten in Python, D Voneshen STFC 2015
+    Returns a list with the list of the (opening, closing) times in microseconds of each chopper
     """
     # conversion factors
     lam2TOF = 252.7784            # the conversion from wavelength to TOF at 1m, multiply by distance
@@ -263,16 +258,37 @@ def calcChopTimes(efocus, freq, instrumentpars, chop2Phase=5):
             while realTimeOp[0] < (uSec/p_frames+next_win_t):
                 chop_times[i].append(copy.deepcopy(realTimeOp[:]))
                 realTimeOp += next_win_t
+    return chop_times
+
+
+def calcChopTimes(efocus, freq, instrumentpars, chop2Phase=5):
+    """
+    A method to calculate the various possible incident energies with a given chopper setup on LET.
+    The window of energy transfers plotted is 85% by default.
+    efocus: The incident enrgy that all choppers are focussed on
+    freq1: The frequency of the resolution choppers
+    freqpr: frequency of the pulse removal chopper
+    instrumentpars: a list of instrument parameters [see ISISDisk.py]
+    chop2Phase: the second choppers phase, adjustable to take the guessing out
+
+    Original Matlab code R. Bewley STFC
+    Rewritten in Python, D Voneshen STFC 2015
+    """
+    uSec = 1e6                    # seconds to microseconds
+    dist = instrumentpars[0]
+    samp_det, chop_samp, rep, tmod, frac_ei, ph_ind_v = tuple(instrumentpars[7:])
+    source_rep, nframe = tuple(rep[:2]) if (hasattr(rep, '__len__') and len(rep) > 1) else (rep, 1)
+
+    # the choppers are phased for the main Ei
+    chop_times = calcChopOpenings(efocus, freq, instrumentpars, chop2Phase)
     # then we look for what else gets through
     # firstly calculate the bounding box for each window in final chopper
-    lines_all = []
+    lines_all = [np.zeros((0, 2, 2))]
     for i in range(nframe):
         t0 = i * uSec / source_rep
         lines = findLine(chop_times[-1], dist[-1], [t0, t0+tmod])
-        lines = checkPath([np.array(ct)+t0 for ct in chop_times[0:-1]], lines, dist[:-1], dist[-1])
-        if lines:
-            for line in lines:
-                lines_all.append(line)
+        lines_all.append(checkPath([np.array(ct)+t0 for ct in chop_times[0:-1]], lines, dist[:-1], dist[-1]))
+    lines_all = np.concatenate(lines_all)
     # ok, now we know the possible neutron velocities. we now need their energies
     Ei = calcEnergy(lines_all, (dist[-1]+chop_samp))
     return Ei, chop_times, [chop_times[0][0], chop_times[-1][0]], dist[-1]-dist[0], lines_all
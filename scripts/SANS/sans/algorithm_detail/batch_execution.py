@@ -5,10 +5,13 @@
 #     & Institut Laue - Langevin
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
+from contextlib import contextmanager
 from copy import deepcopy
+import threading
 from mantid.api import AnalysisDataService, WorkspaceGroup
 from sans.common.general_functions import (add_to_sample_log, create_managed_non_child_algorithm, create_unmanaged_algorithm,
-                                           get_output_name, get_base_name_from_multi_period_name, get_transmission_output_name)
+                                           get_output_name, get_base_name_from_multi_period_name, get_transmission_output_name,
+                                           map_in_parallel)
 from sans.common.enums import (SANSDataType, SaveType, OutputMode, ISISReductionMode, DataType)
 from sans.common.constants import (TRANS_SUFFIX, SANS_SUFFIX, ALL_PERIODS,
                                    LAB_CAN_SUFFIX, LAB_CAN_COUNT_SUFFIX, LAB_CAN_NORM_SUFFIX,
@@ -31,10 +34,23 @@ else:
     from mantidqt.plotting.functions import plot
 
 
+# Reductions of several rows can run at the same time. Grouping, plotting and saving the output
+# is done by one reduction at a time, since it adds to workspace groups shared between rows.
+_output_lock = threading.Lock()
+
+# Files which are loaded for the first time are locked, so that when rows using the same can or
+# transmission runs are reduced at the same time only one of them loads the file. The others
+# wait for it and then pick the workspaces up from the cache.
+_load_locks = {}
+_load_locks_guard = threading.Lock()
+_loaded_files = set()
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 # Functions for the execution of a single batch iteration
 # ----------------------------------------------------------------------------------------------------------------------
-def single_reduction_for_batch(state, use_optimizations, output_mode, plot_results, output_graph, save_can=False):
+def single_reduction_for_batch(state, use_optimizations, output_mode, plot_results, output_graph, save_can=False,
+                               max_workers=1):
     """
     Runs a single reduction.
 
@@ -46,6 +62,7 @@ def single_reduction_for_batch(state, use_optimizations, output_mode, plot_resul
     :param use_optimizations: if true then the optimizations of child algorithms are enabled.
     :param output_mode: the output mode
     :param save_can: bool. whether or not to save out can workspaces
+    :param max_workers: the number of reduction packages, e.g. time slices, which may be reduced at the same time
     """
     # ------------------------------------------------------------------------------------------------------------------
     # Load the data
@@ -69,70 +86,28 @@ def single_reduction_for_batch(state, use_optimizations, output_mode, plot_resul
     # ------------------------------------------------------------------------------------------------------------------
     reduction_packages = get_reduction_packages(state, workspaces, monitors)
     # ------------------------------------------------------------------------------------------------------------------
-    # Run reductions (one at a time)
+    # Run reductions (up to max_workers at a time)
     # ------------------------------------------------------------------------------------------------------------------
-    single_reduction_name = "SANSSingleReduction"
     single_reduction_options = {"UseOptimizations": use_optimizations,
                                 "SaveCan": save_can}
-    reduction_alg = create_managed_non_child_algorithm(single_reduction_name, **single_reduction_options)
-    reduction_alg.setChild(False)
-    # Perform the data reduction
+
+    def _run(reduction_package):
+        run_reduction_package(reduction_package, single_reduction_options, workspace_to_name, workspace_to_monitor,
+                              state.data.user_file)
+
+    map_in_parallel(_run, reduction_packages, max_workers)
+
     for reduction_package in reduction_packages:
-        # -----------------------------------
-        # Set the properties on the algorithm
-        # -----------------------------------
-        set_properties_for_reduction_algorithm(reduction_alg, reduction_package,
-                                               workspace_to_name, workspace_to_monitor)
-
-        # -----------------------------------
-        #  Run the reduction
-        # -----------------------------------
-        reduction_alg.execute()
-
-        # -----------------------------------
-        # Get the output of the algorithm
-        # -----------------------------------
-        reduction_package.reduced_lab = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceLAB",
-                                                                     add_logs=True, user_file=state.data.user_file)
-        reduction_package.reduced_hab = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceHAB",
-                                                                     add_logs=True, user_file=state.data.user_file)
-        reduction_package.reduced_merged = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceMerged",
-                                                                        add_logs=True, user_file=state.data.user_file)
-
-        reduction_package.reduced_lab_can = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceLABCan")
-        reduction_package.reduced_lab_can_count = get_workspace_from_algorithm(reduction_alg,
-                                                                               "OutputWorkspaceLABCanCount")
-        reduction_package.reduced_lab_can_norm = get_workspace_from_algorithm(reduction_alg,
-                                                                              "OutputWorkspaceLABCanNorm")
-        reduction_package.reduced_hab_can = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceHABCan")
-        reduction_package.reduced_hab_can_count = get_workspace_from_algorithm(reduction_alg,
-                                                                               "OutputWorkspaceHABCanCount")
-        reduction_package.reduced_hab_can_norm = get_workspace_from_algorithm(reduction_alg,
-                                                                              "OutputWorkspaceHABCanNorm")
-        reduction_package.calculated_transmission = get_workspace_from_algorithm(reduction_alg,
-                                                                                 "OutputWorkspaceCalculatedTransmission")
-        reduction_package.unfitted_transmission = get_workspace_from_algorithm(reduction_alg,
-                                                                               "OutputWorkspaceUnfittedTransmission")
-        reduction_package.calculated_transmission_can = get_workspace_from_algorithm(reduction_alg,
-                                                                                     "OutputWorkspaceCalculatedTransmissionCan")
-        reduction_package.unfitted_transmission_can = get_workspace_from_algorithm(reduction_alg,
-                                                                                   "OutputWorkspaceUnfittedTransmissionCan")
-
-        reduction_package.reduced_lab_sample = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceLABSample")
-        reduction_package.reduced_hab_sample = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceHABSample")
-
-        reduction_package.out_scale_factor = reduction_alg.getProperty("OutScaleFactor").value
-        reduction_package.out_shift_factor = reduction_alg.getProperty("OutShiftFactor").value
-
-        if plot_results:
-            if PYQT4:
-                plot_workspace(reduction_package, output_graph)
-            elif output_graph:
-                plot_workspace_matplotlib(reduction_package, output_graph)
-        # -----------------------------------
-        # The workspaces are already on the ADS, but should potentially be grouped
-        # -----------------------------------
-        group_workspaces_if_required(reduction_package, output_mode, save_can)
+        with _output_lock:
+            if plot_results:
+                if PYQT4:
+                    plot_workspace(reduction_package, output_graph)
+                elif output_graph:
+                    plot_workspace_matplotlib(reduction_package, output_graph)
+            # -----------------------------------
+            # The workspaces are already on the ADS, but should potentially be grouped
+            # -----------------------------------
+            group_workspaces_if_required(reduction_package, output_mode, save_can)
 
     # --------------------------------
     # Perform output of all workspaces
@@ -146,11 +121,12 @@ def single_reduction_for_batch(state, use_optimizations, output_mode, plot_resul
     # 3. Both:
     #    * This means that we need to save out the reduced data
     #    * The data is already on the ADS, so do nothing
-    if output_mode is OutputMode.SaveToFile:
-        save_to_file(reduction_packages, save_can)
-        delete_reduced_workspaces(reduction_packages)
-    elif output_mode is OutputMode.Both:
-        save_to_file(reduction_packages, save_can)
+    with _output_lock:
+        if output_mode is OutputMode.SaveToFile:
+            save_to_file(reduction_packages, save_can)
+            delete_reduced_workspaces(reduction_packages)
+        elif output_mode is OutputMode.Both:
+            save_to_file(reduction_packages, save_can)
 
     # -----------------------------------------------------------------------
     # Clean up other workspaces if the optimizations have not been turned on.
@@ -164,6 +140,67 @@ def single_reduction_for_batch(state, use_optimizations, output_mode, plot_resul
     return out_scale_factors, out_shift_factors
 
 
+def run_reduction_package(reduction_package, single_reduction_options, workspace_to_name, workspace_to_monitor,
+                          user_file):
+    """
+    Runs SANSSingleReduction for a single reduction package and stores the outputs on the package.
+
+    Each call uses its own algorithm instance, so that several packages can be reduced at the same time.
+    :param reduction_package: a ReductionPackage
+    :param single_reduction_options: the options for SANSSingleReduction which are the same for all packages
+    :param workspace_to_name: a map of SANSDataType vs input-property name of SANSSingleReduction for workspaces
+    :param workspace_to_monitor: a map of SANSDataType vs input-property name of SANSSingleReduction for monitors
+    :param user_file: the user file which is added to the logs of the reduced workspaces
+    """
+    reduction_alg = create_managed_non_child_algorithm("SANSSingleReduction", **single_reduction_options)
+    reduction_alg.setChild(False)
+    # -----------------------------------
+    # Set the properties on the algorithm
+    # -----------------------------------
+    set_properties_for_reduction_algorithm(reduction_alg, reduction_package,
+                                           workspace_to_name, workspace_to_monitor)
+
+    # -----------------------------------
+    #  Run the reduction
+    # -----------------------------------
+    reduction_alg.execute()
+
+    # -----------------------------------
+    # Get the output of the algorithm
+    # -----------------------------------
+    reduction_package.reduced_lab = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceLAB",
+                                                                 add_logs=True, user_file=user_file)
+    reduction_package.reduced_hab = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceHAB",
+                                                                 add_logs=True, user_file=user_file)
+    reduction_package.reduced_merged = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceMerged",
+                                                                    add_logs=True, user_file=user_file)
+
+    reduction_package.reduced_lab_can = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceLABCan")
+    reduction_package.reduced_lab_can_count = get_workspace_from_algorithm(reduction_alg,
+                                                                           "OutputWorkspaceLABCanCount")
+    reduction_package.reduced_lab_can_norm = get_workspace_from_algorithm(reduction_alg,
+                                                                          "OutputWorkspaceLABCanNorm")
+    reduction_package.reduced_hab_can = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceHABCan")
+    reduction_package.reduced_hab_can_count = get_workspace_from_algorithm(reduction_alg,
+                                                                           "OutputWorkspaceHABCanCount")
+    reduction_package.reduced_hab_can_norm = get_workspace_from_algorithm(reduction_alg,
+                                                                          "OutputWorkspaceHABCanNorm")
+    reduction_package.calculated_transmission = get_workspace_from_algorithm(reduction_alg,
+                                                                             "OutputWorkspaceCalculatedTransmission")
+    reduction_package.unfitted_transmission = get_workspace_from_algorithm(reduction_alg,
+                                                                           "OutputWorkspaceUnfittedTransmission")
+    reduction_package.calculated_transmission_can = get_workspace_from_algorithm(reduction_alg,
+                                                                                 "OutputWorkspaceCalculatedTransmissionCan")
+    reduction_package.unfitted_transmission_can = get_workspace_from_algorithm(reduction_alg,
+                                                                               "OutputWorkspaceUnfittedTransmissionCan")
+
+    reduction_package.reduced_lab_sample = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceLABSample")
+    reduction_package.reduced_hab_sample = get_workspace_from_algorithm(reduction_alg, "OutputWorkspaceHABSample")
+
+    reduction_package.out_scale_factor = reduction_alg.getProperty("OutScaleFactor").value
+    reduction_package.out_shift_factor = reduction_alg.getProperty("OutShiftFactor").value
+
+
 def load_workspaces_from_states(state):
     workspace_to_name = {SANSDataType.SampleScatter: "SampleScatterWorkspace",
                          SANSDataType.SampleTransmission: "SampleTransmissionWorkspace",
@@ -387,7 +424,11 @@ def provide_loaded_data(state, use_optimizations, workspace_to_name, workspace_t
     set_output_workspaces_on_load_algorithm(load_options, state)
 
     load_alg = create_managed_non_child_algorithm(load_name, **load_options)
-    load_alg.execute()
+    if use_optimizations:
+        with _exclusive_first_load(get_files_to_load(state)):
+            load_alg.execute()
+    else:
+        load_alg.execute()
 
     # Retrieve the data
     workspace_to_count = {SANSDataType.SampleScatter: "NumberOfSampleScatterWorkspaces",
@@ -409,6 +450,41 @@ def provide_loaded_data(state, use_optimizations, workspace_to_name, workspace_t
     return workspaces, monitors
 
 
+def get_files_to_load(state):
+    """
+    Get the names of all the files which are loaded for a state.
+
+    :param state: a SANSState object.
+    :return: a set of file names.
+    """
+    data = state.data
+    file_names = [data.sample_scatter, data.sample_transmission, data.sample_direct,
+                  data.can_scatter, data.can_transmission, data.can_direct]
+    return set(file_name for file_name in file_names if file_name)
+
+
+@contextmanager
+def _exclusive_first_load(file_names):
+    """
+    Holds a lock for each of the files which have not been loaded before.
+
+    The locks are taken in a fixed order so that two loads can not each wait for the other.
+    :param file_names: the names of the files which are about to be loaded.
+    """
+    with _load_locks_guard:
+        new_files = sorted(file_name for file_name in file_names if file_name not in _loaded_files)
+        locks = [_load_locks.setdefault(file_name, threading.Lock()) for file_name in new_files]
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+        with _load_locks_guard:
+            _loaded_files.update(new_files)
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
 def add_loaded_workspace_to_ads(load_alg, workspace_property_name, workspace):
     """
     Adds a workspace with the name that was set on the output of the load algorithm to the ADS
@@ -0,0 +1,258 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+""" A process-wide cache of loaded and calibrated SANS data.
+
+The ADS based caching of SANSLoad only finds data while a workspace with the expected tag is still on the ADS. This
+cache is independent of the ADS. Entries are keyed by the path, modification time and size of the file, the period,
+the transmission flag and the calibration which was applied. The least recently used entries are dropped once the cache
+holds more than sans.load.cache.size megabytes. The cache is off unless sans.load.cache.size is set. If
+sans.load.cache.directory is set, dropped entries are saved there as processed Nexus files and can be picked up again,
+also by other Mantid sessions.
+
+Since the move and the reduction steps work in place, the cache keeps the workspaces it is given and hands out a clone
+each time they are needed, so every load makes a single copy.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from mantid.kernel import (config, Logger)
+from sans.common.file_information import find_full_file_path
+from sans.common.general_functions import create_unmanaged_algorithm
+
+LOAD_CACHE_SIZE_CONFIG_KEY = "sans.load.cache.size"
+LOAD_CACHE_DIRECTORY_CONFIG_KEY = "sans.load.cache.directory"
+DEFAULT_LOAD_CACHE_SIZE = 0
+
+_MEGABYTE = 1 << 20
+
+sans_logger = Logger("SANS")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# File signatures
+# ----------------------------------------------------------------------------------------------------------------------
+def get_file_signature(file_name):
+    """
+    Gets what identifies the content of a file without reading it.
+
+    :param file_name: the full file path.
+    :return: a tuple of the absolute path, the modification time and the size of the file.
+    """
+    status = os.stat(file_name)
+    return os.path.abspath(file_name), status.st_mtime, status.st_size
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Workspace helpers
+# ----------------------------------------------------------------------------------------------------------------------
+def _run_child_algorithm(name, output_name, **options):
+    alg = create_unmanaged_algorithm(name, **options)
+    alg.execute()
+    return alg.getProperty(output_name).value if output_name else None
+
+
+def _clone_workspaces(workspaces):
+    return [_run_child_algorithm("CloneWorkspace", "OutputWorkspace", InputWorkspace=workspace,
+                                 OutputWorkspace="dummy") for workspace in workspaces]
+
+
+def _get_memory_size(workspaces):
+    return sum(workspace.getMemorySize() for workspace in workspaces)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------------------------------------------------------
+class LoadedDataCache(object):
+    """
+    A bounded LRU cache of the data and monitor workspaces loaded for a SANS file.
+    """
+    def __init__(self, max_size=DEFAULT_LOAD_CACHE_SIZE, directory=""):
+        """
+        :param max_size: the size of the in-memory cache in megabytes. 0 disables the cache.
+        :param directory: a directory into which entries are saved when they drop out of memory. If empty, dropped
+                          entries are lost.
+        """
+        super(LoadedDataCache, self).__init__()
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(file_information, is_transmission, period, calibration_file_name):
+        """
+        Creates the cache key for the data of a file.
+
+        :param file_information: a SANSFileInformation object.
+        :param is_transmission: true if the data is loaded as transmission data.
+        :param period: the selected period.
+        :param calibration_file_name: the calibration file name or an empty string.
+        :return: a tuple which identifies the loaded data.
+        """
+        calibration = ""
+        if calibration_file_name:
+            full_calibration_file_path = find_full_file_path(calibration_file_name)
+            calibration = get_file_signature(full_calibration_file_path) if full_calibration_file_path \
+                else calibration_file_name
+        return get_file_signature(file_information.get_file_name()), bool(is_transmission), period, calibration
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """
+        Gets copies of the cached workspaces for a key.
+
+        :param key: a key made with make_key.
+        :return: a list of workspaces and a list of monitor workspaces, or None if the key is not cached.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # Re-insert the entry to mark it as the most recently used one
+                self._entries[key] = entry
+                self.hits += 1
+        if entry is not None:
+            self._report("hit")
+            return _clone_workspaces(entry[0]), _clone_workspaces(entry[1])
+        # Entries read back from the directory are freshly loaded, so they are handed out without a copy
+        entry = self._load_from_directory(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._report("hit" if entry is not None else "miss")
+        return entry
+
+    def put(self, key, workspaces, monitors):
+        """
+        Adds workspaces to the cache. The cache keeps the workspaces it is given, so they must not be changed
+        afterwards; the returned copies are to be used instead.
+
+        :param key: a key made with make_key.
+        :param workspaces: a list of data workspaces.
+        :param monitors: a list of monitor workspaces, which can be empty.
+        :return: copies of the workspaces and the monitor workspaces.
+        """
+        if not self.enabled:
+            return workspaces, monitors
+        self._add(key, workspaces, monitors)
+        return _clone_workspaces(workspaces), _clone_workspaces(monitors)
+
+    def clear(self):
+        """
+        Removes all the entries held in memory and resets the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._memory = 0
+            self.hits = 0
+            self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, key, workspaces, monitors):
+        size = _get_memory_size(workspaces) + _get_memory_size(monitors)
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (workspaces, monitors, size)
+            self._memory += size
+            while self._entries and self._memory > self.max_size * _MEGABYTE:
+                evicted_key, evicted_entry = self._entries.popitem(last=False)
+                self._memory -= evicted_entry[2]
+                evicted.append((evicted_key, evicted_entry))
+        for evicted_key, (evicted_workspaces, evicted_monitors, _) in evicted:
+            self._save_to_directory(evicted_key, evicted_workspaces, evicted_monitors)
+
+    def _report(self, result):
+        sans_logger.information("SANSLoad: loaded data cache {0}. {1} hits, {2} misses, hit rate {3:.0%}, {4} entries "
+                                "using {5:.1f} MB.".format(result, self.hits, self.misses, self.hit_rate(),
+                                                           len(self._entries), self._memory / _MEGABYTE))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Spilling to disk
+    # ------------------------------------------------------------------------------------------------------------------
+    def _get_base_name(self, key):
+        digest = hashlib.sha1(json.dumps([str(element) for element in key]).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "sans_load_cache_" + digest)
+
+    def _save_to_directory(self, key, workspaces, monitors):
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        base_name = self._get_base_name(key)
+        if os.path.isfile(base_name + ".json"):
+            return
+        try:
+            for index, workspace in enumerate(workspaces):
+                _run_child_algorithm("SaveNexusProcessed", None, InputWorkspace=workspace,
+                                     Filename="{0}_{1}.nxs".format(base_name, index))
+            for index, workspace in enumerate(monitors):
+                _run_child_algorithm("SaveNexusProcessed", None, InputWorkspace=workspace,
+                                     Filename="{0}_monitor_{1}.nxs".format(base_name, index))
+            # The manifest is written last, so that entries which were only partially saved are never picked up
+            with open(base_name + ".json", 'w') as manifest:
+                json.dump({"workspaces": len(workspaces), "monitors": len(monitors)}, manifest)
+        except (IOError, OSError, RuntimeError) as error:
+            sans_logger.warning("SANSLoad: could not save the loaded data cache entry {0}: {1}".format(
+                base_name, str(error)))
+
+    def _load_from_directory(self, key):
+        if not self.directory:
+            return None
+        base_name = self._get_base_name(key)
+        try:
+            with open(base_name + ".json", 'r') as manifest:
+                counts = json.load(manifest)
+            workspaces = [_run_child_algorithm("LoadNexusProcessed", "OutputWorkspace", OutputWorkspace="dummy",
+                                               Filename="{0}_{1}.nxs".format(base_name, index))
+                          for index in range(counts["workspaces"])]
+            monitors = [_run_child_algorithm("LoadNexusProcessed", "OutputWorkspace", OutputWorkspace="dummy",
+                                             Filename="{0}_monitor_{1}.nxs".format(base_name, index))
+                        for index in range(counts["monitors"])]
+        except (IOError, OSError, RuntimeError, ValueError, KeyError):
+            return None
+        return workspaces, monitors
+
+
+_loaded_data_cache = LoadedDataCache()
+
+
+def get_loaded_data_cache():
+    """
+    Gets the process-wide cache of loaded data, updated with the current sans.load.cache settings.
+
+    :return: a LoadedDataCache.
+    """
+    try:
+        max_size = int(config[LOAD_CACHE_SIZE_CONFIG_KEY])
+    except (KeyError, ValueError):
+        max_size = DEFAULT_LOAD_CACHE_SIZE
+    _loaded_data_cache.max_size = max(max_size, 0)
+    try:
+        _loaded_data_cache.directory = config[LOAD_CACHE_DIRECTORY_CONFIG_KEY].strip()
+    except KeyError:
+        _loaded_data_cache.directory = ""
+    return _loaded_data_cache
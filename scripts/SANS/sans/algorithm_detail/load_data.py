@@ -47,6 +47,8 @@ CACHING:
 Adding to the cache(ADS) is supported for the TubeCalibration file.
 Reading from the cache is supported for all files. This avoids data reloads if the correct file is already in the
 cache.
+Independently of the ADS, loaded and calibrated data is kept in the process-wide cache of load_cache, which is used
+when UseCached is set and sans.load.cache.size is not 0.
 """
 from __future__ import (absolute_import, division, print_function)
 from abc import (ABCMeta, abstractmethod)
@@ -64,6 +66,7 @@ from sans.common.general_functions import (create_child_algorithm)
 from sans.common.log_tagger import (set_tag, has_tag, get_tag)
 from sans.state.data import (StateData)
 from sans.algorithm_detail.calibration import apply_calibration
+from sans.algorithm_detail.load_cache import get_loaded_data_cache
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -726,25 +729,56 @@ class SANSLoadDataISIS(SANSLoadData):
         else:
             calibration_file = ""
 
+        loaded_data_cache = get_loaded_data_cache()
+        use_loaded_data_cache = use_cached and loaded_data_cache.enabled
+        cache_keys_to_add = {}
+        # Data from the cache is already calibrated
+        workspaces_to_calibrate = {}
+        workspace_monitors_to_calibrate = {}
+
         for key, value in list(file_infos.items()):
             # Loading
             report_message = "Loading {0}".format(SANSDataType.to_string(key))
             progress.report(report_message)
 
-            workspace_pack, workspace_monitors_pack = load_isis(key, value, period_infos[key],
-                                                                use_cached, calibration_file,
-                                                                parent_alg)
+            cached = None
+            if use_loaded_data_cache:
+                cache_key = loaded_data_cache.make_key(value, is_transmission_type(key), period_infos[key],
+                                                       calibration_file)
+                cached = loaded_data_cache.get(cache_key)
+                if cached is None:
+                    cache_keys_to_add[key] = cache_key
+
+            if cached is not None:
+                workspace_pack = {key: cached[0]}
+                workspace_monitors_pack = {key: cached[1]} if cached[1] else None
+            else:
+                workspace_pack, workspace_monitors_pack = load_isis(key, value, period_infos[key],
+                                                                    use_cached, calibration_file,
+                                                                    parent_alg)
 
             # Add them to the already loaded workspaces
             workspaces.update(workspace_pack)
             if workspace_monitors_pack is not None:
                 workspace_monitors.update(workspace_monitors_pack)
+            if cached is None:
+                workspaces_to_calibrate.update(workspace_pack)
+                if workspace_monitors_pack is not None:
+                    workspace_monitors_to_calibrate.update(workspace_monitors_pack)
 
         # Apply the calibration if any exists.
-        if data_info.calibration:
+        if data_info.calibration and workspaces_to_calibrate:
             report_message = "Applying calibration."
             progress.report(report_message)
-            apply_calibration(calibration_file, workspaces, workspace_monitors, use_cached, publish_to_ads, parent_alg)
+            apply_calibration(calibration_file, workspaces_to_calibrate, workspace_monitors_to_calibrate, use_cached,
+                              publish_to_ads, parent_alg)
+
+        # Keep the calibrated data before it is moved or corrected, and carry on with copies
+        for key, cache_key in list(cache_keys_to_add.items()):
+            workspaces[key], monitors = loaded_data_cache.put(cache_key, workspaces[key],
+                                                              workspace_monitors.get(key, []))
+            if key in workspace_monitors:
+                workspace_monitors[key] = monitors
 
         # Apply corrections for transmission workspaces
         transmission_correction = get_transmission_correction(data_info)
@@ -10,6 +10,8 @@
 
 from __future__ import (absolute_import, division, print_function)
 import os
+import threading
+from collections import OrderedDict
 import h5py as h5
 from abc import (ABCMeta, abstractmethod)
 from mantid.api import FileFinder
@@ -57,6 +59,17 @@ EVENT_WORKSPACE = "event_workspace"
 DEFINITION = "Definition"
 PARAMETERS = "Parameters"
 
+# Fields of a file probe
+ISIS_NEXUS_INFO = "isis_nexus_info"
+INSTRUMENT_NAME = "instrument_name"
+EVENT_MODE = "event_mode"
+GEOMETRY = "geometry"
+ADDED_INFO = "added_info"
+ADDED_DATE_AND_RUN_NUMBER = "added_date_and_run_number"
+ADDED_GEOMETRY = "added_geometry"
+PERIOD_COUNT = "PeriodCount"
+RUN_HEADER = "RunHeader"
+
 # Geometry
 SAMPLE = "sample"
 WIDTH = "width"
@@ -273,6 +286,85 @@ def get_instrument_paths_for_sans_file(file_name=None, file_information=None):
                        "available for {0}".format(str(idf_path)))
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+# Probing files
+# ----------------------------------------------------------------------------------------------------------------------
+# Each file is opened once to read all the fields needed for a SANSFileInformation. The fields are cached for the
+# process, keyed by the path, modification time and size of the file, since a batch reduction asks about the same
+# can and transmission files many times.
+_PROBE_CACHE_SIZE = 1024
+_probe_cache = OrderedDict()
+_probe_cache_lock = threading.Lock()
+
+
+class _FailedField(object):
+    """
+    Stands in for a field which could not be read from a file. The error is raised when the field is asked for.
+    """
+    def __init__(self, error):
+        self.error = error
+
+
+def _read_field(fields, key, reader, *args):
+    try:
+        fields[key] = reader(*args)
+    except Exception as error:
+        fields[key] = _FailedField(error)
+
+
+def _probe_key(probe, file_name):
+    try:
+        status = os.stat(file_name)
+    except OSError:
+        return None
+    return probe.__name__, os.path.abspath(file_name), status.st_mtime, status.st_size
+
+
+def get_probed_fields(probe, file_name):
+    """
+    Gets the fields of a file probe, reading the file only if it is not in the cache or has changed since.
+
+    :param probe: a function which reads a file and returns a dict of fields.
+    :param file_name: the full file path.
+    :return: the dict of fields.
+    """
+    key = _probe_key(probe, file_name)
+    if key is None:
+        return probe(file_name)
+    with _probe_cache_lock:
+        fields = _probe_cache.get(key)
+    if fields is None:
+        fields = probe(file_name)
+        with _probe_cache_lock:
+            _probe_cache[key] = fields
+            while len(_probe_cache) > _PROBE_CACHE_SIZE:
+                _probe_cache.popitem(last=False)
+    return fields
+
+
+def get_probed_field(probe, file_name, field):
+    """
+    Gets a single field of a file probe. If the field could not be read, the original error is raised.
+
+    :param probe: a function which reads a file and returns a dict of fields.
+    :param file_name: the full file path.
+    :param field: the name of the field.
+    :return: the value of the field.
+    """
+    value = get_probed_fields(probe, file_name)[field]
+    if isinstance(value, _FailedField):
+        raise value.error
+    return value
+
+
+def clear_probe_cache():
+    """
+    Removes all the files from the probe cache.
+    """
+    with _probe_cache_lock:
+        _probe_cache.clear()
+
+
 def convert_to_shape(shape_flag):
     """
     Converts a shape flag to a shape object.
@@ -294,6 +386,36 @@ def convert_to_shape(shape_flag):
 # ----------------------------------------------------------------------------------------------------------------------
 # Functions for ISIS Nexus
 # ----------------------------------------------------------------------------------------------------------------------
+def probe_nexus_file(file_name):
+    """
+    Reads all the information which a SANSFileInformation needs from an ISIS Nexus or added Nexus file.
+
+    The file is opened only once. Fields which do not apply to the file, e.g. the added data fields of an ISIS Nexus
+    file, hold the error raised when they were read.
+    :param file_name: the full file path.
+    :return: a dict of fields.
+    """
+    fields = {}
+    try:
+        with h5.File(file_name, 'r') as h5_file:
+            _read_field(fields, ISIS_NEXUS_INFO, _read_isis_nexus_info, h5_file)
+            _read_field(fields, INSTRUMENT_NAME, _read_instrument_name, h5_file)
+            _read_field(fields, START_TIME, _read_top_level_entry, h5_file, START_TIME)
+            _read_field(fields, RUN_NUMBER, _read_top_level_entry, h5_file, RUN_NUMBER)
+            _read_field(fields, EVENT_MODE, _read_event_mode, h5_file)
+            _read_field(fields, GEOMETRY, _read_geometry_isis_nexus, h5_file)
+            _read_field(fields, ADDED_INFO, _read_added_nexus_information, h5_file)
+            _read_field(fields, ADDED_DATE_AND_RUN_NUMBER, _read_date_and_run_number_added_nexus, h5_file)
+            _read_field(fields, ADDED_GEOMETRY, _read_geometry_isis_added_nexus, h5_file)
+    except IOError as error:
+        failed = _FailedField(error)
+        fields = {key: failed for key in [INSTRUMENT_NAME, START_TIME, RUN_NUMBER, EVENT_MODE, GEOMETRY,
+                                          ADDED_DATE_AND_RUN_NUMBER, ADDED_GEOMETRY]}
+        fields[ISIS_NEXUS_INFO] = (False, -1)
+        fields[ADDED_INFO] = (False, 1, False)
+    return fields
+
+
 def get_isis_nexus_info(file_name):
     """
     Get information if is ISIS Nexus and the number of periods.
@@ -301,19 +423,18 @@ def get_isis_nexus_info(file_name):
     :param file_name: the full file path.
     :return: if the file was a Nexus file and the number of periods.
     """
-    try:
-        with h5.File(file_name, 'r') as h5_file:
-            keys = list(h5_file.keys())
-            is_isis_nexus = RAW_DATA_1 in keys
-            if is_isis_nexus:
-                first_entry = h5_file[RAW_DATA_1]
-                period_group = first_entry[PERIODS]
-                proton_charge_data_set = period_group[PROTON_CHARGE]
-                number_of_periods = len(proton_charge_data_set)
-            else:
-                number_of_periods = -1
-    except IOError:
-        is_isis_nexus = False
+    return get_probed_field(probe_nexus_file, file_name, ISIS_NEXUS_INFO)
+
+
+def _read_isis_nexus_info(h5_file):
+    keys = list(h5_file.keys())
+    is_isis_nexus = RAW_DATA_1 in keys
+    if is_isis_nexus:
+        first_entry = h5_file[RAW_DATA_1]
+        period_group = first_entry[PERIODS]
+        proton_charge_data_set = period_group[PROTON_CHARGE]
+        number_of_periods = len(proton_charge_data_set)
+    else:
         number_of_periods = -1
     return is_isis_nexus, number_of_periods
 
@@ -338,17 +459,19 @@ def get_instrument_name_for_isis_nexus(file_name):
                                         |--instrument|
                                                      |--name
     """
-    with h5.File(file_name, 'r') as h5_file:
-        # Open first entry
-        keys = list(h5_file.keys())
-        first_entry = h5_file[keys[0]]
-        # Open instrument group
-        instrument_group = first_entry[INSTRUMENT]
-        # Open name data set
-        name_data_set = instrument_group[NAME]
-        # Read value
-        instrument_name = name_data_set[0].decode("utf-8")
-    return instrument_name
+    return get_probed_field(probe_nexus_file, file_name, INSTRUMENT_NAME)
+
+
+def _read_instrument_name(h5_file):
+    # Open first entry
+    keys = list(h5_file.keys())
+    first_entry = h5_file[keys[0]]
+    # Open instrument group
+    instrument_group = first_entry[INSTRUMENT]
+    # Open name data set
+    name_data_set = instrument_group[NAME]
+    # Read value
+    return name_data_set[0].decode("utf-8")
 
 
 def get_top_level_nexus_entry(file_name, entry_name):
@@ -360,21 +483,25 @@ def get_top_level_nexus_entry(file_name, entry_name):
     :return:
     """
     with h5.File(file_name, 'r') as h5_file:
-        # Open first entry
-        keys = list(h5_file.keys())
-        top_level = h5_file[keys[0]]
-        entry = top_level[entry_name]
-        value = entry[0]
+        value = _read_top_level_entry(h5_file, entry_name)
     return value
 
 
+def _read_top_level_entry(h5_file, entry_name):
+    # Open first entry
+    keys = list(h5_file.keys())
+    top_level = h5_file[keys[0]]
+    entry = top_level[entry_name]
+    return entry[0]
+
+
 def get_date_for_isis_nexus(file_name):
-    value = get_top_level_nexus_entry(file_name, START_TIME)
+    value = get_probed_field(probe_nexus_file, file_name, START_TIME)
     return DateAndTime(value)
 
 
 def get_run_number_for_isis_nexus(file_name):
-    return int(get_top_level_nexus_entry(file_name, RUN_NUMBER))
+    return int(get_probed_field(probe_nexus_file, file_name, RUN_NUMBER))
 
 
 def get_event_mode_information(file_name):
@@ -385,16 +512,19 @@ def get_event_mode_information(file_name):
                                     |--some_group|
                                                  |--Attribute: NX_class = NXevent_data
     """
-    with h5.File(file_name, 'r') as h5_file:
-        # Open first entry
-        keys = list(h5_file.keys())
-        first_entry = h5_file[keys[0]]
-        # Open instrument group
-        is_event_mode = False
-        for value in list(first_entry.values()):
-            if NX_CLASS in value.attrs and NX_EVENT_DATA == value.attrs[NX_CLASS].decode("utf-8"):
-                is_event_mode = True
-                break
+    return get_probed_field(probe_nexus_file, file_name, EVENT_MODE)
+
+
+def _read_event_mode(h5_file):
+    # Open first entry
+    keys = list(h5_file.keys())
+    first_entry = h5_file[keys[0]]
+    # Open instrument group
+    is_event_mode = False
+    for value in list(first_entry.values()):
+        if NX_CLASS in value.attrs and NX_EVENT_DATA == value.attrs[NX_CLASS].decode("utf-8"):
+            is_event_mode = True
+            break
     return is_event_mode
 
 
@@ -405,23 +535,26 @@ def get_geometry_information_isis_nexus(file_name):
     :param file_name:
     :return: height, width, thickness, shape
     """
-    with h5.File(file_name, 'r') as h5_file:
-        # Open first entry
-        keys = list(h5_file.keys())
-        top_level = h5_file[keys[0]]
-        sample = top_level[SAMPLE]
-        height = float(sample[HEIGHT][0])
-        width = float(sample[WIDTH][0])
-        thickness = float(sample[THICKNESS][0])
-        shape_as_string = sample[SHAPE][0].upper().decode("utf-8")
-        if shape_as_string == CYLINDER:
-            shape = SampleShape.Cylinder
-        elif shape_as_string == FLAT_PLATE:
-            shape = SampleShape.FlatPlate
-        elif shape_as_string == DISC:
-            shape = SampleShape.Disc
-        else:
-            shape = None
+    return get_probed_field(probe_nexus_file, file_name, GEOMETRY)
+
+
+def _read_geometry_isis_nexus(h5_file):
+    # Open first entry
+    keys = list(h5_file.keys())
+    top_level = h5_file[keys[0]]
+    sample = top_level[SAMPLE]
+    height = float(sample[HEIGHT][0])
+    width = float(sample[WIDTH][0])
+    thickness = float(sample[THICKNESS][0])
+    shape_as_string = sample[SHAPE][0].upper().decode("utf-8")
+    if shape_as_string == CYLINDER:
+        shape = SampleShape.Cylinder
+    elif shape_as_string == FLAT_PLATE:
+        shape = SampleShape.FlatPlate
+    elif shape_as_string == DISC:
+        shape = SampleShape.Disc
+    else:
+        shape = None
     return height, width, thickness, shape
 
 
@@ -438,26 +571,36 @@ def get_geometry_information_isis_nexus(file_name):
 
 
 def get_date_and_run_number_added_nexus(file_name):
-    with h5.File(file_name, 'r') as h5_file:
-        keys = list(h5_file.keys())
-        first_entry = h5_file[keys[0]]
-        logs = first_entry["logs"]
-        # Start time
-        start_time = logs["start_time"]
-        start_time_value = DateAndTime(start_time["value"][0])
-        # Run number
-        run_number = logs["run_number"]
-        run_number_value = int(run_number["value"][0])
+    start_time, run_number = get_probed_field(probe_nexus_file, file_name, ADDED_DATE_AND_RUN_NUMBER)
+    return DateAndTime(start_time), int(run_number)
+
+
+def _read_date_and_run_number_added_nexus(h5_file):
+    keys = list(h5_file.keys())
+    first_entry = h5_file[keys[0]]
+    logs = first_entry["logs"]
+    # Start time
+    start_time = logs["start_time"]
+    start_time_value = start_time["value"][0]
+    # Run number
+    run_number = logs["run_number"]
+    run_number_value = run_number["value"][0]
     return start_time_value, run_number_value
 
 
-def get_added_nexus_information(file_name):  # noqa
+def get_added_nexus_information(file_name):
     """
     Get information if is added data and the number of periods.
 
     :param file_name: the full file path.
     :return: if the file was a Nexus file and the number of periods.
     """
+    if has_added_suffix(file_name):
+        return get_probed_field(probe_nexus_file, file_name, ADDED_INFO)
+    return False, 1, False
+
+
+def _read_added_nexus_information(h5_file):  # noqa
     ADDED_SUFFIX = "-add_added_event_data"
     ADDED_MONITOR_SUFFIX = "-add_monitors_added_event_data"
 
@@ -532,43 +675,32 @@ def get_added_nexus_information(file_name):  # noqa
                 break
         return is_added_file_histogram, num_periods
 
-    if has_added_suffix(file_name):
-        try:
-            with h5.File(file_name, 'r') as h5_file:
-                # Get all mantid_workspace_X keys
-                keys = list(h5_file.keys())
-                top_level_keys = get_all_keys_for_top_level(keys)
-
-                # Check if entries are added event data, if we don't have a hit, then it can always be
-                # added histogram data
-                is_added_event_file, number_of_periods_event = get_added_event_info(h5_file, top_level_keys)
-                is_added_histogram_file, number_of_periods_histogram = get_added_histogram_info(h5_file, top_level_keys)
-
-                if is_added_event_file:
-                    is_added = True
-                    is_event = True
-                    number_of_periods = number_of_periods_event
-                elif is_added_histogram_file:
-                    is_added = True
-                    is_event = False
-                    number_of_periods = number_of_periods_histogram
-                else:
-                    is_added = True
-                    is_event = False
-                    number_of_periods = 1
-        except IOError:
-            is_added = False
-            is_event = False
-            number_of_periods = 1
+    # Get all mantid_workspace_X keys
+    keys = list(h5_file.keys())
+    top_level_keys = get_all_keys_for_top_level(keys)
+
+    # Check if entries are added event data, if we don't have a hit, then it can always be
+    # added histogram data
+    is_added_event_file, number_of_periods_event = get_added_event_info(h5_file, top_level_keys)
+    is_added_histogram_file, number_of_periods_histogram = get_added_histogram_info(h5_file, top_level_keys)
+
+    if is_added_event_file:
+        is_added = True
+        is_event = True
+        number_of_periods = number_of_periods_event
+    elif is_added_histogram_file:
+        is_added = True
+        is_event = False
+        number_of_periods = number_of_periods_histogram
     else:
-        is_added = False
+        is_added = True
         is_event = False
         number_of_periods = 1
     return is_added, number_of_periods, is_event
 
 
 def get_date_for_added_workspace(file_name):
-    value = get_top_level_nexus_entry(file_name, "start_time")
+    value = get_probed_field(probe_nexus_file, file_name, START_TIME)
     return DateAndTime(value)
 
 
@@ -594,22 +726,59 @@ def get_geometry_information_isis_added_nexus(file_name):
     :param file_name: the file name
     :return: height, width, thickness, shape
     """
-    with h5.File(file_name, 'r') as h5_file:
-        # Open first entry
-        keys = list(h5_file.keys())
-        top_level = h5_file[keys[0]]
-        sample = top_level[SAMPLE]
-        height = float(sample[GEOM_HEIGHT][0])
-        width = float(sample[GEOM_WIDTH][0])
-        thickness = float(sample[GEOM_THICKNESS][0])
-        shape_id = int(sample[GEOM_ID][0])
-        shape = convert_to_shape(shape_id)
+    return get_probed_field(probe_nexus_file, file_name, ADDED_GEOMETRY)
+
+
+def _read_geometry_isis_added_nexus(h5_file):
+    # Open first entry
+    keys = list(h5_file.keys())
+    top_level = h5_file[keys[0]]
+    sample = top_level[SAMPLE]
+    height = float(sample[GEOM_HEIGHT][0])
+    width = float(sample[GEOM_WIDTH][0])
+    thickness = float(sample[GEOM_THICKNESS][0])
+    shape_id = int(sample[GEOM_ID][0])
+    shape = convert_to_shape(shape_id)
     return height, width, thickness, shape
 
 
 # ----------------------------------------------------------------------------------------------------------------------
 # ISIS Raw
 # ----------------------------------------------------------------------------------------------------------------------
+def probe_raw_file(file_name):
+    """
+    Reads all the information which a SANSFileInformation needs from an ISIS Raw file with a single RawFileInfo call.
+
+    :param file_name: the full file path.
+    :return: a dict of fields.
+    """
+    fields = {}
+    try:
+        alg_info = AlgorithmManager.createUnmanaged("RawFileInfo")
+        alg_info.initialize()
+        alg_info.setChild(True)
+        alg_info.setProperty("Filename", file_name)
+        alg_info.setProperty("GetRunParameters", True)
+        alg_info.setProperty("GetSampleParameters", True)
+        alg_info.execute()
+    except (IOError, RuntimeError, ValueError) as error:
+        failed = _FailedField(error)
+        return {key: failed for key in [PERIOD_COUNT, RUN_HEADER, END_TIME, END_DATE, GEOMETRY]}
+
+    fields[PERIOD_COUNT] = alg_info.getProperty(PERIOD_COUNT).value
+    fields[RUN_HEADER] = alg_info.getProperty(RUN_HEADER).value
+    run_parameters = alg_info.getProperty("RunParameterTable").value
+    _read_field(fields, END_TIME, _read_first_row, run_parameters, END_TIME)
+    _read_field(fields, END_DATE, _read_first_row, run_parameters, END_DATE)
+    _read_field(fields, GEOMETRY, _read_geometry_raw, alg_info.getProperty("SampleParameterTable").value)
+    return fields
+
+
+def _read_first_row(table, column_name):
+    keys = table.getColumnNames()
+    return table.column(keys.index(column_name))[0]
+
+
 def get_raw_info(file_name):
     # Preselect files which don't end with .raw
     split_file_name, file_extension = os.path.splitext(file_name)
@@ -618,16 +787,8 @@ def get_raw_info(file_name):
         number_of_periods = -1
     else:
         try:
-            alg_info = AlgorithmManager.createUnmanaged("RawFileInfo")
-            alg_info.initialize()
-            alg_info.setChild(True)
-            alg_info.setProperty("Filename", file_name)
-            alg_info.setProperty("GetRunParameters", True)
-            alg_info.execute()
-
-            periods = alg_info.getProperty("PeriodCount").value
+            number_of_periods = get_probed_field(probe_raw_file, file_name, PERIOD_COUNT)
             is_raw = True
-            number_of_periods = periods
         except IOError:
             is_raw = False
             number_of_periods = -1
@@ -644,14 +805,7 @@ def is_raw_multi_period(file_name):
 
 
 def get_from_raw_header(file_name, index):
-    alg_info = AlgorithmManager.createUnmanaged("RawFileInfo")
-    alg_info.initialize()
-    alg_info.setChild(True)
-    alg_info.setProperty("Filename", file_name)
-    alg_info.setProperty("GetRunParameters", True)
-    alg_info.execute()
-
-    header = alg_info.getProperty("RunHeader").value
+    header = get_probed_field(probe_raw_file, file_name, RUN_HEADER)
     element = header.split()[index]
     return element
 
@@ -690,24 +844,8 @@ def get_date_for_raw(file_name):
         date_and_time_string = year + "-" + month + "-" + day + "T" + time_input
         return DateAndTime(date_and_time_string)
 
-    alg_info = AlgorithmManager.createUnmanaged("RawFileInfo")
-    alg_info.initialize()
-    alg_info.setChild(True)
-    alg_info.setProperty("Filename", file_name)
-    alg_info.setProperty("GetRunParameters", True)
-    alg_info.execute()
-
-    run_parameters = alg_info.getProperty("RunParameterTable").value
-
-    keys = run_parameters.getColumnNames()
-
-    time_id = END_TIME
-    date_id = END_DATE
-
-    time = run_parameters.column(keys.index(time_id))
-    date = run_parameters.column(keys.index(date_id))
-    time = time[0]
-    date = date[0]
+    time = get_probed_field(probe_raw_file, file_name, END_TIME)
+    date = get_probed_field(probe_raw_file, file_name, END_DATE)
     return get_raw_measurement_time(date, time)
 
 
@@ -718,26 +856,14 @@ def get_geometry_information_raw(file_name):
     :param file_name: the full file name to an existing raw file.
     :return: height, width, thickness and shape
     """
-    alg_info = AlgorithmManager.createUnmanaged("RawFileInfo")
-    alg_info.initialize()
-    alg_info.setChild(True)
-    alg_info.setProperty("Filename", file_name)
-    alg_info.setProperty("GetRunParameters", False)
-    alg_info.setProperty("GetSampleParameters", True)
-    alg_info.execute()
-
-    sample_parameters = alg_info.getProperty("SampleParameterTable").value
-    keys = sample_parameters.getColumnNames()
-
-    height_id = E_HEIGHT
-    width_id = E_WIDTH
-    thickness_id = E_THICK
-    shape_id = E_GEOM
-
-    height = sample_parameters.column(keys.index(height_id))[0]
-    width = sample_parameters.column(keys.index(width_id))[0]
-    thickness = sample_parameters.column(keys.index(thickness_id))[0]
-    shape_flag = sample_parameters.column(keys.index(shape_id))[0]
+    return get_probed_field(probe_raw_file, file_name, GEOMETRY)
+
+
+def _read_geometry_raw(sample_parameters):
+    height = _read_first_row(sample_parameters, E_HEIGHT)
+    width = _read_first_row(sample_parameters, E_WIDTH)
+    thickness = _read_first_row(sample_parameters, E_THICK)
+    shape_flag = _read_first_row(sample_parameters, E_GEOM)
     shape = convert_to_shape(shape_flag)
     return height, width, thickness, shape
 
@@ -12,9 +12,11 @@ from __future__ import (absolute_import, division, print_function)
 from math import (acos, sqrt, degrees)
 import re
 from copy import deepcopy
-import json
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 import numpy as np
 from mantid.api import (AlgorithmManager, AnalysisDataService, isSameWorkspaceObject)
+from mantid.kernel import config
 from sans.common.constant_containers import (SANSInstrument_enum_list, SANSInstrument_string_list,
                                              SANSInstrument_string_as_key_NoInstrument)
 from sans.common.constants import (SANS_FILE_TAG, ALL_PERIODS, SANS2D, EMPTY_NAME,
@@ -26,6 +28,7 @@ from sans.common.enums import (DetectorType, RangeStepType, ReductionDimensional
 # Constants
 # -------------------------------------------
 ALTERNATIVE_SANS2D_NAME = "SAN"
+BATCH_WORKERS_CONFIG_KEY = "sans.batch.workers"
 
 
 # -------------------------------------------
@@ -132,6 +135,47 @@ def create_managed_non_child_algorithm(name, **kwargs):
     return alg
 
 
+def get_number_of_batch_workers():
+    """
+    Gets the number of reductions which a batch reduction may run at the same time.
+
+    This is read from the sans.batch.workers setting of the ConfigService. A value of 0 uses
+    one worker per core, any invalid or missing value runs the reductions one at a time.
+    :return: the number of workers, at least 1.
+    """
+    try:
+        workers = int(config[BATCH_WORKERS_CONFIG_KEY])
+    except (KeyError, ValueError):
+        return 1
+    if workers == 0:
+        workers = cpu_count()
+    return max(workers, 1)
+
+
+def map_in_parallel(function, items, max_workers):
+    """
+    Applies a function to each item, running up to max_workers calls at the same time on a pool of threads.
+
+    The work is done in threads rather than processes since the reductions are carried out by algorithms,
+    which release the GIL while they execute. Any exception raised by a call is raised again once all the
+    calls have finished.
+    :param function: a callable taking a single item.
+    :param items: a list of items.
+    :param max_workers: the maximum number of calls to run at the same time. 1 or fewer runs them in turn.
+    :return: a list with the result for each item, in the order of the items.
+    """
+    items = list(items)
+    workers = min(max_workers, len(items))
+    if workers <= 1:
+        return [function(item) for item in items]
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(function, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
 def create_child_algorithm(parent_alg, name, **kwargs):
     """
     Creates a child algorithm from a parent algorithm
@@ -892,11 +936,9 @@ def get_state_hash_for_can_reduction(state, reduction_mode, partial_type=None):
 
         return state_to_hash
     new_state = remove_sample_related_information(state)
-    new_state_serialized = new_state.property_manager
-    new_state_serialized = json.dumps(new_state_serialized, sort_keys=True, indent=4)
 
     # Add a tag for the reduction mode
-    state_string = str(new_state_serialized)
+    state_string = str(new_state.state_hash)
     if reduction_mode is ISISReductionMode.LAB:
         state_string += "LAB"
     elif reduction_mode is ISISReductionMode.HAB:
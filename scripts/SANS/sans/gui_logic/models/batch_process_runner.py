@@ -9,18 +9,24 @@ from sans.sans_batch import SANSBatchReduction
 from sans.algorithm_detail.batch_execution import load_workspaces_from_states
 from ui.sans_isis.worker import Worker
 from sans.common.enums import ISISReductionMode
+from sans.common.general_functions import get_number_of_batch_workers, map_in_parallel
 
 
 class BatchProcessRunner(QObject):
     row_processed_signal = Signal(int, list, list)
     row_failed_signal = Signal(int, str)
 
-    def __init__(self, notify_progress, notify_done, notify_error):
+    def __init__(self, notify_progress, notify_done, notify_error, max_workers=None):
+        """
+        :param max_workers: the number of rows, or slices of a row, which are reduced at the same time. If None
+                            this is taken from the sans.batch.workers setting.
+        """
         super(BatchProcessRunner, self).__init__()
         self.row_processed_signal.connect(notify_progress)
         self.row_failed_signal.connect(notify_error)
         self.notify_done = notify_done
         self.batch_processor = SANSBatchReduction()
+        self.max_workers = get_number_of_batch_workers() if max_workers is None else max_workers
         self._worker = None
 
     @Slot()
@@ -50,10 +56,18 @@ class BatchProcessRunner(QObject):
 
     def _process_states_on_thread(self, states, use_optimizations, output_mode, plot_results, output_graph,
                                   save_can=False):
-        for key, state in states.items():
+        # Without the optimizations every row deletes the data it loaded once it is reduced, so
+        # rows can only be reduced at the same time if they share the loaded data through the cache.
+        row_workers = min(self.max_workers, len(states)) if use_optimizations else 1
+        # Workers not needed for rows are used to reduce the periods or time slices of each row.
+        package_workers = max(1, self.max_workers // max(row_workers, 1))
+
+        def _process_row(row):
+            key, state = row
             try:
                 out_scale_factors, out_shift_factors = \
-                    self.batch_processor([state], use_optimizations, output_mode, plot_results, output_graph, save_can)
+                    self.batch_processor([state], use_optimizations, output_mode, plot_results, output_graph, save_can,
+                                         package_workers)
                 if state.reduction.reduction_mode == ISISReductionMode.Merged:
                     out_shift_factors = out_shift_factors[0]
                     out_scale_factors = out_scale_factors[0]
@@ -65,10 +79,15 @@ class BatchProcessRunner(QObject):
             except Exception as e:
                 self.row_failed_signal.emit(key, str(e))
 
+        map_in_parallel(_process_row, states.items(), row_workers)
+
     def _load_workspaces_on_thread(self, states):
-        for key, state in states.items():
+        def _load_row(row):
+            key, state = row
             try:
                 load_workspaces_from_states(state)
                 self.row_processed_signal.emit(key, [], [])
             except Exception as e:
                 self.row_failed_signal.emit(key, str(e))
+
+        map_in_parallel(_load_row, states.items(), self.max_workers)
@@ -18,7 +18,7 @@ class SANSBatchReduction(object):
         super(SANSBatchReduction, self).__init__()
 
     def __call__(self, states, use_optimizations=True, output_mode=OutputMode.PublishToADS, plot_results = False,
-                 output_graph='', save_can=False):
+                 output_graph='', save_can=False, max_workers=1):
         """
         This is the start of any reduction.
 
@@ -28,20 +28,23 @@ class SANSBatchReduction(object):
                             1. PublishToADS
                             2. SaveToFile
                             3. Both
+        :param max_workers: the number of reduction packages (periods, time slices) of a state which may be
+                            reduced at the same time.
         """
         self.validate_inputs(states, use_optimizations, output_mode, plot_results, output_graph)
 
-        return self._execute(states, use_optimizations, output_mode, plot_results, output_graph, save_can=save_can)
+        return self._execute(states, use_optimizations, output_mode, plot_results, output_graph, save_can=save_can,
+                             max_workers=max_workers)
 
     @staticmethod
-    def _execute(states, use_optimizations, output_mode, plot_results, output_graph, save_can=False):
+    def _execute(states, use_optimizations, output_mode, plot_results, output_graph, save_can=False, max_workers=1):
         # Iterate over each state, load the data and perform the reduction
         out_scale_factors_list = []
         out_shift_factors_list = []
         for state in states:
             out_scale_factors, out_shift_factors = \
                 single_reduction_for_batch(state, use_optimizations, output_mode, plot_results, output_graph,
-                                           save_can=save_can)
+                                           save_can=save_can, max_workers=max_workers)
             out_shift_factors_list.append(out_shift_factors)
             out_scale_factors_list.append(out_scale_factors)
         return out_scale_factors_list, out_shift_factors_list
@@ -9,8 +9,14 @@
 """ Fundamental classes and Descriptors for the State mechanism."""
 from __future__ import (absolute_import, division, print_function)
 from abc import (ABCMeta, abstractmethod)
+from collections import (OrderedDict, namedtuple)
 import copy
+import hashlib
 import inspect
+import itertools
+import json
+import threading
+import weakref
 from functools import (partial)
 from six import string_types, with_metaclass
 
@@ -141,20 +147,42 @@ class TypedParameter(object):
             return self
         else:
             if hasattr(instance, self.name):
-                return getattr(instance, self.name)
+                value = getattr(instance, self.name)
+                # Lists, dicts and sub states can be changed in place, which the instance needs to know about
+                tracked_value = track_element(value, instance)
+                if tracked_value is not value:
+                    setattr(instance, self.name, tracked_value)
+                return tracked_value
             else:
                 return None
 
     def __set__(self, instance, value):
+        self._validate(value)
+        # The descriptor should be holding onto its own data and return a deepcopy of the data.
+        copied_value = copy.deepcopy(value)
+        self._store(instance, copied_value)
+
+    def set_without_copy(self, instance, value):
+        """
+        Sets a value which nothing else refers to, e.g. a freshly deserialized sub state, without copying it.
+
+        :param instance: the instance on which the value is set
+        :param value: the new value
+        """
+        self._validate(value)
+        self._store(instance, value)
+
+    def _validate(self, value):
         # Perform a type check
         self._type_check(value)
-        if self.validator(value):
-            # The descriptor should be holding onto its own data and return a deepcopy of the data.
-            copied_value = copy.deepcopy(value)
-            setattr(instance, self.name, copied_value)
-        else:
+        if not self.validator(value):
             raise ValueError("Trying to set {0} with an invalid value of {1}".format(self.name, str(value)))
 
+    def _store(self, instance, value):
+        setattr(instance, self.name, track_element(value, instance))
+        # Any cached serialization of the instance and of its parent states is out of date now
+        state_changed(instance)
+
     def __delete__(self):
         raise AttributeError("Cannot delete the attribute {0}".format(self.name))
 
@@ -309,17 +337,180 @@ class StateBase(with_metaclass(ABCMeta, object)):
 
     @property
     def property_manager(self):
+        """The serialized state. It is shared and must not be changed, use a deep copy of it to make changes."""
         return convert_state_to_dict(self)
 
     @property_manager.setter
     def property_manager(self, value):
         set_state_from_property_manager(self, value)
 
+    @property
+    def state_hash(self):
+        """A hash of the content of the state which is stable between sessions."""
+        return convert_state_to_dict(self)[STATE_HASH]
+
+    def __deepcopy__(self, memo):
+        # The copy does not belong to a parent state yet, but it can share the cached serialization of the original
+        copied = self.__class__.__new__(self.__class__)
+        memo[id(self)] = copied
+        for key, value in list(self.__dict__.items()):
+            if key == SERIALIZED_STATE:
+                copied.__dict__[key] = value
+            elif key != STATE_PARENT:
+                copied.__dict__[key] = copy.deepcopy(value, memo)
+        return copied
+
+    def __getstate__(self):
+        return {key: value for key, value in list(self.__dict__.items()) if key != STATE_PARENT}
+
     @abstractmethod
     def validate(self):
         pass
 
 
+# ------------------------------------------------
+# Change tracking
+# ------------------------------------------------
+# Each state has a version which changes whenever one of its values changes. The new version is passed on to the parent
+# states, so the version of a state tells us if anything in it or in its sub states has changed. Lists and dicts which
+# are held by a state are replaced by tracked versions of them when they are accessed, such that changing them in
+# place changes the version as well. Copies of the tracked containers are plain lists and dicts again.
+
+
+def state_changed(state):
+    """
+    Gives a state and all of its parent states a new version, which makes their cached serializations out of date.
+
+    :param state: the state which has changed
+    """
+    version = next(_state_versions)
+    while state is not None:
+        setattr(state, STATE_VERSION, version)
+        parent = getattr(state, STATE_PARENT, None)
+        state = parent() if parent is not None else None
+
+
+def track_element(element, owner):
+    """
+    Makes sure that changes to an element of a state are passed on to the state.
+
+    :param element: a value held by the owner, or an element of a list or dict held by the owner
+    :param owner: the state which holds the element
+    :return: the element, or a tracked version of it if it is a list or a dict
+    """
+    if isinstance(element, StateBase):
+        parent = getattr(element, STATE_PARENT, None)
+        if parent is None or parent() is not owner:
+            setattr(element, STATE_PARENT, weakref.ref(owner))
+    elif isinstance(element, list) and (type(element) is list or
+                                        (isinstance(element, TrackedList) and element.owner is not owner)):
+        return TrackedList(owner, element)
+    elif isinstance(element, dict) and (type(element) is dict or
+                                        (isinstance(element, TrackedDict) and element.owner is not owner)):
+        return TrackedDict(owner, element)
+    return element
+
+
+def _tracked_change(method):
+    def _changed(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.changed()
+        return result
+    return _changed
+
+
+class TrackedList(list):
+    """A list held by a state, which tells the state when it is changed."""
+    def __init__(self, owner, elements=()):
+        super(TrackedList, self).__init__(track_element(element, owner) for element in elements)
+        self._owner = weakref.ref(owner)
+
+    @property
+    def owner(self):
+        return self._owner()
+
+    def changed(self):
+        owner = self.owner
+        if owner is not None:
+            for index, element in enumerate(self):
+                tracked_element = track_element(element, owner)
+                if tracked_element is not element:
+                    list.__setitem__(self, index, tracked_element)
+            state_changed(owner)
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        copied = copy.deepcopy(list(self), memo)
+        memo[id(self)] = copied
+        return copied
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+    __setitem__ = _tracked_change(list.__setitem__)
+    __delitem__ = _tracked_change(list.__delitem__)
+    __iadd__ = _tracked_change(list.__iadd__)
+    __imul__ = _tracked_change(list.__imul__)
+    append = _tracked_change(list.append)
+    extend = _tracked_change(list.extend)
+    insert = _tracked_change(list.insert)
+    pop = _tracked_change(list.pop)
+    if hasattr(list, "clear"):
+        clear = _tracked_change(list.clear)
+    remove = _tracked_change(list.remove)
+    reverse = _tracked_change(list.reverse)
+    sort = _tracked_change(list.sort)
+    if hasattr(list, "__setslice__"):
+        __setslice__ = _tracked_change(list.__setslice__)
+        __delslice__ = _tracked_change(list.__delslice__)
+
+
+class TrackedDict(dict):
+    """A dict held by a state, which tells the state when it is changed."""
+    def __init__(self, owner, elements=None):
+        super(TrackedDict, self).__init__((key, track_element(element, owner))
+                                          for key, element in list((elements or {}).items()))
+        self._owner = weakref.ref(owner)
+
+    @property
+    def owner(self):
+        return self._owner()
+
+    def changed(self):
+        owner = self.owner
+        if owner is not None:
+            for key, element in list(self.items()):
+                tracked_element = track_element(element, owner)
+                if tracked_element is not element:
+                    dict.__setitem__(self, key, tracked_element)
+            state_changed(owner)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        copied = copy.deepcopy(dict(self), memo)
+        memo[id(self)] = copied
+        return copied
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+    __setitem__ = _tracked_change(dict.__setitem__)
+    __delitem__ = _tracked_change(dict.__delitem__)
+    clear = _tracked_change(dict.clear)
+    pop = _tracked_change(dict.pop)
+    popitem = _tracked_change(dict.popitem)
+    update = _tracked_change(dict.update)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
 def rename_descriptor_names(cls):
     """
     Class decorator which changes the names of TypedParameters in a class instance in order to make it more readable.
@@ -344,14 +535,45 @@ def rename_descriptor_names(cls):
 #
 # During serialization we place identifier tags into the serialized object, e.g. we add a specifier if the item
 # is a State type at all and if so which state it is.
+#
+# Serializing a state is done often, every time a state is passed to an algorithm. Each state object therefore
+# keeps its serialized form, together with the version of the state it was made from (see the change tracking above).
+# The serialized form is shared by all callers, so it must not be changed. Each serialized state also carries a content
+# hash, which is used to find already deserialized copies of unchanged (sub) states when going the other way.
 
 
 STATE_NAME = "state_name"
 STATE_MODULE = "state_module"
+STATE_HASH = "state_hash"
+STATE_VERSION = "_state_version"
+SERIALIZED_STATE = "_serialized_state"
+STATE_PARENT = "_state_parent"
 SEPARATOR_SERIAL = "#"
 class_type_parameter_id = "ClassTypeParameterID#"
 MODULE = "__module__"
 
+DESERIALIZED_STATE_CACHE_SIZE = 256
+
+_state_versions = itertools.count()
+_class_descriptors = {}
+_classes = {}
+_deserialized_states = OrderedDict()
+_deserialized_states_lock = threading.Lock()
+_state_caching = True
+
+SerializedState = namedtuple("SerializedState", ["state_hash", "values"])
+
+
+def set_state_caching(enabled):
+    """
+    Switches the caching of serialized and deserialized states on or off, e.g. to measure what it gains.
+
+    :param enabled: if True, then serialized and deserialized states are cached
+    """
+    global _state_caching
+    _state_caching = enabled
+    clear_deserialized_state_cache()
+
 
 def is_state(property_manager):
     return property_manager.existsProperty(STATE_NAME) and property_manager.existsProperty(STATE_MODULE)
@@ -378,6 +600,13 @@ def get_module_and_class_name(instance):
 
 
 def provide_class_from_module_and_class_name(module_name, class_name):
+    key = (module_name, class_name)
+    if key not in _classes:
+        _classes[key] = import_class_from_module_and_class_name(module_name, class_name)
+    return _classes[key]
+
+
+def import_class_from_module_and_class_name(module_name, class_name):
     # Importlib seems to be missing on RHEL6, hence we resort to __import__
     try:
         from importlib import import_module
@@ -426,26 +655,67 @@ def create_module_and_class_name_from_encoded_string(class_type_id, module_name,
 
 
 def create_sub_state(value):
+    """
+    Creates a state from its serialized form. A state which has been deserialized before is copied from a cache.
+
+    :param value: a serialized state, either on a property manager or as read by read_serialized_state
+    :return: the deserialized state
+    """
+    serialized = value if isinstance(value, SerializedState) else read_serialized_state(value)
+    state_hash = serialized.state_hash
+    with _deserialized_states_lock:
+        cached = _deserialized_states.pop(state_hash, None)
+        # The cached state is not a copy, so it could have been changed after it was deserialized
+        if cached is not None and getattr(cached[0], STATE_VERSION, None) == cached[1]:
+            _deserialized_states[state_hash] = cached
+        else:
+            cached = None
+    if cached is not None:
+        return copy.deepcopy(cached[0])
+
     # We are dealing with a sub state. We first have to create it and then populate it
-    sub_state_class = provide_class(value)
-    # Create the sub state, populate it and set it on the super state
+    sub_state_class = provide_class_from_module_and_class_name(serialized.values[STATE_MODULE],
+                                                               serialized.values[STATE_NAME])
     sub_state = sub_state_class()
-    sub_state.property_manager = value
+    set_state_from_serialized_state(sub_state, serialized)
+
+    if _state_caching:
+        with _deserialized_states_lock:
+            _deserialized_states[state_hash] = (sub_state, getattr(sub_state, STATE_VERSION, None))
+            while len(_deserialized_states) > DESERIALIZED_STATE_CACHE_SIZE:
+                _deserialized_states.popitem(last=False)
     return sub_state
 
 
+def clear_deserialized_state_cache():
+    with _deserialized_states_lock:
+        _deserialized_states.clear()
+
+
+def get_class_descriptors(cls):
+    """
+    Gets all the TypedParameter descriptors of a state class. These are looked up only once per class.
+
+    :param cls: a state class
+    :return: a dict of descriptor names and descriptors
+    """
+    descriptors = _class_descriptors.get(cls)
+    if descriptors is None:
+        descriptors = {}
+        for descriptor_name, descriptor_object in inspect.getmembers(cls):
+            if inspect.isdatadescriptor(descriptor_object) and isinstance(descriptor_object, TypedParameter):
+                descriptors.update({descriptor_name: descriptor_object})
+        _class_descriptors[cls] = descriptors
+    return descriptors
+
+
 def get_descriptor_values(instance):
     # Get all descriptor names which are TypedParameter of instance's type
-    descriptor_names = []
-    descriptor_types = {}
-    for descriptor_name, descriptor_object in inspect.getmembers(type(instance)):
-        if inspect.isdatadescriptor(descriptor_object) and isinstance(descriptor_object, TypedParameter):
-            descriptor_names.append(descriptor_name)
-            descriptor_types.update({descriptor_name: descriptor_object})
+    descriptor_types = get_class_descriptors(type(instance))
 
     # Get the descriptor values from the instance
     descriptor_values = {}
-    for key in descriptor_names:
+    for key in descriptor_types:
         if hasattr(instance, key):
             value = getattr(instance, key)
             if value is not None:
@@ -455,20 +725,90 @@ def get_descriptor_values(instance):
 
 def get_class_descriptor_types(instance):
     # Get all descriptor names which are TypedParameter of instance's type
-    descriptors = {}
-    for descriptor_name, descriptor_object in inspect.getmembers(type(instance)):
-        if inspect.isdatadescriptor(descriptor_object) and isinstance(descriptor_object, TypedParameter):
-            descriptors.update({descriptor_name: type(descriptor_object)})
-    return descriptors
+    return {descriptor_name: type(descriptor_object)
+            for descriptor_name, descriptor_object in list(get_class_descriptors(type(instance)).items())}
+
+
+def get_hash_of_state_dict(state_dict):
+    """
+    Gets a hash of a serialized state. Serialized sub states are represented by their own hash.
+
+    :param state_dict: a serialized state without a hash entry
+    :return: a hex digest
+    """
+    def _hash_or_value(value):
+        return value[STATE_HASH] if isinstance(value, dict) and STATE_HASH in value else value
+
+    to_hash = {}
+    for key, value in list(state_dict.items()):
+        if isinstance(value, dict) and STATE_HASH not in value:
+            value = {key_sub: _hash_or_value(val_sub) for key_sub, val_sub in list(value.items())}
+        to_hash.update({key: _hash_or_value(value)})
+    serialized = json.dumps(to_hash, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def get_hashable_value(value):
+    if isinstance(value, SerializedState):
+        return value.state_hash
+    elif isinstance(value, dict):
+        return {key_sub: get_hashable_value(val_sub) for key_sub, val_sub in list(value.items())}
+    elif type(value) is PropertyManager:
+        return {key_sub: get_hashable_value(value.getProperty(key_sub).value) for key_sub in list(value.keys())}
+    elif is_float_vector(value) or is_string_vector(value) or is_int_vector(value):
+        return list(value)
+    elif hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+def read_serialized_state(property_manager):
+    """
+    Reads a serialized state from a property manager.
+
+    Sub states are read first, and the content hash of the state is calculated from their hashes, such that each value
+    is read and hashed only once. The hash entry of the serialized state is not used, since the serialized state could
+    have been changed after the hash was added.
+    :param property_manager: a serialized state
+    :return: a SerializedState with the content hash and the values of the state. Sub states are SerializedStates, too.
+    """
+    def _read_value(value):
+        if type(value) is PropertyManager and is_state(value):
+            return read_serialized_state(value)
+        return value
+
+    values = {}
+    to_hash = {}
+    for key in list(property_manager.keys()):
+        if key == STATE_HASH:
+            continue
+        value = _read_value(property_manager.getProperty(key).value)
+        if type(value) is PropertyManager:
+            # We must be dealing with a dict descriptor, a value of which might be a sub state
+            value = {key_sub: _read_value(value.getProperty(key_sub).value) for key_sub in list(value.keys())}
+        values.update({key: value})
+        to_hash.update({key: get_hashable_value(value)})
+    return SerializedState(get_hash_of_state_dict(to_hash), values)
 
 
 def convert_state_to_dict(instance):
     """
     Converts the state object to a dictionary.
 
+    The result is kept on the instance and is reused until the state or one of its sub states changes. It is shared by
+    all callers, hence it must not be changed. Callers which want to change it have to copy it first.
     :param instance: the instance which is to be converted
     :return: a serialized state object in the form of a dict
     """
+    version = getattr(instance, STATE_VERSION, None)
+    cached = getattr(instance, SERIALIZED_STATE, None) if _state_caching else None
+    if cached is None or cached[0] != version:
+        cached = (version, create_state_dict(instance))
+        setattr(instance, SERIALIZED_STATE, cached)
+    return cached[1]
+
+
+def create_state_dict(instance):
     descriptor_values, descriptor_types = get_descriptor_values(instance)
     # Add the descriptors to a dict
     state_dict = dict()
@@ -487,26 +827,29 @@ def convert_state_to_dict(instance):
                 if isinstance(val_sub, StateBase):
                     sub_dictionary_value = val_sub.property_manager
                 else:
-                    sub_dictionary_value = val_sub
+                    sub_dictionary_value = copy.deepcopy(val_sub)
                 sub_dictionary.update({key_sub: sub_dictionary_value})
             value = sub_dictionary
         elif isinstance(descriptor_types[key], ClassTypeParameter):
             value = get_serialized_class_type_parameter(value)
         elif isinstance(descriptor_types[key], ClassTypeListParameter):
-            if value:
-                # If there are entries in the list, then convert them individually and place them into a list.
-                # The list will contain a sequence of serialized ClassTypeParameters
-                serialized_value = []
-                for element in value:
-                    serialized_element = get_serialized_class_type_parameter(element)
-                    serialized_value.append(serialized_element)
-                value = serialized_value
+            # Convert the entries of the list individually and place them into a list.
+            # The list will contain a sequence of serialized ClassTypeParameters
+            serialized_value = []
+            for element in value:
+                serialized_element = get_serialized_class_type_parameter(element)
+                serialized_value.append(serialized_element)
+            value = serialized_value
+        elif isinstance(value, list):
+            # The serialized state must not change when the list of the state is changed
+            value = list(value)
 
         state_dict.update({key: value})
     # Add information about the current state object, such as in which module it lives and what its name is
     module_name, class_name = get_module_and_class_name(instance)
     state_dict.update({STATE_MODULE: module_name})
     state_dict.update({STATE_NAME: class_name})
+    state_dict.update({STATE_HASH: get_hash_of_state_dict(state_dict)})
     return state_dict
 
 
@@ -517,13 +860,29 @@ def set_state_from_property_manager(instance, property_manager):
     :param instance: the instance which is to be set with a values of the property manager
     :param property_manager: the property manager with the stored setting
     """
+    set_state_from_serialized_state(instance, read_serialized_state(property_manager))
+
+
+def set_state_from_serialized_state(instance, serialized_state):
+    """
+    Set the State object from a serialized state which has been read by read_serialized_state.
+
+    :param instance: the instance which is to be set with the values of the serialized state
+    :param serialized_state: a SerializedState
+    """
     def _set_element(inst, k_element, v_element):
-        if k_element != STATE_NAME and k_element != STATE_MODULE:
+        if k_element != STATE_NAME and k_element != STATE_MODULE and k_element != STATE_HASH:
+            setattr(inst, k_element, v_element)
+
+    def _set_new_element(inst, k_element, v_element):
+        # The deserialized sub states are not used anywhere else, so they don't need to be copied
+        descriptor = get_class_descriptors(type(inst)).get(k_element)
+        if descriptor is None:
             setattr(inst, k_element, v_element)
+        else:
+            descriptor.set_without_copy(inst, v_element)
 
-    keys = list(property_manager.keys())
-    for key in keys:
-        value = property_manager.getProperty(key).value
+    for key, value in list(serialized_state.values.items()):
         # There are four scenarios that need to be considered
         # 1. ParameterManager 1: This indicates (most often) that we are dealing with a new state -> create it and
         #                      apply recursion
@@ -538,23 +897,21 @@ def set_state_from_property_manager(instance, property_manager):
         # 6. Vector for string: This needs to handle Mantid's string array
         # 7. Vector for int: This needs to handle Mantid's integer array
         # 8. Normal values: all is fine, just populate them
-        if type(value) is PropertyManager and is_state(value):
+        if isinstance(value, SerializedState):
             sub_state = create_sub_state(value)
-            setattr(instance, key, sub_state)
-        elif type(value) is PropertyManager:
+            _set_new_element(instance, key, sub_state)
+        elif isinstance(value, dict):
             # We must be dealing with an actual dict descriptor
-            sub_dict_keys = list(value.keys())
             dict_element = {}
             # We need to watch out if a value of the dictionary is a sub state
-            for sub_dict_key in sub_dict_keys:
-                sub_dict_value = value.getProperty(sub_dict_key).value
-                if type(sub_dict_value) == PropertyManager and is_state(sub_dict_value):
+            for sub_dict_key, sub_dict_value in list(value.items()):
+                if isinstance(sub_dict_value, SerializedState):
                     sub_state = create_sub_state(sub_dict_value)
                     sub_dict_value_to_insert = sub_state
                 else:
                     sub_dict_value_to_insert = sub_dict_value
                 dict_element.update({sub_dict_key: sub_dict_value_to_insert})
-            setattr(instance, key, dict_element)
+            _set_new_element(instance, key, dict_element)
         elif is_class_type_parameter(value):
             class_type_parameter = get_deserialized_class_type_parameter(value)
             _set_element(instance, key, class_type_parameter)
@@ -0,0 +1,44 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+import unittest
+import numpy as np
+from AbinsModules import SharedMemoryPool
+
+
+def _square_row(arrays, item):
+    arrays["output"][item] = arrays["input"][item] ** 2
+    return item
+
+
+class AbinsSharedMemoryPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        if not SharedMemoryPool.is_available():
+            self.skipTest("Worker processes cannot be started with fork on this platform.")
+
+    def test_workers_write_to_shared_arrays(self):
+        with SharedMemoryPool(processes=2, task=_square_row,
+                              arrays={"input": ((4, 3), np.float64), "output": ((4, 3), np.float64)}) as pool:
+            pool.arrays["input"][:] = np.arange(12.).reshape(4, 3)
+            results = pool.map(range(4))
+            output = pool.arrays["output"].copy()
+
+        self.assertEqual([0, 1, 2, 3], results)
+        np.testing.assert_array_equal(np.arange(12.).reshape(4, 3) ** 2, output)
+
+    def test_arrays_are_reused_between_rounds(self):
+        with SharedMemoryPool(processes=2, task=_square_row,
+                              arrays={"input": (2, np.float64), "output": (2, np.float64)}) as pool:
+            for value in [2., 3.]:
+                pool.arrays["input"][:] = value
+                pool.map(range(2))
+                np.testing.assert_array_equal([value ** 2] * 2, pool.arrays["output"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1372,6 +1372,58 @@ class CrystalFieldFitTest(unittest.TestCase):
         fit.fit()
         self.assertTrue(cf.chi2 < 100.0)
 
+    def test_estimate_parameters_parallel(self):
+        from CrystalField.fitting import makeWorkspace
+        from CrystalField import CrystalField, CrystalFieldFit
+
+        # Create some crystal field data
+        origin = CrystalField('Ce', 'C2v', B20=0.37737, B22=3.9770, B40=-0.031787, B42=-0.11611, B44=-0.12544,
+                              Temperature=44.0, FWHM=1.1)
+        x, y = origin.getSpectrum()
+        ws = makeWorkspace(x, y)
+
+        cf = CrystalField('Ce', 'C2v', B20=0, B22=0, B40=0, B42=0, B44=0,
+                          Temperature=44.0, FWHM=1.0)
+        cf.ties(B20=0.37737)
+        fit = CrystalFieldFit(cf, InputWorkspace=ws)
+        fit.estimate_parameters(50, ['B22', 'B40', 'B42', 'B44'],
+                                constraints='20<f1.PeakCentre<45,20<f2.PeakCentre<45', NSamples=100, Seed=123,
+                                NOutputs=5, NWorkers=2)
+        self.assertEqual(fit.get_number_estimates(), 5)
+        # The model is set to the best of all parameter sets
+        b22 = cf['B22']
+        fit.select_estimated_parameters(2)
+        fit.select_estimated_parameters(1)
+        self.assertAlmostEqual(cf['B22'], b22)
+        # which is the first parameter set of the table
+        from mantid.api import mtd
+        table = mtd['estimated_parameters']
+        names = table.column(0)
+        self.assertIn('B22', names)
+        self.assertAlmostEqual(b22, table.column(1)[names.index('B22')])
+        fit.fit()
+        self.assertTrue(cf.chi2 < 100.0)
+
+        # The parameter sets are distinct
+        columns = [tuple(table.column(i)) for i in range(1, table.columnCount())]
+        self.assertEqual(len(columns), len(set(columns)))
+
+        # Stop as soon as any parameter set is acceptable
+        fit = CrystalFieldFit(cf, InputWorkspace=ws)
+        fit.estimate_parameters(50, ['B22', 'B40', 'B42', 'B44'], NSamples=100, Seed=123, Chi2Target=1.e30)
+        self.assertTrue(fit.get_number_estimates() >= 1)
+
+    def test_rank_parameter_sets(self):
+        from CrystalField.fitting import _rank_parameter_sets
+        initial = [0.0, 1.0]
+        candidates = [(5.0, initial), (2.0, [0.5, 1.5]), (5.0, list(initial)), (1.0, [0.2, 0.3]),
+                      (5.0, initial), (3.0, [0.2, 0.4])]
+        ranked = _rank_parameter_sets(candidates, 3)
+        self.assertEqual([cost for cost, _ in ranked], [1.0, 2.0, 3.0])
+        ranked = _rank_parameter_sets(candidates, 10)
+        self.assertEqual([cost for cost, _ in ranked], [1.0, 2.0, 3.0, 5.0])
+        self.assertEqual(ranked[-1][1], initial)
+
     def test_intensity_scaling_single_spectrum(self):
         from CrystalField import CrystalField, CrystalFieldFit, Background, Function
 
@@ -1472,6 +1524,22 @@ class CrystalFieldFitTest(unittest.TestCase):
         self.assertAlmostEqual(blm['B64'] / blm['B60'], -21., 3) # Cubic symmetry implies B64=-21B60
         DeleteWorkspace(ws)
 
+    def test_CrystalField_PointCharge_change_charges(self):
+        from CrystalField import PointCharge
+        from mantid.geometry import CrystalStructure
+        perovskite = CrystalStructure('4 4 4', 'P m -3 m',
+                                      'Ce 0. 0. 0. 1. 0.; Al 0.5 0.5 0.5 1. 0.; O 0.5 0.5 0. 1. 0.')
+        pc = PointCharge(perovskite, 'Ce', {'Ce':0, 'Al':0, 'O':-2}, MaxDistance=5.)
+        blm0 = pc.calculate()
+        # The ligand positions are kept, so only the charges are recalculated
+        pc.Charges = {'Ce':0, 'Al':0, 'O':-4}
+        blm = pc.calculate()
+        for k, v in blm0.items():
+            self.assertAlmostEqual(blm[k], 2. * v)
+        pc.MaxDistance = 3.
+        blm = pc.calculate()
+        self.assertNotAlmostEqual(blm['B40'], 2. * blm0['B40'])
+
     def test_CrystalField_PointCharge_file(self):
         from CrystalField import PointCharge
         import mantid.simpleapi
@@ -0,0 +1,93 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+import unittest
+import numpy as np
+
+# Import mantid to setup the python paths to the bundled scripts
+import mantid  # noqa
+from mantid.simpleapi import CalculateCoverageDGS, DeleteWorkspace, LoadEmptyInstrument, SetGoniometer, SetUB
+from DGSPlanner import CoverageCalculator
+
+
+class CoverageCalculatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ws = LoadEmptyInstrument(InstrumentName='CNCS', OutputWorkspace='__CoverageCalculatorTest')
+        SetUB(cls.ws, a=5.4, b=5.4, c=13.2, gamma=120)
+
+    @classmethod
+    def tearDownClass(cls):
+        DeleteWorkspace(cls.ws)
+
+    def test_goniometer_matrices(self):
+        directions = ['0,1,0', '0,0,1', '1,0,0']
+        senses = [1, -1, 1]
+        matrices = CoverageCalculator.goniometer_matrices([[0., 30.], [10.], [-5., 0., 5.]], directions, senses)
+        self.assertEqual(matrices.shape, (6, 3, 3))
+        SetGoniometer(self.ws, Axis0='30,0,1,0,1', Axis1='10,0,0,1,-1', Axis2='5,1,0,0,1')
+        np.testing.assert_allclose(matrices[5], self.ws.run().getGoniometer().getR(), atol=1e-12)
+
+    def test_coverage_as_CalculateCoverageDGS(self):
+        two_theta, phi = CoverageCalculator.detector_angles(self.ws)
+        angles = [0., 40.]
+        goniometers = CoverageCalculator.goniometer_matrices([angles, [0.], [0.]], ['0,1,0', '0,0,1', '1,0,0'],
+                                                             [1, 1, 1])
+        ub = self.ws.sample().getOrientedLattice().getUB()
+        basis = [[1., 0., 0.], [0., 1., 0.], [0., 0., 1.]]
+        coverage_args = (ub, basis, 10., [0, 1, 2, 3], [None] * 4, [None] * 4, [0.05, 0.05, None, None])
+        results = list(CoverageCalculator.calculate_coverage(two_theta, phi, goniometers, *coverage_args,
+                                                             block_memory=1))
+        self.assertEqual([result[1] for result in results], [1, 2])
+        for i, angle in enumerate(angles):
+            grid, _, last = list(CoverageCalculator.calculate_coverage(two_theta, phi, goniometers[i:i + 1],
+                                                                       *coverage_args))[-1]
+            SetGoniometer(self.ws, Axis0='{},0,1,0,1'.format(angle))
+            coverage = CalculateCoverageDGS(self.ws, IncidentEnergy=10., Dimension1Step=0.05, Dimension2Step=0.05)
+            signal = coverage.getSignalArray()[:, :, 0, 0] > 0
+            self.assertEqual(signal.shape, last.shape)
+            self.assertAlmostEqual(grid.minimum[0], coverage.getDimension(0).getMinimum(), places=4)
+            self.assertAlmostEqual(grid.maximum[1], coverage.getDimension(1).getMaximum(), places=4)
+            np.testing.assert_array_equal(last >= 0, signal)
+            DeleteWorkspace(coverage)
+        # The later setting is recorded where both cover a bin
+        _, _, last = results[-1]
+        self.assertTrue(np.any(last == 0))
+        self.assertTrue(np.any(last == 1))
+
+    def test_coverage_with_limits_of_integrated_dimensions_as_CalculateCoverageDGS(self):
+        two_theta, phi = CoverageCalculator.detector_angles(self.ws)
+        goniometers = CoverageCalculator.goniometer_matrices([[20.], [0.], [0.]], ['0,1,0', '0,0,1', '1,0,0'],
+                                                             [1, 1, 1])
+        ub = self.ws.sample().getOrientedLattice().getUB()
+        basis = [[1., 0., 0.], [0., 0., 1.], [0., 1., 0.]]
+        _, _, last = list(CoverageCalculator.calculate_coverage(two_theta, phi, goniometers, ub, basis, 10.,
+                                                                [1, 3, 0, 2], [None, -2., -0.2, None],
+                                                                [None, 1., 0.3, 4.], [0.1, 0.5, None, None]))[-1]
+        SetGoniometer(self.ws, Axis0='20,0,1,0,1')
+        coverage = CalculateCoverageDGS(self.ws, IncidentEnergy=10., Q1Basis='1,0,0', Q2Basis='0,0,1',
+                                        Q3Basis='0,1,0', Dimension1='Q2', Dimension1Step=0.1, Dimension2='DeltaE',
+                                        Dimension2Min=-2., Dimension2Max=1., Dimension2Step=0.5, Dimension3='Q1',
+                                        Dimension3Min=-0.2, Dimension3Max=0.3, Dimension4='Q3', Dimension4Max=4.)
+        np.testing.assert_array_equal(last >= 0, coverage.getSignalArray()[:, :, 0, 0] > 0)
+        DeleteWorkspace(coverage)
+
+    def test_cached_coverage(self):
+        two_theta, phi = np.radians([[30., 60.], [0., 10.]])
+        args = (two_theta, phi, np.eye(3), np.eye(3) / 5., np.eye(3).tolist(), 20., [0, 1, 2, 3], [None] * 4,
+                [None] * 4, [0.1, 0.1, None, None])
+        key = ('test_cached_coverage', 20.)
+        calculated = list(CoverageCalculator.cached_coverage(key, *args))
+        cached = list(CoverageCalculator.cached_coverage(key, *args))
+        self.assertEqual(len(cached), 1)
+        self.assertIs(cached[0][2], calculated[-1][2])
+        self.assertTrue(np.any(cached[0][2] == 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mantid.py3compat import mock
+from HFIR_4Circle_Reduction.multi_threads_helpers import MergePeaksThread
+from HFIR_4Circle_Reduction.reduce4circleControl import CWSCDReductionControl
+
+EXP_NUMBER = 355
+CENTER = (128, 128)
+
+
+def touch(file_name, mtime):
+    with open(file_name, 'w'):
+        pass
+    os.utime(file_name, (mtime, mtime))
+
+
+class IsPreProcessedUpToDateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.controller = CWSCDReductionControl('HB3A')
+        self.controller._debugPrintMode = False
+        self.controller.set_detector_center(EXP_NUMBER, CENTER[0], CENTER[1])
+
+        self.input_files = [os.path.join(self.directory, name) for name in ('HB3A_exp355_scan0011.dat',
+                                                                            'HB3A_exp355_scan0011_0001.xml')]
+        for input_file in self.input_files:
+            touch(input_file, 1000)
+        self.md_file = os.path.join(self.directory, 'Exp355_Scan11_MD.nxs')
+        touch(self.md_file, 2000)
+        self.record_dict = {11: {'MD': self.md_file, 'Center': CENTER, 'WaveLength': None,
+                                 'DetSampleDistance': None}}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def is_up_to_date(self):
+        return self.controller.is_pre_processed_up_to_date(EXP_NUMBER, 11, self.md_file, self.input_files,
+                                                           self.record_dict)
+
+    def test_md_file_newer_than_its_inputs_with_matching_record_is_up_to_date(self):
+        self.assertTrue(self.is_up_to_date())
+
+    def test_md_file_older_than_an_input_is_not_up_to_date(self):
+        os.utime(self.input_files[1], (3000, 3000))
+
+        self.assertFalse(self.is_up_to_date())
+
+    def test_md_file_with_another_calibration_is_not_up_to_date(self):
+        self.controller.set_detector_center(EXP_NUMBER, CENTER[0] + 1, CENTER[1])
+
+        self.assertFalse(self.is_up_to_date())
+
+    def test_md_file_recorded_under_another_path_is_not_up_to_date(self):
+        self.record_dict[11]['MD'] = os.path.join(self.directory, 'other', 'Exp355_Scan11_MD.nxs')
+
+        self.assertFalse(self.is_up_to_date())
+
+    def test_scan_without_record_or_md_file_is_not_up_to_date(self):
+        self.assertFalse(self.controller.is_pre_processed_up_to_date(EXP_NUMBER, 12, self.md_file, self.input_files,
+                                                                     self.record_dict))
+        os.remove(self.md_file)
+        self.assertFalse(self.is_up_to_date())
+
+
+class MergePeaksThreadTest(unittest.TestCase):
+    def setUp(self):
+        self.scans = list(range(1, 9))
+        self.md_files = ['Exp355_Scan{0}_MD.nxs'.format(scan) for scan in self.scans]
+        self.up_to_date = {3, 6}
+
+        self.lock = threading.Lock()
+        self.fetched = list()
+        self.merged = list()
+        self.max_waiting = 0
+
+        self.main_window = mock.MagicMock()
+        controller = self.main_window.controller
+        controller.prefetch_scan_files.side_effect = self.prefetch_scan_files
+        controller.is_pre_processed_up_to_date.side_effect = \
+            lambda exp, scan, md_file, input_files, record_dict: scan in self.up_to_date
+        controller.merge_pts_in_scan.side_effect = self.merge_pts_in_scan
+
+    def prefetch_scan_files(self, exp_number, scan_number):
+        with self.lock:
+            self.fetched.append(scan_number)
+        return True, ([1], ['HB3A_exp355_scan{0:04}.dat'.format(scan_number)])
+
+    def merge_pts_in_scan(self, exp_no, scan_no, pt_num_list, rewrite, preprocessed_dir):
+        with self.lock:
+            self.merged.append(scan_no)
+            self.max_waiting = max(self.max_waiting, len(self.fetched) - len(self.merged))
+        return True, ('Exp355_Scan{0}_MD'.format(scan_no), '')
+
+    def run_thread(self, record_file_name):
+        thread = MergePeaksThread(self.main_window, EXP_NUMBER, self.scans, self.md_files)
+        thread.set_number_of_workers(1)
+        thread.set_skip_up_to_date(record_file_name)
+        with mock.patch('HFIR_4Circle_Reduction.fourcircle_utility.read_pre_process_record', return_value={}):
+            thread.run()
+        return thread
+
+    def test_run_skips_up_to_date_scans(self):
+        with mock.patch('os.path.exists', return_value=True):
+            self.run_thread('record.csv')
+
+        self.assertEqual(self.fetched, self.scans)
+        self.assertEqual(self.merged, [scan for scan in self.scans if scan not in self.up_to_date])
+        save_merged_scan = self.main_window.controller.save_merged_scan
+        self.assertEqual([kwargs['output'] for _, kwargs in save_merged_scan.call_args_list],
+                         [md_file for scan, md_file in zip(self.scans, self.md_files) if scan not in self.up_to_date])
+
+    def test_run_merges_all_scans_without_a_record(self):
+        self.run_thread(None)
+
+        self.assertEqual(self.merged, self.scans)
+        self.main_window.controller.is_pre_processed_up_to_date.assert_not_called()
+
+    def test_run_fetches_a_bounded_number_of_scans_ahead(self):
+        self.up_to_date = set()
+        self.run_thread(None)
+
+        # one merging thread: at most one scan is fetched and waits while another is merged
+        self.assertEqual(self.merged, self.scans)
+        self.assertLessEqual(self.max_waiting, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,7 @@ from Muon.GUI.Common.contexts.muon_gui_context import MuonGuiContext
 from Muon.GUI.Common.muon_load_data import MuonLoadData
 from Muon.GUI.Common.utilities.load_utils import load_workspace_from_filename
 from Muon.GUI.Common.ADSHandler.muon_workspace_wrapper import MuonWorkspaceWrapper
+from mantid.py3compat import mock
 
 if sys.version_info.major < 2:
     pass
@@ -106,6 +107,72 @@ class MuonContextTest(unittest.TestCase):
         self.assertEquals(AnalysisDataService.getObjectNames(),
                           ['EMU19489', 'EMU19489 Pairs', 'EMU19489; Pair Asym; long; #1', 'EMU19489; Pair Asym; long; Rebin; #1', 'Muon Data'])
 
+    def test_show_all_groups_does_not_recalculate_unchanged_groups(self):
+        self.context.show_all_groups()
+        counts_workspace = self.group_pair_context['fwd'].workspace[str([19489])]
+
+        with mock.patch('Muon.GUI.Common.utilities.algorithm_utils.run_MuonPreProcess') as pre_process:
+            self.context.show_all_groups()
+
+        pre_process.assert_not_called()
+        self.assertTrue(self.group_pair_context['fwd'].workspace[str([19489])] is counts_workspace)
+
+    def test_changing_a_group_only_recalculates_that_group_and_its_pairs(self):
+        self.context.show_all_groups()
+        self.context.show_all_pairs()
+        fwd_workspace = self.group_pair_context['fwd'].workspace[str([19489])]
+        bwd_workspace = self.group_pair_context['bwd'].workspace[str([19489])]
+        pair_workspace = self.group_pair_context['long'].workspace[str([19489])]
+
+        self.group_pair_context['fwd'].detectors = list(range(1, 10))
+        self.context.show_all_groups()
+        self.context.show_all_pairs()
+
+        self.assertFalse(self.group_pair_context['fwd'].workspace[str([19489])] is fwd_workspace)
+        self.assertTrue(self.group_pair_context['bwd'].workspace[str([19489])] is bwd_workspace)
+        self.assertFalse(self.group_pair_context['long'].workspace[str([19489])] is pair_workspace)
+        self.assertEqual(self.group_pair_context['fwd'].workspace[str([19489])].workspace.getNumberHistograms(), 1)
+
+    def test_pre_processed_data_is_kept_until_all_groups_and_pairs_are_up_to_date(self):
+        self.context.show_all_groups()
+        self.assertTrue(self.context._pre_processed_data)
+
+        with mock.patch('Muon.GUI.Common.utilities.algorithm_utils.run_MuonPreProcess') as pre_process:
+            self.context.show_all_pairs()
+
+        pre_process.assert_not_called()
+        self.assertEqual(self.context._pre_processed_data, {})
+
+    def test_inputs_of_removed_groups_and_pairs_are_not_kept(self):
+        self.context.show_all_groups()
+        self.context.show_all_pairs()
+
+        self.group_pair_context.remove_group('bwd')
+        self.group_pair_context.remove_pair('long')
+        self.context.show_all_groups()
+
+        self.assertEqual([key[:2] for key in self.context._calculated_inputs], [('group', 'fwd')])
+
+    def test_groups_are_recalculated_when_first_good_data_changes(self):
+        self.context.show_all_groups()
+        counts_workspace = self.group_pair_context['fwd'].workspace[str([19489])]
+
+        self.gui_context.update({'FirstGoodDataFromFile': False, 'FirstGoodData': 1.0})
+        self.context.show_all_groups()
+
+        self.assertFalse(self.group_pair_context['fwd'].workspace[str([19489])] is counts_workspace)
+        self.assertAlmostEqual(self.group_pair_context['fwd'].workspace[str([19489])].workspace.readX(0)[0], 1.0, 1)
+
+    def test_recorded_inputs_do_not_keep_the_loaded_data_alive(self):
+        self.context.show_all_groups()
+
+        recorded_inputs = [inputs for inputs, _ in self.context._pre_processed_data.values()] + \
+                          [inputs for _, inputs in self.context._calculated_inputs.values()]
+        self.assertTrue(recorded_inputs)
+        for inputs in recorded_inputs:
+            self.assertFalse(any(item is self.load_result for item in inputs))
+            self.assertTrue(inputs[0]() is self.data_context.get_loaded_entry_for_run([19489]))
+
     def test_update_current_data_sets_current_run_in_data_context(self):
         self.context.update_current_data()
 
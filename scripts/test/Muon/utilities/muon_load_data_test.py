@@ -6,6 +6,7 @@
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
 
+import threading
 import unittest
 
 from mantid.py3compat import mock
@@ -222,6 +223,128 @@ class MuonLoadDataTest(unittest.TestCase):
 
         self.assertEqual(data_dict, {'workspace': self.workspace_last, 'filename': 'path to file', 'run': 4, 'instrument': ''})
 
+    def test_that_get_data_finds_entries_by_run_and_instrument(self):
+        data = self.populate_loaded_data()
+        data.add_data(run=[1234], workspace=[4], filename="C:\\dir1\\file4.nxs", instrument='MUSR')
+
+        self.assertEqual(data.get_data(run=[1234], instrument='MUSR')['workspace'], [4])
+        self.assertEqual(data.get_data(run=1235, instrument='EMU')['workspace'], [2])
+        self.assertIsNone(data.get_data(run=[1234], instrument='EMU'))
+        self.assertEqual(data.contains_n(instrument='EMU'), 3)
+
+    def test_that_index_is_updated_when_data_is_removed(self):
+        data = self.populate_loaded_data()
+
+        data.remove_data(run=1235)
+        data.remove_current_data()
+
+        self.assertFalse(data.contains(run=1235))
+        self.assertFalse(data.contains(filename="C:\\dir1\\file3.nxs"))
+        self.assertEqual(data.get_data(instrument='EMU')['run'], 1234)
+
+    @mock.patch('Muon.GUI.Common.muon_load_data.os.path.isfile', return_value=True)
+    @mock.patch('Muon.GUI.Common.muon_load_data._memory_size', return_value=100)
+    @mock.patch('Muon.GUI.Common.muon_load_data.load_utils')
+    def test_that_least_recently_used_workspaces_are_evicted_and_reloaded(self, load_utils_mock, memory_size_mock, isfile_mock):
+        load_utils_mock.load_workspace_from_filename.return_value = ([5], 1234, "C:\\dir1\\file1.nxs")
+        data = MuonLoadData(memory_limit=250)
+        data.add_data(run=1234, workspace=[1], filename="C:\\dir1\\file1.nxs", instrument='EMU')
+        data.add_data(run=1235, workspace=[2], filename="C:\\dir1\\file2.nxs", instrument='EMU')
+        data.get_data(run=1234)['workspace']
+        data.add_data(run=1236, workspace=[3], filename="C:\\dir1\\file3.nxs", instrument='EMU')
+
+        self.assertEqual([entry.evicted for entry in data.params], [False, True, False])
+        load_utils_mock.load_workspace_from_filename.return_value = ([6], 1235, "C:\\dir1\\file2.nxs")
+        self.assertEqual(data.get_data(run=1235)['workspace'], [6])
+        load_utils_mock.load_workspace_from_filename.assert_called_once_with("C:\\dir1\\file2.nxs")
+        self.assertEqual([entry.evicted for entry in data.params], [True, False, False])
+
+    @mock.patch('Muon.GUI.Common.muon_load_data.os.path.isfile', return_value=True)
+    @mock.patch('Muon.GUI.Common.muon_load_data._memory_size')
+    def test_that_workspaces_shown_in_the_ads_are_not_evicted(self, memory_size_mock, isfile_mock):
+        shown = set()
+        memory_size_mock.side_effect = lambda workspace: 0 if workspace[0] in shown else 100
+        data = MuonLoadData(memory_limit=250)
+        data.add_data(run=1234, workspace=[1], filename="C:\\dir1\\file1.nxs", instrument='EMU')
+        data.add_data(run=1235, workspace=[2], filename="C:\\dir1\\file2.nxs", instrument='EMU')
+        shown.update([1, 2])
+        data.add_data(run=1236, workspace=[3], filename="C:\\dir1\\file3.nxs", instrument='EMU')
+        data.add_data(run=1237, workspace=[4], filename="C:\\dir1\\file4.nxs", instrument='EMU')
+
+        self.assertEqual([entry.evicted for entry in data.params], [False, False, False, False])
+        data.add_data(run=1238, workspace=[5], filename="C:\\dir1\\file5.nxs", instrument='EMU')
+        self.assertEqual([entry.evicted for entry in data.params], [False, False, True, False, False])
+
+    @mock.patch('Muon.GUI.Common.muon_load_data.os.path.isfile', return_value=True)
+    @mock.patch('Muon.GUI.Common.muon_load_data._memory_size', return_value=100)
+    @mock.patch('Muon.GUI.Common.muon_load_data.load_utils')
+    def test_that_evicted_load_results_keep_their_other_outputs(self, load_utils_mock, memory_size_mock, isfile_mock):
+        load_utils_mock.load_workspace_from_filename.return_value = ({'OutputWorkspace': [5], 'TimeZero': 0.5},
+                                                                     1234, "C:\\dir1\\file1.nxs")
+        data = MuonLoadData(memory_limit=150)
+        data.add_data(run=1234, workspace={'OutputWorkspace': [1], 'TimeZero': 0.5}, filename="C:\\dir1\\file1.nxs")
+        data.add_data(run=1235, workspace={'OutputWorkspace': [2], 'TimeZero': 0.6}, filename="C:\\dir1\\file2.nxs")
+        self.assertEqual([entry.evicted for entry in data.params], [True, False])
+
+        self.assertEqual(data.get_data(run=1234)['workspace']['TimeZero'], 0.5)
+        load_utils_mock.load_workspace_from_filename.assert_not_called()
+        self.assertEqual(data.get_data(run=1234)['workspace']['OutputWorkspace'], [5])
+        load_utils_mock.load_workspace_from_filename.assert_called_once_with("C:\\dir1\\file1.nxs")
+        self.assertEqual([entry.evicted for entry in data.params], [False, True])
+        self.assertEqual(data.get_data(run=1235)['workspace']['TimeZero'], 0.6)
+
+    @mock.patch('Muon.GUI.Common.muon_load_data.os.path.isfile', return_value=True)
+    @mock.patch('Muon.GUI.Common.muon_load_data._memory_size', return_value=100)
+    @mock.patch('Muon.GUI.Common.muon_load_data.load_utils')
+    def test_that_files_loaded_ahead_count_towards_the_memory_limit(self, load_utils_mock, memory_size_mock,
+                                                                    isfile_mock):
+        load_utils_mock.load_workspace_from_filename.return_value = ([3], 1236, "C:\\dir1\\file3.nxs")
+        data = MuonLoadData(memory_limit=250, load_ahead_runs=1)
+        data.add_data(run=1234, workspace=[1], filename="C:\\dir1\\file1.nxs")
+        data.load_ahead(["C:\\dir1\\file3.nxs"])
+        data._loaded_ahead["C:\\dir1\\file3.nxs"].wait()
+
+        data.add_data(run=1235, workspace=[2], filename="C:\\dir1\\file2.nxs")
+
+        self.assertEqual([entry.evicted for entry in data.params], [True, False])
+
+    @mock.patch('Muon.GUI.Common.muon_load_data.load_utils')
+    def test_that_files_discarded_before_their_load_has_started_are_not_loaded(self, load_utils_mock):
+        first_load_started = threading.Event()
+        finish_first_load = threading.Event()
+
+        def load(filename):
+            if filename == "file1.nxs":
+                first_load_started.set()
+                finish_first_load.wait()
+            return [filename], 0, filename
+        load_utils_mock.load_workspace_from_filename.side_effect = load
+        data = MuonLoadData(load_ahead_runs=1)
+
+        data.load_ahead(["file1.nxs"])
+        first_load_started.wait()
+        data.load_ahead(["file2.nxs"])
+        data.load_ahead(["file3.nxs"])
+        data.load_ahead(["file4.nxs"])
+        finish_first_load.set()
+
+        self.assertEqual(data.take_loaded_ahead("file4.nxs"), (["file4.nxs"], 0, "file4.nxs"))
+        self.assertEqual(data.take_loaded_ahead("file3.nxs"), (["file3.nxs"], 0, "file3.nxs"))
+        self.assertEqual([call[0][0] for call in load_utils_mock.load_workspace_from_filename.call_args_list],
+                         ["file1.nxs", "file3.nxs", "file4.nxs"])
+
+    @mock.patch('Muon.GUI.Common.muon_load_data.load_utils')
+    def test_that_files_loaded_ahead_are_returned_once(self, load_utils_mock):
+        load_utils_mock.load_workspace_from_filename.return_value = ([1], 1235, "file2.nxs")
+        data = MuonLoadData(load_ahead_runs=1)
+
+        data.load_ahead(["file2.nxs", "file3.nxs"])
+
+        self.assertEqual(data.take_loaded_ahead("file2.nxs"), ([1], 1235, "file2.nxs"))
+        self.assertIsNone(data.take_loaded_ahead("file2.nxs"))
+        self.assertIsNone(data.take_loaded_ahead("file3.nxs"))
+        load_utils_mock.load_workspace_from_filename.assert_called_once_with("file2.nxs")
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
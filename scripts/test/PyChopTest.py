@@ -12,6 +12,7 @@ import numpy as np
 # Import mantid to setup the python paths to the bundled scripts
 import mantid
 from PyChop import PyChop2
+from PyChop.Instruments import Instrument
 
 class PyChop2Tests(unittest.TestCase):
 
@@ -73,5 +74,28 @@ class PyChop2Tests(unittest.TestCase):
             self.assertAlmostEqual(rr[0], res[inc][0], places=7)
             self.assertAlmostEqual(ff, flux[inc], places=7)
 
+
+class InstrumentTests(unittest.TestCase):
+
+    # Tests that a scan of the resolution and flux gives the same results as each setting on its own
+    def test_resolution_flux_scan(self):
+        etrans = np.array([0., 0.5, 1.])
+        for instname, chopper, frequencies, eis in [('merlin', 'G', [[300], [450]], [8., 15., 40.]),
+                                                    ('let', 'High flux', [[240, 120], [160, 80]], [2.2, 3.7, 10.])]:
+            chopobj = Instrument(instname, chopper)
+            default_frequency = chopobj.getFrequency()
+            res, flux = chopobj.getResFluxScan(eis, frequencies, etrans)
+            self.assertEqual(res.shape, (len(frequencies), len(eis), len(etrans)))
+            self.assertEqual(flux.shape, (len(frequencies), len(eis)))
+            # The scan leaves the chopper settings as they were
+            self.assertEqual(chopobj.getFrequency(), default_frequency)
+            for i, frequency in enumerate(frequencies):
+                chopobj.setFrequency(frequency)
+                for j, ei in enumerate(eis):
+                    rr, ff = chopobj.getResFlux(etrans, ei)
+                    np.testing.assert_allclose(res[i, j], rr, rtol=1e-10)
+                    np.testing.assert_allclose(flux[i, j], ff, rtol=1e-10)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+import os
+import shutil
+import tempfile
+import unittest
+import mantid
+from sans.algorithm_detail.load_cache import (LoadedDataCache, get_file_signature)
+from sans.common.constants import EMPTY_NAME
+from sans.common.general_functions import create_unmanaged_algorithm
+
+
+class FakeFileInformation(object):
+    def __init__(self, file_name):
+        self._file_name = file_name
+
+    def get_file_name(self):
+        return self._file_name
+
+
+class LoadedDataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._file_name = self._write_file("run.nxs", b"some run data")
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _write_file(self, name, content):
+        file_name = os.path.join(self._directory, name)
+        with open(file_name, 'wb') as file_handle:
+            file_handle.write(content)
+        return file_name
+
+    @staticmethod
+    def _create_workspace(value):
+        create_alg = create_unmanaged_algorithm("CreateWorkspace", DataX=[1., 2.], DataY=[value], NSpec=1,
+                                                OutputWorkspace=EMPTY_NAME)
+        create_alg.execute()
+        return create_alg.getProperty("OutputWorkspace").value
+
+    def test_that_the_signature_changes_with_the_file(self):
+        signature = get_file_signature(self._file_name)
+        self.assertEqual(signature, get_file_signature(self._file_name))
+        self._write_file("run.nxs", b"some longer run data")
+        self.assertNotEqual(signature, get_file_signature(self._file_name))
+
+    def test_that_cached_workspaces_are_returned_as_copies(self):
+        cache = LoadedDataCache(max_size=10)
+        key = cache.make_key(FakeFileInformation(self._file_name), False, 0, "")
+        workspace = self._create_workspace(3.)
+        monitor = self._create_workspace(4.)
+
+        self.assertTrue(cache.get(key) is None)
+        copies, monitor_copies = cache.put(key, [workspace], [monitor])
+        copies[0].dataY(0)[0] = 5.
+        workspaces, monitors = cache.get(key)
+
+        self.assertFalse(copies[0] is workspace)
+        self.assertEqual(3., workspaces[0].readY(0)[0])
+        self.assertEqual(4., monitors[0].readY(0)[0])
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(0.5, cache.hit_rate())
+
+    def test_that_the_key_depends_on_period_and_transmission(self):
+        file_information = FakeFileInformation(self._file_name)
+        key = LoadedDataCache.make_key(file_information, False, 0, "")
+        self.assertNotEqual(key, LoadedDataCache.make_key(file_information, True, 0, ""))
+        self.assertNotEqual(key, LoadedDataCache.make_key(file_information, False, 1, ""))
+
+    def test_that_least_recently_used_entries_are_dropped(self):
+        cache = LoadedDataCache(max_size=10)
+        workspace = self._create_workspace(1.)
+        cache.max_size = 2.5 * workspace.getMemorySize() / (1 << 20)
+        for period in range(3):
+            cache.put(("hash", False, period, ""), [workspace], [])
+        self.assertEqual(2, len(cache))
+        self.assertTrue(cache.get(("hash", False, 0, "")) is None)
+        self.assertFalse(cache.get(("hash", False, 2, "")) is None)
+
+    def test_that_the_cache_is_disabled_by_default(self):
+        self.assertFalse(LoadedDataCache().enabled)
+
+    def test_that_a_disabled_cache_holds_nothing(self):
+        cache = LoadedDataCache(max_size=0)
+        workspace = self._create_workspace(1.)
+        workspaces, _ = cache.put(("hash", False, 0, ""), [workspace], [])
+        self.assertTrue(workspaces[0] is workspace)
+        self.assertEqual(0, len(cache))
+        self.assertTrue(cache.get(("hash", False, 0, "")) is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,8 @@ import unittest
 import mantid
 
 from sans.common.file_information import (SANSFileInformationFactory, SANSFileInformation, FileType,
-                                          SANSInstrument, get_instrument_paths_for_sans_file)
+                                          SANSInstrument, get_instrument_paths_for_sans_file, find_sans_file,
+                                          probe_nexus_file, get_probed_fields, clear_probe_cache)
 from sans.common.enums import SampleShape
 from mantid.kernel import DateAndTime
 
@@ -150,6 +151,21 @@ class SANSFileInformationGeneralFunctionsTest(unittest.TestCase):
         self.assertTrue("Definition" in idf_path)
         self.assertTrue("Parameters" in ipf_path)
 
+    def test_that_probed_fields_are_cached_until_cleared(self):
+        # Arrange
+        clear_probe_cache()
+        full_file_name = find_sans_file("SANS2D00022024")
+        # Act
+        fields = get_probed_fields(probe_nexus_file, full_file_name)
+        cached_fields = get_probed_fields(probe_nexus_file, full_file_name)
+        clear_probe_cache()
+        reread_fields = get_probed_fields(probe_nexus_file, full_file_name)
+        # Assert
+        self.assertTrue(fields is cached_fields)
+        self.assertTrue(fields is not reread_fields)
+        self.assertEqual(fields["isis_nexus_info"], reread_fields["isis_nexus_info"])
+        self.assertEqual(fields["geometry"], reread_fields["geometry"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -13,7 +13,8 @@ from sans.common.general_functions import (quaternion_to_angle_and_axis, create_
                                            get_reduced_can_workspace_from_ads, write_hash_into_reduced_can_workspace,
                                            convert_instrument_and_detector_type_to_bank_name,
                                            convert_bank_name_to_detector_type_isis,
-                                           get_facility, parse_diagnostic_settings, get_transmission_output_name, get_output_name)
+                                           get_facility, parse_diagnostic_settings, get_transmission_output_name, get_output_name,
+                                           map_in_parallel)
 from sans.common.constants import (SANS2D, LOQ, LARMOR)
 from sans.common.enums import (ISISReductionMode, ReductionDimensionality, OutputParts,
                                SANSInstrument, DetectorType, SANSFacility, DataType)
@@ -540,5 +541,17 @@ class SANSFunctionsTest(unittest.TestCase):
         self.assertEqual(output_name, '12345rear_1D_12.0_34.0Phi12.0_56.0_t4.57_T12.37')
         self.assertEqual(group_output_name, '12345rear_1DPhi12.0_56.0')
 
+    def test_that_map_in_parallel_returns_results_in_order(self):
+        for workers in [1, 4]:
+            self.assertEqual([x * x for x in range(10)], map_in_parallel(lambda x: x * x, range(10), workers))
+
+    def test_that_map_in_parallel_raises_error_of_a_call(self):
+        def _fail_on_three(x):
+            if x == 3:
+                raise RuntimeError("three")
+            return x
+
+        self.assertRaises(RuntimeError, map_in_parallel, _fail_on_three, range(5), 4)
+
 if __name__ == '__main__':
     unittest.main()
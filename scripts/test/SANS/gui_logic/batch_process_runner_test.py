@@ -71,6 +71,30 @@ class BatchProcessRunnerTest(unittest.TestCase):
         self.batch_process_runner.row_failed_signal.emit.assert_any_call(2, 'failure')
         self.assertEqual(self.batch_process_runner.row_processed_signal.emit.call_count, 0)
 
+    def test_that_process_states_reduces_rows_at_the_same_time_with_several_workers(self):
+        runner = BatchProcessRunner(self.notify_progress, self.notify_done, self.notify_error, max_workers=3)
+        runner.row_processed_signal = mock.MagicMock()
+        runner.row_failed_signal = mock.MagicMock()
+        runner.process_states(self.states, True, OutputMode.Both, False, '')
+        QThreadPool.globalInstance().waitForDone()
+
+        self.assertEqual(self.sans_batch_instance.call_count, 3)
+        self.assertEqual(runner.row_processed_signal.emit.call_count, 3)
+        for key in self.states:
+            runner.row_processed_signal.emit.assert_any_call(key, [], [])
+        # each row was given the workers it did not need for other rows
+        for call in self.sans_batch_instance.call_args_list:
+            self.assertEqual(1, call[0][-1])
+
+    def test_that_process_states_reduces_rows_in_turn_without_optimizations(self):
+        runner = BatchProcessRunner(self.notify_progress, self.notify_done, self.notify_error, max_workers=6)
+        runner.process_states(self.states, False, OutputMode.Both, False, '')
+        QThreadPool.globalInstance().waitForDone()
+
+        self.assertEqual(self.sans_batch_instance.call_count, 3)
+        for call in self.sans_batch_instance.call_args_list:
+            self.assertEqual(6, call[0][-1])
+
     def test_that_load_workspaces_emits_row_processed_signal_after_each_row(self):
         self.batch_process_runner.row_processed_signal = mock.MagicMock()
         self.batch_process_runner.row_failed_signal = mock.MagicMock()
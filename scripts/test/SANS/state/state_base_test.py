@@ -6,6 +6,7 @@
 # SPDX - License - Identifier: GPL - 3.0 +
 from __future__ import (absolute_import, division, print_function)
 
+import copy
 import unittest
 import mantid
 
@@ -291,6 +292,106 @@ class TestStateBase(unittest.TestCase):
         self.assertTrue(state_2.float_parameter == 23.)
         self.assertTrue(state_2.positive_float_with_none_parameter == 234.)
 
+    def test_that_serialization_is_updated_when_a_sub_state_changes(self):
+        # Arrange
+        state = ComplexState()
+        serialized = state.property_manager
+
+        # Act
+        state.sub_state_1.string_parameter = "changed"
+        changed = state.property_manager
+
+        # Assert
+        self.assertEqual("changed", changed["sub_state_1"]["string_parameter"])
+        self.assertEqual(serialized["dict_parameter"], changed["dict_parameter"])
+        self.assertNotEqual(serialized["state_hash"], changed["state_hash"])
+
+    def test_that_state_hash_depends_only_on_the_content(self):
+        # Arrange
+        state = ComplexState()
+        other_state = ComplexState()
+        hash_value = state.state_hash
+
+        # Act + Assert
+        self.assertEqual(hash_value, other_state.state_hash)
+        state.sub_state_1.float_list_parameter.append(1.)
+        self.assertNotEqual(hash_value, state.state_hash)
+        self.assertEqual(other_state.dict_parameter["A"].state_hash, state.dict_parameter["A"].state_hash)
+
+    def test_that_serialization_is_updated_when_a_value_is_changed_in_place(self):
+        # Arrange
+        state = ComplexState()
+        serialized = state.property_manager
+        self.assertTrue(serialized is state.property_manager)
+
+        # Act
+        state.dict_parameter["A"].float_list_parameter.append(1.)
+        changed = state.property_manager
+        state.dict_parameter["B"].dict_parameter["1"] = 1
+        changed_again = state.property_manager
+
+        # Assert
+        self.assertEqual([123., 234.], serialized["dict_parameter"]["A"]["float_list_parameter"])
+        self.assertEqual([123., 234., 1.], changed["dict_parameter"]["A"]["float_list_parameter"])
+        self.assertEqual(123, changed["dict_parameter"]["B"]["dict_parameter"]["1"])
+        self.assertEqual(1, changed_again["dict_parameter"]["B"]["dict_parameter"]["1"])
+
+    def test_that_changing_a_copy_of_a_serialized_state_does_not_change_the_state(self):
+        # Arrange
+        state = ComplexState()
+        serialized = copy.deepcopy(state.property_manager)
+
+        # Act
+        serialized["sub_state_1"]["string_parameter"] = "changed"
+        serialized["sub_state_1"]["float_list_parameter"].append(1.)
+
+        # Assert
+        self.assertEqual("String_in_SimpleState", state.property_manager["sub_state_1"]["string_parameter"])
+        self.assertEqual([123., 234.], state.property_manager["sub_state_1"]["float_list_parameter"])
+
+    def test_that_copies_of_a_state_are_independent(self):
+        # Arrange
+        state = ComplexState()
+        state_copy = copy.deepcopy(state)
+
+        # Act
+        state_copy.sub_state_1.float_list_parameter.append(1.)
+
+        # Assert
+        self.assertEqual([123., 234.], state.sub_state_1.float_list_parameter)
+        self.assertEqual([123., 234.], state.property_manager["sub_state_1"]["float_list_parameter"])
+        self.assertEqual([123., 234., 1.], state_copy.property_manager["sub_state_1"]["float_list_parameter"])
+
+    def test_that_deserialization_uses_the_content_and_not_the_stored_hash(self):
+        class FakeAlgorithm(Algorithm):
+            def PyInit(self):
+                self.declareProperty(PropertyManagerProperty("Args"))
+
+            def PyExec(self):
+                pass
+
+        def _deserialize(serialized):
+            fake = FakeAlgorithm()
+            fake.initialize()
+            fake.setProperty("Args", serialized)
+            return create_deserialized_sans_state_from_property_manager(fake.getProperty("Args").value)
+
+        # Arrange
+        state = ComplexState()
+        serialized = copy.deepcopy(state.property_manager)
+        deserialized = _deserialize(serialized)
+        self._assert_simple_state(deserialized.sub_state_1)
+        deserialized.dict_parameter["A"].string_parameter = "changed in place"
+
+        # Act
+        serialized["sub_state_1"]["string_parameter"] = "changed"
+        state_2 = _deserialize(serialized)
+
+        # Assert
+        self.assertEqual(serialized["sub_state_1"]["state_hash"], state.property_manager["sub_state_1"]["state_hash"])
+        self.assertEqual("changed", state_2.sub_state_1.string_parameter)
+        self._assert_simple_state(state_2.dict_parameter["A"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,113 @@
+# Mantid Repository : https://github.com/mantidproject/mantid
+#
+# Copyright &copy; 2019 ISIS Rutherford Appleton Laboratory UKRI,
+#     NScD Oak Ridge National Laboratory, European Spallation Source
+#     & Institut Laue - Langevin
+# SPDX - License - Identifier: GPL - 3.0 +
+from __future__ import (absolute_import, division, print_function)
+
+import unittest
+
+import numpy as np
+
+from mantid.py3compat import mock
+from mantid.simpleapi import CreateEmptyTableWorkspace, CreateSampleWorkspace, DeleteWorkspace
+import tube_calib
+from ideal_tube import IdealTube
+from tube_calib_fit_params import TubeCalibFitParams
+
+PIXELS_PER_TUBE = 50
+PEAKS = [10, 25, 40]
+
+
+class FakeTubeSet(object):
+    """A set of tubes made of consecutive workspace indices"""
+
+    def __init__(self, n_tubes):
+        self.n_tubes = n_tubes
+
+    def getNumTubes(self):
+        return self.n_tubes
+
+    def getTube(self, i):
+        return list(range(i * PIXELS_PER_TUBE, (i + 1) * PIXELS_PER_TUBE)), []
+
+    def getTubeName(self, i):
+        return 'tube{0}'.format(i)
+
+    def getTubeLength(self, i):
+        return 1.0
+
+
+class TubeCalibTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ws = CreateSampleWorkspace(NumBanks=1, BankPixelWidth=PIXELS_PER_TUBE, XMin=0, XMax=1, BinWidth=1,
+                                       StoreInADS=False)
+        pixels = np.arange(PIXELS_PER_TUBE)
+        for tube in range(PIXELS_PER_TUBE):
+            # Shift the peaks of every tube a little, so that each has a different calibration
+            shift = 0.1 * tube
+            counts = 10. + sum(1000. * np.exp(-(pixels - peak - shift) ** 2 / 8.) for peak in PEAKS)
+            for pixel, count in enumerate(counts):
+                cls.ws.dataY(tube * PIXELS_PER_TUBE + pixel)[0] = count
+        cls.ideal_tube = IdealTube()
+        cls.ideal_tube.setArray(np.array([-0.3, 0.0, 0.3]))
+
+    def _calibrate(self, workers, range_list, override_peaks=dict()):
+        calib_table = CreateEmptyTableWorkspace(OutputWorkspace='TubeCalibTest_calibration')
+        calib_table.addColumn(type='int', name='Detector ID')
+        calib_table.addColumn(type='V3D', name='Detector Position')
+        peaks_table = CreateEmptyTableWorkspace(OutputWorkspace='TubeCalibTest_peaks')
+        peaks_table.addColumn(type='str', name='TubeId')
+        for i in range(len(PEAKS)):
+            peaks_table.addColumn(type='float', name='Peak%d' % (i + 1))
+        fit_par = TubeCalibFitParams(PEAKS, height=1000., width=2., margin=6)
+        with mock.patch('tube_calib.max_threads', return_value=workers):
+            tube_calib.getCalibration(self.ws, FakeTubeSet(PIXELS_PER_TUBE), calib_table, fit_par,
+                                      self.ideal_tube, peaks_table, overridePeaks=override_peaks,
+                                      range_list=range_list)
+        peaks = [[peaks_table.cell(row, column) for column in range(peaks_table.columnCount())]
+                 for row in range(peaks_table.rowCount())]
+        positions = [(calib_table.cell(row, 0), calib_table.cell(row, 1))
+                     for row in range(calib_table.rowCount())]
+        DeleteWorkspace(calib_table)
+        DeleteWorkspace(peaks_table)
+        return peaks, positions
+
+    def test_concurrent_calibration_matches_serial_calibration(self):
+        range_list = [7, 2, 11, 0, 5]
+        serial_peaks, serial_positions = self._calibrate(1, range_list)
+        concurrent_peaks, concurrent_positions = self._calibrate(4, range_list)
+
+        self.assertEqual(['tube%d' % i for i in range_list], [row[0] for row in concurrent_peaks])
+        self.assertEqual(len(range_list) * PIXELS_PER_TUBE, len(concurrent_positions))
+        for serial_row, concurrent_row in zip(serial_peaks, concurrent_peaks):
+            np.testing.assert_allclose(serial_row[1:], concurrent_row[1:])
+        self.assertEqual([det_id for det_id, _ in serial_positions],
+                         [det_id for det_id, _ in concurrent_positions])
+        for (_, serial_position), (_, concurrent_position) in zip(serial_positions, concurrent_positions):
+            self.assertAlmostEqual(0., (serial_position - concurrent_position).norm())
+
+    def test_concurrent_calibration_prints_messages_with_their_tube(self):
+        range_list = [3, 8, 1, 6]
+        # two of the peaks of tube 8 are outside the tube, so its correction fails
+        override_peaks = {8: [-5., 25., 60.]}
+        with mock.patch('tube_calib.print', create=True) as print_mock:
+            self._calibrate(4, range_list, override_peaks)
+
+        lines = [' '.join(str(arg) for arg in call[0]) for call in print_mock.call_args_list]
+        lines = [line for line in lines if line.startswith('Calibrated tube') or
+                 line.startswith('Only') or line.startswith('Too few') or line.startswith('Tube correction')]
+        self.assertEqual(['Calibrated tube 4 of 50 tube3',
+                          'Calibrated tube 9 of 50 tube8',
+                          'Only 1 out of 3 slit points used. Missed [1, 3]',
+                          'Too few usable points in tube 1',
+                          'Tube correction failed.',
+                          'Calibrated tube 2 of 50 tube1',
+                          'Calibrated tube 7 of 50 tube6'], lines)
+
+
+if __name__ == '__main__':
+    unittest.main()